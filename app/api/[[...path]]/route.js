@@ -1,129 +1,88 @@
-import { MongoClient } from 'mongodb';
-import OpenAI from 'openai';
 import { v4 as uuidv4 } from 'uuid';
-
-// MongoDB connection
-let cachedClient = null;
-let cachedDb = null;
-
-async function connectToDatabase() {
-  if (cachedClient && cachedDb) {
-    return { client: cachedClient, db: cachedDb };
-  }
-
-  const client = new MongoClient(process.env.MONGO_URL);
-  await client.connect();
-  const db = client.db(process.env.DB_NAME);
-
-  cachedClient = client;
-  cachedDb = db;
-
-  return { client, db };
-}
-
-// OpenAI configuration
-const openai = process.env.OPENAI_API_KEY ? new OpenAI({
-  apiKey: process.env.OPENAI_API_KEY,
-}) : null;
-
-// Mock responses for testing
-const getMockTutorResponse = (userText, userLevel) => {
-  const mockReplies = {
-    A1: "That's a great start! Let me help you improve this sentence.",
-    A2: "Good effort! I can see you're making progress with your English.",
-    B1: "Nice work! Your English is developing well. Let me give you some feedback.",
-    B2: "Excellent! You're expressing yourself clearly. Here are a few suggestions.",
-    C1: "Very well articulated! Your English is quite advanced. Let me offer some refinements."
-  };
-
-  return {
-    reply: mockReplies[userLevel] || mockReplies.B1,
-    corrections: [
-      {
-        original: "I go to school yesterday",
-        corrected: "I went to school yesterday", 
-        explanation: "Use past tense 'went' for actions that happened in the past",
-        rule: "Past Simple Tense"
-      }
-    ],
-    miniExercise: {
-      type: "multiple_choice",
-      question: "Choose the correct past tense:",
-      options: ["I go", "I went", "I going", "I goes"],
-      correct: 1,
-      explanation: "Past tense of 'go' is 'went'"
-    }
-  };
-};
-
-// Tutor system prompt
-const getTutorPrompt = (userLevel) => `You are an English tutor for Brazilian Portuguese speakers learning English.
-
-User Level: ${userLevel} (CEFR)
-Your role:
-1. Respond naturally in English first
-2. Provide up to 3 corrections with brief explanations in Portuguese
-3. Create 1 quick exercise based on the user's input
-4. Be encouraging and motivating
-5. Adapt vocabulary and complexity to the user's CEFR level
-
-Format your response as JSON:
-{
-  "reply": "Natural English response",
-  "corrections": [
-    {
-      "original": "user's text",
-      "corrected": "corrected version", 
-      "explanation": "Brief explanation in Portuguese",
-      "rule": "Grammar rule name"
-    }
-  ],
-  "miniExercise": {
-    "type": "multiple_choice",
-    "question": "Question text",
-    "options": ["option1", "option2", "option3", "option4"],
-    "correct": 0,
-    "explanation": "Why this answer is correct"
-  }
-}
-
-Keep corrections to maximum 3 items. Be gentle and encouraging.`;
-
-export async function POST(request, { params }) {
+import { handleTutorRequest } from '@/lib/tutor';
+import { tutorCache, tutorCacheUsesMongo } from '@/lib/tutorCache';
+import { tutorAdmission } from '@/lib/tutorAdmission';
+import { modelRouter } from '@/lib/modelRouter';
+import { exerciseBank } from '@/lib/exerciseBank';
+import { decodeCursor, getChatHistory, HISTORY_MAX_LIMIT } from '@/lib/chat';
+import { applyReviews, getDueCards, SRS_MAX_BULK_REVIEWS } from '@/lib/srs';
+import { authenticate, authorizeDiagnostics, getProfile, issueToken, profileCache, resolveUserId } from '@/lib/auth';
+import { getDb, mongoPoolStats } from '@/lib/mongodb';
+import { progressBuffer, withPendingProgress } from '@/lib/progressBuffer';
+import { pronunciationAnalysis, pronunciationStats, scorePronunciation } from '@/lib/pronunciation';
+import { requestLog, withRequestLog } from '@/lib/requestLog';
+import { forcedGcAllowed, runtimeMetrics } from '@/lib/runtimeMetrics';
+import { timed, withTiming } from '@/lib/timing';
+
+// Operator-only routes: they flush buffers or expose per-process state and capture stats
+const DIAGNOSTIC_ROUTES = new Set([
+  'user/progress/flush',
+  'user/progress/buffer',
+  'user/profile/cache',
+  'db/pool',
+  'tutor/cache',
+  'tutor/admission',
+  'tutor/models',
+  'tutor/exercises',
+  'pronunciation/stats',
+  'request-log',
+  'runtime/metrics'
+]);
+
+const diagnosticsError = (path, request) =>
+  DIAGNOSTIC_ROUTES.has(path) ? authorizeDiagnostics(request).error : undefined;
+
+export const POST = withRequestLog(withTiming(async (request, { params }) => {
   try {
     const path = params.path?.join('/') || '';
-    const body = await request.json();
+    const denied = diagnosticsError(path, request);
+    if (denied) return denied;
 
-    const { db } = await connectToDatabase();
+    const body = await timed('parse', () => request.json());
 
-    // API Routes
+    const { claims, error } = authenticate(request);
+    if (error) return error;
+
+    // API Routes; each one connects to MongoDB only if it needs it
     switch (path) {
-      case 'tutor':
-        return await handleTutorRequest(body);
+      case 'tutor': {
+        // Only chat history and the shared tutor cache need the database
+        const db = body.sessionId || tutorCacheUsesMongo() ? await getDb() : null;
+        // A signed-in learner's level comes from the token when the client omits it; the
+        // token subject, when present, is the identity rate limits apply to
+        return await handleTutorRequest({ userLevel: claims?.lvl, ...body, userId: claims?.sub ?? body.userId }, db);
+      }
       
       case 'auth/login':
-        return await handleLogin(body, db);
+        return await handleLogin(body, await getDb());
       
       case 'auth/register':
-        return await handleRegister(body, db);
+        return await handleRegister(body, await getDb());
       
       case 'user/progress':
-        return await handleUserProgress(body, db);
+        return await handleUserProgress(body, claims);
+      
+      case 'user/progress/flush':
+        await progressBuffer.drain();
+        return Response.json(progressBuffer.snapshot());
       
       case 'lessons':
-        return await handleLessons(body, db);
+        return await handleLessons(body);
       
       case 'vocabulary/cards':
-        return await handleVocabularyCards(body, db);
+        return await handleVocabularyCards(body, await getDb());
       
       case 'vocabulary/review':
-        return await handleVocabularyCards(body, db);
+        return await handleVocabularyCards(body, await getDb());
+      
+      case 'vocabulary/review/bulk':
+        return await handleBulkReview(body, await getDb());
       
       case 'pronunciation/analyze':
-        return await handlePronunciation(body, db);
+        return await handlePronunciation(body, await getDb());
       
       case 'chat/sessions':
-        return await handleChatSessions(body, db);
+        return await handleChatSessions(body, await getDb());
       
       default:
         return Response.json({ error: 'Route not found' }, { status: 404 });
@@ -132,27 +91,67 @@ export async function POST(request, { params }) {
     console.error('API Error:', error);
     return Response.json({ error: 'Internal server error' }, { status: 500 });
   }
-}
+}));
 
-export async function GET(request, { params }) {
+export const GET = withRequestLog(withTiming(async (request, { params }) => {
   try {
     const path = params.path?.join('/') || '';
+    const denied = diagnosticsError(path, request);
+    if (denied) return denied;
+
     const { searchParams } = new URL(request.url);
-    
-    const { db } = await connectToDatabase();
+
+    const { claims, error } = authenticate(request);
+    if (error) return error;
 
     switch (path) {
       case 'user/profile':
-        return await handleGetProfile(searchParams, db);
+        return await handleGetProfile(searchParams, await getDb(), claims, request);
       
       case 'lessons':
-        return await handleGetLessons(searchParams, db);
+        return await handleGetLessons(searchParams);
       
       case 'vocabulary/due':
-        return await handleGetDueCards(searchParams, db);
+        return await handleGetDueCards(searchParams, await getDb());
       
       case 'chat/history':
-        return await handleGetChatHistory(searchParams, db);
+        return await handleGetChatHistory(searchParams, await getDb());
+      
+      case 'db/pool':
+        return Response.json(mongoPoolStats());
+      
+      case 'request-log':
+        return Response.json(requestLog.snapshot());
+      
+      case 'tutor/cache':
+        return Response.json(tutorCache.snapshot());
+      
+      case 'tutor/admission':
+        return Response.json(tutorAdmission.snapshot());
+      
+      case 'tutor/models':
+        return Response.json(modelRouter.snapshot());
+      
+      case 'tutor/exercises':
+        await exerciseBank.ready();
+        return Response.json(exerciseBank.snapshot());
+      
+      case 'pronunciation/stats':
+        return Response.json(pronunciationStats());
+      
+      case 'user/profile/cache':
+        return Response.json(profileCache.snapshot());
+      
+      case 'user/progress/buffer':
+        return Response.json(progressBuffer.snapshot());
+      
+      case 'runtime/metrics': {
+        const gc = searchParams.get('gc') === '1';
+        if (gc && !forcedGcAllowed()) {
+          return Response.json({ error: 'Forced GC is disabled; set RUNTIME_METRICS_GC=1' }, { status: 403 });
+        }
+        return Response.json(runtimeMetrics.snapshot({ reset: searchParams.get('reset') !== '0', gc }));
+      }
       
       default:
         return Response.json({ error: 'Route not found' }, { status: 404 });
@@ -161,56 +160,13 @@ export async function GET(request, { params }) {
     console.error('API Error:', error);
     return Response.json({ error: 'Internal server error' }, { status: 500 });
   }
-}
-
-// Tutor AI Handler
-async function handleTutorRequest(body) {
-  const { userText, userLevel = 'B1', mode = 'conversation', sessionId } = body;
-
-  // Mock mode
-  if (process.env.AI_TUTOR_MOCK === '1' || !process.env.OPENAI_API_KEY) {
-    const mockResponse = getMockTutorResponse(userText, userLevel);
-    return Response.json(mockResponse);
-  }
-
-  try {
-    const prompt = getTutorPrompt(userLevel);
-    
-    const completion = await openai.chat.completions.create({
-      model: process.env.OPENAI_MODEL || 'gpt-4o-mini',
-      messages: [
-        { role: 'system', content: prompt },
-        { role: 'user', content: userText }
-      ],
-      temperature: 0.7,
-    });
-
-    const responseText = completion.choices[0].message.content;
-    
-    try {
-      const parsedResponse = JSON.parse(responseText);
-      return Response.json(parsedResponse);
-    } catch (parseError) {
-      // Fallback if AI doesn't return valid JSON
-      return Response.json({
-        reply: responseText,
-        corrections: [],
-        miniExercise: null
-      });
-    }
-  } catch (error) {
-    console.error('OpenAI Error:', error);
-    // Fallback to mock response
-    const mockResponse = getMockTutorResponse(userText, userLevel);
-    return Response.json(mockResponse);
-  }
-}
+}));
 
 // Authentication Handlers
 async function handleLogin(body, db) {
   const { email, password } = body;
   
-  const user = await db.collection('users').findOne({ email });
+  const user = await timed('db', () => db.collection('users').findOne({ email }));
   if (!user) {
     return Response.json({ error: 'User not found' }, { status: 404 });
   }
@@ -221,13 +177,13 @@ async function handleLogin(body, db) {
   }
 
   const { password: _, ...userWithoutPassword } = user;
-  return Response.json({ user: userWithoutPassword, token: 'mock-token' });
+  return Response.json({ user: userWithoutPassword, token: issueToken(user) });
 }
 
 async function handleRegister(body, db) {
   const { email, name, password, cefrLevel = 'A2' } = body;
   
-  const existingUser = await db.collection('users').findOne({ email });
+  const existingUser = await timed('db', () => db.collection('users').findOne({ email }));
   if (existingUser) {
     return Response.json({ error: 'User already exists' }, { status: 400 });
   }
@@ -244,29 +200,26 @@ async function handleRegister(body, db) {
     totalMinutes: 0
   };
 
-  await db.collection('users').insertOne(user);
+  await timed('db', () => db.collection('users').insertOne(user));
   
   const { password: _, ...userWithoutPassword } = user;
-  return Response.json({ user: userWithoutPassword, token: 'mock-token' });
+  return Response.json({ user: userWithoutPassword, token: issueToken(user) });
 }
 
 // User Progress Handler
-async function handleUserProgress(body, db) {
-  const { userId, minutesStudied } = body;
+async function handleUserProgress(body, claims) {
+  const { minutesStudied } = body;
+  const { userId, error } = resolveUserId(claims, body.userId);
+  if (error) return error;
   
-  await db.collection('users').updateOne(
-    { _id: userId },
-    { 
-      $inc: { totalMinutes: minutesStudied },
-      $set: { lastStudyDate: new Date() }
-    }
-  );
+  // Buffered and written in bulk; the profile shows it straight away
+  await progressBuffer.recordMinutes(userId, minutesStudied);
 
   return Response.json({ success: true });
 }
 
 // Lessons Handlers
-async function handleLessons(body, db) {
+async function handleLessons(body) {
   const { userId, lessonId, completed = true } = body;
   
   const progress = {
@@ -277,11 +230,11 @@ async function handleLessons(body, db) {
     completedAt: new Date()
   };
 
-  await db.collection('lessonProgress').insertOne(progress);
+  await progressBuffer.recordLesson(progress);
   return Response.json({ success: true });
 }
 
-async function handleGetLessons(searchParams, db) {
+async function handleGetLessons(searchParams) {
   const level = searchParams.get('level') || 'A1';
   
   // Return mock lessons for now
@@ -307,59 +260,38 @@ async function handleGetLessons(searchParams, db) {
 
 // Vocabulary Handlers
 async function handleVocabularyCards(body, db) {
-  const { userId, cardId, result } = body; // result: 'easy', 'good', 'hard', 'again'
-  
-  // Simple SRS logic
-  const intervals = {
-    again: 1,
-    hard: 1,
-    good: 4,
-    easy: 7
-  };
+  const { userId, cardId, result, reviewedAt } = body; // result: 'easy', 'good', 'hard', 'again'
 
-  const interval = intervals[result] || 1;
-  const dueAt = new Date();
-  dueAt.setDate(dueAt.getDate() + interval);
+  const [review] = await applyReviews(db, userId, [{ cardId, result, reviewedAt }]);
 
-  await db.collection('srsReviews').updateOne(
-    { userId, cardId },
-    {
-      $set: {
-        dueAt,
-        interval,
-        ease: result === 'easy' ? 2.5 : result === 'good' ? 2.0 : 1.3,
-        lastResult: result,
-        reviewedAt: new Date()
-      }
-    },
-    { upsert: true }
-  );
+  return Response.json({
+    success: true,
+    nextDue: review.nextDue,
+    interval: review.interval,
+    ease: review.ease
+  });
+}
 
-  return Response.json({ success: true, nextDue: dueAt });
+// Whole review session in one round-trip: { userId, reviews: [{ cardId, result, reviewedAt? }] }
+async function handleBulkReview(body, db) {
+  const { userId, reviews } = body;
+
+  if (!userId || !Array.isArray(reviews)) {
+    return Response.json({ error: 'userId and reviews are required' }, { status: 400 });
+  }
+  if (reviews.length > SRS_MAX_BULK_REVIEWS) {
+    return Response.json({ error: `At most ${SRS_MAX_BULK_REVIEWS} reviews per request` }, { status: 400 });
+  }
+
+  const results = await applyReviews(db, userId, reviews);
+  return Response.json({ success: true, results });
 }
 
 async function handleGetDueCards(searchParams, db) {
   const userId = searchParams.get('userId');
-  const limit = parseInt(searchParams.get('limit')) || 10;
-
-  // Mock vocabulary cards
-  const cards = [
-    {
-      _id: 'card1',
-      term: 'apple',
-      meaning: 'maçã',
-      example: 'I eat an apple every day',
-      cefrLevel: 'A1'
-    },
-    {
-      _id: 'card2',
-      term: 'beautiful',
-      meaning: 'bonito/bonita',
-      example: 'The sunset is beautiful',
-      cefrLevel: 'A2'
-    }
-  ];
+  const limit = Math.min(parseInt(searchParams.get('limit')) || 10, 100);
 
+  const cards = await getDueCards(db, userId, limit);
   return Response.json(cards);
 }
 
@@ -367,18 +299,9 @@ async function handleGetDueCards(searchParams, db) {
 async function handlePronunciation(body, db) {
   const { userId, phrase, audioBase64 } = body;
   
-  // Mock pronunciation analysis
-  const analysis = {
-    _id: uuidv4(),
-    userId,
-    phrase,
-    transcript: phrase.toLowerCase(), // Mock: return same phrase
-    score: 0.85,
-    tips: ['Focus on the "th" sound in "the"', 'Stress the first syllable in "beautiful"'],
-    createdAt: new Date()
-  };
+  const analysis = pronunciationAnalysis(userId, phrase, await scorePronunciation(phrase, audioBase64));
 
-  await db.collection('pronunciation').insertOne(analysis);
+  await timed('db', () => db.collection('pronunciation').insertOne(analysis));
   
   return Response.json(analysis);
 }
@@ -393,34 +316,43 @@ async function handleChatSessions(body, db) {
     level,
     topic,
     createdAt: new Date(),
-    summary: ''
+    summary: '',
+    turnCount: 0,
+    summarizedTurns: 0
   };
 
-  await db.collection('chatSessions').insertOne(session);
+  await timed('db', () => db.collection('chatSessions').insertOne(session));
   return Response.json(session);
 }
 
+// Newest turns first; pass the X-Next-Cursor header back as `before` for older turns
 async function handleGetChatHistory(searchParams, db) {
   const sessionId = searchParams.get('sessionId');
-  const limit = parseInt(searchParams.get('limit')) || 20;
+  const limit = Math.min(parseInt(searchParams.get('limit')) || 20, HISTORY_MAX_LIMIT);
+  const before = searchParams.get('before');
 
-  const turns = await db.collection('chatTurns')
-    .find({ sessionId })
-    .sort({ createdAt: 1 })
-    .limit(limit)
-    .toArray();
+  const cursor = before ? decodeCursor(before) : null;
+  if (before && !cursor) {
+    return Response.json({ error: 'Invalid cursor' }, { status: 400 });
+  }
 
-  return Response.json(turns);
+  const { turns, nextCursor } = await getChatHistory(db, sessionId, { limit, before: cursor });
+
+  return Response.json(turns, {
+    headers: nextCursor ? { 'X-Next-Cursor': nextCursor } : {}
+  });
 }
 
-async function handleGetProfile(searchParams, db) {
-  const userId = searchParams.get('userId');
-  
-  const user = await db.collection('users').findOne({ _id: userId });
-  if (!user) {
+// Served from the profile cache; `Cache-Control: no-cache` forces a fresh read
+async function handleGetProfile(searchParams, db, claims, request) {
+  const { userId, error } = resolveUserId(claims, searchParams.get('userId'));
+  if (error) return error;
+
+  const bypass = /no-cache/i.test(request.headers.get('cache-control') || '');
+  const { profile, source } = await getProfile(db, userId, { bypass });
+  if (!profile) {
     return Response.json({ error: 'User not found' }, { status: 404 });
   }
 
-  const { password: _, ...userWithoutPassword } = user;
-  return Response.json(userWithoutPassword);
+  return Response.json(withPendingProgress(profile), { headers: { 'X-Profile-Cache': source } });
 }
\ No newline at end of file
@@ -1,32 +1,16 @@
-import { MongoClient } from 'mongodb';
+import { issueToken } from '@/lib/auth';
+import { connectToDatabase } from '@/lib/mongodb';
+import { withRequestLog } from '@/lib/requestLog';
+import { timed, withTiming } from '@/lib/timing';
 
-// MongoDB connection
-let cachedClient = null;
-let cachedDb = null;
-
-async function connectToDatabase() {
-  if (cachedClient && cachedDb) {
-    return { client: cachedClient, db: cachedDb };
-  }
-
-  const client = new MongoClient(process.env.MONGO_URL);
-  await client.connect();
-  const db = client.db(process.env.DB_NAME);
-
-  cachedClient = client;
-  cachedDb = db;
-
-  return { client, db };
-}
-
-export async function POST(request) {
+export const POST = withRequestLog(withTiming(async (request) => {
   try {
-    const body = await request.json();
+    const body = await timed('parse', () => request.json());
     const { email, password } = body;
     
     const { db } = await connectToDatabase();
     
-    const user = await db.collection('users').findOne({ email });
+    const user = await timed('db', () => db.collection('users').findOne({ email }));
     if (!user) {
       return Response.json({ error: 'User not found' }, { status: 404 });
     }
@@ -37,9 +21,9 @@ export async function POST(request) {
     }
 
     const { password: _, ...userWithoutPassword } = user;
-    return Response.json({ user: userWithoutPassword, token: 'mock-token' });
+    return Response.json({ user: userWithoutPassword, token: issueToken(user) });
   } catch (error) {
     console.error('Login Error:', error);
     return Response.json({ error: 'Internal server error' }, { status: 500 });
   }
-}
\ No newline at end of file
+}));
\ No newline at end of file
@@ -1,33 +1,17 @@
-import { MongoClient } from 'mongodb';
 import { v4 as uuidv4 } from 'uuid';
+import { issueToken } from '@/lib/auth';
+import { connectToDatabase } from '@/lib/mongodb';
+import { withRequestLog } from '@/lib/requestLog';
+import { timed, withTiming } from '@/lib/timing';
 
-// MongoDB connection
-let cachedClient = null;
-let cachedDb = null;
-
-async function connectToDatabase() {
-  if (cachedClient && cachedDb) {
-    return { client: cachedClient, db: cachedDb };
-  }
-
-  const client = new MongoClient(process.env.MONGO_URL);
-  await client.connect();
-  const db = client.db(process.env.DB_NAME);
-
-  cachedClient = client;
-  cachedDb = db;
-
-  return { client, db };
-}
-
-export async function POST(request) {
+export const POST = withRequestLog(withTiming(async (request) => {
   try {
-    const body = await request.json();
+    const body = await timed('parse', () => request.json());
     const { email, name, password, cefrLevel = 'A2' } = body;
     
     const { db } = await connectToDatabase();
     
-    const existingUser = await db.collection('users').findOne({ email });
+    const existingUser = await timed('db', () => db.collection('users').findOne({ email }));
     if (existingUser) {
       return Response.json({ error: 'User already exists' }, { status: 400 });
     }
@@ -44,12 +28,12 @@ export async function POST(request) {
       totalMinutes: 0
     };
 
-    await db.collection('users').insertOne(user);
+    await timed('db', () => db.collection('users').insertOne(user));
     
     const { password: _, ...userWithoutPassword } = user;
-    return Response.json({ user: userWithoutPassword, token: 'mock-token' });
+    return Response.json({ user: userWithoutPassword, token: issueToken(user) });
   } catch (error) {
     console.error('Register Error:', error);
     return Response.json({ error: 'Internal server error' }, { status: 500 });
   }
-}
\ No newline at end of file
+}));
\ No newline at end of file
@@ -1,28 +1,11 @@
-import { MongoClient } from 'mongodb';
 import { v4 as uuidv4 } from 'uuid';
+import { connectToDatabase } from '@/lib/mongodb';
+import { withRequestLog } from '@/lib/requestLog';
+import { timed, withTiming } from '@/lib/timing';
 
-// MongoDB connection
-let cachedClient = null;
-let cachedDb = null;
-
-async function connectToDatabase() {
-  if (cachedClient && cachedDb) {
-    return { client: cachedClient, db: cachedDb };
-  }
-
-  const client = new MongoClient(process.env.MONGO_URL);
-  await client.connect();
-  const db = client.db(process.env.DB_NAME);
-
-  cachedClient = client;
-  cachedDb = db;
-
-  return { client, db };
-}
-
-export async function POST(request) {
+export const POST = withRequestLog(withTiming(async (request) => {
   try {
-    const body = await request.json();
+    const body = await timed('parse', () => request.json());
     const { userId, level, topic = 'general' } = body;
     
     const { db } = await connectToDatabase();
@@ -33,13 +16,15 @@ export async function POST(request) {
       level,
       topic,
       createdAt: new Date(),
-      summary: ''
+      summary: '',
+      turnCount: 0,
+      summarizedTurns: 0
     };
 
-    await db.collection('chatSessions').insertOne(session);
+    await timed('db', () => db.collection('chatSessions').insertOne(session));
     return Response.json(session);
   } catch (error) {
     console.error('Chat Session Error:', error);
     return Response.json({ error: 'Internal server error' }, { status: 500 });
   }
-}
\ No newline at end of file
+}));
\ No newline at end of file
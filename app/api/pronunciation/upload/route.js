@@ -0,0 +1,40 @@
+import { MAX_UPLOAD_BYTES, pronunciationAnalysis, streamPronunciation } from '@/lib/pronunciation';
+import { authenticate, resolveUserId } from '@/lib/auth';
+import { getDb } from '@/lib/mongodb';
+import { withRequestLog } from '@/lib/requestLog';
+import { timed, withTiming } from '@/lib/timing';
+
+// Raw WAV upload: POST /api/pronunciation/upload?phrase=...&userId=...
+// The body is streamed to the scoring service instead of being read into memory.
+export const POST = withRequestLog(withTiming(async (request) => {
+  try {
+    const { searchParams } = new URL(request.url);
+    const phrase = searchParams.get('phrase');
+
+    const { claims, error } = authenticate(request);
+    if (error) return error;
+
+    if (!phrase || !request.body) {
+      return Response.json({ error: 'phrase and a WAV request body are required' }, { status: 400 });
+    }
+    const { userId, error: userError } = resolveUserId(claims, searchParams.get('userId'));
+    if (userError) return userError;
+    if (parseInt(request.headers.get('content-length')) > MAX_UPLOAD_BYTES) {
+      return Response.json({ error: 'Recording too large' }, { status: 413 });
+    }
+
+    const outcome = await streamPronunciation(phrase, request.body);
+    if (outcome.tooLarge) {
+      return Response.json({ error: 'Recording too large' }, { status: 413 });
+    }
+
+    const analysis = pronunciationAnalysis(userId, phrase, outcome);
+    const db = await getDb();
+    await timed('db', () => db.collection('pronunciation').insertOne(analysis));
+
+    return Response.json(analysis);
+  } catch (error) {
+    console.error('Pronunciation Upload Error:', error);
+    return Response.json({ error: 'Internal server error' }, { status: 500 });
+  }
+}));
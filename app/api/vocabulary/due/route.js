@@ -1,58 +1,20 @@
-import { MongoClient } from 'mongodb';
+import { getDueCards } from '@/lib/srs';
+import { connectToDatabase } from '@/lib/mongodb';
+import { withRequestLog } from '@/lib/requestLog';
+import { withTiming } from '@/lib/timing';
 
-// MongoDB connection
-let cachedClient = null;
-let cachedDb = null;
-
-async function connectToDatabase() {
-  if (cachedClient && cachedDb) {
-    return { client: cachedClient, db: cachedDb };
-  }
-
-  const client = new MongoClient(process.env.MONGO_URL);
-  await client.connect();
-  const db = client.db(process.env.DB_NAME);
-
-  cachedClient = client;
-  cachedDb = db;
-
-  return { client, db };
-}
-
-export async function GET(request) {
+export const GET = withRequestLog(withTiming(async (request) => {
   try {
     const { searchParams } = new URL(request.url);
     const userId = searchParams.get('userId');
-    const limit = parseInt(searchParams.get('limit')) || 10;
+    const limit = Math.min(parseInt(searchParams.get('limit')) || 10, 100);
 
-    // Mock vocabulary cards
-    const cards = [
-      {
-        _id: 'card1',
-        term: 'apple',
-        meaning: 'maçã',
-        example: 'I eat an apple every day',
-        cefrLevel: 'A1'
-      },
-      {
-        _id: 'card2',
-        term: 'beautiful',
-        meaning: 'bonito/bonita',
-        example: 'The sunset is beautiful',
-        cefrLevel: 'A2'
-      },
-      {
-        _id: 'card3',
-        term: 'necessary',
-        meaning: 'necessário',
-        example: 'It is necessary to study English',
-        cefrLevel: 'B1'
-      }
-    ];
+    const { db } = await connectToDatabase();
+    const cards = await getDueCards(db, userId, limit);
 
     return Response.json(cards);
   } catch (error) {
     console.error('Vocabulary Due Error:', error);
     return Response.json({ error: 'Internal server error' }, { status: 500 });
   }
-}
\ No newline at end of file
+}));
\ No newline at end of file
@@ -0,0 +1,20 @@
+import { handleWritingCorrection } from '@/lib/writing';
+import { tutorCacheUsesMongo } from '@/lib/tutorCache';
+import { authenticate } from '@/lib/auth';
+import { getDb } from '@/lib/mongodb';
+import { withRequestLog } from '@/lib/requestLog';
+import { timed, withTiming } from '@/lib/timing';
+
+export const POST = withRequestLog(withTiming(async (request) => {
+  try {
+    const body = await timed('parse', () => request.json());
+    const { claims, error } = authenticate(request);
+    if (error) return error;
+    // Only the shared tutor cache needs the database
+    const db = tutorCacheUsesMongo() ? await getDb() : null;
+    return await handleWritingCorrection({ userLevel: claims?.lvl, ...body, userId: claims?.sub ?? body.userId }, db);
+  } catch (error) {
+    console.error('API Error:', error);
+    return Response.json({ error: 'Internal server error' }, { status: 500 });
+  }
+}));
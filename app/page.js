@@ -24,6 +24,7 @@ export default function AiLinguoApp() {
   const [inputMessage, setInputMessage] = useState('');
   const [isRecording, setIsRecording] = useState(false);
   const [writingText, setWritingText] = useState('');
+  const [writingCorrections, setWritingCorrections] = useState([]);
   const [currentSession, setCurrentSession] = useState(null);
   const [vocabularyCards, setVocabularyCards] = useState([]);
   const [currentCardIndex, setCurrentCardIndex] = useState(0);
@@ -50,17 +51,28 @@ export default function AiLinguoApp() {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [chatMessages]);
 
+  // Signed session token from login/register, sent as a bearer token
+  const authHeaders = () => {
+    const token = localStorage.getItem('ailinguo_token');
+    return token ? { Authorization: `Bearer ${token}` } : {};
+  };
+
   // API calls
   const apiCall = async (endpoint, method = 'GET', data = null) => {
     const config = {
       method,
-      headers: { 'Content-Type': 'application/json' }
+      headers: { 'Content-Type': 'application/json', ...authHeaders() }
     };
     
     if (data) config.body = JSON.stringify(data);
     
     try {
       const response = await fetch(`/api/${endpoint}`, config);
+
+      if (response.status === 401 && config.headers.Authorization) {
+        // Expired or rotated token: drop it and let the user sign in again
+        localStorage.removeItem('ailinguo_token');
+      }
       
       if (!response.ok) {
         const errorData = await response.json();
@@ -84,6 +96,7 @@ export default function AiLinguoApp() {
       if (response.user) {
         setUser(response.user);
         localStorage.setItem('ailinguo_user', JSON.stringify(response.user));
+        localStorage.setItem('ailinguo_token', response.token);
         setCurrentView('dashboard');
       }
     } catch (error) {
@@ -101,6 +114,7 @@ export default function AiLinguoApp() {
       if (response.user) {
         setUser(response.user);
         localStorage.setItem('ailinguo_user', JSON.stringify(response.user));
+        localStorage.setItem('ailinguo_token', response.token);
         setCurrentView('dashboard');
       }
     } catch (error) {
@@ -109,6 +123,49 @@ export default function AiLinguoApp() {
     setIsLoading(false);
   };
 
+  const tutorBusyText = (retryAfter) =>
+    `Your tutor is helping a lot of learners right now. Please try again in ${retryAfter || 1} s.`;
+
+  // Streams an API response over server-sent events, calling onEvent(event, data) as they arrive
+  const streamApi = async (endpoint, data, onEvent) => {
+    const response = await fetch(`/api/${endpoint}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
+      body: JSON.stringify({ ...data, stream: true })
+    });
+
+    if (response.status === 429) {
+      // At capacity: the caller tells the learner when to try again
+      const { retryAfter } = await response.json();
+      throw Object.assign(new Error('HTTP 429'), { retryAfter });
+    }
+
+    if (!response.ok || !response.body) {
+      throw new Error(`HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const payload = block.match(/^data: (.*)$/m)?.[1];
+        if (event && payload) onEvent(event, JSON.parse(payload));
+      }
+    }
+  };
+
+  const streamTutor = (data, onEvent) => streamApi('tutor', data, onEvent);
+
   // Chat handlers
   const handleSendMessage = async () => {
     if (!inputMessage.trim()) return;
@@ -124,26 +181,51 @@ export default function AiLinguoApp() {
     setInputMessage('');
     setIsLoading(true);
 
+    const tutorId = Date.now() + 1;
+    let started = false;
+
     try {
-      const response = await apiCall('tutor', 'POST', {
+      await streamTutor({
         userText: inputMessage,
         userLevel: user?.cefrLevel || 'B1',
         mode: 'conversation',
         sessionId: currentSession?._id
-      });
-
-      const tutorMessage = {
-        id: Date.now() + 1,
-        role: 'tutor',
-        text: response.reply,
-        corrections: response.corrections,
-        exercise: response.miniExercise,
-        timestamp: new Date()
-      };
+      }, (event, data) => {
+        // The tutor bubble replaces the spinner as soon as the first token arrives
+        if (!started) {
+          started = true;
+          setIsLoading(false);
+          setChatMessages(prev => [...prev, {
+            id: tutorId,
+            role: 'tutor',
+            text: '',
+            corrections: [],
+            exercise: null,
+            timestamp: new Date()
+          }]);
+        }
 
-      setChatMessages(prev => [...prev, tutorMessage]);
+        setChatMessages(prev => prev.map(message => {
+          if (message.id !== tutorId) return message;
+          if (event === 'reply') return { ...message, text: message.text + data.delta };
+          if (event === 'corrections') return { ...message, corrections: data };
+          if (event === 'miniExercise') return { ...message, exercise: data };
+          if (event === 'error' && data.status === 429) return { ...message, text: tutorBusyText(data.retryAfter) };
+          return message;
+        }));
+      });
     } catch (error) {
       console.error('Chat error:', error);
+      if (error.retryAfter) {
+        setChatMessages(prev => [...prev, {
+          id: tutorId,
+          role: 'tutor',
+          text: tutorBusyText(error.retryAfter),
+          corrections: [],
+          exercise: null,
+          timestamp: new Date()
+        }]);
+      }
     }
     setIsLoading(false);
   };
@@ -153,15 +235,16 @@ export default function AiLinguoApp() {
     if (!writingText.trim()) return;
     
     setIsLoading(true);
+    setWritingCorrections([]);
     try {
-      const response = await apiCall('tutor', 'POST', {
-        userText: writingText,
-        userLevel: user?.cefrLevel || 'B1',
-        mode: 'writing'
+      // Corrections appear sentence by sentence as the segments are checked
+      await streamApi('writing/correct', {
+        text: writingText,
+        userLevel: user?.cefrLevel || 'B1'
+      }, (event, data) => {
+        if (event === 'segment') setWritingCorrections(prev => [...prev, ...data.corrections]);
+        if (event === 'done') setWritingCorrections(data.corrections);
       });
-
-      // Show corrections in a dialog or similar
-      console.log('Writing corrections:', response);
     } catch (error) {
       console.error('Writing check error:', error);
     }
@@ -863,7 +946,25 @@ export default function AiLinguoApp() {
             </CardContent>
           </Card>
 
-          {/* Results would be shown here after analysis */}
+          {writingCorrections.length > 0 && (
+            <Card className="mt-6">
+              <CardHeader>
+                <CardTitle>Correções</CardTitle>
+              </CardHeader>
+              <CardContent className="space-y-3">
+                {writingCorrections.map((correction, index) => (
+                  <div key={`${correction.segment}-${index}`} className="border-l-4 border-orange-400 pl-3">
+                    <p className="text-sm">
+                      <span className="line-through text-red-600">{correction.original}</span>
+                      {' → '}
+                      <span className="text-green-700 font-medium">{correction.corrected}</span>
+                    </p>
+                    <p className="text-xs text-gray-600">{correction.explanation}</p>
+                  </div>
+                ))}
+              </CardContent>
+            </Card>
+          )}
         </div>
       </div>
     );
@@ -4,22 +4,510 @@ Comprehensive Backend API Testing for AI English Tutor Application
 Tests all backend endpoints with realistic data scenarios
 """
 
+import argparse
+import array
+import asyncio
+import base64
+import contextlib
+import csv
+import hashlib
+import io
+import math
+import os
+import random
 import requests
 import json
+import shlex
+import statistics
+import threading
 import time
 import uuid
-from datetime import datetime
+import wave
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:  # only needed for --load
+    aiohttp = None
 
 # Configuration
 BASE_URL = "http://localhost:3000/api"
 HEADERS = {"Content-Type": "application/json"}
+# Operator endpoints (flushes, stats) require the server's diagnostics token when it has one
+if os.environ.get("DIAGNOSTICS_TOKEN"):
+    HEADERS["X-Diagnostics-Token"] = os.environ["DIAGNOSTICS_TOKEN"]
+
+# Tutor payloads shared by the functional tests and the load scenarios
+TUTOR_TEST_CASES = [
+    {
+        "name": "Basic Grammar Correction",
+        "payload": {
+            "userText": "I go to school yesterday",
+            "userLevel": "A2"
+        }
+    },
+    {
+        "name": "B1 Level Conversation", 
+        "payload": {
+            "userText": "I am learning English because I want to travel",
+            "userLevel": "B1"
+        }
+    },
+    {
+        "name": "C1 Advanced Level",
+        "payload": {
+            "userText": "The economic implications of globalization are quite complex",
+            "userLevel": "C1"
+        }
+    }
+]
+
+# Sentences learners actually type, most common first. The cache benchmark
+# samples them with a Zipf distribution, so a few dominate like in a classroom.
+TUTOR_CACHE_SENTENCES = [
+    ("I go to school yesterday", "A2"),
+    ("I have 20 years", "A1"),
+    ("She don't like coffee", "A2"),
+    ("I am agree with you", "A2"),
+    ("My name is Ana and I am from Brazil", "A1"),
+    ("I like very much pizza", "A1"),
+    ("He have two brothers", "A1"),
+    ("I am learning English because I want to travel", "B1"),
+    ("Yesterday I goed to the beach", "A2"),
+    ("People is very friendly here", "A2"),
+    ("I want that you help me", "B1"),
+    ("I didn't went to work today", "A2"),
+    ("I am here since two years", "B1"),
+    ("Can you explain me the exercise?", "B1"),
+    ("I make my homework every day", "A2"),
+    ("She is more tall than me", "A2"),
+    ("I will travel to United States next month", "B1"),
+    ("If I would have money I would buy a car", "B1"),
+    ("I look forward to hear from you", "B2"),
+    ("It depends of the situation", "B1"),
+    ("I never have been to London", "B1"),
+    ("The informations are on the table", "B1"),
+    ("I am used to wake up early", "B2"),
+    ("Despite of the rain we went out", "B2"),
+    ("The economic implications of globalization are quite complex", "C1"),
+    ("Had I known earlier, I would of come", "C1"),
+    ("She suggested me to take the train", "B2"),
+    ("I'm working here for five years", "B2"),
+    ("We discussed about the project", "B2"),
+    ("There is many reasons to learn English", "B1"),
+]
+
+# Test groups and the groups whose state they need (test_user_id etc).
+# Groups whose dependencies are done run concurrently in the thread pool.
+TEST_GROUPS = {
+    "test_ai_tutor_endpoint": (),
+    "test_authentication_system": (),
+    "test_mongodb_connection": ("test_authentication_system",),
+    "test_chat_session_management": ("test_authentication_system",),
+    "test_vocabulary_srs_system": ("test_authentication_system",),
+    "test_additional_endpoints": ("test_authentication_system",),
+}
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) latency histogram with microsecond resolution.
+
+    Values are bucketed by keeping their top ``significant_bits`` bits, so every
+    bucket is within 1/2**(significant_bits - 1) of the recorded value while the
+    histogram stays small and mergeable across threads and runs.
+    """
+
+    def __init__(self, significant_bits=7):
+        self.significant_bits = significant_bits
+        self.counts = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def bucket(self, value_us):
+        shift = max(0, value_us.bit_length() - self.significant_bits)
+        return (value_us >> shift) << shift
+
+    def record(self, seconds):
+        value_us = max(0, int(seconds * 1_000_000))
+        bucket = self.bucket(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+
+    def percentile(self, pct):
+        """Latency in milliseconds at the given percentile"""
+        if not self.count:
+            return 0.0
+        threshold = pct / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                # Highest value equivalent to the bucket, as HdrHistogram reports it
+                width = 1 << max(0, bucket.bit_length() - self.significant_bits)
+                return min(bucket + width - 1, self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def to_dict(self, buckets=True):
+        stats = {
+            "count": self.count,
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "mean_ms": self.total_us / self.count / 1000.0 if self.count else 0.0,
+            "max_ms": self.max_us / 1000.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "p999_ms": self.percentile(99.9),
+        }
+        if buckets:
+            stats["buckets_us"] = {str(bucket): count for bucket, count in sorted(self.counts.items())}
+        return stats
+
+
+def parse_server_timing(header):
+    """Server-Timing header to {phase: (milliseconds, operations)}, as lib/timing.js writes it"""
+    phases = {}
+    for metric in (header or "").split(","):
+        name, *params = [part.strip() for part in metric.split(";")]
+        if not name:
+            continue
+        duration, count = 0.0, 1
+        for param in params:
+            key, _, value = param.partition("=")
+            value = value.strip('"')
+            if key == "dur":
+                try:
+                    duration = float(value)
+                except ValueError:
+                    pass
+            elif key == "desc" and value.endswith(" ops"):
+                count = int(value.split()[0]) if value.split()[0].isdigit() else 1
+        phases[name] = (duration, count)
+    return phases
+
+
+class BenchmarkRecorder:
+    """Thread-safe latency histograms keyed by (endpoint, status), plus server-side
+    phase histograms per endpoint from the responses' Server-Timing headers"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.phases = {}  # endpoint -> {phase: [LatencyHistogram, operations]}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status, seconds, server_timing=None):
+        phases = parse_server_timing(server_timing) if server_timing else {}
+        with self._lock:
+            histogram = self.histograms.get((endpoint, status))
+            if histogram is None:
+                histogram = self.histograms[(endpoint, status)] = LatencyHistogram()
+            histogram.record(seconds)
+            for name, (duration_ms, count) in phases.items():
+                phase = self.phases.setdefault(endpoint, {}).setdefault(name, [LatencyHistogram(), 0])
+                phase[0].record(duration_ms / 1000)
+                phase[1] += count
+
+    def phase_summary(self, endpoint):
+        """Per-phase latency for one endpoint. Percentiles are over the requests that had the
+        phase; `per_request_ms` spreads it over all of them and `share` is its part of the
+        server total (above 1 for phases that ran in parallel)"""
+        phases = self.phases.get(endpoint)
+        if not phases:
+            return None
+        total = phases.get("total", [LatencyHistogram()])[0]
+        summary = {}
+        for name, (histogram, operations) in phases.items():
+            latency = histogram.to_dict()
+            summary[name] = {
+                "requests": latency["count"],
+                "operations": operations,
+                "per_request_ms": histogram.total_us / total.count / 1000 if total.count else None,
+                "share": histogram.total_us / total.total_us if total.total_us and name != "total" else None,
+                **{key: value for key, value in latency.items() if key not in ("count", "buckets_us")},
+            }
+        return summary
+
+    @staticmethod
+    def is_error(status):
+        return status == "error" or status >= 500
+
+    def summary(self, elapsed):
+        """Per-endpoint throughput, error rate and tail latency"""
+        endpoints = {}
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            for (endpoint, status), histogram in items:
+                entry = endpoints.setdefault(endpoint, {
+                    "histogram": LatencyHistogram(),
+                    "errors": 0,
+                    "statuses": {},
+                })
+                entry["histogram"].merge(histogram)
+                entry["statuses"][str(status)] = histogram.to_dict()
+                if self.is_error(status):
+                    entry["errors"] += histogram.count
+
+            phases = {endpoint: self.phase_summary(endpoint) for endpoint in endpoints}
+
+        report = {}
+        for endpoint, entry in endpoints.items():
+            latency = entry["histogram"].to_dict()
+            report[endpoint] = {
+                "requests": latency["count"],
+                "errors": entry["errors"],
+                "error_rate": entry["errors"] / latency["count"] if latency["count"] else 0.0,
+                "rps": latency["count"] / elapsed if elapsed else 0.0,
+                **{key: value for key, value in latency.items() if key not in ("count", "buckets_us")},
+                "statuses": entry["statuses"],
+            }
+            if phases[endpoint]:
+                report[endpoint]["phases"] = phases[endpoint]
+        total = sum(item["requests"] for item in report.values())
+        errors = sum(item["errors"] for item in report.values())
+        return {
+            "duration_s": elapsed,
+            "total_requests": total,
+            "total_errors": errors,
+            "error_rate": errors / total if total else 0.0,
+            "rps": total / elapsed if elapsed else 0.0,
+            "endpoints": report,
+        }
+
+
+class WindowedRecorder(BenchmarkRecorder):
+    """BenchmarkRecorder that also keeps the current window's latency per endpoint, so a
+    long run can be read as a time series; rotate() hands the window over and starts a new one"""
 
-class BackendTester:
     def __init__(self):
+        super().__init__()
+        self.window = {}  # endpoint -> [LatencyHistogram, errors]
+        self.window_started = time.perf_counter()
+
+    def record(self, endpoint, status, seconds, server_timing=None):
+        super().record(endpoint, status, seconds, server_timing)
+        with self._lock:
+            entry = self.window.setdefault(endpoint, [LatencyHistogram(), 0])
+            entry[0].record(seconds)
+            entry[1] += self.is_error(status)
+
+    def rotate(self):
+        """The finished window as (seconds, {endpoint: [histogram, errors]})"""
+        with self._lock:
+            window, self.window = self.window, {}
+            started, self.window_started = self.window_started, time.perf_counter()
+        return self.window_started - started, window
+
+
+class TimedSession(requests.Session):
+    """requests.Session that times every call with a monotonic clock"""
+
+    def __init__(self, recorder, base_path=""):
+        super().__init__()
+        self.recorder = recorder
+        self.base_path = base_path
+
+    def request(self, method, url, *args, **kwargs):
+        path = urlparse(url).path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path):]
+        endpoint = f"{method.upper()} {path}"
+        if kwargs.get("stream"):
+            # The body is read by the caller, so only time to headers is measured here
+            endpoint += " (ttfb)"
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(endpoint, "error", time.perf_counter() - start)
+            raise
+        self.recorder.record(endpoint, response.status_code, time.perf_counter() - start,
+                             response.headers.get("Server-Timing"))
+        return response
+
+
+def parse_sse_block(block):
+    """Parse one server-sent event block into (event, data)"""
+    event, data = "message", []
+    for line in block.splitlines():
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    return event, json.loads("\n".join(data)) if data else None
+
+
+def assemble_tutor_stream(events):
+    """Rebuild the non-streaming tutor response from streamed events"""
+    response = {"reply": "", "corrections": None, "miniExercise": None}
+    for event, data in events:
+        if event == "reply":
+            response["reply"] += data.get("delta", "")
+        elif event in ("corrections", "miniExercise"):
+            response[event] = data
+    return response
+
+
+def write_report(path, report):
+    """Write the benchmark report as JSON, or as a flat per-endpoint CSV"""
+    if path.endswith(".csv"):
+        columns = ["endpoint", "requests", "errors", "error_rate", "rps", "min_ms", "mean_ms",
+                   "p50_ms", "p90_ms", "p95_ms", "p99_ms", "p999_ms", "max_ms"]
+        with open(path, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for endpoint, item in report["endpoints"].items():
+                writer.writerow({"endpoint": endpoint, **item})
+    else:
+        with open(path, "w") as handle:
+            json.dump(report, handle, indent=2, default=str)
+    print(f"📝 Benchmark report written to {path}")
+
+
+def compare_to_baseline(report, baseline, tolerance=0.25, floor_ms=5.0, error_rate_slack=0.01):
+    """Return regressions of ``report`` against a stored baseline report.
+
+    A latency regression needs both a relative increase above ``tolerance`` and
+    an absolute one above ``floor_ms`` so sub-millisecond noise does not fail runs.
+    When both reports have Server-Timing phases, an endpoint's latency regression is
+    followed by the phases that slowed down by the same rule.
+    """
+    def slower(before, after, metric):
+        return after[metric] > max(before[metric] * (1 + tolerance), before[metric] + floor_ms)
+
+    regressions = []
+    for endpoint, before in baseline.get("endpoints", {}).items():
+        after = report["endpoints"].get(endpoint)
+        if after is None:
+            continue
+        latency_regressed = False
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if slower(before, after, metric):
+                latency_regressed = True
+                regressions.append(f"{endpoint} {metric}: {before[metric]:.1f} -> {after[metric]:.1f}")
+        if latency_regressed:
+            phases_before, phases_after = before.get("phases") or {}, after.get("phases") or {}
+            for name in sorted(phases_after.keys() & phases_before.keys() - {"total"}):
+                for metric in ("mean_ms", "p95_ms"):
+                    if slower(phases_before[name], phases_after[name], metric):
+                        regressions.append(f"  ↳ {endpoint} phase {name} {metric}: "
+                                           f"{phases_before[name][metric]:.1f} -> {phases_after[name][metric]:.1f}")
+        if after["error_rate"] > before["error_rate"] + error_rate_slack:
+            regressions.append(
+                f"{endpoint} error_rate: {before['error_rate']:.2%} -> {after['error_rate']:.2%}")
+        if report.get("mode") == "load" and baseline.get("mode") == "load":
+            if after["rps"] < before["rps"] * (1 - tolerance):
+                regressions.append(f"{endpoint} rps: {before['rps']:.1f} -> {after['rps']:.1f}")
+    return regressions
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Largest session the bulk review endpoint accepts (SRS_MAX_BULK_REVIEWS in lib/srs.js)
+SRS_BULK_BATCH = 500
+
+
+def iso_from_ms(ms):
+    """Epoch milliseconds to the ISO string JavaScript's Date parses"""
+    return (EPOCH + timedelta(milliseconds=int(ms))).isoformat(timespec="milliseconds")
+
+
+def ms_from_iso(value):
+    """ISO timestamp (as serialized by Response.json) to epoch milliseconds"""
+    return (datetime.fromisoformat(value.replace("Z", "+00:00")) - EPOCH) // timedelta(milliseconds=1)
+
+
+def essay_sentences(count, rng):
+    """count learner sentences from TUTOR_CACHE_SENTENCES"""
+    return [rng.choice(TUTOR_CACHE_SENTENCES)[0].rstrip("?") + "." for _ in range(count)]
+
+
+def essay_text(sentences):
+    """Sentences as an essay, five per paragraph"""
+    return "\n\n".join(" ".join(sentences[start:start + 5]) for start in range(0, len(sentences), 5))
+
+
+def wav_recording(seconds, sample_rate=16000):
+    """16-bit mono WAV of a warbling tone, for upload checks that do not need speech"""
+    samples = array.array("h", (
+        int(8000 * math.sin(2 * math.pi * (180 + 40 * math.sin(2 * math.pi * 3 * n / sample_rate)) * n / sample_rate))
+        for n in range(int(seconds * sample_rate))
+    ))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+class BackendTester:
+    # Benchmark options (command-line flags); a benchmark with 0 requests is skipped
+    BENCHMARK_OPTIONS = {
+        "srs_cards": 0,
+        "tutor_cache_requests": 0,
+        "zipf_skew": 1.1,
+        "stream_requests": 0,
+        "stream_concurrency": 8,
+        "routing_requests": 0,
+        "exercise_requests": 0,
+        "chat_turns": 0,
+        "profile_requests": 0,
+        "progress_learners": 0,
+        "progress_events": 3,
+        "cold_start_requests": 0,
+        "cold_start_max_ms": 5000.0,
+        "upload_requests": 0,
+        "upload_seconds": (1, 5, 15, 30),
+    }
+
+    def __init__(self, workers=4, recorder=None, **options):
+        unknown = set(options) - set(self.BENCHMARK_OPTIONS)
+        if unknown:
+            raise TypeError(f"unknown benchmark options: {', '.join(sorted(unknown))}")
+        for name, value in {**self.BENCHMARK_OPTIONS, **options}.items():
+            setattr(self, name, value)
         self.test_results = []
         self.test_user_email = f"testuser_{uuid.uuid4().hex[:8]}@example.com"
         self.test_user_id = None
+        self.test_token = None
         self.test_session_id = None
+        self.workers = workers
+        self.group_timings = {}
+        self.benchmarks = {}  # report section -> results, in the order the benchmarks ran
+        self.recorder = recorder or BenchmarkRecorder()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # One keep-alive pool shared by the per-thread sessions
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+
+    @property
+    def http(self):
+        """Per-thread requests.Session backed by the shared connection pool"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = TimedSession(self.recorder, urlparse(BASE_URL).path)
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
         
     def log_result(self, test_name, success, message, details=None):
         """Log test result"""
@@ -30,44 +518,92 @@ class BackendTester:
             "details": details,
             "timestamp": datetime.now().isoformat()
         }
-        self.test_results.append(result)
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status}: {test_name} - {message}")
-        if details:
-            print(f"   Details: {details}")
+        with self._lock:
+            self.test_results.append(result)
+            print(f"{status}: {test_name} - {message}")
+            if details:
+                print(f"   Details: {details}")
+
+    def run_group(self, name):
+        """Run one test group and record its wall time"""
+        start = time.perf_counter()
+        getattr(self, name)()
+        self.group_timings[name] = time.perf_counter() - start
+
+    def run_groups(self):
+        """Run TEST_GROUPS in the thread pool, respecting their dependencies"""
+        pending = dict(TEST_GROUPS)
+        done = set()
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1)) as pool:
+            while pending or running:
+                for name, deps in list(pending.items()):
+                    if all(dep in done for dep in deps):
+                        running[pool.submit(self.run_group, name)] = name
+                        del pending[name]
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                    done.add(running.pop(future))
+
+    def _run_benchmark(self, name, fn, jobs, concurrency=None, series=()):
+        """Run fn(job) for every job (or range(jobs)) on concurrency threads, self.workers by default.
+
+        fn returns the request latency in seconds, or a {series: seconds} dict to record it under
+        other names (None values are skipped); an exception counts as a failure. Returns the
+        histograms by series (``series`` first, even when empty), the failure messages and the
+        wall time.
+        """
+        jobs = range(jobs) if isinstance(jobs, int) else jobs
+        histograms = {key: LatencyHistogram() for key in series}
+        failures = []
+
+        def run(job):
+            try:
+                latencies = fn(job)
+            except Exception as e:
+                with self._lock:
+                    failures.append(str(e))
+                return
+            if latencies is None:
+                return
+            if not isinstance(latencies, dict):
+                latencies = {"all": latencies}
+            with self._lock:
+                for key, seconds in latencies.items():
+                    if seconds is not None:
+                        histograms.setdefault(key, LatencyHistogram()).record(seconds)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(concurrency or self.workers, 1)) as pool:
+            list(pool.map(run, jobs))
+        wall_time = time.perf_counter() - start
+        print(f"⏱️  {name}: {len(jobs):,} jobs in {wall_time:.1f}s"
+              + (f", {len(failures)} failed" if failures else ""))
+        return histograms, failures, wall_time
+
+    @staticmethod
+    def print_series_table(label, summary):
+        """One row per latency series: count and p50/p95/p99/max"""
+        width = max(len(label), *(len(name) for name in summary))
+        print(f"{label:<{width}} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, stats in summary.items():
+            print(f"{name:<{width}} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                  f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+    @staticmethod
+    def failure_detail(failures):
+        return f"{len(failures)} failed, first: {failures[0]}" if failures else None
     
     def test_ai_tutor_endpoint(self):
         """Test AI Tutor endpoint with mock mode"""
         print("\n=== Testing AI Tutor Endpoint ===")
         
         # Test basic conversation
-        test_cases = [
-            {
-                "name": "Basic Grammar Correction",
-                "payload": {
-                    "userText": "I go to school yesterday",
-                    "userLevel": "A2"
-                }
-            },
-            {
-                "name": "B1 Level Conversation", 
-                "payload": {
-                    "userText": "I am learning English because I want to travel",
-                    "userLevel": "B1"
-                }
-            },
-            {
-                "name": "C1 Advanced Level",
-                "payload": {
-                    "userText": "The economic implications of globalization are quite complex",
-                    "userLevel": "C1"
-                }
-            }
-        ]
-        
-        for test_case in test_cases:
+        for test_case in TUTOR_TEST_CASES:
             try:
-                response = requests.post(
+                response = self.http.post(
                     f"{BASE_URL}/tutor",
                     headers=HEADERS,
                     json=test_case["payload"],
@@ -139,6 +675,423 @@ class BackendTester:
                     False, 
                     f"Request failed: {str(e)}"
                 )
+
+        self.check_tutor_cache()
+        if self.tutor_cache_requests:
+            self.benchmark_tutor_cache(self.tutor_cache_requests, self.zipf_skew)
+
+        self.check_tutor_streaming()
+        self.check_stream_leader_disconnect()
+        if self.stream_requests:
+            self.benchmark_tutor_streaming(self.stream_requests, self.stream_concurrency)
+        if self.routing_requests:
+            self.benchmark_model_routing(self.routing_requests)
+        if self.exercise_requests:
+            self.benchmark_exercise_bank(self.exercise_requests)
+
+        self.check_writing_correction()
+
+    def stream_tutor(self, payload):
+        """Stream a tutor reply over SSE; returns (events, timings) with ttfb/ttft/total in seconds"""
+        started = time.perf_counter()
+        response = self.http.post(
+            f"{BASE_URL}/tutor",
+            headers={**HEADERS, "Accept": "text/event-stream"},
+            json={**payload, "stream": True},
+            stream=True,
+            timeout=60
+        )
+        timings = {"ttfb": time.perf_counter() - started, "ttft": None}
+        events = []
+        buffer = ""
+        with response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                buffer += chunk
+                while "\n\n" in buffer:
+                    block, buffer = buffer.split("\n\n", 1)
+                    event, data = parse_sse_block(block)
+                    if event == "reply" and timings["ttft"] is None and data.get("delta"):
+                        timings["ttft"] = time.perf_counter() - started
+                    events.append((event, data))
+        timings["total"] = time.perf_counter() - started
+        return events, timings
+
+    def check_tutor_streaming(self):
+        """Stream every tutor test case concurrently and validate the reassembled replies"""
+        def run(test_case):
+            try:
+                events, timings = self.stream_tutor(test_case["payload"])
+            except Exception as e:
+                self.log_result(
+                    f"AI Tutor - Streaming {test_case['name']}",
+                    False,
+                    f"Streaming request failed: {str(e)}"
+                )
+                return
+
+            response = assemble_tutor_stream(events)
+            names = [event for event, _ in events]
+            valid = (
+                response["reply"]
+                and isinstance(response["corrections"], list)
+                and "miniExercise" in names
+                and names[-1:] == ["done"]
+            )
+            ttft = f"{timings['ttft'] * 1000:.0f}ms" if timings["ttft"] is not None else "n/a"
+            self.log_result(
+                f"AI Tutor - Streaming {test_case['name']}",
+                bool(valid),
+                f"ttfb {timings['ttfb'] * 1000:.0f}ms, ttft {ttft}, total {timings['total'] * 1000:.0f}ms"
+                f" over {names.count('reply')} reply chunks",
+                None if valid else f"Events: {names}"
+            )
+
+        with ThreadPoolExecutor(max_workers=len(TUTOR_TEST_CASES)) as pool:
+            list(pool.map(run, TUTOR_TEST_CASES))
+
+    def check_stream_leader_disconnect(self):
+        """Requests coalesced onto a stream whose client disconnects still get their own answer"""
+        payload = {"userText": "Yesterday I buyed three book.", "userLevel": "B1",
+                   "mode": f"disconnect-{uuid.uuid4().hex[:8]}"}
+        try:
+            leader = self.http.post(f"{BASE_URL}/tutor", headers={**HEADERS, "Accept": "text/event-stream"},
+                                    json={**payload, "stream": True}, stream=True, timeout=60)
+            if leader.headers.get("X-Tutor-Cache") == "bypass":
+                leader.close()
+                print("⏭️  Tutor cache bypassed (mock mode), skipping stream disconnect check")
+                return
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                streamed = pool.submit(self.stream_tutor, payload)
+                plain = pool.submit(lambda: self.http.post(f"{BASE_URL}/tutor", headers=HEADERS,
+                                                           json=payload, timeout=60))
+                time.sleep(0.5)  # both are waiting on the leader's flight by now
+                leader.close()
+                events, _ = streamed.result()
+                response = plain.result()
+            names = [event for event, _ in events]
+            ok = names[-1:] == ["done"] and response.status_code == 200
+            self.log_result(
+                "AI Tutor - Stream Leader Disconnect",
+                ok,
+                f"followers answered after the leader disconnected: stream {names[-1:]}, "
+                f"plain HTTP {response.status_code} ({response.headers.get('X-Tutor-Cache')})",
+                None if ok else f"Events: {names}"
+            )
+        except Exception as e:
+            self.log_result(
+                "AI Tutor - Stream Leader Disconnect",
+                False,
+                f"Stream disconnect check failed: {str(e)}"
+            )
+
+    def benchmark_tutor_streaming(self, total_requests, concurrency):
+        """Time-to-first-byte, time-to-first-token and total time for concurrent streamed replies"""
+        print(f"\n=== Benchmarking Tutor Streaming ({total_requests} requests, concurrency {concurrency}) ===")
+        run_id = uuid.uuid4().hex[:8]
+        rng = random.Random(run_id)
+
+        def run(index):
+            text, level = rng.choice(TUTOR_CACHE_SENTENCES)
+            # A per-request mode keeps every reply out of the tutor cache
+            _, timings = self.stream_tutor(
+                {"userText": text, "userLevel": level, "mode": f"stream-bench-{run_id}-{index}"})
+            return timings
+
+        histograms, failures, wall_time = self._run_benchmark(
+            "Tutor streaming", run, total_requests, concurrency, series=("ttfb", "ttft", "total"))
+        summary = {name: histogram.to_dict(buckets=False) for name, histogram in histograms.items()}
+        self.print_series_table("metric", summary)
+
+        self.benchmarks["tutor_stream"] = {
+            "requests": total_requests,
+            "concurrency": concurrency,
+            "wall_time": wall_time,
+            "failures": len(failures),
+            **summary,
+        }
+        self.log_result(
+            "AI Tutor - Streaming Benchmark",
+            not failures,
+            f"p50 ttft {summary['ttft']['p50_ms']:.0f}ms vs p50 total {summary['total']['p50_ms']:.0f}ms "
+            f"at concurrency {concurrency}",
+            self.failure_detail(failures)
+        )
+
+    def benchmark_model_routing(self, total_requests):
+        """Tutor latency by answering model, with the router's hedge and circuit breaker counters"""
+        print(f"\n=== Benchmarking Tutor Model Routing ({total_requests} requests) ===")
+        run_id = uuid.uuid4().hex[:8]
+
+        def ask(index):
+            text, level = TUTOR_CACHE_SENTENCES[index % len(TUTOR_CACHE_SENTENCES)]
+            started = time.perf_counter()
+            # A per-request mode keeps every reply out of the tutor cache
+            response = self.http.post(
+                f"{BASE_URL}/tutor",
+                headers=HEADERS,
+                json={"userText": text, "userLevel": level, "mode": f"routing-bench-{run_id}-{index}"},
+                timeout=60
+            )
+            response.raise_for_status()
+            elapsed = time.perf_counter() - started
+            return {"all": elapsed, response.headers.get("X-Tutor-Model", "mock"): elapsed}
+
+        before = self.http.get(f"{BASE_URL}/tutor/models", headers=HEADERS, timeout=10).json()
+        histograms, failures, wall_time = self._run_benchmark(
+            "Tutor model routing", ask, total_requests, series=("all",))
+        after = self.http.get(f"{BASE_URL}/tutor/models", headers=HEADERS, timeout=10).json()
+
+        counters = ("calls", "hedges", "hedgeWins", "cancelled", "failures", "breakerOpens")
+        models = {
+            name: {
+                **{key: state[key] - before["models"].get(name, {}).get(key, 0) for key in counters},
+                "breaker": state["breaker"],
+            }
+            for name, state in after["models"].items()
+        }
+        summary = {name: histogram.to_dict(buckets=False) for name, histogram in histograms.items()}
+        self.print_series_table("answered by", summary)
+        for name, counts in models.items():
+            print(f"🔀 {name}: {counts['calls']} calls, {counts['hedges']} hedges ({counts['hedgeWins']} won), "
+                  f"{counts['cancelled']} cancelled, {counts['failures']} failures, breaker {counts['breaker']}")
+
+        self.benchmarks["tutor_routing"] = {
+            "requests": total_requests,
+            "concurrency": self.workers,
+            "wall_time": wall_time,
+            "failures": len(failures),
+            "hedging": after.get("hedging"),
+            "models": models,
+            "latency": summary,
+        }
+        self.log_result(
+            "AI Tutor - Model Routing Benchmark",
+            not failures,
+            f"p99 {summary['all']['p99_ms']:.0f}ms, "
+            f"{after['hedged'] - before['hedged']} hedged of {total_requests} requests",
+            self.failure_detail(failures)
+        )
+
+    def benchmark_exercise_bank(self, total_requests):
+        """Completion tokens and latency per tutor call with bank exercises vs model-written ones"""
+        print(f"\n=== Benchmarking Exercise Bank ({total_requests} requests per source) ===")
+        bank = self.http.get(f"{BASE_URL}/tutor/exercises", headers=HEADERS, timeout=10).json()
+        if not bank.get("exercises"):
+            self.log_result("AI Tutor - Exercise Bank Benchmark", True,
+                            "Skipped: no exercise bank loaded (see build_exercise_bank.py; "
+                            "EXERCISE_BANK=mongo reads the collection at startup)")
+            return
+        run_id = uuid.uuid4().hex[:8]
+        sources = {"bank": {}, "model": {"exerciseSource": "model"}}
+        results = {source: {"tokens": [], "exercises": 0, "ids": set()} for source in sources}
+
+        def ask(job):
+            source, index = job
+            text, level = TUTOR_CACHE_SENTENCES[index % len(TUTOR_CACHE_SENTENCES)]
+            started = time.perf_counter()
+            # A per-request mode keeps every reply out of the tutor cache
+            response = self.http.post(
+                f"{BASE_URL}/tutor",
+                headers=HEADERS,
+                json={"userText": text, "userLevel": level, "mode": f"exercise-bench-{run_id}-{index}",
+                      **sources[source]},
+                timeout=60
+            )
+            response.raise_for_status()
+            exercise = response.json().get("miniExercise")
+            elapsed = time.perf_counter() - started
+            tokens = response.headers.get("X-Tutor-Completion-Tokens")
+            with self._lock:
+                result = results[source]
+                if tokens is not None:
+                    result["tokens"].append(int(tokens))
+                if exercise:
+                    result["exercises"] += 1
+                    if exercise.get("id"):
+                        result["ids"].add(exercise["id"])
+            return {source: elapsed}
+
+        # Interleaved, so both sources see the same server load
+        jobs = [(source, index) for index in range(total_requests) for source in sources]
+        histograms, failures, wall_time = self._run_benchmark("Exercise bank", ask, jobs, series=sources)
+
+        summary = {}
+        for source, result in results.items():
+            tokens = result["tokens"]
+            summary[source] = {
+                "with_exercise": result["exercises"],
+                "distinct_bank_exercises": len(result["ids"]),
+                "mean_completion_tokens": sum(tokens) / len(tokens) if tokens else None,
+                "latency": histograms[source].to_dict(buckets=False),
+            }
+        print(f"{'source':<8} {'count':>6} {'exercise':>9} {'tokens':>8} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for source, stats in summary.items():
+            latency = stats["latency"]
+            tokens = stats["mean_completion_tokens"]
+            print(f"{source:<8} {latency['count']:>6} {stats['with_exercise']:>9} "
+                  f"{'-' if tokens is None else round(tokens):>8} {latency['p50_ms']:>9.1f} "
+                  f"{latency['p95_ms']:>9.1f} {latency['max_ms']:>9.1f}")
+
+        bank_tokens = summary["bank"]["mean_completion_tokens"]
+        model_tokens = summary["model"]["mean_completion_tokens"]
+        tokens_saved = model_tokens - bank_tokens if bank_tokens is not None and model_tokens is not None else None
+        ms_saved = summary["model"]["latency"]["mean_ms"] - summary["bank"]["latency"]["mean_ms"]
+        self.benchmarks["exercise_bank"] = {
+            "requests": total_requests,
+            "concurrency": self.workers,
+            "wall_time": wall_time,
+            "failures": len(failures),
+            "bank": {key: bank[key] for key in ("exercises", "rules", "version")},
+            "completion_tokens_saved_per_request": tokens_saved,
+            "mean_ms_saved_per_request": ms_saved,
+            **summary,
+        }
+        missing = summary["bank"]["latency"]["count"] - summary["bank"]["with_exercise"]
+        self.log_result(
+            "AI Tutor - Exercise Bank Benchmark",
+            not failures and missing == 0,
+            (f"{tokens_saved:.0f} completion tokens" if tokens_saved is not None else "no token counts (mock mode)")
+            + f" and {ms_saved:.0f}ms saved per request, "
+            f"{summary['bank']['distinct_bank_exercises']} distinct bank exercises served",
+            self.failure_detail(failures) if failures
+            else (f"{missing} bank replies without an exercise" if missing else None)
+        )
+
+    def check_writing_correction(self):
+        """An essay is corrected per sentence with offsets, streamed, and mostly cached on resubmit"""
+        rng = random.Random(uuid.uuid4().hex)
+        # A per-run sentence keeps the first submission from being fully cached
+        text = essay_text(essay_sentences(7, rng) + [f"I go to the club {uuid.uuid4().hex[:6]} yesterday."])
+        try:
+            first = self.http.post(f"{BASE_URL}/writing/correct", headers=HEADERS,
+                                   json={"text": text, "userLevel": "A2"}, timeout=60)
+            first.raise_for_status()
+            data = first.json()
+            misplaced = [
+                correction for correction in data["corrections"]
+                if correction["start"] is not None
+                and text[correction["start"]:correction["end"]].lower() != correction["original"].lower()
+            ]
+            self.log_result(
+                "Writing Correction - Segments and Offsets",
+                data["stats"]["segments"] == 8 and bool(data["corrections"]) and not misplaced,
+                f"{data['stats']['segments']} segments, {len(data['corrections'])} corrections "
+                f"in {data['stats']['durationMs']}ms",
+                f"Offsets not matching the text: {misplaced[:2]}" if misplaced else None
+            )
+
+            response = self.http.post(f"{BASE_URL}/writing/correct", headers=HEADERS,
+                                      json={"text": text, "userLevel": "A2", "stream": True}, timeout=60)
+            response.raise_for_status()
+            events = [parse_sse_block(block) for block in response.text.split("\n\n") if block.strip()]
+            names = [event for event, _ in events]
+            done = events[-1][1] if names[-1:] == ["done"] else {}
+            modes = {segment.get("cache") for event, segment in events if event == "segment"}
+            if modes == {"bypass"}:
+                print("⏭️  Writing segment cache bypassed (mock mode), skipping resubmit check")
+                cached_ok = True
+            else:
+                cached_ok = done.get("stats", {}).get("cached", 0) >= 8 - data["stats"]["failed"]
+            self.log_result(
+                "Writing Correction - Streamed Resubmit",
+                names.count("segment") == 8 and bool(done) and cached_ok,
+                f"{names.count('segment')} segment events, "
+                f"{done.get('stats', {}).get('cached', 0)} segments reused from the first submission",
+                None if done else f"Events: {names}"
+            )
+        except Exception as e:
+            self.log_result(
+                "Writing Correction - Segments and Offsets",
+                False,
+                f"Request failed: {str(e)}"
+            )
+
+    def check_tutor_cache(self):
+        """A repeated identical prompt should be served from the tutor cache"""
+        try:
+            response = self.http.post(
+                f"{BASE_URL}/tutor",
+                headers=HEADERS,
+                json=TUTOR_TEST_CASES[0]["payload"],
+                timeout=10
+            )
+            source = response.headers.get("X-Tutor-Cache")
+            if source == "bypass":
+                print("⏭️  Tutor cache bypassed (mock mode), skipping cache check")
+                return
+            self.log_result(
+                "Tutor Response Cache - Repeat Prompt",
+                response.status_code == 200 and source in ("hit", "shared-hit"),
+                f"Repeated prompt served as {source or 'uncached'}",
+                f"HTTP {response.status_code}"
+            )
+        except Exception as e:
+            self.log_result(
+                "Tutor Response Cache - Repeat Prompt",
+                False,
+                f"Request failed: {str(e)}"
+            )
+
+    def benchmark_tutor_cache(self, total_requests, skew=1.1):
+        """Replay a Zipf-skewed sentence mix and measure cache hit rate and latency saved"""
+        print(f"\n=== Benchmarking Tutor Cache ({total_requests} requests, zipf {skew}) ===")
+        run_id = uuid.uuid4().hex[:8]
+        rng = random.Random(run_id)
+        weights = [1.0 / rank ** skew for rank in range(1, len(TUTOR_CACHE_SENTENCES) + 1)]
+        sentences = rng.choices(TUTOR_CACHE_SENTENCES, weights=weights, k=total_requests)
+
+        def ask(sentence):
+            text, level = sentence
+            started = time.perf_counter()
+            response = self.http.post(
+                f"{BASE_URL}/tutor",
+                headers=HEADERS,
+                # mode is part of the cache key, so every run starts cold
+                json={"userText": text, "userLevel": level, "mode": f"cache-bench-{run_id}"},
+                timeout=60
+            )
+            elapsed = time.perf_counter() - started
+            return {response.headers.get("X-Tutor-Cache", "uncached") if response.ok else "error": elapsed}
+
+        before = self.http.get(f"{BASE_URL}/tutor/cache", headers=HEADERS, timeout=10).json()
+        histograms, failures, wall_time = self._run_benchmark("Tutor cache", ask, sentences)
+        after = self.http.get(f"{BASE_URL}/tutor/cache", headers=HEADERS, timeout=10).json()
+
+        if "bypass" in histograms:
+            print("⏭️  Tutor cache bypassed (mock mode); run with AI_TUTOR_MOCK=0 and a (fake) OpenAI backend")
+        hits = sum(histograms[source].count for source in ("hit", "shared-hit") if source in histograms)
+        misses = histograms["miss"].count if "miss" in histograms else 0
+        served = {source: histogram.to_dict(buckets=False) for source, histogram in histograms.items()}
+        hit_mean = sum(histograms[source].total_us for source in ("hit", "shared-hit") if source in histograms)
+        hit_mean = hit_mean / hits / 1000.0 if hits else 0.0
+        miss_mean = served["miss"]["mean_ms"] if misses else 0.0
+        saved_ms = hits * max(0.0, miss_mean - hit_mean)
+
+        report = self.benchmarks["tutor_cache"] = {
+            "requests": total_requests,
+            "distinct_prompts": len(set(sentences)),
+            "zipf_skew": skew,
+            "wall_time": wall_time,
+            "hit_rate": hits / total_requests if total_requests else 0.0,
+            "hits": hits,
+            "misses": misses,
+            "latency_saved_ms": saved_ms,
+            "evictions": after.get("evictions", 0) - before.get("evictions", 0),
+            "by_source": served,
+        }
+        print(f"🎯 Hit rate {report['hit_rate']:.1%} "
+              f"({hits} hits / {misses} misses over {len(set(sentences))} distinct prompts)")
+        print(f"⚡ Hit mean {hit_mean:.1f}ms vs miss mean {miss_mean:.1f}ms: "
+              f"{saved_ms / 1000:.1f}s of model latency saved")
+        self.log_result(
+            "Tutor Response Cache - Skewed Replay",
+            "error" not in histograms and not failures,
+            f"hit rate {report['hit_rate']:.1%}, "
+            f"{saved_ms / 1000:.1f}s latency saved over {total_requests} requests",
+            f"{histograms['error'].count} requests failed" if "error" in histograms
+            else self.failure_detail(failures)
+        )
     
     def test_authentication_system(self):
         """Test user registration and login"""
@@ -153,7 +1106,7 @@ class BackendTester:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{BASE_URL}/auth/register",
                 headers=HEADERS,
                 json=register_payload,
@@ -164,6 +1117,7 @@ class BackendTester:
                 data = response.json()
                 if "user" in data and "token" in data:
                     self.test_user_id = data["user"]["_id"]
+                    self.test_token = data["token"]
                     user = data["user"]
                     
                     # Validate user data structure
@@ -212,7 +1166,7 @@ class BackendTester:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{BASE_URL}/auth/login",
                 headers=HEADERS,
                 json=login_payload,
@@ -265,7 +1219,7 @@ class BackendTester:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{BASE_URL}/auth/login",
                 headers=HEADERS,
                 json=invalid_login_payload,
@@ -292,6 +1246,225 @@ class BackendTester:
                 False, 
                 f"Invalid login test failed: {str(e)}"
             )
+
+        if self.test_token:
+            self.check_session_tokens()
+            self.check_study_progress()
+            self.check_diagnostics_gate()
+            if self.profile_requests:
+                self.benchmark_profile_reads(self.profile_requests)
+            if self.progress_learners:
+                self.benchmark_progress_writes(self.progress_learners, self.progress_events)
+
+    def auth_headers(self, token=None):
+        return {**HEADERS, "Authorization": f"Bearer {token or self.test_token}"}
+
+    def check_session_tokens(self):
+        """The register token identifies the user on its own; a tampered one is rejected"""
+        try:
+            response = self.http.get(f"{BASE_URL}/user/profile", headers=self.auth_headers(), timeout=10)
+            self.log_result(
+                "Authentication - Session Token",
+                response.status_code == 200 and response.json().get("_id") == self.test_user_id,
+                f"Profile resolved from the token alone (HTTP {response.status_code})",
+                f"X-Profile-Cache: {response.headers.get('X-Profile-Cache')}"
+            )
+
+            header, payload, signature = self.test_token.split(".")
+            forged = f"{header}.{payload}.{signature[::-1]}"
+            response = self.http.get(f"{BASE_URL}/user/profile", headers=self.auth_headers(forged), timeout=10)
+            self.log_result(
+                "Authentication - Tampered Token",
+                response.status_code == 401,
+                f"Tampered token answered with HTTP {response.status_code}"
+            )
+
+            anonymous = self.http.get(f"{BASE_URL}/user/profile", headers=HEADERS, timeout=10)
+            mismatch = self.http.get(f"{BASE_URL}/user/profile", params={"userId": str(uuid.uuid4())},
+                                     headers=self.auth_headers(), timeout=10)
+            self.log_result(
+                "Authentication - Missing vs Foreign userId",
+                anonymous.status_code == 400 and mismatch.status_code == 403,
+                f"No token and no userId: HTTP {anonymous.status_code}, "
+                f"another learner's userId: HTTP {mismatch.status_code}"
+            )
+        except Exception as e:
+            self.log_result(
+                "Authentication - Session Token",
+                False,
+                f"Token check failed: {str(e)}"
+            )
+
+    def check_study_progress(self):
+        """Buffered heartbeats show in the profile at once and reach MongoDB, with the streak, on flush"""
+        try:
+            before = self.http.get(f"{BASE_URL}/user/profile", headers=self.auth_headers(), timeout=10).json()
+            for minutes in (5, 7):
+                self.http.post(f"{BASE_URL}/user/progress", headers=self.auth_headers(),
+                               json={"minutesStudied": minutes}, timeout=10).raise_for_status()
+            buffered = self.http.get(f"{BASE_URL}/user/profile", headers=self.auth_headers(), timeout=10).json()
+            self.http.post(f"{BASE_URL}/user/progress/flush", headers=HEADERS, json={}, timeout=30).raise_for_status()
+            stored = self.http.get(f"{BASE_URL}/user/profile",
+                                   headers={**self.auth_headers(), "Cache-Control": "no-cache"}, timeout=10).json()
+            expected = (before.get("totalMinutes") or 0) + 12
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            problems = [
+                f"{label} totalMinutes {profile.get('totalMinutes')} != {expected}"
+                for label, profile in (("buffered", buffered), ("stored", stored))
+                if profile.get("totalMinutes") != expected
+            ]
+            if stored.get("streakLastDay") != today or not stored.get("streakDays"):
+                problems.append(f"streak {stored.get('streakDays')} ending {stored.get('streakLastDay')}")
+            self.log_result(
+                "Authentication - Study Progress",
+                not problems,
+                f"{expected} minutes, {stored.get('streakDays')}-day streak after flush",
+                "; ".join(problems) or None
+            )
+        except Exception as e:
+            self.log_result(
+                "Authentication - Study Progress",
+                False,
+                f"Study progress check failed: {str(e)}"
+            )
+
+    def check_diagnostics_gate(self):
+        """A learner's session token is not enough to flush the progress buffer"""
+        if not os.environ.get("DIAGNOSTICS_TOKEN"):
+            print("⏭️  DIAGNOSTICS_TOKEN not set; diagnostic endpoints are open on a development server")
+            return
+        try:
+            response = self.http.post(f"{BASE_URL}/user/progress/flush", json={}, timeout=30,
+                                      headers={"Content-Type": "application/json",
+                                               "Authorization": f"Bearer {self.test_token}"})
+            self.log_result(
+                "Authentication - Diagnostics Gate",
+                response.status_code == 403,
+                f"Flush without the diagnostics token answered {response.status_code}"
+            )
+        except Exception as e:
+            self.log_result(
+                "Authentication - Diagnostics Gate",
+                False,
+                f"Diagnostics gate check failed: {str(e)}"
+            )
+
+    def benchmark_progress_writes(self, learners, events_per_learner=3, verify=10):
+        """Heartbeats and lesson completions from many learners: MongoDB write commands per event"""
+        print(f"\n=== Benchmarking Progress Writes ({learners:,} learners x {events_per_learner} events) ===")
+        run_id = uuid.uuid4().hex[:8]
+        user_ids = []
+        for index in range(verify):
+            response = self.http.post(f"{BASE_URL}/auth/register", headers=HEADERS, timeout=30, json={
+                "email": f"progress_{run_id}_{index}@example.com", "password": "securepass123",
+                "name": f"Progress {index}", "cefrLevel": "A2"})
+            response.raise_for_status()
+            user_ids.append(response.json()["user"]["_id"])
+        user_ids += [f"progress-bench-{run_id}-{index}" for index in range(learners - verify)]
+
+        flush_url = f"{BASE_URL}/user/progress/flush"
+        before = self.http.post(flush_url, headers=HEADERS, json={}, timeout=60).json()
+        events = [(user_id, 1 + (index + round_) % 5, index % 3 == 0 and round_ == 0)
+                  for round_ in range(events_per_learner) for index, user_id in enumerate(user_ids)]
+
+        def send(event):
+            user_id, minutes, completes_lesson = event
+            started = time.perf_counter()
+            self.http.post(f"{BASE_URL}/user/progress", headers=HEADERS, timeout=30,
+                           json={"userId": user_id, "minutesStudied": minutes}).raise_for_status()
+            if completes_lesson:
+                self.http.post(f"{BASE_URL}/lessons", headers=HEADERS, timeout=30,
+                               json={"userId": user_id, "lessonId": "1"}).raise_for_status()
+            return time.perf_counter() - started
+
+        histograms, failures, elapsed = self._run_benchmark("Progress writes", send, events, series=("all",))
+        after = self.http.post(flush_url, headers=HEADERS, json={}, timeout=120).json()
+
+        recorded = after["events"] - before["events"]
+        commands = after["writeCommands"] - before["writeCommands"]
+        operations = after["writeOperations"] - before["writeOperations"]
+        user_writes = after["usersFlushed"] - before["usersFlushed"]
+        expected_minutes = {}
+        for user_id, minutes, _ in events:
+            expected_minutes[user_id] = expected_minutes.get(user_id, 0) + minutes
+        mismatched = []
+        for user_id in user_ids[:verify]:
+            profile = self.http.get(f"{BASE_URL}/user/profile", params={"userId": user_id},
+                                    headers={**HEADERS, "Cache-Control": "no-cache"}, timeout=10).json()
+            if profile.get("totalMinutes") != expected_minutes[user_id] or profile.get("streakDays") != 1:
+                mismatched.append(user_id)
+
+        stats = histograms["all"].to_dict(buckets=False)
+        report = self.benchmarks["progress_writes"] = {
+            "learners": learners,
+            "events": recorded,
+            "events_per_second": recorded / elapsed,
+            "write_commands": commands,
+            "write_operations": operations,
+            "user_document_writes": user_writes,
+            "round_trips_saved": 1 - commands / recorded if recorded else 0.0,
+            "user_writes_per_event": user_writes / recorded if recorded else 0.0,
+            "flushes": after["flushes"] - before["flushes"],
+            "latency": stats,
+        }
+        print(f"{recorded:,} events -> {commands} bulk commands carrying {operations:,} operations "
+              f"({user_writes:,} users updates) over {report['flushes']} flushes; "
+              f"p99 {stats['p99_ms']:.1f}ms, {recorded / elapsed:.0f} events/s")
+        self.log_result(
+            "Authentication - Progress Write-Behind Benchmark",
+            not failures and not mismatched,
+            f"{recorded:,} events in {commands} write commands "
+            f"({report['round_trips_saved']:.1%} fewer round trips), "
+            f"{report['user_writes_per_event']:.2f} users updates per event",
+            f"{len(failures)} failed requests, {len(mismatched)} learners with wrong totals or streaks"
+            if failures or mismatched else None
+        )
+
+    def benchmark_profile_reads(self, total_requests, write_every=20):
+        """Profile-heavy traffic with and without the profile cache: DB reads per request and p99"""
+        print(f"\n=== Benchmarking Profile Reads ({total_requests} requests per phase) ===")
+        phases = {}
+        for phase, extra in (("uncached", {"Cache-Control": "no-cache"}), ("cached", {})):
+            sources = {}
+
+            def read(index):
+                if index % write_every == write_every - 1:
+                    # Progress writes invalidate the cached profile
+                    self.http.post(f"{BASE_URL}/user/progress", headers=self.auth_headers(),
+                                   json={"minutesStudied": 1}, timeout=10).raise_for_status()
+                started = time.perf_counter()
+                response = self.http.get(f"{BASE_URL}/user/profile",
+                                         headers={**self.auth_headers(), **extra}, timeout=10)
+                elapsed = time.perf_counter() - started
+                source = response.headers.get("X-Profile-Cache", "uncached") if response.ok else "error"
+                with self._lock:
+                    sources[source] = sources.get(source, 0) + 1
+                return elapsed
+
+            histograms, failures, _ = self._run_benchmark(
+                f"Profile reads ({phase})", read, total_requests, series=("all",))
+            if failures:
+                sources["error"] = sources.get("error", 0) + len(failures)
+            stats = histograms["all"].to_dict(buckets=False)
+            reads = sum(count for source, count in sources.items() if source in ("miss", "bypass", "uncached"))
+            phases[phase] = {**stats, "sources": sources, "db_reads_per_request": reads / total_requests}
+            print(f"{phase:<9} p50 {stats['p50_ms']:.1f}ms  p99 {stats['p99_ms']:.1f}ms  "
+                  f"{reads / total_requests:.2f} users reads/request  {sources}")
+
+        uncached, cached = phases["uncached"], phases["cached"]
+        report = self.benchmarks["profile_cache"] = {
+            "requests": total_requests,
+            "write_every": write_every,
+            **phases,
+            "db_reads_saved_per_request": uncached["db_reads_per_request"] - cached["db_reads_per_request"],
+            "p99_improvement": 1 - cached["p99_ms"] / uncached["p99_ms"] if uncached["p99_ms"] else 0.0,
+        }
+        self.log_result(
+            "Authentication - Profile Cache Benchmark",
+            "error" not in uncached["sources"] and "error" not in cached["sources"],
+            f"{report['db_reads_saved_per_request']:.2f} DB reads saved per request, "
+            f"p99 {uncached['p99_ms']:.1f}ms -> {cached['p99_ms']:.1f}ms"
+        )
     
     def test_mongodb_connection(self):
         """Test MongoDB operations through user profile endpoint"""
@@ -306,7 +1479,7 @@ class BackendTester:
             return
         
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{BASE_URL}/user/profile?userId={self.test_user_id}",
                 headers=HEADERS,
                 timeout=10
@@ -362,7 +1535,7 @@ class BackendTester:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{BASE_URL}/chat/sessions",
                 headers=HEADERS,
                 json=session_payload,
@@ -406,7 +1579,7 @@ class BackendTester:
         # Test chat history retrieval
         if self.test_session_id:
             try:
-                response = requests.get(
+                response = self.http.get(
                     f"{BASE_URL}/chat/history?sessionId={self.test_session_id}&limit=10",
                     headers=HEADERS,
                     timeout=10
@@ -441,6 +1614,136 @@ class BackendTester:
                     False, 
                     f"Chat history retrieval failed: {str(e)}"
                 )
+
+            self.check_chat_pagination()
+
+        if self.chat_turns:
+            self.benchmark_chat_history(self.chat_turns)
+
+    def post_chat_exchange(self, session_id, text, level="B1"):
+        """One tutor exchange recorded in a session; returns the prompt size the server reported"""
+        response = self.http.post(
+            f"{BASE_URL}/tutor",
+            headers=HEADERS,
+            json={"userText": text, "userLevel": level, "sessionId": session_id},
+            timeout=60
+        )
+        response.raise_for_status()
+        return int(response.headers.get("X-Tutor-Prompt-Chars", 0))
+
+    def walk_chat_history(self, session_id, limit):
+        """Follow X-Next-Cursor through every page; returns (pages, page latencies)"""
+        pages, latencies, cursor = [], [], None
+        while True:
+            params = {"sessionId": session_id, "limit": limit}
+            if cursor:
+                params["before"] = cursor
+            started = time.perf_counter()
+            response = self.http.get(f"{BASE_URL}/chat/history", headers=HEADERS, params=params, timeout=30)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages, latencies
+
+    @staticmethod
+    def history_problems(pages, expected_turns):
+        """Ordering, overlap and count problems in a walked history, newest turn first"""
+        turns = [turn for page in pages for turn in page]
+        keys = [(turn["createdAt"], turn["_id"]) for turn in turns]
+        problems = []
+        if any(newer <= older for newer, older in zip(keys, keys[1:])):
+            problems.append("turns are not strictly newest-first")
+        if len({turn["_id"] for turn in turns}) != len(turns):
+            problems.append("pages overlap")
+        if len(turns) != expected_turns:
+            problems.append(f"{len(turns)} turns returned, expected {expected_turns}")
+        return problems
+
+    def check_chat_pagination(self):
+        """Tutor exchanges sent with a sessionId are stored and paged newest-first"""
+        try:
+            for text in ("I have went to the park.", "She don't like apples."):
+                self.post_chat_exchange(self.test_session_id, text)
+            pages, _ = self.walk_chat_history(self.test_session_id, limit=3)
+            problems = self.history_problems(pages, expected_turns=4)
+            if not problems and pages[0][0]["role"] != "tutor":
+                problems.append("newest turn is not the last tutor reply")
+            self.log_result(
+                "Chat Sessions - Paginated History",
+                not problems,
+                f"4 turns over {len(pages)} pages" if not problems else "; ".join(problems)
+            )
+        except Exception as e:
+            self.log_result(
+                "Chat Sessions - Paginated History",
+                False,
+                f"Paginated history failed: {str(e)}"
+            )
+
+    def benchmark_chat_history(self, total_turns, page_size=50):
+        """Grow one session to total_turns; prompt size and latency should stay flat, pages consistent"""
+        print(f"\n=== Benchmarking Chat History ({total_turns:,} turns) ===")
+        session = self.http.post(
+            f"{BASE_URL}/chat/sessions",
+            headers=HEADERS,
+            json={"userId": self.test_user_id, "level": "B1", "topic": "chat-bench"},
+            timeout=10
+        ).json()
+        rng = random.Random(session["_id"])
+        exchanges = total_turns // 2
+        prompt_chars, latencies = [], []
+
+        start = time.perf_counter()
+        for index in range(exchanges):
+            text, level = rng.choice(TUTOR_CACHE_SENTENCES)
+            started = time.perf_counter()
+            prompt_chars.append(self.post_chat_exchange(session["_id"], f"{text} ({index})", level))
+            latencies.append(time.perf_counter() - started)
+        fill_time = time.perf_counter() - start
+
+        # Early vs late exchanges: a bounded context keeps both the same size
+        window = max(1, exchanges // 10)
+        early, late = LatencyHistogram(), LatencyHistogram()
+        for seconds in latencies[:window]:
+            early.record(seconds)
+        for seconds in latencies[-window:]:
+            late.record(seconds)
+
+        pages, page_latencies = self.walk_chat_history(session["_id"], page_size)
+        problems = self.history_problems(pages, expected_turns=exchanges * 2)
+        first_page, deep_page = LatencyHistogram(), LatencyHistogram()
+        first_page.record(page_latencies[0])
+        for seconds in page_latencies[-max(1, len(page_latencies) // 10):]:
+            deep_page.record(seconds)
+
+        strip = lambda histogram: histogram.to_dict(buckets=False)
+        self.benchmarks["chat_history"] = {
+            "turns": exchanges * 2,
+            "fill_seconds": fill_time,
+            "prompt_chars": {
+                "first": prompt_chars[0],
+                "max": max(prompt_chars),
+                "last_window_mean": sum(prompt_chars[-window:]) / window,
+            },
+            "tutor_early": strip(early),
+            "tutor_late": strip(late),
+            "history_pages": len(pages),
+            "history_first_page": strip(first_page),
+            "history_deep_pages": strip(deep_page),
+            "problems": problems,
+        }
+        print(f"📏 Prompt size: {prompt_chars[0]} chars on the first turn, max {max(prompt_chars)}")
+        print(f"⏱️  Tutor p50 {early.percentile(50):.1f}ms early vs {late.percentile(50):.1f}ms late; "
+              f"history page 1 {page_latencies[0] * 1000:.1f}ms vs deepest pages "
+              f"p50 {deep_page.percentile(50):.1f}ms over {len(pages)} pages")
+        self.log_result(
+            "Chat Sessions - History Benchmark",
+            not problems,
+            f"{exchanges * 2:,} turns, prompt max {max(prompt_chars)} chars, {len(pages)} history pages",
+            "; ".join(problems) if problems else None
+        )
     
     def test_vocabulary_srs_system(self):
         """Test vocabulary SRS (Spaced Repetition System)"""
@@ -456,7 +1759,7 @@ class BackendTester:
         
         # Test getting due vocabulary cards
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{BASE_URL}/vocabulary/due?userId={self.test_user_id}&limit=5",
                 headers=HEADERS,
                 timeout=10
@@ -482,7 +1785,7 @@ class BackendTester:
                         }
                         
                         try:
-                            review_response = requests.post(
+                            review_response = self.http.post(
                                 f"{BASE_URL}/vocabulary/review",
                                 headers=HEADERS,
                                 json=review_payload,
@@ -538,6 +1841,232 @@ class BackendTester:
                 False, 
                 f"Due cards request failed: {str(e)}"
             )
+
+        self.check_srs_against_reference()
+        self.check_new_cards_past_seen()
+        if self.srs_cards:
+            self.benchmark_due_queue(self.srs_cards)
+
+    def check_srs_against_reference(self):
+        """Replay a synthetic review history through the bulk endpoint and compare with srs_reference"""
+        try:
+            import srs_reference
+        except ImportError:
+            print("⏭️  Skipping SRS reference cross-check (needs numpy)")
+            return
+
+        user_id = f"srs-check-{uuid.uuid4().hex[:8]}"
+        try:
+            response = self.http.get(
+                f"{BASE_URL}/vocabulary/due?userId={user_id}&limit=50",
+                headers=HEADERS,
+                timeout=10
+            )
+            card_ids = list(dict.fromkeys(card["_id"] for card in response.json()))
+            if not card_ids:
+                self.log_result("Vocabulary SRS - Reference Cross-check", False, "No cards available for a new user")
+                return
+
+            now_ms = int(time.time() * 1000)
+            card_index, ratings, reviewed_ms = srs_reference.synthetic_log(
+                len(card_ids), max_reviews=6, span_days=60, now_ms=now_ms, seed=now_ms)
+            reviews = [
+                {
+                    "cardId": card_ids[card],
+                    "result": srs_reference.RESULTS[rating],
+                    "reviewedAt": iso_from_ms(reviewed)
+                }
+                for card, rating, reviewed in zip(card_index, ratings, reviewed_ms)
+            ]
+
+            response = self.http.post(
+                f"{BASE_URL}/vocabulary/review/bulk",
+                headers=HEADERS,
+                json={"userId": user_id, "reviews": reviews},
+                timeout=10
+            )
+            if response.status_code != 200:
+                self.log_result(
+                    "Vocabulary SRS - Bulk Review",
+                    False,
+                    f"HTTP {response.status_code}: {response.text}"
+                )
+                return
+
+            server = response.json().get("results", [])
+            state, expected = srs_reference.replay(card_index, ratings, reviewed_ms, len(card_ids))
+            mismatches = [
+                (index, row)
+                for index, row in enumerate(server)
+                if row["interval"] != expected["interval"][index]
+                or abs(row["ease"] - expected["ease"][index]) > 1e-9
+                or ms_from_iso(row["nextDue"]) != expected["due_ms"][index]
+            ]
+            self.log_result(
+                "Vocabulary SRS - Bulk Review",
+                len(server) == len(reviews) and not mismatches,
+                f"{len(server)}/{len(reviews)} reviews scheduled in one request, "
+                f"{len(mismatches)} differ from the reference scheduler",
+                str(mismatches[:3]) if mismatches else None
+            )
+
+            response = self.http.get(
+                f"{BASE_URL}/vocabulary/due?userId={user_id}&limit={len(card_ids)}",
+                headers=HEADERS,
+                timeout=10
+            )
+            queried_ms = int(time.time() * 1000)
+            served = [card["_id"] for card in response.json() if card.get("dueAt")]
+            wanted = [card_ids[index] for index in srs_reference.due_queue(state, queried_ms, len(card_ids))]
+            self.log_result(
+                "Vocabulary SRS - Due Queue Order",
+                served == wanted,
+                f"{len(served)} due cards served, reference expects {len(wanted)}",
+                None if served == wanted else f"served {served[:5]}, expected {wanted[:5]}"
+            )
+        except Exception as e:
+            self.log_result(
+                "Vocabulary SRS - Reference Cross-check",
+                False,
+                f"Cross-check failed: {str(e)}"
+            )
+
+    def check_new_cards_past_seen(self, limit=5):
+        """A learner who has reviewed more than 3x limit cards from the start of the deck still gets new ones"""
+        user_id = f"srs-deep-{uuid.uuid4().hex[:8]}"
+        reviewed_count = limit * 4
+        try:
+            response = self.http.get(
+                f"{BASE_URL}/vocabulary/due?userId={user_id}&limit={reviewed_count + limit}",
+                headers=HEADERS,
+                timeout=10
+            )
+            deck = [card["_id"] for card in response.json()]
+            if len(deck) < reviewed_count + limit:
+                print(f"⏭️  Skipping new-card paging check (deck has {len(deck)} cards, "
+                      f"needs {reviewed_count + limit})")
+                return
+
+            reviewed = deck[:reviewed_count]
+            response = self.http.post(
+                f"{BASE_URL}/vocabulary/review/bulk",
+                headers=HEADERS,
+                json={"userId": user_id, "reviews": [{"cardId": card_id, "result": "easy"} for card_id in reviewed]},
+                timeout=10
+            )
+            if response.status_code != 200:
+                self.log_result("Vocabulary SRS - New Cards Past Seen", False,
+                                f"HTTP {response.status_code}: {response.text}")
+                return
+
+            response = self.http.get(
+                f"{BASE_URL}/vocabulary/due?userId={user_id}&limit={limit}",
+                headers=HEADERS,
+                timeout=10
+            )
+            served = [card["_id"] for card in response.json()]
+            repeated = set(served) & set(reviewed)
+            self.log_result(
+                "Vocabulary SRS - New Cards Past Seen",
+                len(served) == limit and not repeated,
+                f"{len(served)}/{limit} new cards after reviewing the first {reviewed_count}, "
+                f"{len(repeated)} already reviewed",
+                f"served {served}" if repeated else None
+            )
+        except Exception as e:
+            self.log_result(
+                "Vocabulary SRS - New Cards Past Seen",
+                False,
+                f"New-card check failed: {str(e)}"
+            )
+
+    def benchmark_due_queue(self, total_cards, deck_size=None, samples=200, limit=20):
+        """Seed total_cards review states across synthetic learners, then time due-queue reads"""
+        import numpy as np
+        import srs_reference
+
+        print(f"\n=== Benchmarking Due Queue ({total_cards:,} cards) ===")
+        run_id = uuid.uuid4().hex[:8]
+        deck = self.http.get(
+            f"{BASE_URL}/vocabulary/due?userId=srs-bench-{run_id}&limit=100",
+            headers=HEADERS,
+            timeout=10
+        ).json()
+        card_ids = list(dict.fromkeys(card["_id"] for card in deck))[:deck_size]
+        users = -(-total_cards // len(card_ids))
+        n_cards = users * len(card_ids)
+
+        # One synthetic history for every (learner, card) pair; card c belongs to learner c // deck
+        now_ms = int(time.time() * 1000)
+        card_index, ratings, reviewed_ms = srs_reference.synthetic_log(
+            n_cards, max_reviews=4, span_days=90, now_ms=now_ms, seed=7)
+        state, _ = srs_reference.replay(card_index, ratings, reviewed_ms, n_cards)
+        owners = card_index // len(card_ids)
+        order = np.argsort(owners, kind="stable")
+        bounds = np.searchsorted(owners[order], np.arange(users + 1))
+
+        def seed_user(user):
+            rows = order[bounds[user]:bounds[user + 1]]
+            for start in range(0, len(rows), SRS_BULK_BATCH):
+                batch = rows[start:start + SRS_BULK_BATCH]
+                response = self.http.post(
+                    f"{BASE_URL}/vocabulary/review/bulk",
+                    headers=HEADERS,
+                    json={
+                        "userId": f"srs-bench-{run_id}-{user}",
+                        "reviews": [
+                            {
+                                "cardId": card_ids[card_index[row] % len(card_ids)],
+                                "result": srs_reference.RESULTS[ratings[row]],
+                                "reviewedAt": iso_from_ms(reviewed_ms[row])
+                            }
+                            for row in batch
+                        ]
+                    },
+                    timeout=30
+                )
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(seed_user, range(users)))
+        seed_time = time.perf_counter() - start
+        print(f"🌱 Seeded {n_cards:,} cards for {users:,} learners in {seed_time:.1f}s "
+              f"({len(card_index) / seed_time:,.0f} reviews/s)")
+
+        histogram = LatencyHistogram()
+        mismatched = 0
+        sampled = random.Random(run_id).sample(range(users), min(samples, users))
+        for user in sampled:
+            started = time.perf_counter()
+            response = self.http.get(
+                f"{BASE_URL}/vocabulary/due?userId=srs-bench-{run_id}-{user}&limit={limit}",
+                headers=HEADERS,
+                timeout=10
+            )
+            histogram.record(time.perf_counter() - started)
+            served = [card["_id"] for card in response.json() if card.get("dueAt")]
+            offset = user * len(card_ids)
+            own = {key: values[offset:offset + len(card_ids)] for key, values in state.items()}
+            wanted = [card_ids[index] for index in srs_reference.due_queue(own, int(time.time() * 1000), limit)]
+            mismatched += served != wanted
+
+        latency = histogram.to_dict(buckets=False)
+        self.benchmarks["srs_due_queue"] = {
+            "cards": n_cards,
+            "learners": users,
+            "seed_seconds": seed_time,
+            "queries": histogram.count,
+            "mismatched_queues": mismatched,
+            "due_query": latency,
+        }
+        self.log_result(
+            "Vocabulary SRS - Due Queue Benchmark",
+            mismatched == 0,
+            f"p50 {latency['p50_ms']:.1f}ms, p99 {latency['p99_ms']:.1f}ms over "
+            f"{histogram.count} queries at {n_cards:,} cards",
+            f"{mismatched} due queues differ from the reference" if mismatched else None
+        )
     
     def test_additional_endpoints(self):
         """Test additional endpoints like lessons and pronunciation"""
@@ -545,7 +2074,7 @@ class BackendTester:
         
         # Test lessons endpoint
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{BASE_URL}/lessons?level=B1",
                 headers=HEADERS,
                 timeout=10
@@ -590,7 +2119,7 @@ class BackendTester:
             }
             
             try:
-                response = requests.post(
+                response = self.http.post(
                     f"{BASE_URL}/pronunciation/analyze",
                     headers=HEADERS,
                     json=pronunciation_payload,
@@ -629,7 +2158,278 @@ class BackendTester:
                     False, 
                     f"Pronunciation analysis failed: {str(e)}"
                 )
+
+            self.check_pronunciation_upload()
+
+        if self.upload_requests:
+            self.benchmark_pronunciation_uploads(self.upload_requests, self.upload_seconds)
+
+    def check_pronunciation_upload(self):
+        """The raw WAV upload returns the same analysis document as the JSON route"""
+        try:
+            response = self.http.post(
+                f"{BASE_URL}/pronunciation/upload",
+                params={"userId": self.test_user_id, "phrase": "Hello, how are you today?"},
+                headers={"Content-Type": "audio/wav"},
+                data=wav_recording(1.5),
+                timeout=30
+            )
+            data = response.json()
+            missing_fields = [field for field in ("_id", "userId", "phrase", "transcript", "score", "tips")
+                              if field not in data]
+            self.log_result(
+                "Additional - Pronunciation Upload",
+                response.status_code == 200 and not missing_fields,
+                f"HTTP {response.status_code}, score {data.get('score')} ({data.get('engine', 'unknown')} engine)",
+                f"Missing: {missing_fields}" if missing_fields else None
+            )
+
+            anonymous = self.http.post(
+                f"{BASE_URL}/pronunciation/upload",
+                params={"phrase": "Hello, how are you today?"},
+                headers={"Content-Type": "audio/wav"},
+                data=wav_recording(0.5),
+                timeout=30
+            )
+            self.log_result(
+                "Additional - Pronunciation Upload Without userId",
+                anonymous.status_code == 400,
+                f"No token and no userId answered with HTTP {anonymous.status_code}"
+            )
+        except Exception as e:
+            self.log_result(
+                "Additional - Pronunciation Upload",
+                False,
+                f"Pronunciation upload failed: {str(e)}"
+            )
+
+    def sample_server_memory(self, stop, peaks, interval=0.02):
+        """Poll the app's memory usage until stop is set, keeping the peaks"""
+        with requests.Session() as session:
+            while not stop.is_set():
+                try:
+                    memory = session.get(f"{BASE_URL}/pronunciation/stats", headers=HEADERS, timeout=5).json()["memory"]
+                except (requests.RequestException, ValueError, KeyError):
+                    continue
+                peaks["heap"] = max(peaks.get("heap", 0), memory["heapUsed"] + memory["external"])
+                peaks["rss"] = max(peaks.get("rss", 0), memory["rss"])
+                stop.wait(interval)
+
+    def benchmark_pronunciation_uploads(self, requests_per_clip, clip_seconds):
+        """Base64-in-JSON vs streamed raw WAV uploads: latency and app memory at several clip lengths"""
+        import pronunciation_service
+
+        print(f"\n=== Benchmarking Pronunciation Uploads ({requests_per_clip} requests per clip and path) ===")
+        phrase = pronunciation_service.SAMPLE_PHRASES[1]
+        speech = pronunciation_service.synthesize_speech(phrase, pitch_hz=150.0, seed=11)
+        results, failures = [], 0
+
+        for seconds in clip_seconds:
+            repeats = -(-int(seconds * pronunciation_service.SAMPLE_RATE) // len(speech))
+            samples = pronunciation_service.np.tile(speech, repeats)[:int(seconds * pronunciation_service.SAMPLE_RATE)]
+            audio = pronunciation_service.encode_wav(samples)
+            encoded = base64.b64encode(audio).decode()
+            row = {"seconds": seconds, "wav_bytes": len(audio)}
+
+            for path in ("json", "stream"):
+                engines = set()
+
+                def upload(_):
+                    started = time.perf_counter()
+                    if path == "json":
+                        response = self.http.post(
+                            f"{BASE_URL}/pronunciation/analyze", headers=HEADERS, timeout=120,
+                            json={"userId": self.test_user_id, "phrase": phrase, "audioBase64": encoded})
+                    else:
+                        response = self.http.post(
+                            f"{BASE_URL}/pronunciation/upload", headers={"Content-Type": "audio/wav"}, timeout=120,
+                            params={"userId": self.test_user_id, "phrase": phrase}, data=audio)
+                    elapsed = time.perf_counter() - started
+                    response.raise_for_status()
+                    with self._lock:
+                        engines.add(response.json().get("engine"))
+                    return elapsed
+
+                baseline = self.http.get(f"{BASE_URL}/pronunciation/stats", headers=HEADERS, timeout=10).json()["memory"]
+                stop, peaks = threading.Event(), {}
+                sampler = threading.Thread(target=self.sample_server_memory, args=(stop, peaks), daemon=True)
+                sampler.start()
+                histograms, upload_failures, _ = self._run_benchmark(
+                    f"{seconds}s uploads ({path})", upload, requests_per_clip, series=("all",))
+                stop.set()
+                sampler.join()
+
+                histogram = histograms["all"]
+                failures += len(upload_failures)
+                row[path] = {
+                    "request_bytes": len(encoded) + len(phrase) + 60 if path == "json" else len(audio),
+                    "p50_ms": histogram.percentile(50),
+                    "p99_ms": histogram.percentile(99),
+                    "peak_heap_mb": max(0, peaks.get("heap", 0) - baseline["heapUsed"] - baseline["external"]) / 2**20,
+                    "peak_rss_mb": max(0, peaks.get("rss", 0) - baseline["rss"]) / 2**20,
+                    "engines": sorted(engine for engine in engines if engine),
+                }
+            results.append(row)
+            print(f"{seconds:>5}s clip ({len(audio) / 2**20:.1f} MB):  "
+                  f"json p50 {row['json']['p50_ms']:.0f}ms +{row['json']['peak_heap_mb']:.1f} MB heap  |  "
+                  f"stream p50 {row['stream']['p50_ms']:.0f}ms +{row['stream']['peak_heap_mb']:.1f} MB heap  "
+                  f"(engines {row['stream']['engines']})")
+
+        self.benchmarks["pronunciation_upload"] = {"requests_per_clip": requests_per_clip, "concurrency": self.workers, "clips": results}
+        longest = results[-1]
+        self.log_result(
+            "Additional - Pronunciation Upload Benchmark",
+            failures == 0,
+            f"{longest['seconds']}s clip: JSON p50 {longest['json']['p50_ms']:.0f}ms / +{longest['json']['peak_heap_mb']:.1f} MB, "
+            f"stream p50 {longest['stream']['p50_ms']:.0f}ms / +{longest['stream']['peak_heap_mb']:.1f} MB",
+            f"{failures} uploads failed" if failures else None
+        )
     
+    def check_standin_null_matching(self, standin):
+        """The stand-in matches null like MongoDB: a missing field equals null (chat.js relies on it)"""
+        from pymongo import MongoClient
+        expected = [
+            ({"a": None}, [1, 2]),
+            ({"a": {"$ne": None}}, [3]),
+            ({"a": {"$in": [None]}}, [1, 2]),
+            ({"a": {"$nin": [None]}}, [3]),
+        ]
+        try:
+            with MongoClient(standin.url, serverSelectionTimeoutMS=5000) as client:
+                collection = client[f"standin_check_{uuid.uuid4().hex[:8]}"]["nulls"]
+                collection.insert_many([{"_id": 1}, {"_id": 2, "a": None}, {"_id": 3, "a": 5}])
+                problems = []
+                for query, ids in expected:
+                    found = sorted(document["_id"] for document in collection.find(query))
+                    if found != ids:
+                        problems.append(f"{query} -> {found}, MongoDB gives {ids}")
+                modified = collection.update_one({"_id": 1, "a": None}, {"$set": {"b": 1}}).modified_count
+                if modified != 1:
+                    problems.append(f"update_one on a missing field matched as null modified {modified}")
+            self.log_result(
+                "Mongo Stand-in - Null Matching",
+                not problems,
+                f"{len(expected)} null queries and a null-filtered update checked",
+                "; ".join(problems) or None
+            )
+        except Exception as e:
+            self.log_result(
+                "Mongo Stand-in - Null Matching",
+                False,
+                f"Stand-in null matching check failed: {str(e)}"
+            )
+
+    def profile_db_roundtrips(self, standin):
+        """Count the stand-in DB operations each API call makes, one call at a time"""
+        calls = [
+            ("POST /tutor", "post", "tutor", TUTOR_TEST_CASES[0]["payload"]),
+            ("POST /auth/login", "post", "auth/login",
+             {"email": self.test_user_email, "password": "securepass123"}),
+            ("GET /user/profile", "get", f"user/profile?userId={self.test_user_id}", None),
+            ("GET /user/profile (token, warm)", "get", "user/profile", None),
+            ("POST /chat/sessions", "post", "chat/sessions",
+             {"userId": self.test_user_id, "level": "B1", "topic": "daily_conversation"}),
+            ("GET /chat/history", "get", f"chat/history?sessionId={self.test_session_id}&limit=10", None),
+            ("GET /vocabulary/due", "get", f"vocabulary/due?userId={self.test_user_id}&limit=5", None),
+            ("POST /vocabulary/review", "post", "vocabulary/review",
+             {"userId": self.test_user_id, "cardId": "card1", "result": "good"}),
+            ("GET /lessons", "get", "lessons?level=B1", None),
+            ("POST /pronunciation/analyze", "post", "pronunciation/analyze",
+             {"userId": self.test_user_id, "phrase": "Hello, how are you today?", "audioBase64": "mock_audio_data"}),
+        ]
+        profile = {}
+        print("\n🍃 DB ROUND-TRIPS PER API CALL:")
+        for label, method, path, payload in calls:
+            before = standin.snapshot()
+            try:
+                headers = self.auth_headers() if "(token" in label else HEADERS
+                if method == "post":
+                    self.http.post(f"{BASE_URL}/{path}", headers=headers, json=payload, timeout=10)
+                else:
+                    self.http.get(f"{BASE_URL}/{path}", headers=headers, timeout=10)
+            except requests.RequestException as e:
+                print(f"  {label}: request failed: {e}")
+                continue
+            after = standin.snapshot()
+            operations = {
+                key: entry["count"] - before.get(key, {}).get("count", 0)
+                for key, entry in after.items()
+                if entry["count"] != before.get(key, {}).get("count", 0)
+            }
+            profile[label] = operations
+            detail = ", ".join(f"{key} x{count}" for key, count in sorted(operations.items())) or "none"
+            print(f"  {label}: {sum(operations.values())} ops ({detail})")
+        return profile
+
+    def benchmark_cold_start(self, total_requests, max_ms):
+        """Simultaneous first requests to a freshly started server must share one MongoDB client"""
+        print(f"\n=== Benchmarking Cold Start ({total_requests} simultaneous first requests) ===")
+        pool_url = f"{BASE_URL}/db/pool"
+        if self.http.get(pool_url, headers=HEADERS, timeout=30).json().get("clientsCreated"):
+            print("⏭️  Server is already connected to MongoDB; restart it for a cold-start run")
+            return
+
+        # The tutor works without a database and must not open a connection
+        self.http.post(f"{BASE_URL}/tutor", headers=HEADERS, json=TUTOR_TEST_CASES[0]["payload"], timeout=60)
+        tutor_clients = self.http.get(pool_url, headers=HEADERS, timeout=10).json()["clientsCreated"]
+        self.log_result(
+            "Cold Start - Tutor Without MongoDB",
+            tutor_clients == 0,
+            f"{tutor_clients} MongoDB clients after a tutor call"
+        )
+
+        # Half the burst hits the catch-all route, half a dedicated route module
+        paths = ["user/profile?userId=cold-start-{}", "vocabulary/due?userId=cold-start-{}&limit=1"]
+        barrier = threading.Barrier(total_requests)
+        histogram = LatencyHistogram()
+        statuses = {}
+
+        def first_request(index):
+            with requests.Session() as session:
+                url = f"{BASE_URL}/{paths[index % len(paths)].format(index)}"
+                barrier.wait()
+                started = time.perf_counter()
+                try:
+                    status = session.get(url, headers=HEADERS, timeout=60).status_code
+                except requests.RequestException:
+                    status = "error"
+                elapsed = time.perf_counter() - started
+            with self._lock:
+                histogram.record(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        threads = [threading.Thread(target=first_request, args=(index,)) for index in range(total_requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        pool = self.http.get(pool_url, headers=HEADERS, timeout=10).json()
+        latency = histogram.to_dict(buckets=False)
+        failed = sum(count for status, count in statuses.items() if status == "error" or status >= 500)
+        self.benchmarks["cold_start"] = {
+            "requests": total_requests,
+            "clients_created": pool["clientsCreated"],
+            "connect_ms": pool.get("lastConnectMs"),
+            "statuses": {str(status): count for status, count in statuses.items()},
+            "first_request": latency,
+            "pool": pool,
+        }
+        print(f"🔌 {pool['clientsCreated']} client(s), connect {pool.get('lastConnectMs')}ms, "
+              f"{pool['open']} pooled connections; first requests p50 {latency['p50_ms']:.1f}ms "
+              f"max {latency['max_ms']:.1f}ms")
+        self.log_result(
+            "Cold Start - Single MongoDB Client",
+            pool["clientsCreated"] == 1 and not failed,
+            f"{pool['clientsCreated']} client(s) for {total_requests} simultaneous first requests",
+            f"{failed} requests failed" if failed else None
+        )
+        self.log_result(
+            "Cold Start - First Request Latency",
+            latency["max_ms"] <= max_ms,
+            f"slowest first request {latency['max_ms']:.0f}ms (limit {max_ms:.0f}ms)"
+        )
+
     def run_all_tests(self):
         """Run all backend tests"""
         print("🚀 Starting Comprehensive Backend API Testing")
@@ -637,18 +2437,23 @@ class BackendTester:
         print(f"👤 Test User Email: {self.test_user_email}")
         print("=" * 60)
         
-        # Run tests in order
-        self.test_ai_tutor_endpoint()
-        self.test_authentication_system()
-        self.test_mongodb_connection()
-        self.test_chat_session_management()
-        self.test_vocabulary_srs_system()
-        self.test_additional_endpoints()
+        # Needs a server that has not talked to MongoDB yet, so it runs first
+        if self.cold_start_requests:
+            self.benchmark_cold_start(self.cold_start_requests, self.cold_start_max_ms)
+
+        # Independent groups run in parallel, dependent chains stay ordered
+        start = time.perf_counter()
+        self.run_groups()
+        wall_time = time.perf_counter() - start
         
         # Summary
         print("\n" + "=" * 60)
         print("📊 TEST SUMMARY")
         print("=" * 60)
+        print(f"Wall time: {wall_time:.3f}s ({self.workers} workers)")
+        for name in TEST_GROUPS:
+            if name in self.group_timings:
+                print(f"  {name}: {self.group_timings[name]:.3f}s")
         
         total_tests = len(self.test_results)
         passed_tests = sum(1 for result in self.test_results if result["success"])
@@ -677,6 +2482,11 @@ class BackendTester:
                 print(f"  🚨 {failure['test']}: {failure['message']}")
         else:
             print("  ✅ No critical failures detected")
+
+        benchmark = self.recorder.summary(wall_time)
+        print("\n⏱️  LATENCY BY ENDPOINT:")
+        print_latency_table(benchmark["endpoints"])
+        print_phase_table(benchmark["endpoints"])
         
         return {
             "total": total_tests,
@@ -684,12 +2494,979 @@ class BackendTester:
             "failed": failed_tests,
             "success_rate": (passed_tests/total_tests)*100,
             "critical_failures": len(critical_failures),
+            "wall_time": wall_time,
+            "benchmark": benchmark,
             "results": self.test_results
         }
 
-if __name__ == "__main__":
-    tester = BackendTester()
-    results = tester.run_all_tests()
-    
+class LoadGenerator:
+    """Replays the BackendTester scenarios as concurrent virtual users over asyncio"""
+
+    # Default scenario mix, weights are relative
+    DEFAULT_MIX = {
+        "tutor": 4,
+        "chat": 2,
+        "vocabulary": 3,
+        "mongodb": 1,
+        "additional": 1,
+        "essay": 0,  # opt in with --mix, e.g. essay=1
+        "pronunciation": 0,
+    }
+
+    # Essay lengths in sentences for the essay scenario
+    ESSAY_SENTENCES = (5, 20, 50)
+
+    # Length of the recording the pronunciation scenario sends as base64 JSON
+    PRONUNCIATION_SECONDS = 5
+
+    def __init__(self, base_url=BASE_URL, users=100, concurrency=50, ramp_up=10.0,
+                 duration=60.0, think_time=0.0, mix=None, timeout=10.0, burst_size=0,
+                 burst_interval=10.0):
+        self.base_url = base_url
+        self.users = users
+        self.concurrency = concurrency
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.think_time = think_time
+        self.mix = mix or dict(self.DEFAULT_MIX)
+        self.timeout = timeout
+        self.burst_size = burst_size
+        self.burst_interval = burst_interval
+        self.recorder = BenchmarkRecorder()
+        self.started_users = 0
+        self.admission = None
+        self.elapsed = 0.0
+        self.semaphore = None
+        self.recording = None
+
+    async def call(self, session, method, route, query=None, payload=None, label=None):
+        """Issue one request and record its latency under "METHOD /route" (plus the label)."""
+        endpoint = f"{method} /{route}" + (f" ({label})" if label else "")
+        try:
+            # Bursts deliberately exceed the client concurrency limit
+            async with self.semaphore if label != "burst" else contextlib.nullcontext():
+                start = time.perf_counter()
+                async with session.request(method, f"{self.base_url}/{route}", params=query,
+                                           json=payload) as response:
+                    data = await response.json(content_type=None)
+                    ok = 200 <= response.status < 300
+                self.recorder.record(endpoint, response.status, time.perf_counter() - start,
+                                     response.headers.get("Server-Timing"))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            data, ok = None, False
+            self.recorder.record(endpoint, "error", time.perf_counter() - start)
+        return data if ok else None
+
+    # Scenarios mirror the BackendTester.test_* groups
+    async def scenario_auth(self, session, state):
+        email = f"loaduser_{uuid.uuid4().hex[:12]}@example.com"
+        data = await self.call(session, "POST", "auth/register", payload={
+            "email": email,
+            "name": "Load Test User",
+            "password": "securepass123",
+            "cefrLevel": random.choice(["A1", "A2", "B1", "B2", "C1"])
+        })
+        if data and "user" in data:
+            state["user_id"] = data["user"]["_id"]
+            await self.call(session, "POST", "auth/login",
+                            payload={"email": email, "password": "securepass123"})
+
+    async def scenario_tutor(self, session, state):
+        test_case = random.choice(TUTOR_TEST_CASES)
+        payload = dict(test_case["payload"])
+        if state.get("session_id"):
+            payload["sessionId"] = state["session_id"]
+        await self.call(session, "POST", "tutor", payload=payload)
+
+    async def scenario_mongodb(self, session, state):
+        if state.get("user_id"):
+            await self.call(session, "GET", "user/profile", query={"userId": state["user_id"]})
+
+    async def scenario_chat(self, session, state):
+        if not state.get("user_id"):
+            return
+        if not state.get("session_id"):
+            data = await self.call(session, "POST", "chat/sessions", payload={
+                "userId": state["user_id"],
+                "level": "B1",
+                "topic": "daily_conversation"
+            })
+            if data:
+                state["session_id"] = data.get("_id")
+        if state.get("session_id"):
+            await self.call(session, "GET", "chat/history",
+                            query={"sessionId": state["session_id"], "limit": "10"})
+
+    async def scenario_vocabulary(self, session, state):
+        if not state.get("user_id"):
+            return
+        cards = await self.call(session, "GET", "vocabulary/due",
+                                query={"userId": state["user_id"], "limit": "5"})
+        if cards:
+            await self.call(session, "POST", "vocabulary/review", payload={
+                "userId": state["user_id"],
+                "cardId": random.choice(cards)["_id"],
+                "result": random.choice(["again", "hard", "good", "easy"])
+            })
+
+    async def scenario_essay(self, session, state):
+        """Submit an essay, then resubmit it with one sentence edited; latency is recorded by length"""
+        sentences = state.get("essay")
+        if sentences is None or random.random() < 0.5:
+            sentences, kind = essay_sentences(random.choice(self.ESSAY_SENTENCES), random), "draft"
+        else:
+            sentences, kind = list(sentences), "edit"
+            edited = random.choice(TUTOR_CACHE_SENTENCES)[0].rstrip("?")
+            sentences[random.randrange(len(sentences))] = f"{edited} {uuid.uuid4().hex[:4]}."
+        state["essay"] = sentences
+        # No userId: the per-learner rate limit would dominate latency at zero think time
+        await self.call(session, "POST", "writing/correct", payload={
+            "text": essay_text(sentences),
+            "userLevel": "B1",
+        }, label=f"{len(sentences):>2} sentences, {kind}")
+
+    async def scenario_additional(self, session, state):
+        await self.call(session, "GET", "lessons", query={"level": "B1"})
+        if state.get("user_id"):
+            await self.call(session, "POST", "pronunciation/analyze", payload={
+                "userId": state["user_id"],
+                "phrase": "Hello, how are you today?",
+                "audioBase64": "mock_audio_data"
+            })
+
+    async def scenario_pronunciation(self, session, state):
+        """A real recording as base64 JSON, the payload the app has to parse whole"""
+        if not state.get("user_id"):
+            return
+        if self.recording is None:
+            self.recording = base64.b64encode(wav_recording(self.PRONUNCIATION_SECONDS)).decode()
+        await self.call(session, "POST", "pronunciation/analyze", payload={
+            "userId": state["user_id"],
+            "phrase": "Hello, how are you today?",
+            "audioBase64": self.recording
+        }, label=f"{self.PRONUNCIATION_SECONDS}s recording")
+
+    async def burst_loop(self, deadline):
+        """Every burst_interval seconds, burst_size learners send the same new sentence at once.
+
+        The server should make one model call per burst (the rest coalesce onto it) and
+        answer anything it cannot admit with 429 rather than a mock reply. Bursts use their
+        own connections so they are not held back by the virtual users' pool.
+        """
+        connector = aiohttp.TCPConnector(limit=self.burst_size)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+            await self.send_bursts(session, deadline)
+
+    async def send_bursts(self, session, deadline):
+        while True:
+            await asyncio.sleep(min(self.burst_interval, max(0.0, deadline - time.perf_counter())))
+            if time.perf_counter() >= deadline:
+                return
+            payload = {
+                "userText": f"Yesterday I have went to the market number {uuid.uuid4().hex[:8]}.",
+                "userLevel": "B1",
+                "mode": "conversation",
+            }
+            await asyncio.gather(*(
+                self.call(session, "POST", "tutor", payload={**payload, "userId": f"burst-student-{index}"},
+                          label="burst")
+                for index in range(self.burst_size)
+            ))
+
+    async def virtual_user(self, session, index, deadline):
+        """One learner: register once, then loop over the weighted scenario mix"""
+        if self.users > 1 and self.ramp_up > 0:
+            await asyncio.sleep(self.ramp_up * index / self.users)
+        if time.perf_counter() >= deadline:
+            return
+        self.started_users += 1
+
+        state = {}
+        await self.scenario_auth(session, state)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            await getattr(self, f"scenario_{name}")(session, state)
+            if self.think_time > 0:
+                await asyncio.sleep(random.expovariate(1.0 / self.think_time))
+
+    def background_tasks(self, deadline):
+        """Coroutines that run beside the virtual users until the deadline"""
+        return [self.burst_loop(deadline)] if self.burst_size else []
+
+    async def run(self):
+        """Start all virtual users and wait until the test duration elapses"""
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        start = time.perf_counter()
+        deadline = start + self.duration
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=HEADERS) as session:
+            await asyncio.gather(*self.background_tasks(deadline), *(
+                self.virtual_user(session, index, deadline)
+                for index in range(self.users)
+            ))
+            self.admission = await self.call(session, "GET", "tutor/admission")
+        self.elapsed = time.perf_counter() - start
+
+    def summary(self):
+        """Per-endpoint throughput and latency percentiles (milliseconds)"""
+        summary = self.recorder.summary(self.elapsed)
+        summary["users"] = self.started_users
+        if self.admission:
+            summary["admission"] = self.admission
+        return summary
+
+    def print_summary(self, summary):
+        print("\n" + "=" * 60)
+        print("📈 LOAD TEST SUMMARY")
+        print("=" * 60)
+        print(f"Virtual users: {summary['users']}  Duration: {summary['duration_s']:.1f}s  "
+              f"Requests: {summary['total_requests']}  Errors: {summary['total_errors']}  "
+              f"Throughput: {summary['rps']:.1f} req/s")
+        print_latency_table(summary["endpoints"])
+        print_phase_table(summary["endpoints"])
+        admission = summary.get("admission")
+        if admission:
+            rejected = ", ".join(f"{reason} {count}" for reason, count in admission["rejected"].items())
+            print(f"Tutor admission: {admission['modelCalls']} model calls, {admission['coalesced']} coalesced, "
+                  f"{admission['queued']} queued (max depth {admission['maxQueueDepth']}, "
+                  f"mean wait {admission['meanQueueWaitMs']:.0f}ms), rejected: {rejected}")
+
+
+def kendall_tau(values):
+    """Kendall rank correlation between a series and time: 1 when every sample is above all
+    earlier ones, around 0 for noise about a level, -1 when it only falls"""
+    pairs = score = 0
+    for index, earlier in enumerate(values):
+        for later in values[index + 1:]:
+            score += (later > earlier) - (later < earlier)
+            pairs += 1
+    return score / pairs if pairs else 0.0
+
+
+def series_trend(times_s, values, envelope=1):
+    """How a sampled series moved over a run: the median of its last quarter against its first,
+    the least-squares slope per hour, and how monotonic it is (Kendall tau), over the whole run
+    and over its second half. With envelope > 1 the series is first reduced to its rolling
+    minimum over that many samples, which irons out garbage-collection sawtooth"""
+    if envelope > 1:
+        values = [min(values[max(0, index - envelope + 1):index + 1]) for index in range(len(values))]
+    quarter = max(1, len(values) // 4)
+    first, last = statistics.median(values[:quarter]), statistics.median(values[-quarter:])
+    hours = [seconds / 3600 for seconds in times_s]
+    mean_hour, mean_value = statistics.fmean(hours), statistics.fmean(values)
+    spread = sum((hour - mean_hour) ** 2 for hour in hours)
+    slope = sum((hour - mean_hour) * (value - mean_value) for hour, value in zip(hours, values))
+    return {
+        "first": first,
+        "last": last,
+        "growth": (last - first) / first if first else float(last > first),
+        "slope_per_hour": slope / spread if spread else 0.0,
+        "tau": kendall_tau(values),
+        "late_tau": kendall_tau(values[len(values) // 2:]),
+    }
+
+
+def megabytes(value):
+    return value / (1 << 20)
+
+
+class SoakTest(LoadGenerator):
+    """Steady mixed traffic for hours, with the app's memory, event-loop lag and the latency of
+    each ``interval`` sampled as a time series (GET /runtime/metrics, lib/runtimeMetrics.js).
+
+    Samples from the first ``warmup`` seconds (JIT, connection pools and caches filling up) are
+    left out of the analysis, which flags:
+      * memory, active handles or per-process caches that keep growing (up by more than
+        ``growth``, Kendall tau above LEAK_TAU, and still rising in the second half of the run),
+      * p95 latency, event-loop lag p99 or error rate drifting up from the first quarter of
+        the run to the last,
+      * server restarts (a new pid, or uptime going back).
+    """
+
+    # Memory series checked for leaks, with the smallest growth worth flagging
+    MEMORY_SERIES = {"rss": 16 << 20, "heapUsed": 4 << 20, "external": 4 << 20}
+    MIN_HANDLE_GROWTH = 5
+    MIN_CACHE_GROWTH = 50
+    LEAK_TAU = 0.6
+    DRIFT_TAU = 0.5
+    ERROR_RATE_SLACK = 0.01
+    MEMORY_ENVELOPE = 5  # samples
+    MIN_SAMPLES = 8
+    MIN_WINDOW_REQUESTS = 20  # per endpoint and window, for the endpoint's own drift check
+    SUMMARY_ROWS = 24
+    SERIES_HEADER = (f"  {'t':>9}{'req/s':>8}{'err':>7}{'p50':>9}{'p95':>9}{'p99':>9}"
+                     f"{'rss':>9}{'heap':>9}{'ext':>9}{'loop p99':>9}{'loop max':>9}")
+
+    def __init__(self, interval=30.0, warmup=300.0, growth=0.10, tolerance=0.25, floor_ms=5.0, **kwargs):
+        if not kwargs.get("mix"):
+            # Large base64 recordings are the payloads most likely to leave memory behind
+            kwargs["mix"] = {**self.DEFAULT_MIX, "pronunciation": 1}
+        super().__init__(**kwargs)
+        self.interval = interval
+        self.warmup = min(warmup, 0.2 * self.duration)
+        self.growth = growth
+        self.tolerance = tolerance
+        self.floor_ms = floor_ms
+        self.recorder = WindowedRecorder()
+        self.samples = []
+        self.force_gc = True  # until the app refuses it
+
+    def background_tasks(self, deadline):
+        return [*super().background_tasks(deadline), self.sample_loop(deadline)]
+
+    async def sample_loop(self, deadline):
+        """A sample at the start and every interval seconds after it, on a connection of its
+        own so a saturated client pool does not delay it"""
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout, headers=HEADERS) as session:
+            start = time.perf_counter()
+            await self.take_sample(session, start)  # also resets the server's lag histogram
+            while start + len(self.samples) * self.interval <= deadline:
+                await asyncio.sleep(max(0.0, start + len(self.samples) * self.interval - time.perf_counter()))
+                await self.take_sample(session, start)
+
+    async def runtime_metrics(self, session):
+        """The app's memory and event-loop lag, after a forced GC when it allows one"""
+        try:
+            async with session.get(f"{self.base_url}/runtime/metrics",
+                                   params={"gc": "1"} if self.force_gc else None) as response:
+                if response.status == 403 and self.force_gc:
+                    # Forced GC is off (RUNTIME_METRICS_GC); sample without it from now on
+                    self.force_gc = False
+                    return await self.runtime_metrics(session)
+                if response.status == 200:
+                    return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+        return None
+
+    async def take_sample(self, session, start):
+        seconds, window = self.recorder.rotate()
+        runtime = await self.runtime_metrics(session)
+        overall, errors = LatencyHistogram(), 0
+        for histogram, endpoint_errors in window.values():
+            overall.merge(histogram)
+            errors += endpoint_errors
+        sample = {
+            "t_s": round(time.perf_counter() - start, 1),
+            "requests": overall.count,
+            "errors": errors,
+            "error_rate": errors / overall.count if overall.count else 0.0,
+            "rps": overall.count / seconds if seconds else 0.0,
+            "p50_ms": overall.percentile(50),
+            "p95_ms": overall.percentile(95),
+            "p99_ms": overall.percentile(99),
+            "endpoints": {
+                endpoint: {"requests": histogram.count, "errors": endpoint_errors,
+                           "p95_ms": histogram.percentile(95)}
+                for endpoint, (histogram, endpoint_errors) in sorted(window.items())
+            },
+            "runtime": runtime,
+        }
+        self.samples.append(sample)
+        print(f"  {self.format_sample(sample)}", flush=True)
+
+    @staticmethod
+    def format_sample(sample):
+        line = (f"{sample['t_s']:>8.0f}s {sample['rps']:>7.1f}{sample['error_rate']:>7.1%}"
+                f"{sample['p50_ms']:>9.1f}{sample['p95_ms']:>9.1f}{sample['p99_ms']:>9.1f}")
+        runtime = sample["runtime"]
+        if not runtime:
+            return line + "   (runtime metrics unavailable)"
+        memory, lag = runtime["memory"], runtime["eventLoopLag"]
+        return line + "".join(f"{megabytes(memory[name]):>9.1f}" for name in ("rss", "heapUsed", "external")) + \
+            "".join(f"{lag[key] if lag[key] is not None else 0:>9.1f}" for key in ("p99Ms", "maxMs"))
+
+    def growth_flag(self, label, trend, min_delta, unit=1, suffix=""):
+        if (trend["tau"] >= self.LEAK_TAU and trend["late_tau"] >= self.LEAK_TAU
+                and trend["growth"] >= self.growth and trend["last"] - trend["first"] >= min_delta):
+            return (f"{label} keeps growing: {trend['first'] / unit:.1f} -> {trend['last'] / unit:.1f}{suffix} "
+                    f"(+{trend['growth']:.0%}, {trend['slope_per_hour'] / unit:+.1f}{suffix}/h, tau {trend['tau']:.2f})")
+        return None
+
+    def drift_flag(self, label, trend, floor, tolerance, scale=1, unit="ms"):
+        if (trend["tau"] >= self.DRIFT_TAU and trend["last"] > trend["first"] * (1 + tolerance)
+                and trend["last"] - trend["first"] >= floor):
+            return (f"{label} drifts up: {trend['first'] * scale:.1f}{unit} in the first quarter, "
+                    f"{trend['last'] * scale:.1f}{unit} in the last (tau {trend['tau']:.2f})")
+        return None
+
+    def analyse(self):
+        """Trends of the samples after the warm-up, and the leak, drift and restart flags"""
+        trends, flags = {}, []
+        previous = None
+        for sample in self.samples:
+            runtime = sample["runtime"]
+            if not runtime:
+                continue
+            if previous and (runtime["pid"] != previous["pid"] or runtime["uptimeSeconds"] < previous["uptimeSeconds"]):
+                flags.append(f"server restarted before t={sample['t_s']:.0f}s (pid {previous['pid']} -> {runtime['pid']})")
+            previous = runtime
+
+        steady = [sample for sample in self.samples if sample["t_s"] >= self.warmup]
+        measured = [sample for sample in steady if sample["runtime"]]
+        if len(measured) < self.MIN_SAMPLES:
+            flags.append(f"only {len(measured)} runtime samples after the {self.warmup:.0f}s warm-up "
+                         f"(need {self.MIN_SAMPLES}); run longer or sample more often")
+        else:
+            times = [sample["t_s"] for sample in measured]
+            for name, min_delta in self.MEMORY_SERIES.items():
+                trends[name] = series_trend(times, [sample["runtime"]["memory"][name] for sample in measured],
+                                            envelope=self.MEMORY_ENVELOPE)
+                flags.append(self.growth_flag(name, trends[name], min_delta, unit=1 << 20, suffix="MB"))
+            handles = [sample["runtime"]["activeResources"] for sample in measured]
+            if None not in handles:
+                trends["activeResources"] = series_trend(times, handles, envelope=self.MEMORY_ENVELOPE)
+                flags.append(self.growth_flag("active handles", trends["activeResources"], self.MIN_HANDLE_GROWTH))
+            for name in measured[0]["runtime"]["caches"]:
+                trend = trends[f"caches.{name}"] = series_trend(
+                    times, [sample["runtime"]["caches"].get(name, 0) for sample in measured])
+                flags.append(self.growth_flag(f"{name} entries", trend, self.MIN_CACHE_GROWTH))
+            lag = [(sample["t_s"], sample["runtime"]["eventLoopLag"]["p99Ms"]) for sample in measured
+                   if sample["runtime"]["eventLoopLag"]["p99Ms"] is not None]
+            if len(lag) >= self.MIN_SAMPLES:
+                trends["eventLoopLag.p99Ms"] = series_trend(*zip(*lag))
+                flags.append(self.drift_flag("event-loop lag p99", trends["eventLoopLag.p99Ms"],
+                                             self.floor_ms, self.tolerance))
+
+        busy = [sample for sample in steady if sample["requests"]]
+        if len(busy) >= self.MIN_SAMPLES:
+            times = [sample["t_s"] for sample in busy]
+            trends["p95_ms"] = series_trend(times, [sample["p95_ms"] for sample in busy])
+            flags.append(self.drift_flag("p95 latency", trends["p95_ms"], self.floor_ms, self.tolerance))
+            trends["error_rate"] = series_trend(times, [sample["error_rate"] for sample in busy])
+            flags.append(self.drift_flag("error rate", trends["error_rate"], self.ERROR_RATE_SLACK, 0,
+                                         scale=100, unit="%"))
+            for endpoint in sorted({endpoint for sample in busy for endpoint in sample["endpoints"]}):
+                points = [(sample["t_s"], sample["endpoints"][endpoint]["p95_ms"]) for sample in busy
+                          if sample["endpoints"].get(endpoint, {}).get("requests", 0) >= self.MIN_WINDOW_REQUESTS]
+                if len(points) >= self.MIN_SAMPLES:
+                    trend = trends[f"{endpoint} p95_ms"] = series_trend(*zip(*points))
+                    flags.append(self.drift_flag(f"{endpoint} p95", trend, self.floor_ms, self.tolerance))
+        return trends, [flag for flag in flags if flag]
+
+    def summary(self):
+        """The load test summary plus the sampled time series, trends and flags"""
+        summary = super().summary()
+        trends, flags = self.analyse()
+        summary["soak"] = {
+            "interval_s": self.interval,
+            "warmup_s": self.warmup,
+            "samples": self.samples,
+            "trends": trends,
+            "flags": flags,
+        }
+        return summary
+
+    def print_summary(self, summary):
+        super().print_summary(summary)
+        soak = summary["soak"]
+        samples = soak["samples"]
+        print(f"\n🕰️ SOAK TIME SERIES (one row per {soak['interval_s']:g}s window, warm-up {soak['warmup_s']:.0f}s):")
+        print(self.SERIES_HEADER)
+        step = max(1, math.ceil(len(samples) / self.SUMMARY_ROWS))
+        rows = samples[::step] + ([samples[-1]] if samples and (len(samples) - 1) % step else [])
+        for sample in rows:
+            print(f"  {self.format_sample(sample)}")
+        print("(rss/heap/ext in MB, after a forced GC when enabled, loop = event-loop lag in ms over the window)")
+        if any(sample["runtime"] and sample["runtime"]["gc"] != "forced" for sample in samples):
+            print("ℹ️ The app did not force a GC, so heap figures include uncollected garbage "
+                  "(start it with NODE_OPTIONS=--expose-gc RUNTIME_METRICS_GC=1)")
+
+        trends = soak["trends"]
+        memory = [name for name in (*self.MEMORY_SERIES, "activeResources") if name in trends]
+        if memory:
+            print("\n📐 Trends after the warm-up (first quarter -> last quarter, rolling-minimum envelope):")
+            for name in memory:
+                trend = trends[name]
+                unit = 1 if name == "activeResources" else 1 << 20
+                print(f"  {name:<16}{trend['first'] / unit:>10.1f} -> {trend['last'] / unit:<10.1f}"
+                      f"{trend['growth']:>+8.1%}{trend['slope_per_hour'] / unit:>+10.1f}/h  tau {trend['tau']:+.2f}")
+        if soak["flags"]:
+            print("\n🚨 SOAK FLAGS:")
+            for flag in soak["flags"]:
+                print(f"  🚨 {flag}")
+        else:
+            print("\n✅ No leaks, monotonic growth or latency drift after the warm-up")
+
+
+class TrafficReplayer:
+    """Re-issues a request capture (REQUEST_LOG_PATH, lib/requestLog.js) with its original timing.
+
+    Each request is sent at its recorded offset from the first one divided by ``speed``.
+    User, session and card ids are mapped onto the seeded dataset (generate_dataset.py),
+    every original id consistently to the same dataset id; captured token holders sign in
+    as the learner their id maps to, and sizes kept in place of long strings and uploads
+    are filled back in. Latency is reported per route next to the latency in the capture.
+    """
+
+    # Monitoring routes are not the traffic being reproduced
+    SKIPPED_ROUTES = {"db/pool", "request-log", "tutor/cache", "tutor/admission", "tutor/models",
+                      "tutor/exercises", "pronunciation/stats", "runtime/metrics"}
+    ID_KINDS = {"userId": "user", "sessionId": "session", "cardId": "card"}
+    DATASET_PASSWORD = "password123"
+
+    def __init__(self, path, base_url=BASE_URL, speed=1.0, limit=None, dataset_users=100_000,
+                 dataset_cards=2_000, concurrency=512, timeout=60.0):
+        from generate_dataset import make_id
+        self.make_id = make_id
+        self.base_url = base_url
+        self.speed = speed
+        self.dataset_users = dataset_users
+        self.dataset_cards = dataset_cards
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.entries = self.load(path, limit)
+        self.recorder = BenchmarkRecorder()
+        self.recorded = BenchmarkRecorder()
+        self.lag = LatencyHistogram()
+        self.mismatches = {}
+        self.tokens = {}
+        self.fillers = {}
+        self.elapsed = 0.0
+        self.semaphore = None
+
+    def load(self, path, limit):
+        """Captured requests in arrival order; malformed lines and monitoring calls are skipped"""
+        entries = []
+        with open(path) as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(entry, dict) and "ts" in entry and entry.get("route") not in self.SKIPPED_ROUTES:
+                    entries.append(entry)
+        entries.sort(key=lambda entry: entry["ts"])
+        return entries[:limit] if limit else entries
+
+    def dataset_index(self, value, size):
+        return int(hashlib.sha256(str(value).encode()).hexdigest()[:12], 16) % size
+
+    def dataset_id(self, kind, value):
+        """The dataset id an original id maps to (a learner's first chat session for sessions)"""
+        if kind == "card":
+            return self.make_id("card", self.dataset_index(value, self.dataset_cards))
+        index = self.dataset_index(value, self.dataset_users)
+        return self.make_id("session", index, 0) if kind == "session" else self.make_id("user", index)
+
+    def learner_email(self, value):
+        return f"learner{self.dataset_index(value, self.dataset_users)}@example.com"
+
+    def filler(self, key, chars, sha=""):
+        """Stand-in for a string the capture kept only the length (and for text, the hash) of"""
+        if (key, chars, sha) not in self.fillers:
+            if "audio" in key.lower():
+                seconds = max(0.1, (chars * 3 / 4 - 44) / 32000)
+                self.fillers[key, chars, sha] = base64.b64encode(wav_recording(seconds)).decode()
+            else:
+                # Texts with the same hash get the same stand-in, different ones differ
+                self.fillers[key, chars, sha] = (f"{sha} " + "lorem ipsum " * (chars // 12 + 1))[:chars]
+        return self.fillers[key, chars, sha]
+
+    def rewrite(self, value, key=""):
+        """Captured query or body with ids mapped to the dataset and omitted values filled in"""
+        if isinstance(value, dict):
+            if "$omittedChars" in value:
+                return self.filler(key, value["$omittedChars"])
+            if "$redactedChars" in value:
+                return self.filler(key, value["$redactedChars"], value.get("sha", ""))
+            return {field: self.rewrite(item, field) for field, item in value.items()}
+        if isinstance(value, list):
+            return [self.rewrite(item, key) for item in value]
+        if key in self.ID_KINDS and isinstance(value, str):
+            return self.dataset_id(self.ID_KINDS[key], value)
+        if key == "email" and isinstance(value, str):
+            return self.learner_email(value)
+        if key == "password":
+            return self.DATASET_PASSWORD
+        return value
+
+    def request_body(self, entry):
+        """(json, data, headers) for the captured body"""
+        body = entry.get("body")
+        if body is None:
+            return None, None, {}
+        if isinstance(body, dict) and "$omittedBytes" in body:
+            seconds = max(0.1, ((body["$omittedBytes"] or 32044) - 44) / 32000)
+            return None, wav_recording(seconds), {"Content-Type": body.get("contentType") or "audio/wav"}
+        body = self.rewrite(body)
+        if entry["route"] == "auth/register" and isinstance(body, dict):
+            # Registering a dataset learner's address again would only replay a 409
+            body["email"] = f"replay_{uuid.uuid4().hex[:12]}@example.com"
+        return body, None, {}
+
+    async def token(self, session, subject):
+        """Bearer token of the learner a captured token subject maps to (signed in once)"""
+        if subject not in self.tokens:
+            self.tokens[subject] = asyncio.ensure_future(self.sign_in(session, subject))
+        return await self.tokens[subject]
+
+    async def sign_in(self, session, subject):
+        email = f"learner{self.dataset_index(subject, self.dataset_users)}@example.com"
+        try:
+            async with session.post(f"{self.base_url}/auth/login",
+                                    json={"email": email, "password": self.DATASET_PASSWORD}) as response:
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+        return data.get("token") if isinstance(data, dict) else None
+
+    async def issue(self, session, entry, due):
+        """Send one captured request and record its latency beside the captured one"""
+        endpoint = f"{entry['method']} /{entry['route']}"
+        self.recorded.record(endpoint, entry.get("status", "error"), entry.get("durationMs", 0) / 1000)
+        payload, data, headers = self.request_body(entry)
+        if entry.get("subject"):
+            token = await self.token(session, entry["subject"])
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+        async with self.semaphore:
+            start = time.perf_counter()
+            self.lag.record(max(0.0, start - due))
+            try:
+                async with session.request(entry["method"], f"{self.base_url}/{entry['route']}",
+                                           params=self.rewrite(entry.get("query") or {}), json=payload,
+                                           data=data, headers=headers) as response:
+                    # Captured latency is time to the response headers; for streams only that is comparable
+                    elapsed = time.perf_counter() - start
+                    await response.read()
+                    if not entry.get("stream"):
+                        elapsed = time.perf_counter() - start
+                    status = response.status
+                    server_timing = response.headers.get("Server-Timing")
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status, elapsed, server_timing = "error", time.perf_counter() - start, None
+        self.recorder.record(endpoint, status, elapsed, server_timing)
+        if status != entry.get("status"):
+            self.mismatches[endpoint] = self.mismatches.get(endpoint, 0) + 1
+
+    async def run(self):
+        """Schedule every captured request at its (sped up) original offset"""
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+            tasks = []
+            first = self.entries[0]["ts"] if self.entries else 0
+            start = time.perf_counter()
+            for entry in self.entries:
+                due = start + (entry["ts"] - first) / 1000 / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(self.issue(session, entry, due)))
+            await asyncio.gather(*tasks)
+            self.elapsed = time.perf_counter() - start
+
+    def summary(self):
+        """Replay throughput and latency per route, with the captured latency beside it"""
+        summary = self.recorder.summary(self.elapsed)
+        recorded = self.recorded.summary(0)["endpoints"]
+        captured_span = (self.entries[-1]["ts"] - self.entries[0]["ts"]) / 1000 if self.entries else 0.0
+        for endpoint, item in summary["endpoints"].items():
+            before = recorded.get(endpoint, {})
+            item["recorded"] = {key: before.get(key) for key in ("requests", "errors", "p50_ms", "p95_ms", "p99_ms")}
+            item["status_mismatches"] = self.mismatches.get(endpoint, 0)
+        summary["speed"] = self.speed
+        summary["captured_span_s"] = captured_span
+        summary["schedule_lag"] = self.lag.to_dict(buckets=False)
+        summary["signed_in_learners"] = len(self.tokens)
+        return summary
+
+    def print_summary(self, summary):
+        print("\n" + "=" * 60)
+        print("🔁 REPLAY SUMMARY")
+        print("=" * 60)
+        print(f"Requests: {summary['total_requests']}  Errors: {summary['total_errors']}  "
+              f"Captured span: {summary['captured_span_s']:.1f}s at {summary['speed']:g}x -> "
+              f"{summary['duration_s']:.1f}s ({summary['rps']:.1f} req/s)")
+        endpoints = summary["endpoints"]
+        width = max([32, *(len(endpoint) + 2 for endpoint in endpoints)])
+        print(f"{'Endpoint':<{width}}{'reqs':>7}{'status≠':>8}"
+              f"{'p50 rec':>10}{'p50':>9}{'p95 rec':>10}{'p95':>9}{'p99 rec':>10}{'p99':>9}")
+        for endpoint, item in endpoints.items():
+            recorded = item["recorded"]
+            print(f"{endpoint:<{width}}{item['requests']:>7}{item['status_mismatches']:>8}"
+                  + "".join(f"{recorded[metric] or 0:>10.1f}{item[metric]:>9.1f}"
+                            for metric in ("p50_ms", "p95_ms", "p99_ms")))
+        print("(latencies in ms; rec = recorded in the capture)")
+        print_phase_table(endpoints)
+        lag = summary["schedule_lag"]
+        print(f"Schedule lag: p50 {lag['p50_ms']:.1f}ms, p99 {lag['p99_ms']:.1f}ms, max {lag['max_ms']:.1f}ms")
+
+
+def print_latency_table(endpoints):
+    """Print per-endpoint request counts and latency percentiles"""
+    width = max([32, *(len(endpoint) + 2 for endpoint in endpoints)])
+    print(f"{'Endpoint':<{width}}{'reqs':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, item in endpoints.items():
+        print(f"{endpoint:<{width}}{item['requests']:>8}{item['errors']:>6}{item['rps']:>9.1f}"
+              f"{item['p50_ms']:>9.1f}{item['p95_ms']:>9.1f}{item['p99_ms']:>9.1f}")
+    print("(latencies in ms)")
+
+
+def print_phase_table(endpoints):
+    """Print where the server spent each endpoint's time, from its Server-Timing phases"""
+    rows = [(endpoint, item["phases"]) for endpoint, item in endpoints.items() if item.get("phases")]
+    if not rows:
+        return
+    print("\n🧭 SERVER TIME BY PHASE (ms per request, share of server total):")
+    width = max([32, *(len(endpoint) + 2 for endpoint, _ in rows)])
+    for endpoint, phases in rows:
+        total = phases.get("total", {}).get("mean_ms", 0.0)
+        parts = [
+            f"{name} {phase['per_request_ms']:.1f}"
+            + (f" ({phase['share']:.0%})" if phase["share"] is not None else "")
+            + (f" x{phase['operations'] / phase['requests']:.1f}" if phase["operations"] > phase["requests"] else "")
+            for name, phase in sorted(phases.items(), key=lambda item: -(item[1]["per_request_ms"] or 0))
+            if name != "total" and phase["per_request_ms"] is not None
+        ]
+        print(f"{endpoint:<{width}}total {total:>8.1f}  " + ", ".join(parts))
+
+
+def parse_mix(value):
+    """Parse a scenario mix such as "tutor=4,vocabulary=2" """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in LoadGenerator.DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    global BASE_URL
+
+    parser = argparse.ArgumentParser(description="AI Linguo backend API tests")
+    parser.add_argument("--base-url", default=BASE_URL, help="API base URL")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads for independent test groups (1 runs them in order)")
+    parser.add_argument("--load", action="store_true",
+                        help="replay the test scenarios as concurrent virtual users")
+    parser.add_argument("--users", type=int, default=100, help="virtual users for --load")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="maximum in-flight requests for --load")
+    parser.add_argument("--ramp-up", type=float, default=10.0,
+                        help="seconds over which virtual users are started")
+    parser.add_argument("--duration", type=float, default=60.0, help="load test duration in seconds")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean pause between scenario iterations per user, in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help="scenario weights, e.g. tutor=4,chat=2,vocabulary=3")
+    parser.add_argument("--soak", type=float, default=0.0, metavar="HOURS",
+                        help="drive the --load traffic (with pronunciation uploads) for HOURS, sampling the "
+                             "app's memory and event-loop lag, and flag leaks and latency drift")
+    parser.add_argument("--soak-interval", type=float, default=30.0,
+                        help="seconds per --soak sample and latency window")
+    parser.add_argument("--soak-warmup", type=float, default=300.0,
+                        help="seconds of --soak left out of the trend analysis (at most a fifth of the run)")
+    parser.add_argument("--soak-growth", type=float, default=0.10,
+                        help="relative memory growth over a --soak run that counts as a leak")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="re-issue a REQUEST_LOG_PATH capture with its original timing, ids mapped "
+                             "to the generate_dataset.py dataset")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="replay time compression, e.g. 10 sends the capture ten times faster")
+    parser.add_argument("--replay-limit", type=int, default=0, metavar="N",
+                        help="replay only the first N captured requests")
+    parser.add_argument("--dataset-users", type=int, default=100_000,
+                        help="learners in the seeded dataset --replay maps user ids onto")
+    parser.add_argument("--dataset-cards", type=int, default=2_000,
+                        help="vocabCards in the seeded dataset --replay maps card ids onto")
+    parser.add_argument("--burst", type=int, default=0, metavar="N",
+                        help="during --load, N learners send the same new tutor sentence at once every "
+                             "--burst-interval seconds (coalescing and admission control)")
+    parser.add_argument("--burst-interval", type=float, default=10.0,
+                        help="seconds between --burst bursts")
+    parser.add_argument("--srs-cards", type=int, default=0, metavar="N",
+                        help="seed N synthetic SRS cards and benchmark due-queue queries (needs numpy)")
+    parser.add_argument("--tutor-cache-bench", type=int, default=0, metavar="N",
+                        help="replay N Zipf-distributed tutor prompts and report cache hit rate")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="skew of the --tutor-cache-bench sentence distribution")
+    parser.add_argument("--stream-bench", type=int, default=0, metavar="N",
+                        help="stream N tutor replies and report ttfb/ttft/total latency")
+    parser.add_argument("--stream-concurrency", type=int, default=8,
+                        help="concurrent streams for --stream-bench")
+    parser.add_argument("--routing-bench", type=int, default=0, metavar="N",
+                        help="N uncached tutor calls; latency by answering model plus hedge/breaker counters")
+    parser.add_argument("--exercise-bench", type=int, default=0, metavar="N",
+                        help="N uncached tutor calls each with bank and with model-written exercises "
+                             "(completion tokens and latency saved)")
+    parser.add_argument("--chat-turns", type=int, default=0, metavar="N",
+                        help="grow one chat session to N turns and time tutor calls and history pages")
+    parser.add_argument("--profile-bench", type=int, default=0, metavar="N",
+                        help="N profile reads with and without the profile cache (DB reads saved, p99)")
+    parser.add_argument("--cold-start", type=int, default=0, metavar="N",
+                        help="fire N simultaneous first requests at a freshly started server before the tests")
+    parser.add_argument("--cold-start-max-ms", type=float, default=5000.0,
+                        help="slowest acceptable first request for --cold-start")
+    parser.add_argument("--progress-bench", type=int, default=0, metavar="LEARNERS",
+                        help="progress heartbeats from LEARNERS learners; reports MongoDB writes per event")
+    parser.add_argument("--progress-events", type=int, default=3,
+                        help="heartbeats per learner for --progress-bench")
+    parser.add_argument("--upload-bench", type=int, default=0, metavar="N",
+                        help="N pronunciation uploads per clip length through the JSON and the streamed route "
+                             "(latency and app memory; needs numpy)")
+    parser.add_argument("--upload-seconds", type=lambda value: [float(part) for part in value.split(",")],
+                        default=[1, 5, 15, 30], help="clip lengths for --upload-bench, e.g. 1,5,15,30")
+    parser.add_argument("--fake-openai", metavar="ARGS",
+                        help="start fake_openai_server.py in-process with these arguments, "
+                             "e.g. \"--port 8089 --latency lognormal:800:0.5 --malformed-rate 0.1\"")
+    parser.add_argument("--mongo-standin", metavar="PORT", type=int, nargs="?", const=27018,
+                        help="start the in-memory mongo_standin.py on PORT (default 27018); "
+                             "the app needs MONGO_URL pointing there")
+    parser.add_argument("--report", action="append", default=[],
+                        help="write the benchmark report to a .json or .csv file (repeatable)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed relative latency/throughput regression against --baseline, and drift over --soak")
+    parser.add_argument("--regression-floor-ms", type=float, default=5.0,
+                        help="ignore latency regressions smaller than this many milliseconds")
+    args = parser.parse_args()
+    BASE_URL = args.base_url.rstrip("/")
+
+    standin = None
+    if args.mongo_standin is not None:
+        import mongo_standin
+        start = time.perf_counter()
+        standin = mongo_standin.MongoStandin(port=args.mongo_standin).start_in_thread()
+        print(f"🍃 Mongo stand-in on {standin.url} started in "
+              f"{(time.perf_counter() - start) * 1000:.1f}ms (the app needs MONGO_URL={standin.url})")
+
+    fake_openai = None
+    if args.fake_openai is not None:
+        import fake_openai_server
+        fake_openai = fake_openai_server.server_from_args(
+            fake_openai_server.build_parser().parse_args(shlex.split(args.fake_openai)))
+        fake_openai.start_in_thread()
+        print(f"🤖 Fake OpenAI server on http://{fake_openai.host}:{fake_openai.port}/v1 "
+              "(the app needs OPENAI_BASE_URL pointing there and AI_TUTOR_MOCK=0)")
+
+    if args.replay:
+        if aiohttp is None:
+            parser.error("--replay requires aiohttp (pip install aiohttp)")
+        replayer = TrafficReplayer(
+            args.replay,
+            base_url=BASE_URL,
+            speed=args.replay_speed,
+            limit=args.replay_limit or None,
+            dataset_users=args.dataset_users,
+            dataset_cards=args.dataset_cards,
+            concurrency=args.concurrency,
+        )
+        print(f"🔁 Replaying {len(replayer.entries)} captured requests from {args.replay} "
+              f"at {args.replay_speed:g}x")
+        asyncio.run(replayer.run())
+        report = replayer.summary()
+        replayer.print_summary(report)
+        exit_code = 0 if report["total_requests"] else 1
+    elif args.soak:
+        if aiohttp is None:
+            parser.error("--soak requires aiohttp (pip install aiohttp)")
+        soak = SoakTest(
+            interval=args.soak_interval,
+            warmup=args.soak_warmup,
+            growth=args.soak_growth,
+            tolerance=args.max_regression,
+            floor_ms=args.regression_floor_ms,
+            base_url=BASE_URL,
+            users=args.users,
+            concurrency=args.concurrency,
+            ramp_up=args.ramp_up,
+            duration=args.soak * 3600,
+            think_time=args.think_time,
+            mix=args.mix,
+            burst_size=args.burst,
+            burst_interval=args.burst_interval,
+        )
+        print(f"🕰️ Starting soak test: {args.users} users, concurrency {args.concurrency}, "
+              f"{args.soak:g}h, a sample every {args.soak_interval:g}s")
+        print(SoakTest.SERIES_HEADER)
+        asyncio.run(soak.run())
+        report = soak.summary()
+        soak.print_summary(report)
+        exit_code = 0 if report["total_requests"] and not report["soak"]["flags"] else 1
+    elif args.load:
+        if aiohttp is None:
+            parser.error("--load requires aiohttp (pip install aiohttp)")
+        generator = LoadGenerator(
+            base_url=BASE_URL,
+            users=args.users,
+            concurrency=args.concurrency,
+            ramp_up=args.ramp_up,
+            duration=args.duration,
+            think_time=args.think_time,
+            mix=args.mix,
+            burst_size=args.burst,
+            burst_interval=args.burst_interval,
+        )
+        print(f"🚀 Starting load test: {args.users} users, concurrency {args.concurrency}, "
+              f"ramp-up {args.ramp_up}s, duration {args.duration}s")
+        asyncio.run(generator.run())
+        report = generator.summary()
+        generator.print_summary(report)
+        exit_code = 0 if report["total_requests"] else 1
+    else:
+        tester = BackendTester(workers=args.workers, srs_cards=args.srs_cards,
+                               tutor_cache_requests=args.tutor_cache_bench, zipf_skew=args.zipf,
+                               stream_requests=args.stream_bench, stream_concurrency=args.stream_concurrency,
+                               chat_turns=args.chat_turns, profile_requests=args.profile_bench,
+                               cold_start_requests=args.cold_start, cold_start_max_ms=args.cold_start_max_ms,
+                               upload_requests=args.upload_bench, upload_seconds=args.upload_seconds,
+                               progress_learners=args.progress_bench, progress_events=args.progress_events,
+                               routing_requests=args.routing_bench, exercise_requests=args.exercise_bench)
+        if standin is not None:
+            tester.check_standin_null_matching(standin)
+        results = tester.run_all_tests()
+        report = results["benchmark"]
+        exit_code = 0 if results["critical_failures"] == 0 else 1
+        report.update(tester.benchmarks)
+        if standin is not None and tester.test_user_id:
+            report["db_roundtrips"] = tester.profile_db_roundtrips(standin)
+
+    if standin is not None:
+        print("\n🍃 Mongo stand-in operations:")
+        mongo_standin.print_stats(standin.snapshot())
+        report["mongo_standin"] = standin.snapshot()
+
+    if fake_openai is not None:
+        print(f"\n🤖 Fake OpenAI stats: {fake_openai.stats}")
+        report["fake_openai"] = dict(fake_openai.stats)
+
+    report = {
+        "mode": "replay" if args.replay else "soak" if args.soak else "load" if args.load else "smoke",
+        "timestamp": datetime.now().isoformat(),
+        "base_url": BASE_URL,
+        **report,
+    }
+    for path in args.report:
+        write_report(path, report)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        regressions = compare_to_baseline(report, baseline, tolerance=args.max_regression,
+                                          floor_ms=args.regression_floor_ms)
+        if regressions:
+            print(f"\n🐢 REGRESSIONS vs {args.baseline}:")
+            for regression in regressions:
+                print(f"  🚨 {regression}")
+            exit_code = 1
+        else:
+            print(f"\n✅ No regressions vs {args.baseline}")
+
     # Exit with appropriate code
-    exit(0 if results["critical_failures"] == 0 else 1)
\ No newline at end of file
+    return exit_code
+
+
+if __name__ == "__main__":
+    exit(main())
\ No newline at end of file
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Mini-exercise bank builder
+Builds the multiple-choice exercises the tutor serves from lib/exerciseBank.js,
+indexed by grammar rule and CEFR level, so tutor calls no longer spend output
+tokens (and latency) generating a fresh exercise every time.
+
+The bank starts from the hand-written catalogue below. With --generate N an
+OpenAI-compatible model (OPENAI_BASE_URL / OPENAI_API_KEY) writes N more
+exercises per (rule, level); malformed ones are dropped. Option order is
+shuffled deterministically from --seed, and ids are derived from the exercise
+text, so rebuilding the same bank gives the same ids:
+    python build_exercise_bank.py --out exercise_bank.json
+    python build_exercise_bank.py --generate 20 --mongo-uri mongodb://localhost:27017 --drop
+Point the app at the result with EXERCISE_BANK_PATH, or load it into the
+exerciseBank collection.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+ID_NAMESPACE = uuid.UUID("0c6d3f5e-2a1b-4f7e-8c9d-5b4a3e2f1d07")
+GENERAL_RULE = "General Practice"  # same name as lib/exerciseBank.js
+COLLECTION = "exerciseBank"
+
+# rule -> (levels, [(question, correct, [distractors], explanation)])
+RULES = {
+    "Past Simple Tense": (("A1", "A2", "B1"), [
+        ("Yesterday I ___ to the park.", "went", ["go", "goes", "going"],
+         "'Went' é o passado de 'go'; 'yesterday' pede o passado simples."),
+        ("She ___ dinner at eight last night.", "cooked", ["cooks", "cook", "cooking"],
+         "Ações terminadas no passado usam o passado simples."),
+        ("We ___ the movie last weekend.", "saw", ["see", "seen", "sees"],
+         "'Saw' é o passado simples de 'see'; 'seen' é o particípio."),
+        ("Did you ___ the email?", "read", ["readed", "reads", "reading"],
+         "Depois de 'did' o verbo fica na forma base."),
+        ("They ___ in Lisbon in 2019.", "lived", ["live", "have lived", "living"],
+         "Um ano terminado no passado pede o passado simples."),
+    ]),
+    "Subject-Verb Agreement": (("A1", "A2", "B1"), [
+        ("She ___ coffee.", "doesn't like", ["don't like", "not like", "doesn't likes"],
+         "Com he/she/it a negativa usa 'doesn't' + verbo na forma base."),
+        ("My brother ___ in São Paulo.", "works", ["work", "working", "are working"],
+         "Com he/she/it o verbo no presente ganha -s."),
+        ("The people here ___ very friendly.", "are", ["is", "be", "was being"],
+         "'People' é plural em inglês."),
+        ("Everybody ___ the answer.", "knows", ["know", "are knowing", "knowing"],
+         "'Everybody' concorda com o verbo no singular."),
+        ("The news ___ good today.", "is", ["are", "were", "be"],
+         "'News' é incontável e usa o verbo no singular."),
+    ]),
+    "Age with To Be": (("A1", "A2"), [
+        ("I ___ twenty years old.", "am", ["have", "has", "do"],
+         "Em inglês a idade é dita com o verbo 'to be'."),
+        ("How old ___ your sister?", "is", ["has", "does", "have"],
+         "A pergunta sobre idade usa 'to be'."),
+        ("My parents ___ fifty.", "are", ["have", "has", "is"],
+         "Idade com 'to be', concordando com o sujeito plural."),
+        ("He ___ ten when he moved.", "was", ["had", "has", "did"],
+         "No passado a idade usa 'was/were'."),
+    ]),
+    "Present Perfect vs Simple Past": (("A2", "B1", "B2"), [
+        ("I ___ here since 2020.", "have lived", ["live", "am living", "lived"],
+         "'Since' com ação que continua até agora pede o present perfect."),
+        ("She ___ to Paris three times.", "has been", ["was", "is", "goes"],
+         "Experiências sem tempo definido usam o present perfect."),
+        ("We ___ the report yesterday.", "finished", ["have finished", "finish", "has finished"],
+         "Com tempo definido ('yesterday') usa-se o passado simples."),
+        ("___ you ever eaten sushi?", "Have", ["Did", "Do", "Are"],
+         "'Ever' para experiências pede o present perfect."),
+        ("They ___ each other for ten years.", "have known", ["know", "are knowing", "knew"],
+         "Verbos de estado com duração até agora usam o present perfect."),
+    ]),
+    "Prepositions of Time": (("A1", "A2", "B1"), [
+        ("The class starts ___ 9 o'clock.", "at", ["in", "on", "to"],
+         "Horas usam 'at'."),
+        ("My birthday is ___ May.", "in", ["on", "at", "to"],
+         "Meses usam 'in'."),
+        ("We meet ___ Mondays.", "on", ["in", "at", "by"],
+         "Dias da semana usam 'on'."),
+        ("I was born ___ 1998.", "in", ["on", "at", "by"],
+         "Anos usam 'in'."),
+        ("See you ___ the weekend.", "at", ["in", "to", "by"],
+         "No inglês britânico diz-se 'at the weekend'; no americano, 'on the weekend'."),
+    ]),
+    "Articles": (("A1", "A2", "B1"), [
+        ("She is ___ engineer.", "an", ["a", "the", "—"],
+         "Profissões levam artigo indefinido; 'an' antes de som de vogal."),
+        ("I love ___ music.", "—", ["the", "a", "an"],
+         "Substantivos incontáveis em sentido geral não levam artigo."),
+        ("Can you close ___ door, please?", "the", ["a", "an", "—"],
+         "'The' para algo específico que os dois conhecem."),
+        ("He plays ___ guitar very well.", "the", ["a", "—", "an"],
+         "Instrumentos musicais costumam levar 'the'."),
+        ("It takes ___ hour to get there.", "an", ["a", "the", "—"],
+         "'Hour' começa com som de vogal, então 'an'."),
+    ]),
+    "Countable and Uncountable Nouns": (("A2", "B1"), [
+        ("The ___ is on the table.", "information", ["informations", "an information", "informations are"],
+         "'Information' é incontável e não tem plural."),
+        ("How ___ money do you have?", "much", ["many", "lot", "few"],
+         "Incontáveis usam 'much'."),
+        ("I need some ___ about the course.", "advice", ["advices", "an advice", "advise"],
+         "'Advice' é incontável; 'advise' é o verbo."),
+        ("There aren't ___ apples left.", "many", ["much", "a little", "less"],
+         "Contáveis no plural usam 'many'."),
+    ]),
+    "Verb Patterns": (("A2", "B1", "B2"), [
+        ("I look forward to ___ from you.", "hearing", ["hear", "heard", "to hear"],
+         "Em 'look forward to', 'to' é preposição e pede -ing."),
+        ("She enjoys ___ novels.", "reading", ["to read", "read", "reads"],
+         "'Enjoy' é seguido de verbo com -ing."),
+        ("They decided ___ early.", "to leave", ["leaving", "leave", "left"],
+         "'Decide' é seguido de infinitivo com 'to'."),
+        ("Can you explain the exercise ___?", "to me", ["me", "for me", "at me"],
+         "'Explain' pede 'to' antes da pessoa."),
+        ("I'm used to ___ early.", "getting up", ["get up", "got up", "gets up"],
+         "'Be used to' é seguido de -ing."),
+    ]),
+    "Conditionals": (("B1", "B2", "C1"), [
+        ("If I ___ money, I would buy a car.", "had", ["would have", "have", "will have"],
+         "No segundo condicional a oração com 'if' usa o passado simples."),
+        ("If it rains, we ___ at home.", "will stay", ["would stay", "stayed", "stay would"],
+         "Primeiro condicional: 'if' + presente, 'will' + verbo."),
+        ("If she had studied, she ___ passed.", "would have", ["will have", "would", "had"],
+         "Terceiro condicional: 'would have' + particípio."),
+        ("I ___ call you if I hear anything.", "will", ["would", "am", "did"],
+         "Possibilidade real no futuro: primeiro condicional."),
+        ("If I ___ you, I'd accept the offer.", "were", ["am", "would be", "be"],
+         "Em conselhos usa-se 'If I were you'."),
+    ]),
+    "False Friends": (("A2", "B1", "B2"), [
+        ("I ___ with you completely.", "agree", ["am agree", "agreeing", "am agreeing"],
+         "'Agree' já é verbo; não se usa 'am agree'."),
+        ("She works in a car ___. (= fábrica)", "factory", ["fabric", "fabrication", "manufacture"],
+         "'Fabric' é tecido; fábrica é 'factory'."),
+        ("___, I didn't see the message. (= na verdade)", "Actually", ["Currently", "Nowadays", "Presently"],
+         "'Actually' significa 'na verdade'; 'currently' é 'atualmente'."),
+        ("I ___ to travel next year. (= pretendo)", "intend", ["pretend", "attend", "extend"],
+         "'Pretend' significa fingir; 'pretender' é 'intend' ou 'plan'."),
+        ("I bought this novel at the ___. (= livraria)", "bookshop", ["library", "librarian", "bookcase"],
+         "'Library' é biblioteca; livraria é 'bookshop'."),
+    ]),
+    "Reported Speech": (("B1", "B2", "C1"), [
+        ("She said she ___ tired.", "was", ["is", "be", "has"],
+         "No discurso indireto o presente recua para o passado."),
+        ("He told me he ___ the film.", "had seen", ["has seen", "sees", "see"],
+         "O present perfect recua para o past perfect."),
+        ("They asked where I ___.", "lived", ["did live", "do live", "live did"],
+         "Perguntas indiretas usam a ordem afirmativa."),
+        ("She asked me ___ I wanted tea.", "if", ["that", "what", "do"],
+         "Perguntas sim/não indiretas usam 'if' ou 'whether'."),
+    ]),
+    "Passive Voice": (("B1", "B2", "C1"), [
+        ("The bridge ___ in 1990.", "was built", ["built", "is build", "was build"],
+         "Voz passiva: 'to be' + particípio."),
+        ("English ___ all over the world.", "is spoken", ["speaks", "is speaking", "spoken"],
+         "Fatos gerais na passiva usam o presente de 'to be'."),
+        ("The results ___ tomorrow.", "will be announced", ["will announce", "announced", "are announce"],
+         "Passiva no futuro: 'will be' + particípio."),
+        ("The letter has ___ sent.", "been", ["be", "being", "was"],
+         "Present perfect passivo: 'has been' + particípio."),
+    ]),
+    "Inversion": (("C1", "C2"), [
+        ("Never ___ such a beautiful place.", "have I seen", ["I have seen", "I saw", "seen I have"],
+         "Depois de advérbios negativos no início, o auxiliar vem antes do sujeito."),
+        ("Not only ___ late, but he also forgot the tickets.", "was he", ["he was", "he is", "is he"],
+         "'Not only' no início pede inversão."),
+        ("Hardly ___ arrived when it started to rain.", "had we", ["we had", "we have", "did we"],
+         "'Hardly ... when' pede inversão com o past perfect."),
+        ("Rarely ___ such dedication.", "do we see", ["we see", "we do see", "see we"],
+         "'Rarely' no início pede inversão com 'do'."),
+    ]),
+}
+
+# Mixed items for learners whose corrections match no rule (or who made none)
+GENERAL = {
+    "A1": [
+        ("___ you like pizza?", "Do", ["Does", "Are", "Is"], "Perguntas com 'you' no presente usam 'do'."),
+        ("There ___ two cats in the garden.", "are", ["is", "be", "has"], "'There are' com plural."),
+        ("I ___ from Brazil.", "am", ["is", "are", "be"], "'I' usa 'am'."),
+    ],
+    "A2": [
+        ("I'm ___ than my brother.", "taller", ["more tall", "tallest", "tall"], "Comparativo de adjetivo curto: -er."),
+        ("We ___ TV when you called.", "were watching", ["watched", "are watching", "was watching"],
+         "Ação em andamento no passado: past continuous."),
+        ("She can ___ three languages.", "speak", ["speaks", "to speak", "speaking"], "Depois de 'can', verbo na forma base."),
+    ],
+    "B1": [
+        ("I've lived here ___ five years.", "for", ["since", "during", "by"], "'For' com duração; 'since' com ponto inicial."),
+        ("He ___ to the gym every morning.", "goes", ["go", "is going", "going"], "Rotina: presente simples."),
+        ("The movie was ___ boring that we left.", "so", ["such", "too", "very"], "'So' + adjetivo + 'that'."),
+    ],
+    "B2": [
+        ("I wish I ___ more time.", "had", ["have", "would have", "has"], "'Wish' sobre o presente usa o passado."),
+        ("She ___ have left already; her coat is gone.", "must", ["can", "should", "would"], "Dedução forte: 'must have'."),
+        ("It's time we ___ home.", "went", ["go", "will go", "going"], "'It's time' + passado simples."),
+    ],
+    "C1": [
+        ("___ the weather, the match went ahead.", "Despite", ["Although", "Despite of", "In spite"],
+         "'Despite' sem 'of', seguido de substantivo."),
+        ("Had I known, I ___ have come.", "would", ["will", "had", "should to"], "Condicional invertido."),
+        ("She's ___ to win the award.", "bound", ["bind", "bounded", "binding"], "'Be bound to' = com certeza vai."),
+    ],
+    "C2": [
+        ("Little ___ know what was coming.", "did they", ["they did", "they knew", "knew they"],
+         "'Little' no início pede inversão com 'did'."),
+        ("The proposal was met ___ widespread criticism.", "with", ["by", "from", "of"], "Colocação: 'met with criticism'."),
+        ("It's high time the law ___ changed.", "was", ["is", "be", "will be"], "'High time' + passado."),
+    ],
+}
+
+GENERATION_PROMPT = """You write multiple-choice grammar exercises for Brazilian Portuguese speakers learning English.
+
+Rule: {rule}
+Level: {level} (CEFR)
+Write {count} different fill-in-the-blank exercises practising this rule at this level.
+Each has a question with one blank (___), 4 options with exactly one correct, and a
+brief explanation in Portuguese.
+
+Format your response as JSON:
+{{
+  "exercises": [
+    {{
+      "type": "multiple_choice",
+      "question": "Question text",
+      "options": ["option1", "option2", "option3", "option4"],
+      "correct": 0,
+      "explanation": "Why this answer is correct"
+    }}
+  ]
+}}"""
+
+
+def make_id(*parts):
+    """Deterministic UUID string for an exercise, from its rule, level and question"""
+    return str(uuid.uuid5(ID_NAMESPACE, ":".join(parts)))
+
+
+def make_exercise(rule, level, question, correct, distractors, explanation, seed, source="catalogue"):
+    """Exercise document with the options shuffled deterministically"""
+    options = [correct, *distractors]
+    digest = hashlib.sha256(f"{seed}:{rule}:{level}:{question}".encode()).digest()
+    random.Random(digest).shuffle(options)
+    return {
+        "_id": make_id(rule, level, question),
+        "rule": rule,
+        "level": level,
+        "type": "multiple_choice",
+        "question": question,
+        "options": options,
+        "correct": options.index(correct),
+        "explanation": explanation,
+        "source": source,
+    }
+
+
+def catalogue_exercises(seed):
+    """The hand-written exercises: every rule item at each of the rule's levels"""
+    exercises = []
+    for rule, (levels, items) in RULES.items():
+        for level in levels:
+            for question, correct, distractors, explanation in items:
+                exercises.append(make_exercise(rule, level, question, correct, distractors, explanation, seed))
+    for level, items in GENERAL.items():
+        for question, correct, distractors, explanation in items:
+            exercises.append(make_exercise(GENERAL_RULE, level, question, correct, distractors, explanation, seed))
+    return exercises
+
+
+def valid_exercise(item):
+    """Whether a generated item has the shape the tutor UI renders"""
+    return (isinstance(item, dict)
+            and isinstance(item.get("question"), str) and item["question"].strip()
+            and isinstance(item.get("options"), list) and len(item["options"]) >= 2
+            and all(isinstance(option, str) and option.strip() for option in item["options"])
+            and len(set(item["options"])) == len(item["options"])
+            and isinstance(item.get("correct"), int) and 0 <= item["correct"] < len(item["options"])
+            and isinstance(item.get("explanation"), str))
+
+
+def generate_exercises(session, options, rule, level):
+    """Model-written exercises for one (rule, level); malformed items are dropped"""
+    response = session.post(f"{options['base_url']}/chat/completions", json={
+        "model": options["model"],
+        "messages": [
+            {"role": "system", "content": GENERATION_PROMPT.format(rule=rule, level=level, count=options["count"])},
+            {"role": "user", "content": f"{rule} ({level})"},
+        ],
+        "temperature": 0.9,
+    }, timeout=options["timeout"])
+    response.raise_for_status()
+    content = response.json()["choices"][0]["message"]["content"].strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return [], 1
+    # Also accept the tutor's own shape, e.g. from fake_openai_server.py
+    items = data.get("exercises") if isinstance(data.get("exercises"), list) else [data.get("miniExercise")]
+    valid = [item for item in items if valid_exercise(item)]
+    exercises = [
+        make_exercise(rule, level, item["question"].strip(), item["options"][item["correct"]],
+                      [option for index, option in enumerate(item["options"]) if index != item["correct"]],
+                      item["explanation"], options["seed"], source=options["model"])
+        for item in valid
+    ]
+    return exercises, len(items) - len(valid)
+
+
+def generate_all(options, workers):
+    """Runs generate_exercises for every (rule, level) on a thread pool"""
+    targets = [(rule, level) for rule, (levels, _) in RULES.items() for level in levels]
+    targets += [(GENERAL_RULE, level) for level in GENERAL]
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {options['api_key']}"
+    exercises, dropped, failed = [], 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_exercises, session, options, rule, level): (rule, level)
+                   for rule, level in targets}
+        for future in as_completed(futures):
+            rule, level = futures[future]
+            try:
+                generated, malformed = future.result()
+            except requests.RequestException as error:
+                failed += 1
+                print(f"⚠️  {rule} ({level}): {error}")
+                continue
+            exercises.extend(generated)
+            dropped += malformed
+    print(f"🤖 Generated {len(exercises)} exercises for {len(targets)} rule/level pairs "
+          f"({dropped} malformed dropped, {failed} calls failed)")
+    return exercises
+
+
+def dedupe(exercises):
+    """One exercise per _id; the first (catalogue) copy wins"""
+    unique = {}
+    for exercise in exercises:
+        unique.setdefault(exercise["_id"], exercise)
+    return list(unique.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the AI Linguo mini-exercise bank")
+    parser.add_argument("--seed", type=int, default=42, help="seed for the option order")
+    parser.add_argument("--generate", type=int, default=0,
+                        help="model-written exercises to add per rule and level (0 = catalogue only)")
+    parser.add_argument("--model", default=os.environ.get("OPENAI_MODEL", "gpt-4o-mini"))
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+    parser.add_argument("--workers", type=int, default=8, help="concurrent generation calls")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds per generation call")
+    parser.add_argument("--out", help="write the bank to this JSON file (for EXERCISE_BANK_PATH)")
+    parser.add_argument("--mongo-uri", help="load the bank into this MongoDB")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "ailinguo"), help="database name")
+    parser.add_argument("--drop", action="store_true", help="replace the existing exerciseBank collection")
+    args = parser.parse_args()
+
+    if not args.out and not args.mongo_uri:
+        parser.error("give --out and/or --mongo-uri")
+
+    started = time.perf_counter()
+    exercises = catalogue_exercises(args.seed)
+    print(f"📚 {len(exercises)} catalogue exercises for {len(RULES)} rules")
+
+    if args.generate:
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            print("❌ --generate needs OPENAI_API_KEY")
+            return 1
+        exercises += generate_all({
+            "base_url": args.base_url.rstrip("/"),
+            "api_key": api_key,
+            "model": args.model,
+            "count": args.generate,
+            "seed": args.seed,
+            "timeout": args.timeout,
+        }, args.workers)
+
+    exercises = dedupe(exercises)
+    pairs = {(exercise["rule"], exercise["level"]) for exercise in exercises}
+    print(f"📦 {len(exercises)} exercises in {len(pairs)} rule/level lists "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump({"exercises": exercises}, handle, ensure_ascii=False, indent=1)
+        print(f"💾 Wrote {args.out}")
+
+    if args.mongo_uri:
+        from pymongo import MongoClient, ReplaceOne
+        collection = MongoClient(args.mongo_uri)[args.db][COLLECTION]
+        if args.drop:
+            collection.drop()
+        collection.bulk_write([ReplaceOne({"_id": exercise["_id"]}, exercise, upsert=True)
+                               for exercise in exercises], ordered=False)
+        collection.create_index([("rule", 1), ("level", 1)])
+        print(f"🍃 Loaded {len(exercises)} exercises into {args.db}.{COLLECTION}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,364 @@
-import zipfile
+import argparse
+import hashlib
+import json
 import os
-import shutil
-
-def create_ai_linguo_zip():
-    # Create a clean version without node_modules
-    source_dir = '/app/ai-linguo'
-    zip_path = '/app/ai-linguo.zip'
-    
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(source_dir):
-            # Skip node_modules, .next, and other build directories
-            dirs[:] = [d for d in dirs if d not in ['node_modules', '.next', '.git', 'dist', 'build']]
-            
-            for file in files:
-                # Skip yarn.lock and other generated files
-                if file in ['yarn.lock', 'package-lock.json']:
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                arc_name = os.path.relpath(file_path, source_dir)
-                zipf.write(file_path, arc_name)
-    
-    print(f"Created {zip_path}")
-    print(f"Size: {os.path.getsize(zip_path)} bytes")
+import stat
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_SOURCE_DIR = '/app/ai-linguo'
+DEFAULT_ZIP_PATH = '/app/ai-linguo.zip'
+
+# Skip node_modules, .next, and other build directories
+DEFAULT_EXCLUDE_DIRS = ['node_modules', '.next', '.git', 'dist', 'build']
+# Skip yarn.lock and other generated files
+DEFAULT_EXCLUDE_FILES = ['yarn.lock', 'package-lock.json']
+
+# Formats that are already compressed are stored as-is
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.mp3', '.mp4', '.ogg', '.webm', '.wav',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.br', '.7z', '.pdf',
+}
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+MANIFEST_VERSION = 1
+ZIP64_LIMIT = 0xFFFFFFFF
+CHUNK_SIZE = 1024 * 1024
+
+
+def collect_files(source_dir, exclude_dirs, exclude_files):
+    """Walk the source tree and return (path, arcname, stat) tuples in a stable order"""
+    members = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if d not in exclude_dirs)
+        for file in sorted(files):
+            if file in exclude_files:
+                continue
+            file_path = os.path.join(root, file)
+            arc_name = os.path.relpath(file_path, source_dir).replace(os.sep, '/')
+            members.append((file_path, arc_name, os.stat(file_path)))
+    return members
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compress_member(file_path, level, expected_sha256=None):
+    """Read and compress one file; runs in a worker process.
+
+    With expected_sha256 the file is hashed first and, when the content is
+    unchanged, only {'reused': True} is returned so the caller can copy the
+    previous compressed bytes instead.
+    """
+    if expected_sha256 is not None and file_sha256(file_path) == expected_sha256:
+        return {'reused': True}
+
+    info = os.stat(file_path)
+    store = os.path.splitext(file_path)[1].lower() in STORED_EXTENSIONS
+    compressor = None if store else zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = 0
+    digest = hashlib.sha256()
+    chunks = []
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            digest.update(chunk)
+            chunks.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        chunks.append(compressor.flush())
+    data = b''.join(chunks)
+
+    method = ZIP_STORED if store else ZIP_DEFLATED
+    if method == ZIP_DEFLATED and len(data) >= info.st_size:
+        # Deflate did not help, keep the raw bytes instead
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        method = ZIP_STORED
+    return {
+        'reused': False,
+        'size': info.st_size,
+        'mtime': info.st_mtime,
+        'mtime_ns': info.st_mtime_ns,
+        'mode': info.st_mode,
+        'crc': crc & 0xFFFFFFFF,
+        'sha256': digest.hexdigest(),
+        'method': method,
+        'data': data,
+    }
+
+
+def load_manifest(manifest_path, archive_path, level):
+    """Members of the previous build, or {} if the manifest does not match its archive"""
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        info = os.stat(archive_path)
+    except (OSError, ValueError):
+        return {}
+    if (manifest.get('version') != MANIFEST_VERSION or manifest.get('level') != level
+            or manifest.get('archive_size') != info.st_size
+            or manifest.get('archive_mtime_ns') != info.st_mtime_ns):
+        return {}
+    return manifest.get('members', {})
+
+
+def write_manifest(manifest_path, archive_path, level, members):
+    info = os.stat(archive_path)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'level': level,
+        'archive_size': info.st_size,
+        'archive_mtime_ns': info.st_mtime_ns,
+        'members': members,
+    }
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, manifest_path)
+
+
+def dos_datetime(timestamp):
+    t = time.localtime(max(timestamp, 315532800))  # ZIP dates start in 1980
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipStreamWriter:
+    """Writes a ZIP archive sequentially to any binary stream (no seeking).
+
+    Members are added with their data already compressed, so CRCs and sizes
+    are known up front and no data descriptors are needed.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offset = 0
+        self.entries = []
+
+    def write(self, data):
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def add_member(self, arc_name, member):
+        name = arc_name.encode('utf-8')
+        size, compressed_size = member['size'], len(member['data'])
+        zip64 = size >= ZIP64_LIMIT or compressed_size >= ZIP64_LIMIT
+        extra = struct.pack('<HHQQ', 0x0001, 16, size, compressed_size) if zip64 else b''
+        dos_time, dos_date = dos_datetime(member['mtime'])
+        entry = {
+            'name': name,
+            'offset': self.offset,
+            'crc': member['crc'],
+            'method': member['method'],
+            'size': size,
+            'compressed_size': compressed_size,
+            'dos_time': dos_time,
+            'dos_date': dos_date,
+            'mode': member['mode'],
+        }
+        self.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, 0x0800, member['method'],
+            dos_time, dos_date, member['crc'],
+            ZIP64_LIMIT if zip64 else compressed_size, ZIP64_LIMIT if zip64 else size,
+            len(name), len(extra)) + name + extra)
+        entry['data_offset'] = self.offset
+        self.write(member['data'])
+        self.entries.append(entry)
+        return entry
+
+    def close(self):
+        """Write the central directory (with ZIP64 records when needed)"""
+        directory_offset = self.offset
+        for entry in self.entries:
+            zip64_fields = []
+            if entry['size'] >= ZIP64_LIMIT or entry['compressed_size'] >= ZIP64_LIMIT:
+                zip64_fields += [entry['size'], entry['compressed_size']]
+            if entry['offset'] >= ZIP64_LIMIT:
+                zip64_fields.append(entry['offset'])
+            extra = (struct.pack('<HH', 0x0001, 8 * len(zip64_fields))
+                     + struct.pack(f'<{len(zip64_fields)}Q', *zip64_fields)) if zip64_fields else b''
+            large = bool(zip64_fields)
+            mode = entry['mode'] if stat.S_ISREG(entry['mode']) else 0o100644
+            self.write(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 45, 45 if large else 20, 0x0800,
+                entry['method'], entry['dos_time'], entry['dos_date'], entry['crc'],
+                ZIP64_LIMIT if entry['compressed_size'] >= ZIP64_LIMIT else entry['compressed_size'],
+                ZIP64_LIMIT if entry['size'] >= ZIP64_LIMIT else entry['size'],
+                len(entry['name']), len(extra), 0, 0, 0, (mode & 0xFFFF) << 16,
+                min(entry['offset'], ZIP64_LIMIT)) + entry['name'] + extra)
+        directory_size = self.offset - directory_offset
+        count = len(self.entries)
+
+        if count >= 0xFFFF or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+            zip64_end = self.offset
+            self.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                                   count, count, directory_size, directory_offset))
+            self.write(struct.pack('<IIQI', 0x07064b50, 0, zip64_end, 1))
+        self.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                               min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0))
+        self.stream.flush()
+
+
+def create_ai_linguo_zip(source_dir=DEFAULT_SOURCE_DIR, zip_path=DEFAULT_ZIP_PATH,
+                         exclude_dirs=DEFAULT_EXCLUDE_DIRS, exclude_files=DEFAULT_EXCLUDE_FILES,
+                         workers=None, level=6, previous_path=None, manifest_path=None,
+                         incremental=True):
+    """Package source_dir into zip_path ('-' streams the archive to stdout).
+
+    Members whose size and mtime (or, failing that, content hash) match the
+    manifest of the previous archive are copied from it as already-compressed
+    bytes; only changed files are read and deflated.
+    """
+    # Progress goes to stderr so the archive can be streamed on stdout
+    log = sys.stderr if zip_path == '-' else sys.stdout
+    timings = {}
+
+    if previous_path is None and zip_path != '-':
+        previous_path = zip_path
+    if manifest_path is None and previous_path:
+        manifest_path = previous_path + '.manifest.json'
+
+    start = time.perf_counter()
+    members = collect_files(source_dir, set(exclude_dirs), set(exclude_files))
+    previous = load_manifest(manifest_path, previous_path, level) if incremental and manifest_path else {}
+    timings['scan'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Write next to the target and swap at the end, the previous archive is read meanwhile
+    tmp_path = zip_path + '.tmp' if zip_path != '-' else None
+    stream = sys.stdout.buffer if zip_path == '-' else open(tmp_path, 'wb')
+    previous_archive = open(previous_path, 'rb') if previous else None
+    writer = ZipStreamWriter(stream)
+    manifest = {}
+    counts = {'unchanged': 0, 'rehashed': 0, 'compressed': 0, 'stored': 0}
+    raw_bytes = 0
+    workers = workers or os.cpu_count() or 1
+
+    def submit(pool, file_path, arc_name, info):
+        entry = previous.get(arc_name)
+        if entry and entry['size'] == info.st_size and entry['mtime_ns'] == info.st_mtime_ns:
+            return (arc_name, info, entry, None)
+        expected = entry['sha256'] if entry and entry['size'] == info.st_size else None
+        return (arc_name, info, entry, pool.submit(compress_member, file_path, level, expected))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of members in flight so memory stays flat
+            pending = deque()
+            queue = iter(members)
+            for file_path, arc_name, info in queue:
+                pending.append(submit(pool, file_path, arc_name, info))
+                if len(pending) >= workers * 4:
+                    break
+            while pending:
+                arc_name, info, entry, future = pending.popleft()
+                member = future.result() if future else {'reused': True}
+                if member['reused']:
+                    counts['unchanged' if future is None else 'rehashed'] += 1
+                    previous_archive.seek(entry['data_offset'])
+                    member = {
+                        'size': entry['size'],
+                        'mtime': info.st_mtime,
+                        'mode': info.st_mode,
+                        'crc': entry['crc'],
+                        'sha256': entry['sha256'],
+                        'method': entry['method'],
+                        'data': previous_archive.read(entry['compressed_size']),
+                    }
+                else:
+                    counts['compressed'] += 1
+                written = writer.add_member(arc_name, member)
+                raw_bytes += member['size']
+                counts['stored'] += member['method'] == ZIP_STORED
+                manifest[arc_name] = {
+                    'size': member['size'],
+                    'mtime_ns': info.st_mtime_ns,
+                    'sha256': member['sha256'],
+                    'crc': member['crc'],
+                    'method': member['method'],
+                    'compressed_size': written['compressed_size'],
+                    'data_offset': written['data_offset'],
+                }
+                next_member = next(queue, None)
+                if next_member:
+                    pending.append(submit(pool, *next_member))
+        timings['compress+write'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        writer.close()
+        timings['central directory'] = time.perf_counter() - start
+    finally:
+        if previous_archive:
+            previous_archive.close()
+        if stream is not sys.stdout.buffer:
+            stream.close()
+
+    if tmp_path:
+        os.replace(tmp_path, zip_path)
+        if manifest_path:
+            write_manifest(manifest_path, zip_path, level, manifest)
+
+    total_bytes = writer.offset
+    print(f"Created {zip_path}", file=log)
+    print(f"Size: {total_bytes} bytes", file=log)
+    print(f"Members: {len(members)} ({counts['stored']} stored without recompression), {workers} workers", file=log)
+    print(f"Rebuild: {counts['compressed']} compressed, {counts['unchanged']} copied unchanged, "
+          f"{counts['rehashed']} copied after hash check", file=log)
+    ratio = total_bytes / raw_bytes if raw_bytes else 1.0
+    print(f"Compression: {raw_bytes} -> {total_bytes} bytes (ratio {ratio:.3f}, "
+          f"{(1 - ratio) * 100:.1f}% saved)", file=log)
+    for phase, seconds in timings.items():
+        print(f"  {phase}: {seconds * 1000:.1f}ms", file=log)
+    return writer.entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Package the AI Linguo source tree as a zip archive")
+    parser.add_argument("--source", default=DEFAULT_SOURCE_DIR, help="directory to package")
+    parser.add_argument("-o", "--output", default=DEFAULT_ZIP_PATH,
+                        help="archive path, or '-' to stream to stdout")
+    parser.add_argument("--exclude-dir", action="append", default=None,
+                        help=f"directory name to skip (repeatable, default: {' '.join(DEFAULT_EXCLUDE_DIRS)})")
+    parser.add_argument("--exclude-file", action="append", default=None,
+                        help=f"file name to skip (repeatable, default: {' '.join(DEFAULT_EXCLUDE_FILES)})")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="compression processes (default: CPU count)")
+    parser.add_argument("--level", type=int, default=6, choices=range(0, 10), metavar="0-9",
+                        help="deflate level")
+    parser.add_argument("--previous", default=None,
+                        help="previous archive to copy unchanged members from (default: the output path)")
+    parser.add_argument("--manifest", default=None,
+                        help="build manifest path (default: <previous archive>.manifest.json)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and recompress everything")
+    args = parser.parse_args()
+    create_ai_linguo_zip(
+        source_dir=args.source,
+        zip_path=args.output,
+        exclude_dirs=args.exclude_dir if args.exclude_dir is not None else DEFAULT_EXCLUDE_DIRS,
+        exclude_files=args.exclude_file if args.exclude_file is not None else DEFAULT_EXCLUDE_FILES,
+        workers=args.workers,
+        level=args.level,
+        previous_path=args.previous,
+        manifest_path=args.manifest,
+        incremental=not args.full,
+    )
+
 
 if __name__ == "__main__":
-    create_ai_linguo_zip()
\ No newline at end of file
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in server for benchmarking the AI tutor
+Serves /v1/chat/completions offline with configurable latency, streaming
+token rate, 429/5xx injection and malformed (non-JSON) tutor replies. Latency
+and error rate can be set per model to exercise the tutor's model fallback.
+
+Point the app at it with:
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://localhost:8089/v1 AI_TUTOR_MOCK=0 yarn dev
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+# Latency distributions, all parameters in milliseconds
+LATENCY_DISTRIBUTIONS = {
+    "constant": lambda rng, value: value,
+    "uniform": lambda rng, low, high: rng.uniform(low, high),
+    "normal": lambda rng, mean, stddev: max(0.0, rng.gauss(mean, stddev)),
+    "lognormal": lambda rng, median, sigma: median * rng.lognormvariate(0.0, sigma),
+    "exponential": lambda rng, mean: rng.expovariate(1.0 / mean) if mean > 0 else 0.0,
+}
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+def parse_latency(spec):
+    """Parse a latency spec such as "lognormal:800:0.5" or "constant:200" """
+    name, *params = spec.split(":")
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise argparse.ArgumentTypeError(
+            f"unknown latency distribution {name!r}, choose from {', '.join(LATENCY_DISTRIBUTIONS)}")
+    try:
+        params = [float(param) for param in params]
+        LATENCY_DISTRIBUTIONS[name](random.Random(0), *params)
+    except (TypeError, ValueError):
+        raise argparse.ArgumentTypeError(f"invalid parameters for {name}: {spec!r}")
+    return (name, params)
+
+
+def parse_model_latency(spec):
+    """Parse "MODEL=LATENCY", e.g. "gpt-4o-mini=lognormal:800:1.0" """
+    model, sep, latency = spec.partition("=")
+    if not sep or not model:
+        raise argparse.ArgumentTypeError(f"expected MODEL=LATENCY, got {spec!r}")
+    return (model, parse_latency(latency))
+
+
+def parse_model_rate(spec):
+    """Parse "MODEL=RATE", e.g. "gpt-4o-mini=0.5" """
+    model, sep, rate = spec.partition("=")
+    try:
+        if not sep or not model:
+            raise ValueError(spec)
+        return (model, float(rate))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MODEL=RATE, got {spec!r}")
+
+
+def estimate_tokens(text):
+    """Rough OpenAI token count (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def tutor_reply(user_text, level, exercise=True):
+    """Tutor JSON in the shape getTutorPrompt asks the model for
+
+    Without exercise (the prompt says the exercise bank supplies it) there is no
+    miniExercise, as a real model would leave it out.
+    """
+    reply = {
+        "reply": f"Thanks for sharing! At level {level} you are doing well. "
+                 "Let's look at your sentence together and make it sound even more natural.",
+        "corrections": [
+            {
+                "original": user_text,
+                "corrected": user_text.replace(" go ", " went "),
+                "explanation": "Use o passado simples para ações que já terminaram.",
+                "rule": "Past Simple Tense"
+            }
+        ],
+        "miniExercise": {
+            "type": "multiple_choice",
+            "question": "Choose the correct past tense:",
+            "options": ["I go", "I went", "I going", "I goes"],
+            "correct": 1,
+            "explanation": "The past tense of 'go' is 'went'."
+        }
+    }
+    if not exercise:
+        del reply["miniExercise"]
+    return reply
+
+
+class FakeOpenAIServer:
+    """Minimal asyncio HTTP/1.1 server speaking the chat completions API"""
+
+    def __init__(self, host="127.0.0.1", port=8089, latency=("constant", [0.0]),
+                 tokens_per_second=0.0, rate_limit_rate=0.0, error_rate=0.0,
+                 malformed_rate=0.0, seed=None, model_latency=None, model_error_rate=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.model_latency = dict(model_latency or {})
+        self.model_error_rate = dict(model_error_rate or {})
+        self.rng = random.Random(seed)
+        self.stats = {
+            "requests": 0,
+            "completions": 0,
+            "streamed": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "malformed": 0,
+            "cancelled": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "models": {},
+        }
+        self.server = None
+
+    def sample_latency(self, model=None):
+        name, params = self.model_latency.get(model, self.latency)
+        return LATENCY_DISTRIBUTIONS[name](self.rng, *params) / 1000.0
+
+    # HTTP plumbing
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self.dispatch(method, path.split("?", 1)[0], body, writer, reader)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send_json(self, writer, status, payload, extra_headers=None):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        headers = [
+            f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(data)}",
+            "Connection: keep-alive",
+        ]
+        for key, value in (extra_headers or {}).items():
+            headers.append(f"{key}: {value}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + data)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body, writer, reader=None):
+        self.stats["requests"] += 1
+        if method == "GET" and path in ("/health", "/v1/health"):
+            await self.send_json(writer, 200, {"status": "ok"})
+        elif method == "GET" and path in ("/stats", "/v1/stats"):
+            await self.send_json(writer, 200, self.stats)
+        elif method == "GET" and path in ("/models", "/v1/models"):
+            await self.send_json(writer, 200, {"object": "list", "data": []})
+        elif method == "POST" and path in ("/chat/completions", "/v1/chat/completions"):
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                await self.send_json(writer, 400, error_body("invalid JSON body", "invalid_request_error"))
+                return
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+            try:
+                await self.chat_completion(request, writer, reader)
+            finally:
+                self.stats["in_flight"] -= 1
+        else:
+            await self.send_json(writer, 404, error_body(f"no route for {method} {path}", "not_found"))
+
+    # Chat completions
+    def model_stats(self, model):
+        if model not in self.stats["models"]:
+            self.stats["models"][model] = {"requests": 0, "completions": 0, "server_errors": 0, "cancelled": 0}
+        return self.stats["models"][model]
+
+    def cancelled(self, reader, model_stats):
+        """True (and counted) when the client hung up, e.g. it aborted a hedged request"""
+        if reader is None or not reader.at_eof():
+            return False
+        self.stats["cancelled"] += 1
+        model_stats["cancelled"] += 1
+        return True
+
+    async def chat_completion(self, request, writer, reader=None):
+        model = request.get("model", "gpt-4o-mini")
+        model_stats = self.model_stats(model)
+        model_stats["requests"] += 1
+        await asyncio.sleep(self.sample_latency(model))
+        if self.cancelled(reader, model_stats):
+            return
+
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            await self.send_json(writer, 429, error_body("Rate limit reached (injected)", "rate_limit_exceeded"),
+                                 {"Retry-After": "1", "x-ratelimit-remaining-requests": "0"})
+            return
+        if roll < self.rate_limit_rate + self.model_error_rate.get(model, self.error_rate):
+            self.stats["server_errors"] += 1
+            model_stats["server_errors"] += 1
+            status = self.rng.choice([500, 502, 503])
+            await self.send_json(writer, status, error_body("Upstream failure (injected)", "server_error"))
+            return
+
+        messages = request.get("messages", [])
+        user_text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        system_text = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        level = "B1"
+        if "User Level:" in system_text:
+            level = system_text.split("User Level:", 1)[1].split()[0]
+
+        if self.rng.random() < self.malformed_rate:
+            self.stats["malformed"] += 1
+            content = ("Great job! You should say 'I went to school yesterday' because the action "
+                       "happened in the past.")
+        else:
+            exercise = 'Do not include "miniExercise"' not in system_text
+            content = json.dumps(tutor_reply(user_text, level, exercise), ensure_ascii=False)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        usage = {
+            "prompt_tokens": sum(estimate_tokens(m.get("content", "")) for m in messages),
+            "completion_tokens": estimate_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if request.get("stream"):
+            self.stats["streamed"] += 1
+            await self.stream_completion(writer, completion_id, model, content, reader)
+        else:
+            await self.token_delay(usage["completion_tokens"])
+            if self.cancelled(reader, model_stats):
+                return
+            self.stats["completions"] += 1
+            model_stats["completions"] += 1
+            await self.send_json(writer, 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    async def token_delay(self, tokens):
+        if self.tokens_per_second > 0:
+            await asyncio.sleep(tokens / self.tokens_per_second)
+
+    async def stream_completion(self, writer, completion_id, model, content, reader=None):
+        """Send the content as SSE chunks, one ~4 character token at a time"""
+        writer.write(("HTTP/1.1 200 OK\r\n"
+                      "Content-Type: text/event-stream\r\n"
+                      "Cache-Control: no-cache\r\n"
+                      "Transfer-Encoding: chunked\r\n"
+                      "Connection: keep-alive\r\n\r\n").encode())
+
+        def chunk(delta, finish_reason=None):
+            event = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            data = f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode()
+            return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+        writer.write(chunk({"role": "assistant", "content": ""}))
+        for start in range(0, len(content), 4):
+            await self.token_delay(1)
+            if self.cancelled(reader, self.model_stats(model)):
+                return
+            writer.write(chunk({"content": content[start:start + 4]}))
+            await writer.drain()
+        writer.write(chunk({}, "stop"))
+        done = b"data: [DONE]\n\n"
+        writer.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+        await writer.drain()
+        self.stats["completions"] += 1
+        self.model_stats(model)["completions"] += 1
+
+    # Lifecycle
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"🤖 Fake OpenAI server listening on http://{self.host}:{self.port}/v1")
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self):
+        """Run the server on a daemon thread; returns once it is accepting connections"""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="fake-openai", daemon=True).start()
+        ready.wait()
+        return self
+
+
+def error_body(message, code):
+    return {"error": {"message": message, "type": code, "param": None, "code": code}}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in server for tutor benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=parse_latency, default=("constant", [0.0]),
+                        help="time to first byte: constant:MS, uniform:LOW:HIGH, normal:MEAN:STD, "
+                             "lognormal:MEDIAN:SIGMA or exponential:MEAN (milliseconds)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="generation speed; 0 sends the whole reply at once")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of completions answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of completions answered with 500/502/503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="fraction of completions whose content is not valid JSON")
+    parser.add_argument("--model-latency", type=parse_model_latency, action="append", default=[],
+                        metavar="MODEL=SPEC", help="latency for one model, e.g. gpt-4o-mini=lognormal:800:1.0 "
+                                                   "(repeatable; others use --latency)")
+    parser.add_argument("--model-error-rate", type=parse_model_rate, action="append", default=[],
+                        metavar="MODEL=RATE", help="5xx rate for one model (repeatable; others use --error-rate)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    return parser
+
+
+def server_from_args(args):
+    return FakeOpenAIServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+        model_latency=dict(args.model_latency),
+        model_error_rate=dict(args.model_error_rate),
+    )
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(server_from_args(build_parser().parse_args()).serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for performance work
+Produces production-sized users, SRS review states, chat sessions and turns and
+pronunciation attempts with skewed (log-normal) per-learner activity, in the
+same document shapes the API routes write.
+
+Learners are generated in fixed-size chunks by a process pool. Every chunk is
+seeded from (--seed, first learner), so the same arguments always produce the
+same dataset whatever --workers is. Each worker either streams its chunk into
+Mongo with unordered insert_many batches or writes gzipped NDJSON shards for
+mongoimport. Indexes are built once the load is done:
+    python generate_dataset.py --users 1000000 --mongo-uri mongodb://localhost:27017
+    python generate_dataset.py --users 1000000 --out dataset/
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+import srs_reference
+
+DAY_MS = srs_reference.DAY_MS
+ID_NAMESPACE = uuid.UUID("6f1b2a4e-7f54-4c1e-9d4b-2f0c3e5a8b71")
+CEFR_LEVELS = ("A1", "A2", "B1", "B2", "C1")
+CEFR_WEIGHTS = (0.2, 0.3, 0.25, 0.15, 0.1)
+COLLECTIONS = ("users", "vocabCards", "srsReviews", "chatSessions", "chatTurns", "pronunciation")
+
+# Indexes the routes rely on, built after the load (lib/srs.js, lib/chat.js, login by email)
+INDEXES = {
+    "users": [({"email": 1}, {"unique": True})],
+    "srsReviews": [({"userId": 1, "dueAt": 1}, {}), ({"userId": 1, "cardId": 1}, {})],
+    "chatTurns": [({"sessionId": 1, "createdAt": 1, "_id": 1}, {})],
+}
+
+# Mirrors the defaults in lib/chat.js
+CHAT_CONTEXT_TURNS = 8
+CHAT_SUMMARY_MAX_CHARS = 2000
+
+VOCABULARY = [
+    ("apple", "maçã", "I eat an apple every day"),
+    ("house", "casa", "My house is very big"),
+    ("water", "água", "I drink water when I am thirsty"),
+    ("friend", "amigo", "My best friend lives next door"),
+    ("beautiful", "bonito/bonita", "The sunset is beautiful"),
+    ("important", "importante", "Education is very important"),
+    ("different", "diferente", "Every person is different"),
+    ("difficult", "difícil", "Math is difficult for me"),
+    ("necessary", "necessário", "It is necessary to study English"),
+    ("although", "embora", "Although it was raining, we went out"),
+    ("knowledge", "conhecimento", "Knowledge is power"),
+    ("nevertheless", "no entanto", "It was hard; nevertheless, we finished"),
+]
+
+LEARNER_SENTENCES = [
+    "I go to school yesterday",
+    "She don't like coffee",
+    "I am agree with you",
+    "Yesterday I goed to the beach",
+    "People is very friendly here",
+    "I am here since two years",
+    "Can you explain me the exercise?",
+    "If I would have money I would buy a car",
+    "I look forward to hear from you",
+    "The informations are on the table",
+    "Despite of the rain we went out",
+    "We discussed about the project",
+]
+
+TUTOR_REPLIES = [
+    ("Good effort! Remember to use the past tense for finished actions.", "Past Simple Tense"),
+    ("Nice sentence! Watch subject-verb agreement.", "Subject-Verb Agreement"),
+    ("Great! Just one small preposition to fix.", "Prepositions"),
+    ("Well done, that was almost perfect.", None),
+]
+
+PHRASES = [
+    "The weather is beautiful today",
+    "I think this is the right answer",
+    "She sells seashells by the seashore",
+    "Thank you very much for your help",
+]
+
+
+def make_id(kind, *parts):
+    """Deterministic UUID string, so reruns with the same seed produce the same _ids"""
+    # Same value as str(uuid.uuid5(ID_NAMESPACE, name)) without building UUID objects
+    digest = hashlib.sha1(ID_NAMESPACE.bytes + ":".join([kind, *map(str, parts)]).encode()).hexdigest()
+    return (f"{digest[:8]}-{digest[8:12]}-5{digest[13:16]}-"
+            f"{'89ab'[int(digest[16], 16) & 3]}{digest[17:20]}-{digest[20:32]}")
+
+
+def to_datetimes(ms):
+    """Epoch milliseconds to naive UTC datetimes (how pymongo stores BSON dates)"""
+    return np.asarray(ms, dtype="datetime64[ms]").tolist()
+
+
+def activity_weights(users, skew, seed):
+    """Per-learner activity multipliers with mean 1; larger skew means a heavier tail"""
+    weights = np.random.default_rng(seed).lognormal(0.0, skew, size=users)
+    return weights / weights.mean()
+
+
+def vocabulary_deck(size):
+    """vocabCards documents in the order getDueCards() introduces them (level, then _id)"""
+    rng = np.random.default_rng(size)
+    levels = rng.choice(len(CEFR_LEVELS), size=size, p=CEFR_WEIGHTS)
+    deck = []
+    for index in range(size):
+        term, meaning, example = VOCABULARY[index % len(VOCABULARY)]
+        deck.append({
+            "_id": make_id("card", index),
+            "term": term,
+            "meaning": meaning,
+            "example": example,
+            "cefrLevel": CEFR_LEVELS[levels[index]],
+        })
+    deck.sort(key=lambda card: (card["cefrLevel"], card["_id"]))
+    return deck
+
+
+def fold_summary(turns):
+    """The extractive summary lib/chat.js builds: one line per learner turn, oldest dropped first"""
+    lines = [f"Learner: {turn['text'][:120]}" for turn in turns if turn["role"] == "user"]
+    while lines and len("\n".join(lines)) > CHAT_SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def generate_chunk(first, weights, deck_ids, options):
+    """All documents for learners first .. first + len(weights) - 1, by collection"""
+    rng = np.random.default_rng([options["seed"], first])
+    now_ms = options["now_ms"]
+    span_ms = options["span_days"] * DAY_MS
+    count = len(weights)
+
+    created_ms = now_ms - rng.integers(0, span_ms, size=count)
+    active_ms = now_ms - created_ms
+    levels = rng.choice(len(CEFR_LEVELS), size=count, p=CEFR_WEIGHTS)
+    created_at = to_datetimes(created_ms)
+
+    docs = {name: [] for name in COLLECTIONS if name != "vocabCards"}
+
+    cards = np.minimum(rng.poisson(options["cards_per_user"] * weights), len(deck_ids))
+    for offset in range(count):
+        index = first + offset
+        minutes = int(rng.poisson(10 * weights[offset] * active_ms[offset] / DAY_MS))
+        user = {
+            "_id": make_id("user", index),
+            "email": f"learner{index}@example.com",
+            "name": f"Learner {index}",
+            "password": "password123",
+            "cefrLevel": CEFR_LEVELS[levels[offset]],
+            "dailyGoalMinutes": 15,
+            "createdAt": created_at[offset],
+            "streakDays": int(rng.poisson(3 * weights[offset])),
+            "totalMinutes": minutes,
+            "lastStudyDate": created_at[offset] if minutes == 0 else to_datetimes(
+                now_ms - rng.integers(0, DAY_MS * 7))
+        }
+        if user["streakDays"]:
+            # UTC day the streak was last extended, as maintained by lib/progressBuffer.js
+            user["streakLastDay"] = user["lastStudyDate"].strftime("%Y-%m-%d")
+        docs["users"].append(user)
+
+    # SRS: each learner has reviewed the first `cards` cards of the deck, more active
+    # learners more often. The log is replayed through the production scheduler.
+    n_cards = int(cards.sum())
+    if n_cards:
+        owner = np.repeat(np.arange(count), cards)
+        deck_pos = np.arange(n_cards) - np.repeat(np.cumsum(cards) - cards, cards)
+        reviews = 1 + rng.poisson(options["reviews_per_card"] * weights[owner])
+        card_index = np.repeat(np.arange(n_cards), reviews)
+        reviewed_ms = created_ms[owner[card_index]] + (
+            rng.random(len(card_index)) * active_ms[owner[card_index]]).astype(np.int64)
+        ratings = rng.choice(len(srs_reference.RESULTS), size=len(card_index),
+                             p=srs_reference.DEFAULT_RATING_WEIGHTS).astype(np.int8)
+        order = np.argsort(reviewed_ms, kind="stable")
+        card_index, ratings, reviewed_ms = card_index[order], ratings[order], reviewed_ms[order]
+        state, _ = srs_reference.replay(card_index, ratings, reviewed_ms, n_cards)
+
+        # Chronological log, so the last occurrence of each card is its latest review
+        last = np.empty(n_cards, dtype=np.int64)
+        last[card_index] = np.arange(len(card_index))
+        due_at = to_datetimes(state["due_ms"])
+        reviewed_at = to_datetimes(reviewed_ms[last])
+        for card in range(n_cards):
+            docs["srsReviews"].append({
+                "userId": docs["users"][owner[card]]["_id"],
+                "cardId": deck_ids[deck_pos[card]],
+                "dueAt": due_at[card],
+                "interval": int(state["interval"][card]),
+                "ease": float(state["ease"][card]),
+                "repetitions": int(state["repetitions"][card]),
+                "lapses": int(state["lapses"][card]),
+                "lastResult": srs_reference.RESULTS[ratings[last[card]]],
+                "reviewedAt": reviewed_at[card],
+            })
+
+    # Chat: sessions per learner follow activity, exchanges per session are geometric
+    sessions = rng.poisson(options["sessions_per_user"] * weights)
+    for offset in np.flatnonzero(sessions):
+        user = docs["users"][offset]
+        for number in range(sessions[offset]):
+            session_id = make_id("session", first + offset, number)
+            started_ms = int(created_ms[offset] + rng.random() * active_ms[offset])
+            exchanges = int(rng.geometric(1.0 / options["exchanges_per_session"]))
+            gaps = np.cumsum(rng.integers(5_000, 120_000, size=exchanges * 2))
+            stamps = to_datetimes(np.minimum(started_ms + gaps, now_ms - 1))
+            turns = []
+            for turn in range(exchanges * 2):
+                turn_doc = {
+                    "_id": make_id("turn", session_id, turn),
+                    "sessionId": session_id,
+                    "createdAt": stamps[turn],
+                }
+                if turn % 2 == 0:
+                    turn_doc.update(role="user", text=LEARNER_SENTENCES[rng.integers(len(LEARNER_SENTENCES))])
+                else:
+                    reply, rule = TUTOR_REPLIES[rng.integers(len(TUTOR_REPLIES))]
+                    turn_doc.update(role="tutor", text=reply, corrections=[
+                        {"original": turns[-1]["text"], "corrected": turns[-1]["text"], "rule": rule}
+                    ] if rule else [])
+                turns.append(turn_doc)
+
+            # Steady state of lib/chat.js: everything but the last context window is folded
+            folded = max(0, len(turns) - CHAT_CONTEXT_TURNS)
+            session = {
+                "_id": session_id,
+                "userId": user["_id"],
+                "level": user["cefrLevel"],
+                "topic": "general",
+                "createdAt": to_datetimes(started_ms),
+                "summary": fold_summary(turns[:folded]),
+                "turnCount": len(turns),
+                "summarizedTurns": folded,
+            }
+            if folded:
+                session["summarizedThrough"] = turns[folded - 1]["createdAt"]
+            docs["chatSessions"].append(session)
+            docs["chatTurns"].extend(turns)
+
+    attempts = rng.poisson(options["attempts_per_user"] * weights)
+    for offset in np.flatnonzero(attempts):
+        stamps = to_datetimes(created_ms[offset] + (rng.random(attempts[offset]) * active_ms[offset]).astype(np.int64))
+        for number in range(attempts[offset]):
+            phrase = PHRASES[rng.integers(len(PHRASES))]
+            docs["pronunciation"].append({
+                "_id": make_id("attempt", first + offset, number),
+                "userId": docs["users"][offset]["_id"],
+                "phrase": phrase,
+                "transcript": phrase.lower(),
+                "score": round(float(rng.beta(8, 2)), 2),
+                "tips": [],
+                "createdAt": stamps[number],
+            })
+
+    return docs
+
+
+def extended_json(value):
+    """JSON encoder default= hook emitting MongoDB Extended JSON dates for mongoimport"""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat(timespec="milliseconds") + "Z"}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+# One encoder for every document; json.dumps(default=...) would build a new one per call
+NDJSON_ENCODER = json.JSONEncoder(default=extended_json, ensure_ascii=False)
+
+
+def write_chunk(first, weights, deck_ids, options):
+    """Worker entry point: generate one chunk and load or write it; returns per-collection counts"""
+    docs = generate_chunk(first, weights, deck_ids, options)
+    counts = {name: len(batch) for name, batch in docs.items()}
+
+    if options["out"]:
+        shard = first // options["chunk_users"]
+        for name, batch in docs.items():
+            if not batch:
+                continue
+            path = os.path.join(options["out"], f"{name}.{shard:05d}.ndjson.gz")
+            with gzip.open(path, "wt", encoding="utf-8", compresslevel=options["compress_level"]) as handle:
+                handle.writelines(NDJSON_ENCODER.encode(doc) + "\n" for doc in batch)
+        return counts
+
+    db = mongo_database(options["mongo_uri"], options["db_name"])
+    size = options["batch_size"]
+    for name, batch in docs.items():
+        for start in range(0, len(batch), size):
+            # Unordered: the server applies the whole batch even if one document fails
+            db[name].insert_many(batch[start:start + size], ordered=False, bypass_document_validation=True)
+    return counts
+
+
+_client = None
+
+
+def mongo_database(uri, db_name):
+    """One MongoClient per worker process"""
+    global _client
+    if _client is None:
+        from pymongo import MongoClient
+        _client = MongoClient(uri)
+    return _client[db_name]
+
+
+def build_indexes(db):
+    """Create the serving indexes on the loaded collections; returns seconds per collection"""
+    timings = {}
+    for name, indexes in INDEXES.items():
+        started = time.perf_counter()
+        for keys, options in indexes:
+            db[name].create_index(list(keys.items()), **options)
+        timings[name] = time.perf_counter() - started
+        print(f"📇 {name}: {len(indexes)} index(es) in {timings[name]:.1f}s")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a production-sized synthetic AI Linguo dataset")
+    parser.add_argument("--users", type=int, default=100_000, help="learners to generate")
+    parser.add_argument("--vocab", type=int, default=2_000, help="vocabCards in the shared deck")
+    parser.add_argument("--cards-per-user", type=float, default=60, help="mean cards reviewed per learner")
+    parser.add_argument("--reviews-per-card", type=float, default=3, help="mean extra reviews per card")
+    parser.add_argument("--sessions-per-user", type=float, default=4, help="mean chat sessions per learner")
+    parser.add_argument("--exchanges-per-session", type=float, default=6,
+                        help="mean learner/tutor exchanges per session")
+    parser.add_argument("--attempts-per-user", type=float, default=10,
+                        help="mean pronunciation attempts per learner")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="log-normal sigma of learner activity (0 = everyone equally active)")
+    parser.add_argument("--span-days", type=int, default=365, help="history window in days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-users", type=int, default=1_000,
+                        help="learners per generated chunk (part of the seed: keep it fixed to reproduce a dataset)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="generator processes")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "ailinguo"), help="database name")
+    parser.add_argument("--batch-size", type=int, default=1_000, help="documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="drop the generated collections before loading")
+    parser.add_argument("--no-indexes", action="store_true", help="skip building indexes after the load")
+    parser.add_argument("--indexes-only", action="store_true",
+                        help="only build indexes (e.g. after mongoimport of an --out dataset)")
+    parser.add_argument("--out", help="write gzipped NDJSON shards to this directory instead of loading Mongo")
+    parser.add_argument("--compress-level", type=int, default=1, help="gzip level for --out")
+    args = parser.parse_args()
+
+    if args.indexes_only:
+        build_indexes(mongo_database(args.mongo_uri, args.db))
+        return 0
+
+    options = {
+        "seed": args.seed,
+        "now_ms": int(time.time() * 1000) // DAY_MS * DAY_MS,
+        "span_days": args.span_days,
+        "cards_per_user": args.cards_per_user,
+        "reviews_per_card": args.reviews_per_card,
+        "sessions_per_user": args.sessions_per_user,
+        "exchanges_per_session": max(1.0, args.exchanges_per_session),
+        "attempts_per_user": args.attempts_per_user,
+        "chunk_users": args.chunk_users,
+        "out": args.out,
+        "compress_level": args.compress_level,
+        "mongo_uri": args.mongo_uri,
+        "db_name": args.db,
+        "batch_size": args.batch_size,
+    }
+
+    deck = vocabulary_deck(args.vocab)
+    deck_ids = [card["_id"] for card in deck]
+    weights = activity_weights(args.users, args.skew, args.seed)
+    target = args.out or f"{args.mongo_uri}/{args.db}"
+    print(f"🏭 Generating {args.users:,} learners into {target} with {args.workers} workers")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        with gzip.open(os.path.join(args.out, "vocabCards.00000.ndjson.gz"), "wt", encoding="utf-8") as handle:
+            handle.writelines(NDJSON_ENCODER.encode(card) + "\n" for card in deck)
+    else:
+        # A client of its own, kept out of _client: the pool forks below and a
+        # connected MongoClient must not be inherited by the workers
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+        db = client[args.db]
+        if args.drop:
+            for name in COLLECTIONS:
+                db.drop_collection(name)
+        db["vocabCards"].insert_many(deck, ordered=False)
+
+    totals = {name: 0 for name in COLLECTIONS}
+    totals["vocabCards"] = len(deck)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(write_chunk, first, weights[first:first + args.chunk_users], deck_ids, options)
+            for first in range(0, args.users, args.chunk_users)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            for name, count in future.result().items():
+                totals[name] += count
+            if done % max(1, len(futures) // 10) == 0 or done == len(futures):
+                elapsed = time.perf_counter() - started
+                print(f"   {done}/{len(futures)} chunks, {sum(totals.values()):,} documents "
+                      f"({sum(totals.values()) / elapsed:,.0f} docs/s)")
+    load_time = time.perf_counter() - started
+
+    print(f"📦 {sum(totals.values()):,} documents in {load_time:.1f}s")
+    for name, count in totals.items():
+        print(f"   {name:<14} {count:>14,}")
+
+    if args.out:
+        print("\nLoad with mongoimport, then build the indexes:")
+        for name in COLLECTIONS:
+            print(f"  gunzip -c {args.out}/{name}.*.ndjson.gz | mongoimport --uri {args.mongo_uri} --db {args.db} "
+                  f"--collection {name} --numInsertionWorkers {args.workers}")
+        print(f"  python generate_dataset.py --indexes-only --mongo-uri {args.mongo_uri} --db {args.db}")
+    else:
+        if not args.no_indexes:
+            build_indexes(db)
+        client.close()
+
+    print(f"\n👤 Sample learner: learner0@example.com / password123 (userId {make_id('user', 0)})")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
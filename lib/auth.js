@@ -0,0 +1,171 @@
+import { createHmac, timingSafeEqual } from 'crypto';
+import { timed } from '@/lib/timing';
+
+// Signed session tokens and the profile cache
+// Login and register issue HS256 JWTs carrying the user id and CEFR level, so routes
+// that only need to know who is calling check a signature instead of reading `users`.
+// Full profiles go through a small per-process TTL cache that is invalidated whenever
+// a route writes to the user document.
+
+const TOKEN_TTL_SECONDS = parseInt(process.env.AUTH_TOKEN_TTL_SECONDS) || 7 * 24 * 60 * 60;
+const PROFILE_TTL_MS = parseInt(process.env.PROFILE_CACHE_TTL_MS) || 30 * 1000;
+const PROFILE_MAX_ENTRIES = parseInt(process.env.PROFILE_CACHE_MAX_ENTRIES) || 10000;
+const DEV_SECRET = 'ailinguo-development-secret';
+
+const authSecret = () => {
+  if (process.env.AUTH_SECRET) return process.env.AUTH_SECRET;
+  if (process.env.NODE_ENV === 'production') {
+    throw new Error('AUTH_SECRET must be set in production');
+  }
+  return DEV_SECRET;
+};
+
+const base64url = (value) => Buffer.from(value).toString('base64url');
+const sign = (data) => createHmac('sha256', authSecret()).update(data).digest('base64url');
+const TOKEN_HEADER = base64url(JSON.stringify({ alg: 'HS256', typ: 'JWT' }));
+
+export function issueToken(user, now = Date.now()) {
+  const issuedAt = Math.floor(now / 1000);
+  const payload = base64url(JSON.stringify({
+    sub: user._id,
+    lvl: user.cefrLevel,
+    iat: issuedAt,
+    exp: issuedAt + TOKEN_TTL_SECONDS
+  }));
+  return `${TOKEN_HEADER}.${payload}.${sign(`${TOKEN_HEADER}.${payload}`)}`;
+}
+
+// Claims of a valid, unexpired token, otherwise null
+export function verifyToken(token, now = Date.now()) {
+  const [header, payload, signature] = String(token).split('.');
+  if (header !== TOKEN_HEADER || !payload || !signature) return null;
+
+  const expected = Buffer.from(sign(`${header}.${payload}`));
+  const given = Buffer.from(signature);
+  if (given.length !== expected.length || !timingSafeEqual(given, expected)) return null;
+
+  try {
+    const claims = JSON.parse(Buffer.from(payload, 'base64url').toString());
+    return claims.exp * 1000 > now ? claims : null;
+  } catch (error) {
+    return null;
+  }
+}
+
+// { claims } for a valid bearer token, { claims: null } without one, and
+// { error } with a 401 response when a token was sent but does not verify
+export function authenticate(request) {
+  const header = request.headers.get('authorization');
+  if (!header) return { claims: null };
+
+  const match = header.match(/^Bearer\s+(\S+)$/i);
+  const claims = match ? verifyToken(match[1]) : null;
+  return claims
+    ? { claims }
+    : { error: Response.json({ error: 'Invalid or expired token' }, { status: 401 }) };
+}
+
+// The caller's user id: from the token when there is one, else the request parameter.
+// Returns null when both are given and disagree.
+export const requestUserId = (claims, requested) => {
+  if (!claims) return requested;
+  return !requested || requested === claims.sub ? claims.sub : null;
+};
+
+// requestUserId() for routes that need a user: { userId }, or { error } with 400 when
+// there is neither a token nor a userId and 403 when the two disagree
+export function resolveUserId(claims, requested) {
+  const userId = requestUserId(claims, requested);
+  if (userId) return { userId };
+  return {
+    error: claims
+      ? Response.json({ error: 'userId does not match the session token' }, { status: 403 })
+      : Response.json({ error: 'userId is required' }, { status: 400 })
+  };
+}
+
+// Operational endpoints (flushes, cache and pool stats) are for operators, not learners.
+// With DIAGNOSTICS_TOKEN set they need a matching X-Diagnostics-Token header; without it
+// they are open in development and closed in production. { } when allowed, else { error }
+export function authorizeDiagnostics(request) {
+  const token = process.env.DIAGNOSTICS_TOKEN;
+  if (!token) {
+    return process.env.NODE_ENV === 'production'
+      ? { error: Response.json({ error: 'Diagnostics are disabled' }, { status: 403 }) }
+      : {};
+  }
+
+  const expected = Buffer.from(sign(token));
+  const given = Buffer.from(sign(request.headers.get('x-diagnostics-token') || ''));
+  return timingSafeEqual(given, expected)
+    ? {}
+    : { error: Response.json({ error: 'Diagnostics token required' }, { status: 403 }) };
+}
+
+class ProfileCache {
+  constructor(maxEntries, ttlMs) {
+    this.maxEntries = maxEntries;
+    this.ttlMs = ttlMs;
+    this.entries = new Map(); // insertion order doubles as LRU order
+    this.writes = 0;          // bumped by every invalidation
+    this.stats = { hits: 0, misses: 0, bypassed: 0, invalidations: 0, evictions: 0 };
+  }
+
+  get(userId) {
+    const entry = this.entries.get(userId);
+    if (!entry) return null;
+    this.entries.delete(userId);
+    if (entry.expiresAt <= Date.now()) return null;
+    this.entries.set(userId, entry);
+    return entry.profile;
+  }
+
+  set(userId, profile) {
+    this.entries.delete(userId);
+    this.entries.set(userId, { profile, expiresAt: Date.now() + this.ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.stats.evictions++;
+    }
+  }
+
+  invalidate(userId) {
+    this.writes++;
+    this.stats.invalidations++;
+    this.entries.delete(userId);
+  }
+
+  snapshot() {
+    const lookups = this.stats.hits + this.stats.misses;
+    return {
+      ...this.stats,
+      size: this.entries.size,
+      ttlMs: this.ttlMs,
+      hitRate: lookups ? this.stats.hits / lookups : 0
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one cache per process
+globalThis.__profileCache = globalThis.__profileCache || new ProfileCache(PROFILE_MAX_ENTRIES, PROFILE_TTL_MS);
+
+export const profileCache = globalThis.__profileCache;
+
+// User document without the password. Returns { profile, source } where source is
+// 'hit', 'miss' or 'bypass' (a `Cache-Control: no-cache` request).
+export async function getProfile(db, userId, { bypass = false } = {}) {
+  const cached = bypass ? null : profileCache.get(userId);
+  if (cached) {
+    profileCache.stats.hits++;
+    return { profile: cached, source: 'hit' };
+  }
+  profileCache.stats[bypass ? 'bypassed' : 'misses']++;
+
+  const writes = profileCache.writes;
+  const profile = await timed('db', () => db.collection('users').findOne({ _id: userId }, { projection: { password: 0 } }));
+  // A write that landed while we were reading may have made this copy stale
+  if (profile && profileCache.writes === writes) {
+    profileCache.set(userId, profile);
+  }
+  return { profile, source: bypass ? 'bypass' : 'miss' };
+}
@@ -0,0 +1,186 @@
+import { v4 as uuidv4 } from 'uuid';
+import { detached, timed } from '@/lib/timing';
+
+// Chat history and bounded tutor context
+// Every exchange is stored in chatTurns. The tutor sees the session summary plus the
+// turns not folded into it yet; once more than CONTEXT_TURNS + FOLD_BATCH turns are
+// unsummarized, the oldest ones are folded into chatSessions.summary, so the prompt
+// stays the same size however long the conversation runs.
+
+const CONTEXT_TURNS = parseInt(process.env.CHAT_CONTEXT_TURNS) || 8;
+const FOLD_BATCH = parseInt(process.env.CHAT_FOLD_BATCH) || 8;
+const SUMMARY_MAX_CHARS = parseInt(process.env.CHAT_SUMMARY_MAX_CHARS) || 2000;
+const RULES_PREFIX = 'Rules practised: ';
+
+export const HISTORY_MAX_LIMIT = 100;
+
+let chatIndexesPromise = null;
+
+export function ensureChatIndexes(db) {
+  if (!chatIndexesPromise) {
+    chatIndexesPromise = db.collection('chatTurns')
+      .createIndex({ sessionId: 1, createdAt: 1, _id: 1 })
+      .catch((error) => {
+        chatIndexesPromise = null;
+        throw error;
+      });
+  }
+  return chatIndexesPromise;
+}
+
+// Opaque pagination cursor pointing at the last turn of a page
+export const encodeCursor = (turn) =>
+  Buffer.from(`${new Date(turn.createdAt).toISOString()}|${turn._id}`).toString('base64url');
+
+export const decodeCursor = (cursor) => {
+  const [createdAt, _id] = Buffer.from(String(cursor), 'base64url').toString().split('|');
+  const date = new Date(createdAt);
+  return isNaN(date.getTime()) || !_id ? null : { createdAt: date, _id };
+};
+
+// Newest turns first. `before` is the cursor returned with the previous page.
+export async function getChatHistory(db, sessionId, { limit = 20, before = null } = {}) {
+  await ensureChatIndexes(db);
+
+  const query = { sessionId };
+  if (before) {
+    query.$or = [
+      { createdAt: { $lt: before.createdAt } },
+      { createdAt: before.createdAt, _id: { $lt: before._id } }
+    ];
+  }
+
+  // One extra row tells us whether another page exists
+  const turns = await timed('db', () => db.collection('chatTurns')
+    .find(query)
+    .sort({ createdAt: -1, _id: -1 })
+    .limit(limit + 1)
+    .toArray());
+
+  const page = turns.slice(0, limit);
+  return {
+    turns: page,
+    nextCursor: turns.length > limit ? encodeCursor(page[page.length - 1]) : null
+  };
+}
+
+// Summary plus the unsummarized turns, oldest first
+export async function loadChatContext(db, sessionId) {
+  await ensureChatIndexes(db);
+
+  const session = await timed('db', () => db.collection('chatSessions').findOne(
+    { _id: sessionId },
+    { projection: { summary: 1, summarizedThrough: 1 } }
+  ));
+
+  const query = { sessionId };
+  if (session?.summarizedThrough) {
+    query.createdAt = { $gt: session.summarizedThrough };
+  }
+
+  const recent = await timed('db', () => db.collection('chatTurns')
+    .find(query)
+    .sort({ createdAt: -1, _id: -1 })
+    .limit(CONTEXT_TURNS + FOLD_BATCH)
+    .project({ _id: 0, role: 1, text: 1 })
+    .toArray());
+
+  return { summary: session?.summary || '', turns: recent.reverse() };
+}
+
+export const isEmptyContext = (context) => !context || (!context.summary && context.turns.length === 0);
+
+// Chat messages placed between the system prompt and the new learner message
+export const contextMessages = (context) => {
+  if (isEmptyContext(context)) return [];
+  return [
+    ...(context.summary
+      ? [{ role: 'system', content: `Summary of the earlier conversation:\n${context.summary}` }]
+      : []),
+    ...context.turns.map((turn) => (
+      turn.role === 'user'
+        ? { role: 'user', content: turn.text }
+        : { role: 'assistant', content: JSON.stringify({ reply: turn.text }) }
+    ))
+  ];
+};
+
+const clip = (text = '', max) => (text.length > max ? `${text.slice(0, max - 1)}…` : text);
+
+// Extractive summary: grammar rules practised so far plus one line per learner message.
+// The oldest lines are dropped first when it outgrows SUMMARY_MAX_CHARS.
+export function foldIntoSummary(summary, turns) {
+  let lines = summary ? summary.split('\n') : [];
+  const rules = new Set();
+
+  if (lines[0]?.startsWith(RULES_PREFIX)) {
+    lines[0].slice(RULES_PREFIX.length).split(', ').forEach((rule) => rules.add(rule));
+    lines = lines.slice(1);
+  }
+
+  for (const turn of turns) {
+    if (turn.role === 'user') {
+      lines.push(`Learner: ${clip(turn.text, 120)}`);
+    }
+    (turn.corrections || []).forEach((correction) => {
+      if (correction.rule) rules.add(correction.rule);
+    });
+  }
+
+  const header = rules.size ? [`${RULES_PREFIX}${[...rules].slice(-20).join(', ')}`] : [];
+  let size = header.concat(lines).join('\n').length;
+  while (size > SUMMARY_MAX_CHARS && lines.length) {
+    size -= lines.shift().length + 1;
+  }
+  return header.concat(lines).join('\n');
+}
+
+async function foldChatSummary(db, session) {
+  const summarizedTurns = session.summarizedTurns || 0;
+  const foldCount = (session.turnCount || 0) - summarizedTurns - CONTEXT_TURNS;
+  if (foldCount <= 0) return;
+
+  const query = { sessionId: session._id };
+  if (session.summarizedThrough) {
+    query.createdAt = { $gt: session.summarizedThrough };
+  }
+
+  const turns = await db.collection('chatTurns')
+    .find(query)
+    .sort({ createdAt: 1, _id: 1 })
+    .limit(foldCount)
+    .toArray();
+  if (turns.length === 0) return;
+
+  // Conditional on summarizedTurns so concurrent folds of the same turns cannot both apply
+  await db.collection('chatSessions').updateOne(
+    { _id: session._id, summarizedTurns: session.summarizedTurns ?? null },
+    {
+      $set: {
+        summary: foldIntoSummary(session.summary, turns),
+        summarizedThrough: turns[turns.length - 1].createdAt
+      },
+      $inc: { summarizedTurns: turns.length }
+    }
+  );
+}
+
+// Store one exchange; folding older turns into the summary happens in the background
+export async function appendChatTurns(db, sessionId, turns) {
+  await ensureChatIndexes(db);
+
+  await timed('db', () => db.collection('chatTurns').insertMany(
+    turns.map((turn) => ({ _id: uuidv4(), sessionId, ...turn }))
+  ));
+
+  const session = await timed('db', () => db.collection('chatSessions').findOneAndUpdate(
+    { _id: sessionId },
+    { $inc: { turnCount: turns.length } },
+    { returnDocument: 'after' }
+  ));
+
+  if (session && session.turnCount - (session.summarizedTurns || 0) > CONTEXT_TURNS + FOLD_BATCH) {
+    detached(() => foldChatSummary(db, session))
+      .catch((error) => console.error('Chat Summary Error:', error));
+  }
+}
@@ -0,0 +1,192 @@
+import { createHash } from 'crypto';
+import { readFile } from 'fs/promises';
+import { getDb, mongoClientStarted } from '@/lib/mongodb';
+import { detached } from '@/lib/timing';
+
+// Mini-exercise bank
+// Exercises are built offline by build_exercise_bank.py and indexed here by (rule, CEFR
+// level). While the bank has entries the tutor prompt stops asking the model for a
+// miniExercise (and lists the bank's rule names for the corrections instead); the
+// exercise is picked from the bank by the rule of the learner's first correction that
+// has one, falling back to nearby levels and then to the level's general practice.
+// Each learner walks each (rule, level) list in order from their own starting point, so
+// they see every exercise once before any repeats and learners do not all get the same
+// one first.
+//
+// Loaded from EXERCISE_BANK_PATH (the builder's JSON output) when set, otherwise from
+// the exerciseBank collection, and reloaded every EXERCISE_BANK_REFRESH_MS. The
+// collection is read eagerly only with EXERCISE_BANK=mongo; otherwise the bank waits
+// until another route has opened the shared client, so tutor calls that need no
+// database never connect for it. Loads run in the background: requests are served
+// without bank exercises until the first one lands.
+
+const BANK_PATH = process.env.EXERCISE_BANK_PATH;
+const REFRESH_MS = parseInt(process.env.EXERCISE_BANK_REFRESH_MS) || 10 * 60 * 1000;
+const MAX_CURSORS = 100000;
+const LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2'];
+export const GENERAL_RULE = 'General Practice';
+
+export const exerciseBankEnabled = () => process.env.EXERCISE_BANK !== '0';
+
+const bankSourceAvailable = () =>
+  Boolean(BANK_PATH) || process.env.EXERCISE_BANK === 'mongo' || mongoClientStarted();
+
+export const ruleKey = (rule = '') => rule.toLowerCase().replace(/[^a-z0-9]+/g, ' ').trim();
+
+const hash = (text) => createHash('sha256').update(text).digest('hex');
+
+// Exercise shape the tutor responses use
+const toExercise = ({ _id, rule, type, question, options, correct, explanation }) => ({
+  id: _id, rule, type, question, options, correct, explanation
+});
+
+class ExerciseBank {
+  constructor() {
+    this.byKey = new Map();   // `${ruleKey}|${level}` -> exercises
+    this.rules = [];          // rule names, without the general practice entry
+    this.version = null;
+    this.size = 0;
+    this.loadedAt = 0;
+    this.loading = null;
+    this.cursors = new Map(); // `${userId}|${key}` -> exercises served, oldest first
+    this.stats = { served: 0, exactMatches: 0, nearbyLevel: 0, general: 0, misses: 0, loadErrors: 0 };
+  }
+
+  async fetchExercises() {
+    if (BANK_PATH) {
+      const data = JSON.parse(await readFile(BANK_PATH, 'utf8'));
+      return Array.isArray(data) ? data : data.exercises;
+    }
+    const db = await getDb();
+    return db.collection('exerciseBank').find({}).toArray();
+  }
+
+  index(exercises) {
+    const byKey = new Map();
+    const rules = new Map();
+    for (const exercise of exercises) {
+      if (!exercise?.rule || !Array.isArray(exercise.options)) continue;
+      const key = `${ruleKey(exercise.rule)}|${exercise.level}`;
+      if (!byKey.has(key)) byKey.set(key, []);
+      byKey.get(key).push(exercise);
+      if (exercise.rule !== GENERAL_RULE) rules.set(ruleKey(exercise.rule), exercise.rule);
+    }
+    // Same order on every instance, so rotation does not depend on load order
+    byKey.forEach((list) => list.sort((a, b) => String(a._id).localeCompare(String(b._id))));
+    this.byKey = byKey;
+    this.rules = [...rules.values()].sort();
+    this.size = exercises.length;
+    this.version = this.size ? hash(this.rules.join('\n')).slice(0, 12) : null;
+  }
+
+  // Starts a load when the bank is stale and has a source, and never throws. Only the
+  // stats route waits on the first load; the tutor calls this without awaiting it.
+  ready() {
+    if (!exerciseBankEnabled() || !bankSourceAvailable()) return Promise.resolve(this);
+    const stale = Date.now() - this.loadedAt > REFRESH_MS;
+    if (stale && !this.loading) {
+      this.loading = detached(() => this.fetchExercises())
+        .then((exercises) => this.index(exercises || []))
+        .catch((error) => {
+          this.stats.loadErrors++;
+          console.error('Exercise Bank Error:', error);
+        })
+        .finally(() => {
+          this.loadedAt = Date.now();
+          this.loading = null;
+        });
+    }
+    // Only the first load is waited for
+    return this.loadedAt ? Promise.resolve(this) : this.loading.then(() => this);
+  }
+
+  active() {
+    return exerciseBankEnabled() && this.size > 0;
+  }
+
+  // Candidate lists for a rule: the level itself, then the nearest levels
+  lookup(rule, level) {
+    const key = ruleKey(rule);
+    const at = Math.max(0, LEVELS.indexOf(level));
+    for (let distance = 0; distance < LEVELS.length; distance++) {
+      for (const candidate of new Set([LEVELS[at - distance], LEVELS[at + distance]])) {
+        const list = candidate && this.byKey.get(`${key}|${candidate}`);
+        if (list) return { key: `${key}|${candidate}`, list, exact: distance === 0 };
+      }
+    }
+    return null;
+  }
+
+  // Bank rule matching a correction's rule: same name, or one name containing the other
+  matchRule(rule) {
+    const key = ruleKey(rule);
+    if (!key) return null;
+    return this.rules.find((name) => ruleKey(name) === key)
+      || this.rules.find((name) => key.includes(ruleKey(name)) || ruleKey(name).includes(key))
+      || null;
+  }
+
+  // Next exercise of `list` for this learner
+  rotate(userId, key, list) {
+    const cursorKey = `${userId || ''}|${key}`;
+    let served = this.cursors.get(cursorKey);
+    if (served === undefined) {
+      // Each learner starts somewhere else in the list
+      served = parseInt(hash(cursorKey).slice(0, 8), 16);
+      if (this.cursors.size >= MAX_CURSORS) this.cursors.delete(this.cursors.keys().next().value);
+    } else {
+      this.cursors.delete(cursorKey); // re-inserted as the newest entry
+    }
+    this.cursors.set(cursorKey, served + 1);
+    return list[served % list.length];
+  }
+
+  // Exercise for the learner's corrections, or null when the bank has nothing to offer
+  pick(userId, corrections, level) {
+    let found = null;
+    for (const correction of Array.isArray(corrections) ? corrections : []) {
+      const rule = this.matchRule(correction?.rule);
+      found = rule && this.lookup(rule, level);
+      if (found) break;
+    }
+    if (found) {
+      this.stats[found.exact ? 'exactMatches' : 'nearbyLevel']++;
+    } else {
+      found = this.lookup(GENERAL_RULE, level);
+      if (!found) {
+        this.stats.misses++;
+        return null;
+      }
+      this.stats.general++;
+    }
+    this.stats.served++;
+    return toExercise(this.rotate(userId, found.key, found.list));
+  }
+
+  snapshot() {
+    return {
+      ...this.stats,
+      enabled: exerciseBankEnabled(),
+      source: BANK_PATH || 'mongodb:exerciseBank',
+      sourceAvailable: bankSourceAvailable(),
+      exercises: this.size,
+      rules: this.rules.length,
+      lists: this.byKey.size,
+      version: this.version,
+      cursors: this.cursors.size,
+      loadedAt: this.loadedAt ? new Date(this.loadedAt).toISOString() : null
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one bank per process
+globalThis.__exerciseBank = globalThis.__exerciseBank || new ExerciseBank();
+
+export const exerciseBank = globalThis.__exerciseBank;
+
+// The response with a bank exercise, unless it already has one
+export function withBankExercise(response, userId, userLevel) {
+  if (response.miniExercise) return response;
+  const exercise = exerciseBank.pick(userId, response.corrections, userLevel);
+  return exercise ? { ...response, miniExercise: exercise } : response;
+}
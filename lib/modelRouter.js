@@ -0,0 +1,268 @@
+// Model routing for tutor calls
+// Calls go to OPENAI_MODEL first. When it has not answered within its usual latency
+// (the p95 of its recent successful calls, or MODEL_HEDGE_AFTER_MS when set), a hedged
+// request goes to OPENAI_MODEL_FALLBACK; the first valid answer wins and the other
+// request is aborted. An error or an invalid (non-JSON) answer moves on to the next
+// model right away. Each model has a circuit breaker: after MODEL_BREAKER_FAILURES
+// consecutive failures it is skipped for MODEL_BREAKER_COOLDOWN_MS, then one trial
+// call decides whether it is closed again. Provider 429s move on without counting as
+// failures.
+
+const HEDGE_ENABLED = process.env.MODEL_HEDGE !== '0';
+const HEDGE_AFTER_MS = parseInt(process.env.MODEL_HEDGE_AFTER_MS) || 0;
+const HEDGE_DEFAULT_MS = parseInt(process.env.MODEL_HEDGE_DEFAULT_MS) || 3000;
+const HEDGE_MIN_SAMPLES = parseInt(process.env.MODEL_HEDGE_MIN_SAMPLES) || 20;
+const HEDGE_MIN_MS = 50;
+const HEDGE_PERCENTILE = 0.95;
+const BREAKER_FAILURES = parseInt(process.env.MODEL_BREAKER_FAILURES) || 5;
+const BREAKER_COOLDOWN_MS = parseInt(process.env.MODEL_BREAKER_COOLDOWN_MS) || 30000;
+const LATENCY_WINDOW = 256;
+
+// Recent latencies of one kind of call ('complete': whole answer, 'stream': first token)
+class LatencyWindow {
+  constructor(size) {
+    this.samples = new Array(size);
+    this.count = 0;
+  }
+
+  record(ms) {
+    this.samples[this.count % this.samples.length] = ms;
+    this.count++;
+  }
+
+  percentile(p) {
+    const filled = Math.min(this.count, this.samples.length);
+    if (filled === 0) return null;
+    const sorted = this.samples.slice(0, filled).sort((a, b) => a - b);
+    return sorted[Math.min(filled - 1, Math.floor(p * filled))];
+  }
+
+  snapshot() {
+    return { samples: this.count, p50Ms: this.percentile(0.5), p95Ms: this.percentile(HEDGE_PERCENTILE) };
+  }
+}
+
+class ModelState {
+  constructor(name) {
+    this.name = name;
+    this.breaker = 'closed'; // 'closed', 'open' or 'half_open'
+    this.openUntil = 0;
+    this.trialInFlight = false;
+    this.consecutiveFailures = 0;
+    this.latency = { complete: new LatencyWindow(LATENCY_WINDOW), stream: new LatencyWindow(LATENCY_WINDOW) };
+    this.stats = {
+      calls: 0,
+      successes: 0,
+      invalid: 0,
+      failures: 0,
+      rateLimited: 0,
+      hedges: 0,
+      hedgeWins: 0,
+      cancelled: 0,
+      breakerOpens: 0
+    };
+  }
+
+  // Whether a call could go to this model now
+  available(now) {
+    if (this.breaker === 'closed') return true;
+    if (this.breaker === 'open') return now >= this.openUntil;
+    return !this.trialInFlight;
+  }
+
+  // Same, taking the trial slot when the breaker is (or turns) half-open
+  allow(now) {
+    if (!this.available(now)) return false;
+    if (this.breaker !== 'closed') {
+      this.breaker = 'half_open';
+      this.trialInFlight = true;
+    }
+    return true;
+  }
+
+  succeed(kind, ms, valid) {
+    this.stats.successes++;
+    if (!valid) this.stats.invalid++;
+    this.latency[kind].record(ms);
+    this.consecutiveFailures = 0;
+    this.breaker = 'closed';
+    this.trialInFlight = false;
+  }
+
+  fail(error) {
+    this.trialInFlight = false;
+    if (error?.status === 429) {
+      this.stats.rateLimited++;
+      return;
+    }
+    this.stats.failures++;
+    this.consecutiveFailures++;
+    if (this.breaker === 'half_open' || this.consecutiveFailures >= BREAKER_FAILURES) {
+      if (this.breaker !== 'open') this.stats.breakerOpens++;
+      this.breaker = 'open';
+      this.openUntil = Date.now() + BREAKER_COOLDOWN_MS;
+    }
+  }
+
+  // Lost a hedge race: the call says nothing about the model's health
+  cancel() {
+    this.stats.cancelled++;
+    this.trialInFlight = false;
+  }
+
+  hedgeAfterMs(kind) {
+    if (HEDGE_AFTER_MS) return HEDGE_AFTER_MS;
+    const window = this.latency[kind];
+    if (window.count < HEDGE_MIN_SAMPLES) return HEDGE_DEFAULT_MS;
+    return Math.max(HEDGE_MIN_MS, window.percentile(HEDGE_PERCENTILE));
+  }
+
+  snapshot() {
+    return {
+      ...this.stats,
+      breaker: this.breaker,
+      consecutiveFailures: this.consecutiveFailures,
+      openForMs: this.breaker === 'open' ? Math.max(0, this.openUntil - Date.now()) : 0,
+      latency: { complete: this.latency.complete.snapshot(), stream: this.latency.stream.snapshot() },
+      hedgeAfterMs: { complete: this.hedgeAfterMs('complete'), stream: this.hedgeAfterMs('stream') }
+    };
+  }
+}
+
+class ModelRouter {
+  constructor(models, hedging) {
+    this.models = [...new Set(models.filter(Boolean))].map((name) => new ModelState(name));
+    this.hedging = hedging;
+    this.stats = { requests: 0, hedged: 0, exhausted: 0, unavailable: 0 };
+  }
+
+  state(name) {
+    return this.models.find((model) => model.name === name);
+  }
+
+  // Runs attempt(model, signal) against the models in order and resolves with the first
+  // { valid: true, ... } outcome plus { model, hedged, fallback }: hedged when the answer
+  // came from a call started while another was still running, fallback when it came from
+  // a model other than the primary (after a hedge, an error or an open circuit breaker).
+  // attempt latency counts up to its resolution, so for streams it should resolve at the
+  // first token. With no valid answer the last invalid outcome is returned, and with none
+  // at all the first non-429 error is thrown (a 429 only when every model rate-limited
+  // the call). Aborting `signal` gives up on the call: running attempts are cancelled, and
+  // the winning attempt's signal is aborted too, so a stream that is still being read
+  // stops with it.
+  complete(kind, attempt, signal = null) {
+    if (signal?.aborted) return Promise.reject(signal.reason);
+    this.stats.requests++;
+    const now = Date.now();
+    const candidates = this.models.filter((model) => model.available(now));
+    if (candidates.length === 0) {
+      this.stats.unavailable++;
+      return Promise.reject(new Error('No tutor model available (circuit breakers open)'));
+    }
+
+    return new Promise((resolve, reject) => {
+      const running = new Map(); // model -> AbortController
+      const errors = [];
+      let invalid = null;
+      let next = 0;
+      let timer = null;
+      let settled = false;
+
+      const settle = (outcome, error) => {
+        settled = true;
+        clearTimeout(timer);
+        signal?.removeEventListener('abort', giveUp);
+        for (const [model, controller] of running) {
+          model.cancel();
+          controller.abort();
+        }
+        running.clear();
+        if (error) reject(error);
+        else resolve(outcome);
+      };
+
+      const giveUp = () => {
+        if (!settled) settle(null, signal.reason);
+      };
+      signal?.addEventListener('abort', giveUp, { once: true });
+
+      const finishIfExhausted = () => {
+        if (settled || running.size > 0 || next < candidates.length) return;
+        this.stats.exhausted++;
+        if (invalid) settle(invalid);
+        else {
+          settle(null, errors.find((error) => error?.status !== 429) || errors[0]
+            || new Error('No tutor model available (circuit breakers open)'));
+        }
+      };
+
+      const launch = () => {
+        clearTimeout(timer);
+        let model = null;
+        while (!settled && !model && next < candidates.length) {
+          const candidate = candidates[next++];
+          if (candidate.allow(Date.now())) model = candidate;
+        }
+        if (!model) return;
+        const hedge = running.size > 0;
+        if (hedge) {
+          model.stats.hedges++;
+          this.stats.hedged++;
+        }
+        model.stats.calls++;
+        const controller = new AbortController();
+        signal?.addEventListener('abort', () => controller.abort(), { once: true });
+        running.set(model, controller);
+        const started = Date.now();
+
+        attempt(model.name, controller.signal).then((outcome) => {
+          if (!running.delete(model)) return; // lost the race and was aborted
+          model.succeed(kind, Date.now() - started, outcome.valid);
+          if (outcome.valid) {
+            if (hedge) model.stats.hedgeWins++;
+            settle({ ...outcome, model: model.name, hedged: hedge, fallback: model !== this.models[0] });
+            return;
+          }
+          invalid = invalid || { ...outcome, model: model.name, hedged: hedge, fallback: model !== this.models[0] };
+          launch();
+          finishIfExhausted();
+        }, (error) => {
+          if (!running.delete(model)) return;
+          model.fail(error);
+          errors.push(error);
+          launch();
+          finishIfExhausted();
+        });
+
+        // Hedge once this model is slower than it usually is
+        if (this.hedging && next < candidates.length) {
+          timer = setTimeout(launch, model.hedgeAfterMs(kind));
+        }
+      };
+
+      launch();
+      finishIfExhausted();
+    });
+  }
+
+  // A call that failed after complete() resolved, e.g. a stream cut off midway
+  failure(name, error) {
+    this.state(name)?.fail(error);
+  }
+
+  snapshot() {
+    return {
+      ...this.stats,
+      hedging: this.hedging,
+      models: Object.fromEntries(this.models.map((model) => [model.name, model.snapshot()]))
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one router per process
+globalThis.__modelRouter = globalThis.__modelRouter || new ModelRouter(
+  [process.env.OPENAI_MODEL || 'gpt-4o-mini', process.env.OPENAI_MODEL_FALLBACK],
+  HEDGE_ENABLED
+);
+
+export const modelRouter = globalThis.__modelRouter;
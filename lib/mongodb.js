@@ -0,0 +1,100 @@
+import { MongoClient } from 'mongodb';
+import { timed } from '@/lib/timing';
+
+// Shared MongoDB client
+// One client per process, created on first use. The connect promise itself is cached,
+// so simultaneous cold requests wait on the same connection instead of each building
+// their own client. Route modules are bundled separately, so the state lives on
+// globalThis like the other per-process caches.
+
+const envInt = (name) => {
+  const value = parseInt(process.env[name]);
+  return Number.isNaN(value) ? undefined : value;
+};
+
+// Driver pool settings; unset variables keep the driver defaults
+const clientOptions = () => Object.fromEntries(Object.entries({
+  maxPoolSize: envInt('MONGO_MAX_POOL_SIZE'),
+  minPoolSize: envInt('MONGO_MIN_POOL_SIZE'),
+  maxConnecting: envInt('MONGO_MAX_CONNECTING'),
+  maxIdleTimeMS: envInt('MONGO_MAX_IDLE_TIME_MS'),
+  waitQueueTimeoutMS: envInt('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+  connectTimeoutMS: envInt('MONGO_CONNECT_TIMEOUT_MS'),
+  serverSelectionTimeoutMS: envInt('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+  socketTimeoutMS: envInt('MONGO_SOCKET_TIMEOUT_MS')
+}).filter(([, value]) => value !== undefined));
+
+const state = globalThis.__mongo = globalThis.__mongo || {
+  promise: null,
+  options: null,
+  stats: {
+    clientsCreated: 0,
+    connectFailures: 0,
+    lastConnectMs: null,
+    connectionsCreated: 0,
+    connectionsClosed: 0,
+    checkedOut: 0,
+    checkOutsStarted: 0,
+    checkOutsCompleted: 0,
+    checkOutFailures: 0,
+    checkOutWaitMs: 0,
+    poolClears: 0
+  }
+};
+
+// CMAP events: open connections, checked-out connections and the wait queue
+function trackPool(client) {
+  const { stats } = state;
+  client.on('connectionCreated', () => { stats.connectionsCreated++; });
+  client.on('connectionClosed', () => { stats.connectionsClosed++; });
+  client.on('connectionCheckOutStarted', () => { stats.checkOutsStarted++; });
+  client.on('connectionCheckedOut', (event) => {
+    stats.checkOutsCompleted++;
+    stats.checkedOut++;
+    stats.checkOutWaitMs += event.durationMS || 0;
+  });
+  client.on('connectionCheckOutFailed', () => { stats.checkOutFailures++; });
+  client.on('connectionCheckedIn', () => { stats.checkedOut--; });
+  client.on('connectionPoolCleared', () => { stats.poolClears++; });
+}
+
+export function connectToDatabase() {
+  if (!state.promise) {
+    const started = Date.now();
+    state.options = clientOptions();
+    const client = new MongoClient(process.env.MONGO_URL || process.env.MONGODB_URI, state.options);
+    state.stats.clientsCreated++;
+    trackPool(client);
+
+    state.promise = client.connect()
+      .then(() => {
+        state.stats.lastConnectMs = Date.now() - started;
+        return { client, db: client.db(process.env.DB_NAME) };
+      })
+      .catch((error) => {
+        // Let the next request try again instead of caching the failure
+        state.stats.connectFailures++;
+        state.promise = null;
+        client.close().catch(() => {});
+        throw error;
+      });
+  }
+  return timed('db-connect', () => state.promise);
+}
+
+export const getDb = async () => (await connectToDatabase()).db;
+
+// Whether some request has already opened (or is opening) the shared client
+export const mongoClientStarted = () => state.promise !== null;
+
+export function mongoPoolStats() {
+  const { stats } = state;
+  return {
+    ...stats,
+    connected: state.promise !== null && stats.lastConnectMs !== null,
+    open: stats.connectionsCreated - stats.connectionsClosed,
+    waitQueue: stats.checkOutsStarted - stats.checkOutsCompleted - stats.checkOutFailures,
+    meanCheckOutWaitMs: stats.checkOutsCompleted ? stats.checkOutWaitMs / stats.checkOutsCompleted : 0,
+    options: state.options || clientOptions()
+  };
+}
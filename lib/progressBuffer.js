@@ -0,0 +1,290 @@
+import { getDb } from '@/lib/mongodb';
+import { profileCache } from '@/lib/auth';
+import { detached } from '@/lib/timing';
+
+// Write-behind study progress
+// Heartbeats (POST /api/user/progress) and lesson completions are coalesced per learner
+// in memory and written every PROGRESS_FLUSH_MS as a few bulk commands instead of one
+// write per event: one users update per learner, one studyDays upsert per learner-day
+// (the daily rollup) and one bulk insert of the lessonProgress rows. Streaks are kept
+// on the user document (streakDays, streakLastDay) by conditional updates in the same
+// bulk. Days are UTC days. PROGRESS_FLUSH_MS=0 writes every event through.
+//
+// Buffered events survive SIGTERM/SIGINT (the buffer is flushed before exiting); a
+// crash loses at most one flush interval.
+
+const FLUSH_MS = parseInt(process.env.PROGRESS_FLUSH_MS ?? '', 10);
+const FLUSH_INTERVAL_MS = Number.isNaN(FLUSH_MS) ? 5000 : FLUSH_MS;
+const MAX_BUFFERED_USERS = parseInt(process.env.PROGRESS_MAX_BUFFERED_USERS) || 10000;
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+export const studyDay = (date) => date.toISOString().slice(0, 10);
+const previousDay = (day) => studyDay(new Date(Date.parse(day) - DAY_MS));
+
+// Write operations for one flush, in the order they have to be applied. `streaks` holds
+// the user-days whose streak update was already written by this process.
+function buildWrites(users, lessons, streaks) {
+  const userOps = [];
+  const dayOps = [];
+
+  for (const [userId, entry] of users) {
+    userOps.push({
+      updateOne: {
+        filter: { _id: userId },
+        update: { $inc: { totalMinutes: entry.minutes }, $max: { lastStudyDate: entry.lastStudyDate } }
+      }
+    });
+
+    for (const day of [...entry.days.keys()].sort()) {
+      const { minutes, lessons: lessonCount } = entry.days.get(day);
+      dayOps.push({
+        updateOne: {
+          filter: { _id: `${userId}|${day}` },
+          update: { $inc: { minutes, lessons: lessonCount }, $setOnInsert: { userId, day } },
+          upsert: true
+        }
+      });
+
+      // Studied yesterday: the streak goes on. Last studied before that (or never): it restarts.
+      // Same day or a later day already counted: nothing to do. The filters are disjoint.
+      if (streaks.get(userId) === day) continue;
+      const previous = previousDay(day);
+      userOps.push(
+        {
+          updateOne: {
+            filter: { _id: userId, streakLastDay: previous },
+            update: { $inc: { streakDays: 1 }, $set: { streakLastDay: day } }
+          }
+        },
+        {
+          updateOne: {
+            filter: { _id: userId, $or: [{ streakLastDay: { $exists: false } }, { streakLastDay: { $lt: previous } }] },
+            update: { $set: { streakDays: 1, streakLastDay: day } }
+          }
+        }
+      );
+    }
+  }
+
+  return [
+    { collection: 'users', ops: userOps },
+    { collection: 'studyDays', ops: dayOps },
+    { collection: 'lessonProgress', ops: lessons.map((document) => ({ insertOne: { document } })) }
+  ].filter((write) => write.ops.length);
+}
+
+// Minutes and last study date per user of the users updates still to be applied in `writes`
+function unwrittenProgress(writes) {
+  const progress = new Map();
+  for (const write of writes) {
+    if (write.collection !== 'users') continue;
+    for (const { updateOne } of write.ops) {
+      const minutes = updateOne.update.$inc?.totalMinutes;
+      if (minutes === undefined) continue;
+      const userId = updateOne.filter._id;
+      const lastStudyDate = updateOne.update.$max.lastStudyDate;
+      const entry = progress.get(userId);
+      if (!entry) {
+        progress.set(userId, { minutes, lastStudyDate });
+        continue;
+      }
+      entry.minutes += minutes;
+      if (lastStudyDate > entry.lastStudyDate) entry.lastStudyDate = lastStudyDate;
+    }
+  }
+  return progress;
+}
+
+class ProgressBuffer {
+  constructor(flushIntervalMs, maxBufferedUsers) {
+    this.flushIntervalMs = flushIntervalMs;
+    this.maxBufferedUsers = maxBufferedUsers;
+    this.users = new Map();     // userId -> { minutes, lastStudyDate, days: Map(day -> { minutes, lessons }) }
+    this.lessons = [];
+    this.inflight = new Map();  // entries being written, still visible to pendingProgress
+    this.retry = [];            // writes left over from a failed flush
+    this.unwritten = new Map(); // userId -> { minutes, lastStudyDate } of the users updates in retry
+    this.streaks = new Map();   // userId -> day whose streak update is written, for today only
+    this.streaksDay = null;
+    this.flushing = null;
+    this.timer = null;
+    this.stats = {
+      events: 0,
+      flushes: 0,
+      failedFlushes: 0,
+      writeCommands: 0,
+      writeOperations: 0,
+      usersFlushed: 0,
+      lastFlushMs: null
+    };
+  }
+
+  // The user's buffered entry and its totals for the day of `at`
+  entry(userId, at) {
+    let entry = this.users.get(userId);
+    if (!entry) {
+      entry = { minutes: 0, lastStudyDate: at, days: new Map() };
+      this.users.set(userId, entry);
+    }
+    if (at > entry.lastStudyDate) entry.lastStudyDate = at;
+
+    const day = studyDay(at);
+    if (!entry.days.has(day)) entry.days.set(day, { minutes: 0, lessons: 0 });
+    return [entry, entry.days.get(day)];
+  }
+
+  recordMinutes(userId, minutes, at = new Date()) {
+    const value = Number(minutes) || 0;
+    const [entry, day] = this.entry(userId, at);
+    entry.minutes += value;
+    day.minutes += value;
+    return this.recorded();
+  }
+
+  recordLesson(progress) {
+    if (progress.userId) this.entry(progress.userId, progress.completedAt)[1].lessons += 1;
+    this.lessons.push(progress);
+    return this.recorded();
+  }
+
+  // Resolves once the event is stored: immediately when buffering, after the write otherwise
+  recorded() {
+    this.stats.events++;
+    if (this.flushIntervalMs === 0) return this.drain();
+    // Flushes are not part of the request that happened to trigger them
+    if (!this.timer) {
+      this.timer = detached(() => setInterval(() => {
+        this.flush().catch((error) => console.error('Progress Flush Error:', error));
+      }, this.flushIntervalMs));
+      this.timer.unref?.();
+    }
+    if (this.users.size >= this.maxBufferedUsers) {
+      detached(() => this.flush()).catch((error) => console.error('Progress Flush Error:', error));
+    }
+    return Promise.resolve();
+  }
+
+  hasPending() {
+    return this.users.size > 0 || this.lessons.length > 0 || this.retry.length > 0;
+  }
+
+  // One flush at a time; callers arriving during a flush share it
+  flush() {
+    if (!this.flushing) {
+      this.flushing = this.writeBuffered().finally(() => {
+        this.flushing = null;
+      });
+    }
+    return this.flushing;
+  }
+
+  // Flush until everything recorded so far is written
+  async drain() {
+    while (this.flushing || this.hasPending()) {
+      await this.flush();
+    }
+  }
+
+  async writeBuffered() {
+    if (!this.hasPending()) return;
+
+    const today = studyDay(new Date());
+    if (this.streaksDay !== today) {
+      this.streaks = new Map();
+      this.streaksDay = today;
+    }
+
+    const users = this.users;
+    const retried = this.unwritten;
+    const writes = [...this.retry, ...buildWrites(users, this.lessons, this.streaks)];
+    this.users = new Map();
+    this.lessons = [];
+    this.retry = [];
+    this.inflight = users;
+
+    const started = Date.now();
+    let index = 0;
+    try {
+      const db = await getDb();
+      for (; index < writes.length; index++) {
+        const write = writes[index];
+        try {
+          // Ordered, so streak updates apply day by day
+          await db.collection(write.collection).bulkWrite(write.ops, { ordered: true });
+          this.stats.writeCommands++;
+          this.stats.writeOperations += write.ops.length;
+        } catch (error) {
+          // Operations before the first write error were applied; without one the outcome
+          // is unknown and the whole command is retried
+          writes[index] = { ...write, ops: write.ops.slice(error.writeErrors?.[0]?.index ?? 0) };
+          throw error;
+        }
+      }
+      this.unwritten = new Map();
+      this.stats.flushes++;
+      this.stats.usersFlushed += users.size;
+      users.forEach((entry, userId) => {
+        if (entry.days.has(today)) this.streaks.set(userId, today);
+      });
+    } catch (error) {
+      this.retry = writes.slice(index);
+      // Still counted by pendingProgress until a retry applies them
+      this.unwritten = unwrittenProgress(this.retry);
+      this.stats.failedFlushes++;
+      throw error;
+    } finally {
+      this.inflight = new Map();
+      this.stats.lastFlushMs = Date.now() - started;
+      for (const userId of new Set([...users.keys(), ...retried.keys()])) profileCache.invalidate(userId);
+    }
+  }
+
+  // Minutes and last study date recorded for a user but not written yet
+  pendingProgress(userId) {
+    const entries = [this.unwritten.get(userId), this.inflight.get(userId), this.users.get(userId)].filter(Boolean);
+    if (entries.length === 0) return null;
+    return {
+      minutes: entries.reduce((sum, entry) => sum + entry.minutes, 0),
+      lastStudyDate: new Date(Math.max(...entries.map((entry) => entry.lastStudyDate.getTime())))
+    };
+  }
+
+  snapshot() {
+    return {
+      ...this.stats,
+      bufferedUsers: this.users.size,
+      bufferedLessons: this.lessons.length,
+      retryWrites: this.retry.reduce((sum, write) => sum + write.ops.length, 0),
+      flushIntervalMs: this.flushIntervalMs
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one buffer per process
+globalThis.__progressBuffer = globalThis.__progressBuffer || new ProgressBuffer(FLUSH_INTERVAL_MS, MAX_BUFFERED_USERS);
+
+export const progressBuffer = globalThis.__progressBuffer;
+
+// Profile with buffered progress applied on top of the stored document
+export function withPendingProgress(profile) {
+  const pending = profile && progressBuffer.pendingProgress(profile._id);
+  if (!pending) return profile;
+  return {
+    ...profile,
+    totalMinutes: (profile.totalMinutes || 0) + pending.minutes,
+    lastStudyDate: profile.lastStudyDate && profile.lastStudyDate > pending.lastStudyDate
+      ? profile.lastStudyDate
+      : pending.lastStudyDate
+  };
+}
+
+if (!globalThis.__progressShutdown) {
+  globalThis.__progressShutdown = true;
+  for (const signal of ['SIGTERM', 'SIGINT']) {
+    process.once(signal, () => {
+      progressBuffer.drain()
+        .catch((error) => console.error('Progress Flush Error:', error))
+        .finally(() => process.exit(0));
+    });
+  }
+}
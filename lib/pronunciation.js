@@ -0,0 +1,114 @@
+import { v4 as uuidv4 } from 'uuid';
+import { timed } from '@/lib/timing';
+
+// Pronunciation scoring client
+// Recordings are scored by pronunciation_service.py (MFCC features + DTW against a
+// reference recording, micro-batched across CPU cores). When the service is not
+// running, has no reference for the phrase or cannot decode the upload, the route
+// falls back to the mock analysis so the page keeps working in development.
+//
+// Two upload paths: POST /api/pronunciation/analyze takes base64 inside JSON, and
+// POST /api/pronunciation/upload takes the raw WAV body and pipes it to the service
+// chunk by chunk, so a recording is never held in memory as a whole here.
+
+const SERVICE_URL = process.env.PRONUNCIATION_SERVICE_URL || 'http://127.0.0.1:8090';
+const TIMEOUT_MS = parseInt(process.env.PRONUNCIATION_TIMEOUT_MS) || 5000;
+
+export const MAX_UPLOAD_BYTES = parseInt(process.env.PRONUNCIATION_MAX_UPLOAD_BYTES) || 8 * 1024 * 1024;
+
+export const pronunciationServiceEnabled = () => process.env.PRONUNCIATION_SERVICE !== '0';
+
+const stats = globalThis.__pronunciationStats = globalThis.__pronunciationStats || {
+  json: { requests: 0, bytes: 0, fallbacks: 0 },
+  stream: { requests: 0, bytes: 0, fallbacks: 0, rejectedTooLarge: 0 }
+};
+
+export const pronunciationStats = () => ({ ...stats, memory: process.memoryUsage() });
+
+async function callService(path, init, upload) {
+  try {
+    const { response, data } = await timed('scoring', async () => {
+      const response = await fetch(`${SERVICE_URL}${path}`, { ...init, signal: AbortSignal.timeout(TIMEOUT_MS) });
+      return { response, data: await response.json() };
+    });
+    if (response.status === 413) return { tooLarge: true };
+    if (!response.ok) {
+      return { fallback: response.status === 404 ? 'no_reference' : 'rejected', error: data.error };
+    }
+    return { result: data };
+  } catch (error) {
+    if (upload?.tooLarge) return { tooLarge: true };
+    return { fallback: error.name === 'TimeoutError' ? 'timeout' : 'unavailable' };
+  }
+}
+
+// { result } from the service, or { fallback } with the reason it could not score
+export async function scorePronunciation(phrase, audioBase64) {
+  stats.json.requests++;
+  stats.json.bytes += audioBase64?.length || 0;
+  if (!pronunciationServiceEnabled()) return { fallback: 'disabled' };
+
+  const outcome = await callService('/score', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ phrase, audioBase64 })
+  });
+  if (outcome.fallback) stats.json.fallbacks++;
+  return outcome;
+}
+
+// Counts bytes on their way through and errors the stream past the cap
+function uploadLimit(upload) {
+  return new TransformStream({
+    transform(chunk, controller) {
+      upload.bytes += chunk.byteLength;
+      if (upload.bytes > MAX_UPLOAD_BYTES) {
+        upload.tooLarge = true;
+        controller.error(new Error('Recording too large'));
+        return;
+      }
+      controller.enqueue(chunk);
+    }
+  });
+}
+
+// Same as scorePronunciation for a raw WAV body stream. The service pulls the chunks
+// as fast as it consumes them, so a slow analyzer slows the upload instead of
+// buffering it here. Returns { tooLarge: true } past MAX_UPLOAD_BYTES.
+export async function streamPronunciation(phrase, body) {
+  stats.stream.requests++;
+  if (!pronunciationServiceEnabled()) return { fallback: 'disabled' };
+
+  const upload = { bytes: 0, tooLarge: false };
+  const outcome = await callService(`/score/stream?phrase=${encodeURIComponent(phrase)}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'audio/wav' },
+    body: body.pipeThrough(uploadLimit(upload)),
+    duplex: 'half'
+  }, upload);
+
+  stats.stream.bytes += upload.bytes;
+  if (outcome.tooLarge) stats.stream.rejectedTooLarge++;
+  if (outcome.fallback) stats.stream.fallbacks++;
+  return outcome;
+}
+
+// Stored analysis document: service scores, or the mock analysis when it could not score
+export function pronunciationAnalysis(userId, phrase, { result, fallback }) {
+  return {
+    _id: uuidv4(),
+    userId,
+    phrase,
+    transcript: phrase.toLowerCase(), // No speech recognition: the learner reads the phrase
+    ...(result
+      ? { score: result.score, tips: result.tips, words: result.words, details: result.details, engine: 'dtw' }
+      : {
+          // Mock pronunciation analysis
+          score: 0.85,
+          tips: ['Focus on the "th" sound in "the"', 'Stress the first syllable in "beautiful"'],
+          engine: 'mock',
+          fallbackReason: fallback
+        }),
+    createdAt: new Date()
+  };
+}
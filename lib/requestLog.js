@@ -0,0 +1,161 @@
+import { createHash } from 'crypto';
+import { appendFile } from 'fs/promises';
+import { authenticate } from '@/lib/auth';
+
+// Request capture
+// With REQUEST_LOG_PATH set, API requests (a REQUEST_LOG_SAMPLE fraction of them) are
+// appended to that file as NDJSON, one line per request:
+//   { ts, method, route, query, body, status, durationMs, subject, stream }
+// `ts` is the arrival time in epoch ms, `durationMs` the time to the response headers
+// and `subject` the user id of a valid bearer token. Bodies are sanitized before they
+// are written: passwords and tokens are dropped, email addresses and names become a
+// stable pseudonym, learner-written text (`userText`, `text`) is kept only as its
+// length and a hash, and long strings (base64 audio) and raw upload bodies only as
+// their size. Ids and the token subject are kept, so a capture still links requests
+// to learners. backend_test.py --replay re-issues a capture with its original timing.
+// Lines are buffered and appended in batches, so capture adds no file write to a request.
+
+const LOG_PATH = process.env.REQUEST_LOG_PATH;
+const SAMPLE = process.env.REQUEST_LOG_SAMPLE !== undefined ? parseFloat(process.env.REQUEST_LOG_SAMPLE) : 1;
+const MAX_STRING = parseInt(process.env.REQUEST_LOG_MAX_STRING) || 32768;
+const FLUSH_MS = 1000;
+const FLUSH_LINES = 500;
+const MAX_BUFFERED = 20000;
+const SECRET_FIELDS = new Set(['password', 'token', 'authorization', 'apiKey']);
+const EMAIL = /^[^@\s]+@[^@\s]+\.[^@\s]+$/;
+const NAME_FIELDS = new Set(['name']);
+const FREE_TEXT_FIELDS = new Set(['userText', 'text']);
+
+export const requestLogEnabled = () => Boolean(LOG_PATH) && SAMPLE > 0;
+
+const digest = (value) => createHash('sha256').update(value).digest('hex').slice(0, 16);
+
+// Same address, same pseudonym, so a replay can map each one to a dataset learner
+const pseudonymEmail = (email) => `user-${digest(email.toLowerCase())}@example.invalid`;
+
+export function sanitize(value, key = '') {
+  if (SECRET_FIELDS.has(key)) return null;
+  if (typeof value === 'string') {
+    // The hash keeps repeated texts recognisable (cache hits replay as cache hits)
+    if (FREE_TEXT_FIELDS.has(key)) return { $redactedChars: value.length, sha: digest(value) };
+    if (NAME_FIELDS.has(key)) return `learner-${digest(value)}`;
+    if (value.length > MAX_STRING) return { $omittedChars: value.length };
+    return EMAIL.test(value) ? pseudonymEmail(value) : value;
+  }
+  if (Array.isArray(value)) return value.map((item) => sanitize(item));
+  if (value && typeof value === 'object') {
+    return Object.fromEntries(Object.entries(value).map(([field, item]) => [field, sanitize(item, field)]));
+  }
+  return value;
+}
+
+// JSON bodies are read from a clone; anything else (raw WAV uploads) is only measured,
+// so streamed bodies stay streamed
+async function captureBody(request) {
+  if (request.method === 'GET' || request.method === 'HEAD') return null;
+  if (!(request.headers.get('content-type') || '').includes('application/json')) {
+    const bytes = parseInt(request.headers.get('content-length'));
+    return { $omittedBytes: Number.isNaN(bytes) ? null : bytes, contentType: request.headers.get('content-type') };
+  }
+  try {
+    return sanitize(JSON.parse(await request.clone().text()));
+  } catch (error) {
+    return { $unparseable: true };
+  }
+}
+
+class RequestLog {
+  constructor(path) {
+    this.path = path;
+    this.lines = [];
+    this.writing = null;
+    this.timer = null;
+    this.stats = { captured: 0, written: 0, dropped: 0, writeErrors: 0 };
+  }
+
+  write(entry) {
+    if (this.lines.length >= MAX_BUFFERED) {
+      // The disk is not keeping up; losing capture lines beats growing without bound
+      this.stats.dropped++;
+      return;
+    }
+    this.stats.captured++;
+    this.lines.push(JSON.stringify(entry));
+    if (this.lines.length >= FLUSH_LINES) this.flush();
+    else if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), FLUSH_MS);
+      this.timer.unref?.();
+    }
+  }
+
+  // One append at a time, in arrival order
+  flush() {
+    clearTimeout(this.timer);
+    this.timer = null;
+    if (this.writing || this.lines.length === 0) return this.writing;
+    const lines = this.lines;
+    this.lines = [];
+    this.writing = appendFile(this.path, lines.join('\n') + '\n')
+      .then(() => {
+        this.stats.written += lines.length;
+      })
+      .catch((error) => {
+        this.stats.writeErrors++;
+        this.stats.dropped += lines.length;
+        console.error('Request Log Error:', error);
+      })
+      .finally(() => {
+        this.writing = null;
+        if (this.lines.length) this.flush();
+      });
+    return this.writing;
+  }
+
+  snapshot() {
+    return {
+      ...this.stats,
+      enabled: requestLogEnabled(),
+      path: this.path || null,
+      sample: SAMPLE,
+      buffered: this.lines.length
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one log (and one write queue) per process
+globalThis.__requestLog = globalThis.__requestLog || new RequestLog(LOG_PATH);
+
+export const requestLog = globalThis.__requestLog;
+
+// Route handler that captures its requests; the handler itself when capture is off
+export function withRequestLog(handler) {
+  if (!requestLogEnabled()) return handler;
+  return async (request, context) => {
+    if (Math.random() >= SAMPLE) return handler(request, context);
+
+    const ts = Date.now();
+    const url = new URL(request.url);
+    const body = await captureBody(request);
+    const started = performance.now();
+    let status = 500;
+    let stream = false;
+    try {
+      const response = await handler(request, context);
+      status = response.status;
+      stream = (response.headers.get('content-type') || '').startsWith('text/event-stream');
+      return response;
+    } finally {
+      requestLog.write({
+        ts,
+        method: request.method,
+        route: url.pathname.replace(/^\/api\/?/, ''),
+        query: sanitize(Object.fromEntries(url.searchParams)),
+        body,
+        status,
+        durationMs: Math.round((performance.now() - started) * 10) / 10,
+        subject: authenticate(request).claims?.sub ?? null,
+        ...(stream && { stream: true })
+      });
+    }
+  };
+}
@@ -0,0 +1,88 @@
+import { monitorEventLoopDelay } from 'perf_hooks';
+import { tutorCache } from '@/lib/tutorCache';
+import { tutorAdmission } from '@/lib/tutorAdmission';
+import { profileCache } from '@/lib/auth';
+import { progressBuffer } from '@/lib/progressBuffer';
+import { exerciseBank } from '@/lib/exerciseBank';
+
+// Runtime metrics for soak tests
+// Memory, event-loop lag and the sizes of the per-process caches, sampled through
+// GET /api/runtime/metrics by backend_test.py --soak. Event-loop lag is a histogram
+// over the interval since the previous sample (the histogram is reset on each read,
+// unless ?reset=0). With ?gc=1 a full GC runs first, so heap figures show what is still
+// reachable rather than where the last collection happened to leave them. A forced GC
+// stalls the process, so it needs RUNTIME_METRICS_GC=1 as well as --expose-gc; the
+// route refuses ?gc=1 otherwise. Test stacks only.
+
+const LOOP_RESOLUTION_MS = 20;
+
+export const forcedGcAllowed = () => process.env.RUNTIME_METRICS_GC === '1';
+
+const ns = (value) => (Number.isFinite(value) ? Math.round(value / 1e4) / 100 : null); // ns -> ms
+
+class RuntimeMetrics {
+  constructor() {
+    this.loopDelay = monitorEventLoopDelay({ resolution: LOOP_RESOLUTION_MS });
+    this.loopDelay.enable();
+    this.intervalStartedAt = Date.now();
+    this.samples = 0;
+  }
+
+  loopLag(reset) {
+    const { loopDelay } = this;
+    // The histogram counts the sampling resolution itself as delay; report only the excess
+    const lag = (value) => (loopDelay.count ? Math.max(0, ns(value) - LOOP_RESOLUTION_MS) : null);
+    const snapshot = {
+      intervalMs: Date.now() - this.intervalStartedAt,
+      samples: loopDelay.count,
+      meanMs: lag(loopDelay.mean),
+      p50Ms: lag(loopDelay.percentile(50)),
+      p99Ms: lag(loopDelay.percentile(99)),
+      maxMs: lag(loopDelay.max)
+    };
+    if (reset) {
+      loopDelay.reset();
+      this.intervalStartedAt = Date.now();
+    }
+    return snapshot;
+  }
+
+  snapshot({ reset = true, gc = false } = {}) {
+    const collected = gc && forcedGcAllowed() && typeof globalThis.gc === 'function';
+    if (collected) globalThis.gc();
+    this.samples++;
+    const memory = process.memoryUsage();
+    const cpu = process.cpuUsage();
+    return {
+      timestamp: new Date().toISOString(),
+      pid: process.pid,
+      uptimeSeconds: Math.round(process.uptime()),
+      sample: this.samples,
+      gc: collected ? 'forced' : forcedGcAllowed() && typeof globalThis.gc === 'function' ? 'available' : 'unavailable',
+      memory: {
+        rss: memory.rss,
+        heapTotal: memory.heapTotal,
+        heapUsed: memory.heapUsed,
+        external: memory.external,
+        arrayBuffers: memory.arrayBuffers
+      },
+      cpu: { userMs: Math.round(cpu.user / 1000), systemMs: Math.round(cpu.system / 1000) },
+      eventLoopLag: this.loopLag(reset),
+      activeResources: process.getActiveResourcesInfo?.().length ?? null,
+      // Per-process state that grows with traffic
+      caches: {
+        tutorCache: tutorCache.snapshot().size,
+        profileCache: profileCache.entries.size,
+        admissionBuckets: tutorAdmission.buckets.size,
+        inFlightTutorCalls: tutorAdmission.flights.size,
+        progressBuffer: progressBuffer.snapshot().bufferedUsers,
+        exerciseCursors: exerciseBank.cursors.size
+      }
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one monitor per process
+globalThis.__runtimeMetrics = globalThis.__runtimeMetrics || new RuntimeMetrics();
+
+export const runtimeMetrics = globalThis.__runtimeMetrics;
@@ -0,0 +1,252 @@
+import { timed } from '@/lib/timing';
+
+// Spaced repetition scheduling (SM-2 variant)
+// srs_reference.py mirrors scheduleReview() step for step; keep the two in sync.
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+export const SRS_DEFAULT_EASE = 2.5;
+export const SRS_MIN_EASE = 1.3;
+export const SRS_MAX_INTERVAL = 3650;
+export const SRS_RESULTS = ['again', 'hard', 'good', 'easy'];
+export const SRS_MAX_BULK_REVIEWS = 500;
+const NEW_CARD_MAX_PAGE = 1000;
+
+// Shown to learners whose deck has not been seeded yet
+export const SAMPLE_CARDS = [
+  {
+    _id: 'card1',
+    term: 'apple',
+    meaning: 'maçã',
+    example: 'I eat an apple every day',
+    cefrLevel: 'A1'
+  },
+  {
+    _id: 'card2',
+    term: 'beautiful',
+    meaning: 'bonito/bonita',
+    example: 'The sunset is beautiful',
+    cefrLevel: 'A2'
+  },
+  {
+    _id: 'card3',
+    term: 'necessary',
+    meaning: 'necessário',
+    example: 'It is necessary to study English',
+    cefrLevel: 'B1'
+  }
+];
+
+const roundEase = (ease) => Math.round(ease * 100) / 100;
+
+// Compute the next review state from the previous one.
+// interval is in days; repetitions counts consecutive successful reviews.
+export function scheduleReview(previous, result, reviewedAt = new Date()) {
+  const state = {
+    interval: previous?.interval || 0,
+    ease: previous?.ease || SRS_DEFAULT_EASE,
+    repetitions: previous?.repetitions || 0,
+    lapses: previous?.lapses || 0
+  };
+
+  let { interval, ease, repetitions, lapses } = state;
+
+  switch (result) {
+    case 'again':
+      repetitions = 0;
+      lapses += 1;
+      ease = Math.max(SRS_MIN_EASE, ease - 0.2);
+      interval = 1;
+      break;
+    case 'hard':
+      ease = Math.max(SRS_MIN_EASE, ease - 0.15);
+      interval = repetitions === 0 ? 1 : Math.max(interval + 1, Math.round(interval * 1.2));
+      repetitions += 1;
+      break;
+    case 'easy':
+      ease = ease + 0.15;
+      interval = repetitions === 0 ? 4 : Math.max(interval + 1, Math.round(interval * ease * 1.3));
+      repetitions += 1;
+      break;
+    case 'good':
+    default:
+      if (repetitions === 0) {
+        interval = 1;
+      } else if (repetitions === 1) {
+        interval = Math.max(interval + 1, 4);
+      } else {
+        interval = Math.max(interval + 1, Math.round(interval * ease));
+      }
+      repetitions += 1;
+      break;
+  }
+
+  interval = Math.min(interval, SRS_MAX_INTERVAL);
+  ease = roundEase(ease);
+
+  return {
+    interval,
+    ease,
+    repetitions,
+    lapses,
+    dueAt: new Date(reviewedAt.getTime() + interval * DAY_MS),
+    reviewedAt
+  };
+}
+
+// Indexes backing the due queue and per-card upserts; created once per process
+let srsIndexesPromise = null;
+
+export function ensureSrsIndexes(db) {
+  if (!srsIndexesPromise) {
+    srsIndexesPromise = Promise.all([
+      db.collection('srsReviews').createIndex({ userId: 1, dueAt: 1 }),
+      db.collection('srsReviews').createIndex({ userId: 1, cardId: 1 })
+    ]).catch((error) => {
+      srsIndexesPromise = null;
+      throw error;
+    });
+  }
+  return srsIndexesPromise;
+}
+
+const parseReviewedAt = (value, now) => {
+  if (!value) return now;
+  const date = new Date(value);
+  // Offline clients may sync old reviews, but never ones from the future
+  return isNaN(date.getTime()) || date > now ? now : date;
+};
+
+const toReviewDocument = (userId, cardId, result, next) => ({
+  userId,
+  cardId,
+  dueAt: next.dueAt,
+  interval: next.interval,
+  ease: next.ease,
+  repetitions: next.repetitions,
+  lapses: next.lapses,
+  lastResult: result,
+  reviewedAt: next.reviewedAt
+});
+
+// Apply a whole session of reviews with one read and one bulk write.
+// Reviews are applied in order, so repeated reviews of a card build on each other.
+export async function applyReviews(db, userId, reviews, now = new Date()) {
+  await ensureSrsIndexes(db);
+
+  const cardIds = [...new Set(reviews.map((review) => review.cardId))];
+  const existing = await timed('db', () => db.collection('srsReviews')
+    .find({ userId, cardId: { $in: cardIds } })
+    .project({ _id: 0, cardId: 1, interval: 1, ease: 1, repetitions: 1, lapses: 1 })
+    .toArray());
+
+  const states = new Map(existing.map((doc) => [doc.cardId, doc]));
+  const results = [];
+
+  for (const review of reviews) {
+    const result = SRS_RESULTS.includes(review.result) ? review.result : 'again';
+    const next = scheduleReview(states.get(review.cardId), result, parseReviewedAt(review.reviewedAt, now));
+    states.set(review.cardId, next);
+    results.push({
+      cardId: review.cardId,
+      result,
+      nextDue: next.dueAt,
+      interval: next.interval,
+      ease: next.ease,
+      repetitions: next.repetitions
+    });
+  }
+
+  // Only the final state of each card needs to be written
+  const latest = new Map();
+  reviews.forEach((review, index) => latest.set(review.cardId, index));
+
+  const operations = [...latest.entries()].map(([cardId, index]) => {
+    const next = states.get(cardId);
+    return {
+      updateOne: {
+        filter: { userId, cardId },
+        update: { $set: toReviewDocument(userId, cardId, results[index].result, next) },
+        upsert: true
+      }
+    };
+  });
+
+  if (operations.length > 0) {
+    await timed('db', () => db.collection('srsReviews').bulkWrite(operations, { ordered: false }));
+  }
+
+  return results;
+}
+
+const findCards = async (db, cardIds) => {
+  if (cardIds.length === 0) return new Map();
+  const cards = await timed('db', () => db.collection('vocabCards').find({ _id: { $in: cardIds } }).toArray());
+  const byId = new Map(cards.map((card) => [card._id, card]));
+  SAMPLE_CARDS.forEach((card) => {
+    if (!byId.has(card._id)) byId.set(card._id, card);
+  });
+  return byId;
+};
+
+// Cards due for review, oldest first, topped up with unseen cards when the
+// learner has fewer than `limit` reviews due.
+export async function getDueCards(db, userId, limit = 10, now = new Date()) {
+  await ensureSrsIndexes(db);
+
+  const due = await timed('db', () => db.collection('srsReviews')
+    .find({ userId, dueAt: { $lte: now } })
+    .sort({ dueAt: 1 })
+    .limit(limit)
+    .project({ _id: 0, cardId: 1, dueAt: 1, interval: 1, ease: 1 })
+    .toArray());
+
+  const cardsById = await findCards(db, due.map((review) => review.cardId));
+  const cards = due
+    .filter((review) => cardsById.has(review.cardId))
+    .map((review) => ({
+      ...cardsById.get(review.cardId),
+      dueAt: review.dueAt,
+      interval: review.interval,
+      ease: review.ease
+    }));
+
+  if (cards.length >= limit) {
+    return cards;
+  }
+
+  // New cards in level order, minus those the learner already has. The deck is read a
+  // page at a time after the last card seen, so learners deep into a large deck still
+  // get unseen cards; pages grow so that takes a few round trips, not one per page.
+  const wanted = limit - cards.length;
+  const fresh = [];
+  let pageSize = wanted * 3;
+  let after = null;
+  while (fresh.length < wanted) {
+    const query = after
+      ? { $or: [{ cefrLevel: { $gt: after.cefrLevel } }, { cefrLevel: after.cefrLevel, _id: { $gt: after._id } }] }
+      : {};
+    let candidates = await timed('db', () => db.collection('vocabCards')
+      .find(query)
+      .sort({ cefrLevel: 1, _id: 1 })
+      .limit(pageSize)
+      .toArray());
+    if (candidates.length === 0 && !after) {
+      candidates = SAMPLE_CARDS;
+    }
+    if (candidates.length === 0) break;
+
+    const seen = await timed('db', () => db.collection('srsReviews')
+      .find({ userId, cardId: { $in: candidates.map((card) => card._id) } })
+      .project({ _id: 0, cardId: 1 })
+      .toArray());
+    const seenIds = new Set(seen.map((review) => review.cardId));
+    fresh.push(...candidates.filter((card) => !seenIds.has(card._id)));
+
+    if (candidates.length < pageSize || candidates === SAMPLE_CARDS) break;
+    after = candidates[candidates.length - 1];
+    pageSize = Math.min(pageSize * 2, NEW_CARD_MAX_PAGE);
+  }
+
+  return cards.concat(fresh.slice(0, wanted));
+}
@@ -0,0 +1,105 @@
+import { AsyncLocalStorage } from 'async_hooks';
+
+// Server-Timing
+// Each API request runs in a timing context. timed(name, fn) adds the duration of fn to
+// the request's `name` phase; a phase that runs several times (one `db` per Mongo
+// operation) is summed and counted, and phases that overlap (parallel model calls) are
+// summed too. The response carries the phases and the handler total, e.g.
+//   Server-Timing: parse;dur=0.3, db-connect;dur=0.1, db;dur=4.2;desc="2 ops", total;dur=5.1
+// so a slow route shows which layer the time went to. Streamed responses only carry
+// what happened before their headers. A TIMING_LOG_SAMPLE fraction of requests is also
+// logged as one JSON line. SERVER_TIMING=0 turns all of it off.
+//
+// Timers and promises created during a request inherit its context, so background work
+// (buffer flushes, cache writes, bank loads) is started through detached(), and timed()
+// ignores the context of a request whose header has already been built.
+
+const ENABLED = process.env.SERVER_TIMING !== '0';
+const LOG_SAMPLE = parseFloat(process.env.TIMING_LOG_SAMPLE) || 0;
+
+// Route modules are bundled separately; keep one context store per process
+globalThis.__timingStorage = globalThis.__timingStorage || new AsyncLocalStorage();
+const storage = globalThis.__timingStorage;
+
+const round = (ms) => Math.round(ms * 10) / 10;
+
+class RequestTiming {
+  constructor() {
+    this.started = performance.now();
+    this.phases = new Map(); // name -> { ms, count }, in first-seen order
+    this.finished = false;
+  }
+
+  add(name, ms) {
+    const phase = this.phases.get(name);
+    if (phase) {
+      phase.ms += ms;
+      phase.count++;
+    } else {
+      this.phases.set(name, { ms, count: 1 });
+    }
+  }
+
+  header(totalMs) {
+    return [
+      ...[...this.phases].map(([name, { ms, count }]) =>
+        `${name};dur=${round(ms)}${count > 1 ? `;desc="${count} ops"` : ''}`),
+      `total;dur=${round(totalMs)}`
+    ].join(', ');
+  }
+
+  toJSON(totalMs) {
+    return {
+      totalMs: round(totalMs),
+      phases: Object.fromEntries([...this.phases].map(([name, { ms, count }]) => [name, { ms: round(ms), count }]))
+    };
+  }
+}
+
+// fn() timed as phase `name` of the current request; just fn() outside a request
+export async function timed(name, fn) {
+  const timing = storage.getStore();
+  if (!timing || timing.finished) return fn();
+  const started = performance.now();
+  try {
+    return await fn();
+  } finally {
+    timing.add(name, performance.now() - started);
+  }
+}
+
+// fn() outside the current request's context, for work that outlives or runs beside it
+export const detached = (fn) => storage.exit(fn);
+
+// Adds the phases to the response; Response.json() headers are mutable, proxied ones may not be
+function withHeader(response, value) {
+  try {
+    response.headers.set('Server-Timing', value);
+    return response;
+  } catch (error) {
+    const copy = new Response(response.body, response);
+    copy.headers.set('Server-Timing', value);
+    return copy;
+  }
+}
+
+// Route handler that reports its phases in Server-Timing; the handler itself when off
+export function withTiming(handler) {
+  if (!ENABLED) return handler;
+  return (request, context) => storage.run(new RequestTiming(), async () => {
+    const timing = storage.getStore();
+    const response = await handler(request, context);
+    const totalMs = performance.now() - timing.started;
+    timing.finished = true;
+    if (LOG_SAMPLE && Math.random() < LOG_SAMPLE) {
+      console.log(JSON.stringify({
+        type: 'timing',
+        method: request.method,
+        route: new URL(request.url).pathname,
+        status: response.status,
+        ...timing.toJSON(totalMs)
+      }));
+    }
+    return withHeader(response, timing.header(totalMs));
+  });
+}
@@ -0,0 +1,471 @@
+import OpenAI from 'openai';
+import { createHash } from 'crypto';
+import { tutorCache, tutorCacheEnabled, tutorCacheKey, tutorCacheUsesMongo } from '@/lib/tutorCache';
+import { SSE_HEADERS, TutorStreamParser, responseEvents, sseEvent } from '@/lib/tutorStream';
+import { appendChatTurns, contextMessages, isEmptyContext, loadChatContext } from '@/lib/chat';
+import { FLIGHT_ABANDONED, TutorOverloadedError, overloadedResponse, tutorAdmission } from '@/lib/tutorAdmission';
+import { modelRouter } from '@/lib/modelRouter';
+import { exerciseBank, withBankExercise } from '@/lib/exerciseBank';
+import { detached, timed } from '@/lib/timing';
+
+// OpenAI configuration
+// OPENAI_BASE_URL points the client at any OpenAI-compatible server, e.g. the
+// local fake_openai_server.py used for benchmarking the real code path in CI.
+const openai = process.env.OPENAI_API_KEY ? new OpenAI({
+  apiKey: process.env.OPENAI_API_KEY,
+  baseURL: process.env.OPENAI_BASE_URL || undefined,
+  timeout: parseInt(process.env.OPENAI_TIMEOUT_MS) || 60000,
+  maxRetries: process.env.OPENAI_MAX_RETRIES !== undefined ? parseInt(process.env.OPENAI_MAX_RETRIES) : 2,
+}) : null;
+
+// Mock responses for testing
+export const getMockTutorResponse = (userText, userLevel) => {
+  const mockReplies = {
+    A1: "That's a great start! Let me help you improve this sentence.",
+    A2: "Good effort! I can see you're making progress with your English.",
+    B1: "Nice work! Your English is developing well. Let me give you some feedback.",
+    B2: "Excellent! You're expressing yourself clearly. Here are a few suggestions.",
+    C1: "Very well articulated! Your English is quite advanced. Let me offer some refinements."
+  };
+
+  return {
+    reply: mockReplies[userLevel] || mockReplies.B1,
+    corrections: [
+      {
+        original: "I go to school yesterday",
+        corrected: "I went to school yesterday",
+        explanation: "Use past tense 'went' for actions that happened in the past",
+        rule: "Past Simple Tense"
+      }
+    ],
+    miniExercise: {
+      type: "multiple_choice",
+      question: "Choose the correct past tense:",
+      options: ["I go", "I went", "I going", "I goes"],
+      correct: 1,
+      explanation: "Past tense of 'go' is 'went'"
+    }
+  };
+};
+
+// Tutor system prompt
+// With bankRules (the exercise bank's rule names) the model names the rules of its
+// corrections and leaves the exercise out; it is picked from the bank afterwards.
+export const getTutorPrompt = (userLevel, bankRules = null) => `You are an English tutor for Brazilian Portuguese speakers learning English.
+
+User Level: ${userLevel} (CEFR)
+Your role:
+1. Respond naturally in English first
+2. Provide up to 3 corrections with brief explanations in Portuguese
+${bankRules
+  ? `3. Name the rule of each correction, using one of these names when one fits: ${bankRules.join(', ')}`
+  : "3. Create 1 quick exercise based on the user's input"}
+4. Be encouraging and motivating
+5. Adapt vocabulary and complexity to the user's CEFR level
+
+Format your response as JSON:
+{
+  "reply": "Natural English response",
+  "corrections": [
+    {
+      "original": "user's text",
+      "corrected": "corrected version",
+      "explanation": "Brief explanation in Portuguese",
+      "rule": "Grammar rule name"
+    }
+  ]${bankRules ? '' : `,
+  "miniExercise": {
+    "type": "multiple_choice",
+    "question": "Question text",
+    "options": ["option1", "option2", "option3", "option4"],
+    "correct": 0,
+    "explanation": "Why this answer is correct"
+  }`}
+}
+
+Keep corrections to maximum 3 items. Be gentle and encouraging.${bankRules
+  ? '\nDo not include "miniExercise"; the exercise is chosen separately.'
+  : ''}`;
+
+// Changes whenever the prompt template does, so cached replies never outlive it
+export const TUTOR_PROMPT_VERSION = createHash('sha256')
+  .update(getTutorPrompt('{level}'))
+  .digest('hex')
+  .slice(0, 12);
+
+export const isMockMode = () => process.env.AI_TUTOR_MOCK === '1' || !process.env.OPENAI_API_KEY;
+
+export const tutorModel = () => process.env.OPENAI_MODEL || 'gpt-4o-mini';
+
+const tutorMessages = (userText, userLevel, context = null, bankRules = null) => [
+  { role: 'system', content: getTutorPrompt(userLevel, bankRules) },
+  ...contextMessages(context),
+  { role: 'user', content: userText }
+];
+
+// Key identifying identical requests (for coalescing and the cache) plus the db for the
+// shared cache tier (null when only the local LRU is used)
+const tutorCacheContext = ({ userText, userLevel, mode, bankExercises }, db) => {
+  const promptVersion = `${TUTOR_PROMPT_VERSION}:${tutorModel()}${bankExercises ? `:bank-${exerciseBank.version}` : ''}`;
+  const flightKey = tutorCacheKey({ userText, userLevel, mode, promptVersion });
+  return {
+    flightKey,
+    cacheKey: tutorCacheEnabled() ? flightKey : null,
+    sharedDb: tutorCacheUsesMongo() ? db : null
+  };
+};
+
+// Session context, prompt and cache lookup shared by both handlers
+// exerciseSource: 'model' asks the model for the exercise even when the bank is loaded.
+async function prepareTutorRequest(body, db) {
+  const { userText, userLevel = 'B1', mode = 'conversation', sessionId, userId, exerciseSource } = body;
+  const startedAt = new Date();
+
+  // Not awaited: until the bank has loaded, replies carry model-written exercises
+  exerciseBank.ready();
+  const context = sessionId && db ? await loadChatContext(db, sessionId) : null;
+  const bankExercises = exerciseSource !== 'model' && exerciseBank.active();
+  const messages = tutorMessages(userText, userLevel, context, bankExercises ? exerciseBank.rules : null);
+  const promptChars = messages.reduce((total, message) => total + message.content.length, 0);
+
+  // Replies inside an ongoing conversation depend on its history, so they are neither
+  // cached nor shared between requests
+  const { flightKey, cacheKey, sharedDb } = !isMockMode() && isEmptyContext(context)
+    ? tutorCacheContext({ userText, userLevel, mode, bankExercises }, db)
+    : { flightKey: null, cacheKey: null, sharedDb: null };
+  const cached = cacheKey
+    ? await tutorCache.get(cacheKey, sharedDb)
+    : { response: null, source: 'bypass' };
+
+  return {
+    userText, userLevel, sessionId, userId, startedAt, messages, promptChars, flightKey, cacheKey, sharedDb, cached,
+    bankExercises
+  };
+}
+
+// Persist the exchange when it belongs to a chat session
+async function recordExchange(db, { sessionId, userText, startedAt }, response) {
+  if (!db || !sessionId) return;
+  try {
+    await appendChatTurns(db, sessionId, [
+      { role: 'user', text: userText, createdAt: startedAt },
+      {
+        role: 'tutor',
+        text: response.reply,
+        corrections: response.corrections || [],
+        // Strictly after the learner turn so history order never flips
+        createdAt: new Date(Math.max(Date.now(), startedAt.getTime() + 1))
+      }
+    ]);
+  } catch (error) {
+    console.error('Chat History Error:', error);
+  }
+}
+
+// Provider rate limits become a 429 for the learner; Retry-After is passed on when given
+const upstreamOverload = (error) => {
+  const retryAfter = parseFloat(error.headers?.['retry-after'] ?? error.headers?.get?.('retry-after'));
+  return new TutorOverloadedError('upstream', Number.isNaN(retryAfter) ? tutorAdmission.retryAfter() : retryAfter);
+};
+
+// Mock reply for the request; in bank mode its exercise comes from the bank instead
+const tutorMockResponse = ({ userText, userLevel, bankExercises }) => {
+  const response = getMockTutorResponse(userText, userLevel);
+  return bankExercises ? { ...response, miniExercise: null } : response;
+};
+
+// The learner's copy of a (possibly cached or shared) response, with a bank exercise
+// when the model was not asked for one
+const withRequestExercise = (request, response) => (request.bankExercises
+  ? withBankExercise(response, request.userId, request.userLevel)
+  : response);
+
+// One completion from `model`; answers that are not valid JSON are returned as plain replies
+async function completeTutor(model, messages, signal) {
+  const completion = await openai.chat.completions.create({
+    model,
+    messages,
+    temperature: 0.7,
+  }, { signal });
+
+  const responseText = completion.choices[0].message.content;
+  const usage = completion.usage;
+
+  try {
+    return { valid: true, response: JSON.parse(responseText), usage };
+  } catch (parseError) {
+    // Fallback if AI doesn't return valid JSON (not cached, the next call may do better)
+    return {
+      valid: false,
+      usage,
+      response: {
+        reply: responseText,
+        corrections: [],
+        miniExercise: null
+      }
+    };
+  }
+}
+
+// One answer for `messages` through the model router: { valid, response, model, hedged, fallback }
+export const requestTutorModel = (messages) => timed('model', () =>
+  modelRouter.complete('complete', (model, signal) => completeTutor(model, messages, signal)));
+
+async function callTutorModel(request) {
+  const { messages, cacheKey, sharedDb } = request;
+  try {
+    const outcome = await requestTutorModel(messages);
+    request.model = outcome.model;
+    request.usage = outcome.usage;
+    if (outcome.valid && cacheKey) {
+      // The shared-tier write happens in the background
+      detached(() => tutorCache.set(cacheKey, outcome.response, sharedDb));
+    }
+    return outcome.response;
+  } catch (error) {
+    if (error.status === 429) {
+      tutorAdmission.stats.rejected.upstream++;
+      throw upstreamOverload(error);
+    }
+    console.error('OpenAI Error:', error);
+    // Fallback to mock response
+    return tutorMockResponse(request);
+  }
+}
+
+// Opens a completion stream on `model` and waits for its first reply token, so the
+// router can hedge on time to first token
+async function openTutorStream(model, messages, signal) {
+  const completion = await openai.chat.completions.create({
+    model,
+    messages,
+    temperature: 0.7,
+    stream: true,
+  }, { signal });
+
+  const chunks = completion[Symbol.asyncIterator]();
+  const buffered = [];
+  while (true) {
+    const { value, done } = await chunks.next();
+    if (done) break;
+    buffered.push(value);
+    if (value.choices[0]?.delta?.content) break;
+  }
+  return { valid: true, chunks, buffered };
+}
+
+// The chunks read while opening the stream, then the rest
+async function* streamChunks({ chunks, buffered }) {
+  yield* buffered;
+  while (true) {
+    const { value, done } = await chunks.next();
+    if (done) return;
+    yield value;
+  }
+}
+
+// Throws TutorOverloadedError when the request cannot be admitted
+async function generateTutorResponse(request) {
+  // Mock mode
+  if (isMockMode()) {
+    return tutorMockResponse(request);
+  }
+
+  if (request.cached.response) {
+    return request.cached.response;
+  }
+
+  // Same request already on its way to the model: share the answer, or take over when
+  // its leader abandoned it
+  let flight;
+  while ((flight = tutorAdmission.flight(request.flightKey))) {
+    const shared = await flight;
+    if (shared !== FLIGHT_ABANDONED) {
+      request.cached = { response: null, source: 'coalesced' };
+      return shared;
+    }
+  }
+
+  tutorAdmission.takeToken(request.userId);
+  return tutorAdmission.lead(request.flightKey, tutorAdmission.run(() => callTutorModel(request)));
+}
+
+// Tutor AI Handler
+// db is optional; it enables chat history (with a sessionId) and the shared cache tier.
+export async function handleTutorRequest(body, db = null) {
+  if (body.stream) {
+    return streamTutorRequest(body, db);
+  }
+
+  const request = await prepareTutorRequest(body, db);
+  let response;
+  try {
+    response = withRequestExercise(request, await generateTutorResponse(request));
+  } catch (error) {
+    if (error instanceof TutorOverloadedError) return overloadedResponse(error);
+    throw error;
+  }
+  await recordExchange(db, request, response);
+
+  return Response.json(response, {
+    headers: {
+      'X-Tutor-Cache': request.cached.source,
+      'X-Tutor-Prompt-Chars': String(request.promptChars),
+      ...(request.model && { 'X-Tutor-Model': request.model }),
+      ...(request.usage && { 'X-Tutor-Completion-Tokens': String(request.usage.completion_tokens) })
+    }
+  });
+}
+
+// Streaming Tutor Handler
+// Server-sent events: `start`, `reply` deltas as tokens arrive, then `corrections` and
+// `miniExercise` once each is complete, then `done`. Falls back to the mock
+// response if the model fails before any reply text was sent. Admission happens before
+// the stream opens, so a rejected request gets a plain 429; a request identical to one
+// in flight waits for it and is then replayed like a cached reply.
+export async function streamTutorRequest(body, db = null) {
+  const request = await prepareTutorRequest(body, db);
+  const { messages, cacheKey, sharedDb, cached, promptChars } = request;
+  let cacheSource = cached.source;
+  let shared = cached.response;
+  let flight = null;
+
+  if (!isMockMode() && !shared) {
+    try {
+      // Wait on an identical request in flight; lead when there is none, or its leader gave up
+      let pending;
+      while (!shared && (pending = tutorAdmission.flight(request.flightKey))) {
+        const outcome = await pending;
+        if (outcome !== FLIGHT_ABANDONED) {
+          shared = outcome;
+          cacheSource = 'coalesced';
+        }
+      }
+      if (!shared) {
+        tutorAdmission.takeToken(request.userId);
+        await timed('queue', () => tutorAdmission.acquire());
+        flight = { startedAt: Date.now(), settled: false };
+        tutorAdmission.lead(request.flightKey, new Promise((resolve, reject) => {
+          flight.resolve = resolve;
+          flight.reject = reject;
+        }));
+      }
+    } catch (error) {
+      if (error instanceof TutorOverloadedError) return overloadedResponse(error);
+      throw error;
+    }
+  }
+
+  // Hands the outcome to the requests coalesced onto this one and frees the model slot.
+  // Only an overload is shared as an error; anything that went wrong for this client alone
+  // settles with FLIGHT_ABANDONED, so the waiting requests run the call themselves.
+  const settle = (outcome, error = null) => {
+    if (!flight || flight.settled) return;
+    flight.settled = true;
+    tutorAdmission.release(flight.startedAt);
+    if (error) flight.reject(error);
+    else flight.resolve(outcome);
+  };
+
+  const encoder = new TextEncoder();
+  // Aborted when the client goes away, which stops the model call and frees its slot
+  const disconnect = new AbortController();
+
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = ({ event, data }) => {
+        if (!disconnect.signal.aborted) controller.enqueue(encoder.encode(sseEvent(event, data)));
+      };
+
+      // Flushes the headers right away, before the model has produced anything
+      send({ event: 'start', data: { cache: cacheSource, promptChars } });
+
+      try {
+        if (isMockMode() || shared) {
+          const response = withRequestExercise(request, shared || tutorMockResponse(request));
+          responseEvents(response).forEach(send);
+          await recordExchange(db, request, response);
+          send({ event: 'done', data: { complete: true, cache: cacheSource } });
+          return;
+        }
+
+        const parser = new TutorStreamParser();
+        let sentReply = false;
+        let model = null;
+
+        try {
+          const opened = await modelRouter.complete('stream',
+            (name, signal) => openTutorStream(name, messages, signal), disconnect.signal);
+          model = opened.model;
+
+          for await (const chunk of streamChunks(opened)) {
+            const content = chunk.choices[0]?.delta?.content;
+            if (!content) continue;
+            for (const event of parser.push(content)) {
+              sentReply = sentReply || event.event === 'reply';
+              send(event);
+            }
+          }
+        } catch (error) {
+          if (disconnect.signal.aborted) return;
+          if (model) modelRouter.failure(model, error);
+          if (error.status === 429 && !sentReply) {
+            tutorAdmission.stats.rejected.upstream++;
+            const overloaded = upstreamOverload(error);
+            settle(null, overloaded);
+            send({
+              event: 'error',
+              data: { error: 'The tutor is busy, please try again shortly', status: 429, retryAfter: overloaded.retryAfterSeconds }
+            });
+            return;
+          }
+          console.error('OpenAI Error:', error);
+          if (!sentReply) {
+            // Fallback to mock response
+            const mockResponse = tutorMockResponse(request);
+            settle(mockResponse);
+            const fallback = withRequestExercise(request, mockResponse);
+            responseEvents(fallback).forEach(send);
+            await recordExchange(db, request, fallback);
+            send({ event: 'done', data: { complete: false, cache: cacheSource, fallback: true } });
+            return;
+          }
+        }
+
+        const { events, response, complete } = parser.end();
+        settle(response);
+        // A miniExercise the model left out comes from the bank
+        const answered = withRequestExercise(request, response);
+        events
+          .map((event) => (event.event === 'miniExercise' ? { event: 'miniExercise', data: answered.miniExercise } : event))
+          .forEach(send);
+        if (complete && cacheKey) {
+          tutorCache.set(cacheKey, response, sharedDb);
+        }
+        await recordExchange(db, request, answered);
+        send({ event: 'done', data: { complete, cache: cacheSource, model } });
+      } catch (error) {
+        if (disconnect.signal.aborted) return;
+        console.error('Tutor Stream Error:', error);
+        settle(FLIGHT_ABANDONED);
+        send({ event: 'error', data: { error: 'Internal server error' } });
+      } finally {
+        settle(FLIGHT_ABANDONED);
+        if (!disconnect.signal.aborted) controller.close();
+      }
+    },
+
+    cancel(reason) {
+      disconnect.abort(reason);
+      settle(FLIGHT_ABANDONED);
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      ...SSE_HEADERS,
+      'X-Tutor-Cache': cacheSource,
+      'X-Tutor-Prompt-Chars': String(promptChars)
+    }
+  });
+}
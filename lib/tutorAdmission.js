@@ -0,0 +1,199 @@
+import { timed } from '@/lib/timing';
+
+// Admission control for model calls
+// Identical tutor requests that are in flight at the same time share one model call
+// (single flight, keyed like the response cache). Model calls run under a global
+// concurrency limit with a bounded wait queue, and each learner has a token bucket.
+// Requests that cannot be admitted get an explicit 429 with Retry-After instead of
+// the mock reply, and so do calls the provider itself rate-limits.
+
+const MAX_CONCURRENT = parseInt(process.env.TUTOR_MAX_CONCURRENT) || 16;
+const MAX_QUEUE = parseInt(process.env.TUTOR_MAX_QUEUE) || 64;
+const QUEUE_TIMEOUT_MS = parseInt(process.env.TUTOR_QUEUE_TIMEOUT_MS) || 10000;
+const USER_RATE_PER_MINUTE = parseInt(process.env.TUTOR_USER_RATE_PER_MINUTE) || 20;
+const USER_BURST = parseInt(process.env.TUTOR_USER_BURST) || 5;
+const MAX_BUCKETS = 50000;
+
+export class TutorOverloadedError extends Error {
+  constructor(reason, retryAfterSeconds) {
+    super(`Tutor overloaded (${reason})`);
+    this.reason = reason; // 'queue_full', 'queue_timeout', 'user_rate' or 'upstream'
+    this.retryAfterSeconds = Math.max(1, Math.ceil(retryAfterSeconds || 1));
+  }
+}
+
+// What a flight resolves to when its leader gave up for reasons of its own (its client
+// went away, its stream broke): the requests waiting on it take over instead of sharing
+// an error that is not theirs
+export const FLIGHT_ABANDONED = Symbol('tutor flight abandoned');
+
+export const overloadedResponse = (error) => Response.json(
+  { error: 'The tutor is busy, please try again shortly', reason: error.reason, retryAfter: error.retryAfterSeconds },
+  { status: 429, headers: { 'Retry-After': String(error.retryAfterSeconds) } }
+);
+
+class TutorAdmission {
+  constructor({ maxConcurrent, maxQueue, queueTimeoutMs, ratePerMinute, burst }) {
+    this.maxConcurrent = maxConcurrent;
+    this.maxQueue = maxQueue;
+    this.queueTimeoutMs = queueTimeoutMs;
+    this.ratePerMs = ratePerMinute / 60000;
+    this.burst = burst;
+    this.active = 0;
+    this.queue = [];
+    this.flights = new Map();
+    this.buckets = new Map(); // insertion order doubles as age order for eviction
+    this.stats = {
+      admitted: 0,
+      queued: 0,
+      coalesced: 0,
+      leaders: 0,
+      maxQueueDepth: 0,
+      queueWaitMs: 0,
+      modelCalls: 0,
+      modelMs: 0,
+      rejected: { queue_full: 0, queue_timeout: 0, user_rate: 0, upstream: 0 }
+    };
+  }
+
+  reject(reason, retryAfterSeconds) {
+    this.stats.rejected[reason]++;
+    return new TutorOverloadedError(reason, retryAfterSeconds);
+  }
+
+  // Seconds until a request joining the queue now would probably get a slot
+  retryAfter() {
+    const meanMs = this.stats.modelCalls ? this.stats.modelMs / this.stats.modelCalls : 1000;
+    return ((this.queue.length + 1) / this.maxConcurrent) * meanMs / 1000;
+  }
+
+  // Spend one of the learner's tokens; throws when the bucket is empty
+  takeToken(userId) {
+    if (!userId) return;
+    const now = Date.now();
+    let bucket = this.buckets.get(userId);
+    if (!bucket) {
+      if (this.buckets.size >= MAX_BUCKETS) this.sweepBuckets(now);
+      bucket = { tokens: this.burst, updatedAt: now };
+      this.buckets.set(userId, bucket);
+    }
+    bucket.tokens = Math.min(this.burst, bucket.tokens + (now - bucket.updatedAt) * this.ratePerMs);
+    bucket.updatedAt = now;
+    if (bucket.tokens < 1) {
+      throw this.reject('user_rate', (1 - bucket.tokens) / this.ratePerMs / 1000);
+    }
+    bucket.tokens -= 1;
+  }
+
+  // Full buckets carry no state worth keeping; past that, the oldest go first
+  sweepBuckets(now) {
+    for (const [userId, bucket] of this.buckets) {
+      if (bucket.tokens + (now - bucket.updatedAt) * this.ratePerMs >= this.burst) this.buckets.delete(userId);
+    }
+    for (const userId of this.buckets.keys()) {
+      if (this.buckets.size < MAX_BUCKETS) break;
+      this.buckets.delete(userId);
+    }
+  }
+
+  // Wait for a model-call slot; rejects when the queue is full or the wait times out
+  acquire() {
+    if (this.active < this.maxConcurrent) {
+      this.active++;
+      this.stats.admitted++;
+      return Promise.resolve();
+    }
+    if (this.queue.length >= this.maxQueue) {
+      return Promise.reject(this.reject('queue_full', this.retryAfter()));
+    }
+
+    return new Promise((resolve, reject) => {
+      const waiter = { resolve, queuedAt: Date.now() };
+      waiter.timer = setTimeout(() => {
+        this.queue.splice(this.queue.indexOf(waiter), 1);
+        this.stats.queueWaitMs += this.queueTimeoutMs;
+        reject(this.reject('queue_timeout', this.retryAfter()));
+      }, this.queueTimeoutMs);
+      this.queue.push(waiter);
+      this.stats.queued++;
+      this.stats.maxQueueDepth = Math.max(this.stats.maxQueueDepth, this.queue.length);
+    });
+  }
+
+  // Hand the slot to the next waiter, or free it; startedAt times the model call it served
+  release(startedAt = null) {
+    if (startedAt !== null) {
+      this.stats.modelCalls++;
+      this.stats.modelMs += Date.now() - startedAt;
+    }
+    const next = this.queue.shift();
+    if (!next) {
+      this.active--;
+      return;
+    }
+    clearTimeout(next.timer);
+    this.stats.admitted++;
+    this.stats.queueWaitMs += Date.now() - next.queuedAt;
+    next.resolve();
+  }
+
+  // fn() under a slot, timing the model call
+  async run(fn) {
+    await timed('queue', () => this.acquire());
+    const started = Date.now();
+    try {
+      return await fn();
+    } finally {
+      this.release(started);
+    }
+  }
+
+  // The in-flight call for key, if there is one; it resolves to FLIGHT_ABANDONED when
+  // the caller should lead a call of its own
+  flight(key) {
+    const flight = key ? this.flights.get(key) : null;
+    if (flight) this.stats.coalesced++;
+    return flight || null;
+  }
+
+  // Register promise as the call identical requests wait on until it settles
+  lead(key, promise) {
+    if (!key) return promise;
+    this.stats.leaders++;
+    this.flights.set(key, promise);
+    promise.then(() => this.flights.delete(key), () => this.flights.delete(key));
+    return promise;
+  }
+
+  snapshot() {
+    const rejected = Object.values(this.stats.rejected).reduce((sum, count) => sum + count, 0);
+    return {
+      ...this.stats,
+      rejectedTotal: rejected,
+      active: this.active,
+      queueDepth: this.queue.length,
+      inFlightKeys: this.flights.size,
+      buckets: this.buckets.size,
+      meanQueueWaitMs: this.stats.queued ? this.stats.queueWaitMs / this.stats.queued : 0,
+      meanModelMs: this.stats.modelCalls ? this.stats.modelMs / this.stats.modelCalls : 0,
+      limits: {
+        maxConcurrent: this.maxConcurrent,
+        maxQueue: this.maxQueue,
+        queueTimeoutMs: this.queueTimeoutMs,
+        userRatePerMinute: this.ratePerMs * 60000,
+        userBurst: this.burst
+      }
+    };
+  }
+}
+
+// Route modules are bundled separately; keep one limiter per process
+globalThis.__tutorAdmission = globalThis.__tutorAdmission || new TutorAdmission({
+  maxConcurrent: MAX_CONCURRENT,
+  maxQueue: MAX_QUEUE,
+  queueTimeoutMs: QUEUE_TIMEOUT_MS,
+  ratePerMinute: USER_RATE_PER_MINUTE,
+  burst: USER_BURST
+});
+
+export const tutorAdmission = globalThis.__tutorAdmission;
@@ -0,0 +1,146 @@
+import { createHash } from 'crypto';
+import { timed } from '@/lib/timing';
+
+// Tutor response cache
+// Identical prompts (same normalized text, level, mode and system prompt) get the
+// same reply, so repeated beginner sentences skip the model call entirely.
+// Tier 1 is an in-process LRU with TTL; tier 2 is an optional Mongo collection
+// shared by every server instance (TUTOR_CACHE_MONGO=1).
+
+const MAX_ENTRIES = parseInt(process.env.TUTOR_CACHE_MAX_ENTRIES) || 1000;
+const TTL_MS = parseInt(process.env.TUTOR_CACHE_TTL_MS) || 60 * 60 * 1000;
+const COLLECTION = 'tutorCache';
+
+export const tutorCacheEnabled = () => process.env.TUTOR_CACHE !== '0';
+export const tutorCacheUsesMongo = () => tutorCacheEnabled() && process.env.TUTOR_CACHE_MONGO === '1';
+
+// Whitespace and Unicode form only; case and punctuation are what the tutor corrects
+export const normalizeTutorText = (text = '') =>
+  String(text).normalize('NFC').trim().replace(/\s+/g, ' ');
+
+export const tutorCacheKey = ({ userText, userLevel, mode, promptVersion }) =>
+  createHash('sha256')
+    .update(JSON.stringify([promptVersion, userLevel, mode, normalizeTutorText(userText)]))
+    .digest('hex');
+
+class TutorCache {
+  constructor(maxEntries, ttlMs) {
+    this.maxEntries = maxEntries;
+    this.ttlMs = ttlMs;
+    this.entries = new Map(); // insertion order doubles as LRU order
+    this.stats = {
+      hits: 0,
+      misses: 0,
+      sharedHits: 0,
+      sharedMisses: 0,
+      sets: 0,
+      evictions: 0,
+      expirations: 0,
+      errors: 0
+    };
+    this.indexesReady = null;
+  }
+
+  getLocal(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return null;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      this.stats.expirations++;
+      return null;
+    }
+    // Refresh recency
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.response;
+  }
+
+  setLocal(key, response, expiresAt = Date.now() + this.ttlMs) {
+    this.entries.delete(key);
+    this.entries.set(key, { response, expiresAt });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.stats.evictions++;
+    }
+  }
+
+  ensureIndexes(db) {
+    if (!this.indexesReady) {
+      this.indexesReady = db.collection(COLLECTION)
+        .createIndex({ expiresAt: 1 }, { expireAfterSeconds: 0 })
+        .catch((error) => {
+          this.indexesReady = null;
+          throw error;
+        });
+    }
+    return this.indexesReady;
+  }
+
+  // Returns { response, source } where source is 'hit', 'shared-hit' or 'miss'
+  async get(key, db = null) {
+    const local = this.getLocal(key);
+    if (local) {
+      this.stats.hits++;
+      return { response: local, source: 'hit' };
+    }
+    this.stats.misses++;
+
+    if (!db) return { response: null, source: 'miss' };
+
+    try {
+      const doc = await timed('db', () => db.collection(COLLECTION).findOne({ _id: key, expiresAt: { $gt: new Date() } }));
+      if (doc) {
+        this.stats.sharedHits++;
+        this.setLocal(key, doc.response, doc.expiresAt.getTime());
+        return { response: doc.response, source: 'shared-hit' };
+      }
+      this.stats.sharedMisses++;
+    } catch (error) {
+      this.stats.errors++;
+      console.error('Tutor Cache Error:', error);
+    }
+    return { response: null, source: 'miss' };
+  }
+
+  async set(key, response, db = null) {
+    this.stats.sets++;
+    const expiresAt = Date.now() + this.ttlMs;
+    this.setLocal(key, response, expiresAt);
+
+    if (!db) return;
+
+    try {
+      await this.ensureIndexes(db);
+      await db.collection(COLLECTION).updateOne(
+        { _id: key },
+        { $set: { response, expiresAt: new Date(expiresAt), createdAt: new Date() } },
+        { upsert: true }
+      );
+    } catch (error) {
+      this.stats.errors++;
+      console.error('Tutor Cache Error:', error);
+    }
+  }
+
+  snapshot() {
+    const lookups = this.stats.hits + this.stats.misses;
+    return {
+      ...this.stats,
+      size: this.entries.size,
+      maxEntries: this.maxEntries,
+      ttlMs: this.ttlMs,
+      hitRate: lookups ? (this.stats.hits + this.stats.sharedHits) / lookups : 0,
+      shared: tutorCacheUsesMongo()
+    };
+  }
+
+  clear() {
+    this.entries.clear();
+    Object.keys(this.stats).forEach((name) => { this.stats[name] = 0; });
+  }
+}
+
+// Route modules are bundled separately; keep one cache per process
+globalThis.__tutorCache = globalThis.__tutorCache || new TutorCache(MAX_ENTRIES, TTL_MS);
+
+export const tutorCache = globalThis.__tutorCache;
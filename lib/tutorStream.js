@@ -0,0 +1,222 @@
+// Streaming tutor replies
+// The model is asked for {"reply", "corrections", "miniExercise"} JSON. TutorStreamParser
+// reads that object as tokens arrive: the reply string is decoded and emitted as deltas
+// immediately, other top-level fields are emitted once their value is complete.
+
+export const SSE_HEADERS = {
+  'Content-Type': 'text/event-stream; charset=utf-8',
+  'Cache-Control': 'no-cache, no-transform',
+  'Connection': 'keep-alive',
+  'X-Accel-Buffering': 'no'
+};
+
+export const sseEvent = (event, data) => `event: ${event}\ndata: ${JSON.stringify(data)}\n\n`;
+
+// Fields streamed as their own events, with the value used when the model omits them
+const FIELD_DEFAULTS = {
+  corrections: [],
+  miniExercise: null
+};
+
+const ESCAPES = { '"': '"', '\\': '\\', '/': '/', b: '\b', f: '\f', n: '\n', r: '\r', t: '\t' };
+
+const isWhitespace = (char) => char === ' ' || char === '\n' || char === '\r' || char === '\t';
+
+export class TutorStreamParser {
+  constructor() {
+    this.state = 'start';
+    this.raw = '';          // everything received, for the non-JSON fallback
+    this.key = '';
+    this.value = '';        // raw text of the non-reply value being captured
+    this.nesting = 0;
+    this.inString = false;
+    this.escaped = false;
+    this.unicode = null;    // pending \uXXXX digits inside the reply
+    this.reply = '';
+    this.fields = {};
+  }
+
+  // Feed a chunk of model output; returns [{ event, data }] ready to send
+  push(text) {
+    this.raw += text;
+    const events = [];
+    let delta = '';
+
+    const flushDelta = () => {
+      if (delta) {
+        this.reply += delta;
+        events.push({ event: 'reply', data: { delta } });
+        delta = '';
+      }
+    };
+
+    for (const char of text) {
+      switch (this.state) {
+        case 'start':
+          if (isWhitespace(char)) break;
+          if (char === '`') { this.state = 'fence'; break; }
+          if (char === '{') { this.state = 'key-wait'; break; }
+          // Not JSON at all: the whole output is the reply
+          this.state = 'text';
+          delta += char;
+          break;
+
+        case 'fence':
+          // Skip a ```json line some models wrap their output in
+          if (char === '\n') this.state = 'start';
+          break;
+
+        case 'text':
+          delta += char;
+          break;
+
+        case 'key-wait':
+          if (char === '"') { this.state = 'key'; this.key = ''; }
+          else if (char === '}') this.state = 'done';
+          break;
+
+        case 'key':
+          if (this.escaped) { this.key += char; this.escaped = false; }
+          else if (char === '\\') this.escaped = true;
+          else if (char === '"') this.state = 'colon';
+          else this.key += char;
+          break;
+
+        case 'colon':
+          if (char === ':') this.state = 'value-wait';
+          break;
+
+        case 'value-wait':
+          if (isWhitespace(char)) break;
+          if (this.key === 'reply' && char === '"') {
+            this.state = 'reply';
+            this.reply = '';
+            break;
+          }
+          this.state = 'value';
+          this.value = '';
+          this.nesting = 0;
+          this.inString = false;
+          this.escaped = false;
+          // fall through into value handling for this first character
+          if (this.captureValue(char, events)) this.state = 'done';
+          break;
+
+        case 'value':
+          if (this.captureValue(char, events)) this.state = 'done';
+          break;
+
+        case 'reply':
+          if (this.unicode !== null) {
+            this.unicode += char;
+            if (this.unicode.length === 4) {
+              delta += String.fromCharCode(parseInt(this.unicode, 16));
+              this.unicode = null;
+            }
+          } else if (this.escaped) {
+            this.escaped = false;
+            if (char === 'u') this.unicode = '';
+            else delta += ESCAPES[char] ?? char;
+          } else if (char === '\\') {
+            this.escaped = true;
+          } else if (char === '"') {
+            flushDelta();
+            this.fields.reply = this.reply;
+            this.state = 'key-wait';
+          } else {
+            delta += char;
+          }
+          break;
+
+        default:
+          break;
+      }
+    }
+
+    flushDelta();
+    return events;
+  }
+
+  // Capture one character of a non-reply value; returns true if it closed the object
+  captureValue(char, events) {
+    if (this.inString) {
+      this.value += char;
+      if (this.escaped) this.escaped = false;
+      else if (char === '\\') this.escaped = true;
+      else if (char === '"') {
+        this.inString = false;
+        if (this.nesting === 0) this.completeValue(events);
+      }
+      return false;
+    }
+
+    if (this.nesting === 0 && (char === ',' || char === '}')) {
+      // End of a scalar value
+      if (this.value.trim()) this.completeValue(events);
+      this.state = 'key-wait';
+      return char === '}';
+    }
+
+    this.value += char;
+    if (char === '"') this.inString = true;
+    else if (char === '{' || char === '[') this.nesting++;
+    else if (char === '}' || char === ']') {
+      this.nesting--;
+      if (this.nesting === 0) this.completeValue(events);
+    }
+    return false;
+  }
+
+  completeValue(events) {
+    const key = this.key;
+    this.state = 'key-wait';
+    try {
+      const value = JSON.parse(this.value);
+      this.fields[key] = value;
+      if (key in FIELD_DEFAULTS) events.push({ event: key, data: value });
+    } catch (error) {
+      // A malformed field is replaced by its default at the end
+    }
+    this.value = '';
+  }
+
+  // Finish the stream: events for fields the model never sent, plus the full response
+  end() {
+    const events = [];
+    const complete = this.state === 'done';
+
+    if (this.state === 'text' || this.state === 'start' || this.state === 'fence') {
+      // Same fallback as the non-streaming handler: raw output as the reply
+      return {
+        events: Object.entries(FIELD_DEFAULTS).map(([event, data]) => ({ event, data })),
+        response: { reply: this.raw, corrections: [], miniExercise: null },
+        complete: false
+      };
+    }
+
+    for (const [key, fallback] of Object.entries(FIELD_DEFAULTS)) {
+      if (!(key in this.fields)) {
+        this.fields[key] = fallback;
+        events.push({ event: key, data: fallback });
+      }
+    }
+
+    return {
+      events,
+      response: { ...this.fields, reply: this.fields.reply ?? this.reply },
+      complete
+    };
+  }
+}
+
+// Events for a response that is already complete (mock, cache hit), word by word
+export function responseEvents(response) {
+  const words = (response.reply || '').match(/\S+\s*/g) || [];
+  return [
+    ...words.map((delta) => ({ event: 'reply', data: { delta } })),
+    ...Object.entries(FIELD_DEFAULTS).map(([key, fallback]) => ({
+      event: key,
+      data: response[key] ?? fallback
+    }))
+  ];
+}
@@ -0,0 +1,257 @@
+import { createHash } from 'crypto';
+import { isMockMode, requestTutorModel, tutorModel } from '@/lib/tutor';
+import { tutorCache, tutorCacheEnabled, tutorCacheKey } from '@/lib/tutorCache';
+import { TutorOverloadedError, overloadedResponse, tutorAdmission } from '@/lib/tutorAdmission';
+import { SSE_HEADERS, sseEvent } from '@/lib/tutorStream';
+
+// Writing correction
+// A submitted text is split into sentences (or paragraphs) and each segment is corrected
+// by its own model call, WRITING_CONCURRENCY at a time, so an essay costs a few short
+// calls instead of one long one, there is no cap on corrections for the whole text and
+// an unparseable answer only loses its own segment. Segment results are cached under
+// the segment text, so re-submitting an edited draft only calls the model for the
+// segments that changed. Corrections carry character offsets into the submitted text.
+
+const MAX_CHARS = parseInt(process.env.WRITING_MAX_CHARS) || 20000;
+const CONCURRENCY = parseInt(process.env.WRITING_CONCURRENCY) || 4;
+
+export const getWritingPrompt = (userLevel) => `You are an English writing tutor for Brazilian Portuguese speakers learning English.
+
+User Level: ${userLevel} (CEFR)
+You receive one passage from a longer text written by the learner.
+List every grammar, vocabulary and spelling error in the passage. For each one, copy the
+wrong words exactly as they appear in the passage into "original", give the corrected
+words, a brief explanation in Portuguese and the grammar rule name.
+
+Format your response as JSON:
+{
+  "corrections": [
+    {
+      "original": "exact words from the passage",
+      "corrected": "corrected version",
+      "explanation": "Brief explanation in Portuguese",
+      "rule": "Grammar rule name"
+    }
+  ]
+}
+
+Return an empty list when the passage has no errors.`;
+
+// Changes whenever the prompt template does, so cached corrections never outlive it
+const WRITING_PROMPT_VERSION = createHash('sha256')
+  .update(getWritingPrompt('{level}'))
+  .digest('hex')
+  .slice(0, 12);
+
+// Mock corrections for common learner errors, so mock mode returns offsets that line up
+const MOCK_RULES = [
+  {
+    pattern: /\bI go\b(?=[^.!?]*\byesterday\b)/,
+    corrected: () => 'I went',
+    explanation: "Use o passado simples 'went' para ações que já aconteceram",
+    rule: 'Past Simple Tense'
+  },
+  {
+    pattern: /\b(she|he|it) don't\b/i,
+    corrected: (match) => `${match[1]} doesn't`,
+    explanation: "Com he/she/it, a negativa do presente é doesn't",
+    rule: 'Subject-Verb Agreement'
+  },
+  {
+    pattern: /\bI have (\d+) years\b/,
+    corrected: (match) => `I am ${match[1]} years old`,
+    explanation: "Em inglês a idade é dita com o verbo 'to be'",
+    rule: 'Age with To Be'
+  }
+];
+
+const getMockCorrections = (text) => MOCK_RULES.flatMap(({ pattern, corrected, explanation, rule }) => {
+  const match = text.match(pattern);
+  return match ? [{ original: match[0], corrected: corrected(match), explanation, rule }] : [];
+});
+
+// Non-blank sentences (or paragraphs) of text with their [start, end) offsets
+export function splitSegments(text, unit = 'sentence') {
+  const segments = [];
+  const paragraphs = /[^\n]+/g;
+  for (const paragraph of text.matchAll(paragraphs)) {
+    const pieces = unit === 'paragraph'
+      ? [paragraph]
+      : paragraph[0].matchAll(/[^.!?]+(?:[.!?]+["'”’)\]]*)?|[.!?]+/g);
+    for (const piece of pieces) {
+      const leading = piece[0].length - piece[0].trimStart().length;
+      const segmentText = piece[0].trim();
+      if (!segmentText) continue;
+      const start = (unit === 'paragraph' ? 0 : paragraph.index) + piece.index + leading;
+      segments.push({ index: segments.length, start, end: start + segmentText.length, text: segmentText });
+    }
+  }
+  return segments;
+}
+
+// Offsets of a correction inside its segment, or null when the model did not quote it
+const locate = (segment, original) => {
+  if (typeof original !== 'string' || !original) return { start: null, end: null };
+  let at = segment.text.indexOf(original);
+  if (at < 0) at = segment.text.toLowerCase().indexOf(original.toLowerCase());
+  return at < 0
+    ? { start: null, end: null }
+    : { start: segment.start + at, end: segment.start + at + original.length };
+};
+
+async function segmentCorrections(segment, userLevel, sharedDb) {
+  if (isMockMode()) {
+    return { corrections: getMockCorrections(segment.text), cache: 'bypass' };
+  }
+
+  const key = tutorCacheKey({
+    userText: segment.text,
+    userLevel,
+    mode: 'writing',
+    promptVersion: `${WRITING_PROMPT_VERSION}:${tutorModel()}`
+  });
+  if (tutorCacheEnabled()) {
+    const cached = await tutorCache.get(key, sharedDb);
+    if (cached.response) return { corrections: cached.response.corrections, cache: cached.source };
+  }
+
+  // The same sentence from another learner may already be on its way to the model
+  const flight = tutorAdmission.flight(key);
+  const outcome = await (flight || tutorAdmission.lead(key, tutorAdmission.run(() => requestTutorModel([
+    { role: 'system', content: getWritingPrompt(userLevel) },
+    { role: 'user', content: segment.text }
+  ]))));
+
+  const corrections = outcome.valid ? outcome.response.corrections : null;
+  if (!Array.isArray(corrections)) {
+    return { corrections: [], cache: 'miss', error: 'unparseable' };
+  }
+  if (!flight && tutorCacheEnabled()) {
+    tutorCache.set(key, { corrections }, sharedDb);
+  }
+  return { corrections, cache: flight ? 'coalesced' : 'miss', model: outcome.model };
+}
+
+// Result for one segment; failures stay local to the segment
+async function correctSegment(segment, userLevel, sharedDb) {
+  let result;
+  try {
+    result = await segmentCorrections(segment, userLevel, sharedDb);
+  } catch (error) {
+    if (error instanceof TutorOverloadedError) {
+      result = { corrections: [], error: 'overloaded', retryAfter: error.retryAfterSeconds };
+    } else if (error.status === 429) {
+      tutorAdmission.stats.rejected.upstream++;
+      result = { corrections: [], error: 'overloaded' };
+    } else {
+      console.error('Writing Segment Error:', error);
+      result = { corrections: [], error: 'unavailable' };
+    }
+  }
+
+  const { text, ...position } = segment;
+  return {
+    ...position,
+    ...result,
+    corrections: result.corrections
+      .filter((correction) => correction && typeof correction === 'object')
+      .map((correction) => ({ ...correction, segment: segment.index, ...locate(segment, correction.original) }))
+  };
+}
+
+// Corrects segments CONCURRENCY at a time, calling onSegment as each one finishes. Once
+// signal is aborted no new segment is started; calls already made still finish, since
+// other requests may be sharing them.
+async function correctSegments(segments, userLevel, sharedDb, onSegment, signal = null) {
+  const results = new Array(segments.length);
+  let next = 0;
+  const worker = async () => {
+    while (next < segments.length && !signal?.aborted) {
+      const segment = segments[next++];
+      results[segment.index] = await correctSegment(segment, userLevel, sharedDb);
+      onSegment?.(results[segment.index]);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(CONCURRENCY, segments.length) }, worker));
+  return results;
+}
+
+// All corrections in text order; unlocated ones last
+const mergeCorrections = (results) => results
+  .flatMap((result) => result.corrections)
+  .sort((a, b) => (a.start ?? Infinity) - (b.start ?? Infinity) || a.segment - b.segment);
+
+const summarize = (results, startedAt) => ({
+  segments: results.length,
+  cached: results.filter((result) => result.cache === 'hit' || result.cache === 'shared-hit').length,
+  coalesced: results.filter((result) => result.cache === 'coalesced').length,
+  failed: results.filter((result) => result.error).length,
+  durationMs: Date.now() - startedAt
+});
+
+// Writing Correction Handler
+// Body: { text, userLevel, unit: 'sentence' | 'paragraph', stream, userId }. With
+// `stream`, answers with server-sent events: `start` (the segments), one `segment` per
+// segment as it finishes, then `done` with the merged corrections.
+export async function handleWritingCorrection(body, sharedDb = null) {
+  const { text, userLevel = 'B1', unit = 'sentence', stream = false, userId } = body;
+  if (typeof text !== 'string' || !text.trim()) {
+    return Response.json({ error: 'text is required' }, { status: 400 });
+  }
+  if (text.length > MAX_CHARS) {
+    return Response.json({ error: `Text longer than ${MAX_CHARS} characters` }, { status: 413 });
+  }
+
+  const startedAt = Date.now();
+  const segments = splitSegments(text, unit === 'paragraph' ? 'paragraph' : 'sentence');
+
+  // One token per submission, however many segments it has
+  if (!isMockMode()) {
+    try {
+      tutorAdmission.takeToken(userId);
+    } catch (error) {
+      if (error instanceof TutorOverloadedError) return overloadedResponse(error);
+      throw error;
+    }
+  }
+
+  if (!stream) {
+    const results = await correctSegments(segments, userLevel, sharedDb);
+    return Response.json({
+      segments: results,
+      corrections: mergeCorrections(results),
+      stats: summarize(results, startedAt)
+    });
+  }
+
+  const encoder = new TextEncoder();
+  // Aborted when the client goes away, which stops the remaining segments
+  const disconnect = new AbortController();
+
+  const events = new ReadableStream({
+    async start(controller) {
+      const send = (event, data) => {
+        if (!disconnect.signal.aborted) controller.enqueue(encoder.encode(sseEvent(event, data)));
+      };
+      send('start', { segments: segments.map(({ text, ...position }) => position) });
+      try {
+        const results = await correctSegments(segments, userLevel, sharedDb,
+          (result) => send('segment', result), disconnect.signal);
+        if (disconnect.signal.aborted) return;
+        send('done', { corrections: mergeCorrections(results), stats: summarize(results, startedAt) });
+      } catch (error) {
+        if (disconnect.signal.aborted) return;
+        console.error('Writing Stream Error:', error);
+        send('error', { error: 'Internal server error' });
+      } finally {
+        if (!disconnect.signal.aborted) controller.close();
+      }
+    },
+
+    cancel(reason) {
+      disconnect.abort(reason);
+    }
+  });
+
+  return new Response(events, { headers: SSE_HEADERS });
+}
@@ -0,0 +1,1134 @@
+#!/usr/bin/env python3
+"""
+In-process MongoDB wire-protocol stand-in for fast, hermetic backend test runs
+Speaks enough of OP_MSG/OP_QUERY for the Node driver and implements the
+commands the API routes use (find, insert, update with upsert/$set/$inc,
+delete, findAndModify, aggregate, createIndexes) on in-memory collections.
+Every command is counted and timed per collection.
+
+Point the app at it with:
+    MONGO_URL=mongodb://127.0.0.1:27018 yarn dev
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+OP_REPLY = 1
+OP_QUERY = 2004
+OP_MSG = 2013
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+DEFAULT_BATCH_SIZE = 101
+
+
+# BSON codec
+
+class ObjectId:
+    """12-byte BSON ObjectId"""
+
+    _counter = itertools.count(int.from_bytes(os.urandom(3), "big"))
+    _process = os.urandom(5)
+
+    __slots__ = ("binary",)
+
+    def __init__(self, binary=None):
+        if binary is None:
+            binary = (struct.pack(">I", int(time.time())) + self._process
+                      + (next(self._counter) & 0xFFFFFF).to_bytes(3, "big"))
+        self.binary = bytes(binary)
+
+    def __eq__(self, other):
+        return isinstance(other, ObjectId) and other.binary == self.binary
+
+    def __lt__(self, other):
+        return self.binary < other.binary
+
+    def __hash__(self):
+        return hash(self.binary)
+
+    def __repr__(self):
+        return f"ObjectId('{self.binary.hex()}')"
+
+
+class Binary(bytes):
+    """BSON binary with its subtype (UUIDs in session ids use subtype 4)"""
+
+    def __new__(cls, data, subtype=0):
+        value = super().__new__(cls, data)
+        value.subtype = subtype
+        return value
+
+
+class Int64(int):
+    """Integer that must be encoded as a BSON int64 (cursor ids)"""
+
+
+class Timestamp(int):
+    """BSON timestamp (uint64)"""
+
+
+class Regex:
+    __slots__ = ("pattern", "flags")
+
+    def __init__(self, pattern, flags=""):
+        self.pattern = pattern
+        self.flags = flags
+
+
+class RawBSON(bytes):
+    """Value kept as raw bytes (decimal128 and other rarely used types)"""
+
+    def __new__(cls, data, type_code):
+        value = super().__new__(cls, data)
+        value.type_code = type_code
+        return value
+
+
+class MinKey:
+    pass
+
+
+class MaxKey:
+    pass
+
+
+def decode_document(data, pos=0):
+    size = struct.unpack_from("<i", data, pos)[0]
+    end = pos + size - 1
+    pos += 4
+    document = {}
+    while pos < end:
+        type_code = data[pos]
+        key_end = data.index(b"\x00", pos + 1)
+        key = data[pos + 1:key_end].decode("utf-8")
+        document[key], pos = decode_value(type_code, data, key_end + 1)
+    return document, end + 1
+
+
+def decode_value(type_code, data, pos):
+    if type_code == 0x01:
+        return struct.unpack_from("<d", data, pos)[0], pos + 8
+    if type_code in (0x02, 0x0D, 0x0E):
+        length = struct.unpack_from("<i", data, pos)[0]
+        return data[pos + 4:pos + 3 + length].decode("utf-8"), pos + 4 + length
+    if type_code == 0x03:
+        return decode_document(data, pos)
+    if type_code == 0x04:
+        document, pos = decode_document(data, pos)
+        return list(document.values()), pos
+    if type_code == 0x05:
+        length, subtype = struct.unpack_from("<iB", data, pos)
+        return Binary(data[pos + 5:pos + 5 + length], subtype), pos + 5 + length
+    if type_code == 0x06:
+        return None, pos
+    if type_code == 0x07:
+        return ObjectId(data[pos:pos + 12]), pos + 12
+    if type_code == 0x08:
+        return data[pos] == 1, pos + 1
+    if type_code == 0x09:
+        millis = struct.unpack_from("<q", data, pos)[0]
+        return EPOCH + timedelta(milliseconds=millis), pos + 8
+    if type_code == 0x0A:
+        return None, pos
+    if type_code == 0x0B:
+        pattern_end = data.index(b"\x00", pos)
+        flags_end = data.index(b"\x00", pattern_end + 1)
+        return (Regex(data[pos:pattern_end].decode(), data[pattern_end + 1:flags_end].decode()),
+                flags_end + 1)
+    if type_code == 0x10:
+        return struct.unpack_from("<i", data, pos)[0], pos + 4
+    if type_code == 0x11:
+        return Timestamp(struct.unpack_from("<Q", data, pos)[0]), pos + 8
+    if type_code == 0x12:
+        return Int64(struct.unpack_from("<q", data, pos)[0]), pos + 8
+    if type_code == 0x13:
+        return RawBSON(data[pos:pos + 16], 0x13), pos + 16
+    if type_code == 0xFF:
+        return MinKey(), pos
+    if type_code == 0x7F:
+        return MaxKey(), pos
+    raise ValueError(f"unsupported BSON type 0x{type_code:02x}")
+
+
+def encode_document(document):
+    body = b"".join(encode_element(str(key), value) for key, value in document.items())
+    return struct.pack("<i", len(body) + 5) + body + b"\x00"
+
+
+def encode_element(key, value):
+    name = key.encode("utf-8") + b"\x00"
+    if isinstance(value, bool):
+        return b"\x08" + name + (b"\x01" if value else b"\x00")
+    if isinstance(value, Timestamp):
+        return b"\x11" + name + struct.pack("<Q", value)
+    if isinstance(value, Int64):
+        return b"\x12" + name + struct.pack("<q", value)
+    if isinstance(value, int):
+        if -2 ** 31 <= value < 2 ** 31:
+            return b"\x10" + name + struct.pack("<i", value)
+        return b"\x12" + name + struct.pack("<q", value)
+    if isinstance(value, float):
+        return b"\x01" + name + struct.pack("<d", value)
+    if isinstance(value, str):
+        data = value.encode("utf-8") + b"\x00"
+        return b"\x02" + name + struct.pack("<i", len(data)) + data
+    if isinstance(value, dict):
+        return b"\x03" + name + encode_document(value)
+    if isinstance(value, (list, tuple)):
+        return b"\x04" + name + encode_document({str(i): item for i, item in enumerate(value)})
+    if isinstance(value, Binary):
+        return b"\x05" + name + struct.pack("<iB", len(value), value.subtype) + bytes(value)
+    if isinstance(value, RawBSON):
+        return bytes([value.type_code]) + name + bytes(value)
+    if isinstance(value, bytes):
+        return b"\x05" + name + struct.pack("<iB", len(value), 0) + value
+    if isinstance(value, ObjectId):
+        return b"\x07" + name + value.binary
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return b"\x09" + name + struct.pack("<q", (value - EPOCH) // timedelta(milliseconds=1))
+    if value is None:
+        return b"\x0A" + name
+    if isinstance(value, Regex):
+        return b"\x0B" + name + value.pattern.encode() + b"\x00" + value.flags.encode() + b"\x00"
+    if isinstance(value, MinKey):
+        return b"\xFF" + name
+    if isinstance(value, MaxKey):
+        return b"\x7F" + name
+    raise TypeError(f"cannot encode {type(value).__name__} as BSON")
+
+
+# Query, update and sort semantics
+
+MISSING = object()
+
+
+def type_rank(value):
+    """BSON comparison order between types"""
+    if isinstance(value, MinKey):
+        return 0
+    if value is None or value is MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    if isinstance(value, Regex):
+        return 11
+    return 12
+
+
+def sort_key(value):
+    rank = type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5):
+        return (rank, repr(value))
+    if rank == 9 and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    if rank in (0, 11, 12):
+        return (rank, 0)
+    return (rank, value)
+
+
+def compare(left, right):
+    """-1/0/1 using BSON ordering, or None when the types are not comparable"""
+    if type_rank(left) != type_rank(right):
+        return None
+    left_key, right_key = sort_key(left), sort_key(right)
+    return (left_key > right_key) - (left_key < right_key)
+
+
+def hashable(value):
+    if isinstance(value, dict):
+        return tuple((key, hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ("__list__",) + tuple(hashable(item) for item in value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def get_path(document, path):
+    """Value at a dotted path; lists are traversed element-wise"""
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else MISSING
+            else:
+                values = [item.get(part, MISSING) for item in value if isinstance(item, dict)]
+                values = [item for item in values if item is not MISSING]
+                value = values if values else MISSING
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def set_path(document, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        if isinstance(document, list):
+            document = document[int(part)]
+        else:
+            document = document.setdefault(part, {})
+    if isinstance(document, list):
+        document[int(parts[-1])] = value
+    else:
+        document[parts[-1]] = value
+
+
+def unset_path(document, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part) if isinstance(document, dict) else None
+        if document is None:
+            return
+    if isinstance(document, dict):
+        document.pop(parts[-1], None)
+
+
+def values_equal(left, right):
+    if type_rank(left) != type_rank(right):
+        return False
+    return hashable(left) == hashable(right)
+
+
+def candidates(value):
+    """A field value plus, for arrays, each element (Mongo array matching). A missing field
+    compares as null, so {a: null} and {a: {$in: [null]}} match it and {a: {$ne: null}} does not"""
+    if value is MISSING:
+        return [None]
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def match_condition(value, condition):
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        return all(match_operator(value, operator, argument, condition)
+                   for operator, argument in condition.items())
+    if isinstance(condition, Regex):
+        return match_operator(value, "$regex", condition, {})
+    return any(values_equal(item, condition) for item in candidates(value))
+
+
+def match_operator(value, operator, argument, condition):
+    if operator == "$eq":
+        return any(values_equal(item, argument) for item in candidates(value))
+    if operator == "$ne":
+        return not any(values_equal(item, argument) for item in candidates(value))
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        for item in candidates(value):
+            result = compare(item, argument)
+            if result is None:
+                continue
+            if ((operator == "$gt" and result > 0) or (operator == "$gte" and result >= 0)
+                    or (operator == "$lt" and result < 0) or (operator == "$lte" and result <= 0)):
+                return True
+        return False
+    if operator == "$in":
+        return any(values_equal(item, option) for item in candidates(value) for option in argument)
+    if operator == "$nin":
+        return not any(values_equal(item, option) for item in candidates(value) for option in argument)
+    if operator == "$exists":
+        return (value is not MISSING) == bool(argument)
+    if operator == "$not":
+        return not match_condition(value, argument)
+    if operator == "$size":
+        return isinstance(value, list) and len(value) == argument
+    if operator == "$elemMatch":
+        return isinstance(value, list) and any(
+            match_filter(item, argument) if isinstance(item, dict) else match_condition(item, argument)
+            for item in value)
+    if operator == "$regex":
+        pattern = argument.pattern if isinstance(argument, Regex) else argument
+        flags = (argument.flags if isinstance(argument, Regex) else "") + condition.get("$options", "")
+        compiled = re.compile(pattern, re.IGNORECASE if "i" in flags else 0)
+        return any(isinstance(item, str) and compiled.search(item) for item in candidates(value))
+    if operator == "$options":
+        return True
+    raise CommandError(2, f"unknown operator: {operator}")
+
+
+def match_filter(document, query):
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(match_filter(document, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(document, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(match_filter(document, sub) for sub in condition):
+                return False
+        elif key == "$comment":
+            continue
+        elif not match_condition(get_path(document, key), condition):
+            return False
+    return True
+
+
+def sort_documents(documents, sort):
+    for key, direction in reversed(list((sort or {}).items())):
+        documents.sort(key=lambda doc: sort_key(get_path(doc, key)), reverse=direction < 0)
+    return documents
+
+
+def project(document, projection):
+    if not projection:
+        return document
+    include = {key for key, flag in projection.items() if flag and key != "_id"}
+    if include:
+        result = {}
+        if projection.get("_id", 1):
+            result["_id"] = document.get("_id")
+        for key in include:
+            value = get_path(document, key)
+            if value is not MISSING:
+                set_path(result, key, value)
+        return result
+    result = dict(document)
+    for key, flag in projection.items():
+        if not flag:
+            unset_path(result, key)
+    return result
+
+
+def apply_update(document, update, inserting=False):
+    """Apply an update document (operators or a replacement) in place"""
+    if not any(key.startswith("$") for key in update):
+        _id = document.get("_id")
+        document.clear()
+        document.update(update)
+        if _id is not None:
+            document.setdefault("_id", _id)
+        return
+    for operator, fields in update.items():
+        for path, argument in fields.items():
+            current = get_path(document, path)
+            if operator == "$set":
+                set_path(document, path, argument)
+            elif operator == "$setOnInsert":
+                if inserting:
+                    set_path(document, path, argument)
+            elif operator == "$unset":
+                unset_path(document, path)
+            elif operator == "$inc":
+                set_path(document, path, (0 if current is MISSING or current is None else current) + argument)
+            elif operator == "$mul":
+                set_path(document, path, (0 if current is MISSING else current) * argument)
+            elif operator == "$min":
+                if current is MISSING or compare(argument, current) == -1:
+                    set_path(document, path, argument)
+            elif operator == "$max":
+                if current is MISSING or compare(argument, current) == 1:
+                    set_path(document, path, argument)
+            elif operator == "$currentDate":
+                set_path(document, path, datetime.now(timezone.utc))
+            elif operator in ("$push", "$addToSet"):
+                items = current if isinstance(current, list) else []
+                new_items = argument["$each"] if isinstance(argument, dict) and "$each" in argument else [argument]
+                for item in new_items:
+                    if operator == "$push" or not any(values_equal(item, existing) for existing in items):
+                        items.append(item)
+                if isinstance(argument, dict) and "$slice" in argument:
+                    limit = argument["$slice"]
+                    items = items[limit:] if limit < 0 else items[:limit]
+                set_path(document, path, items)
+            elif operator == "$pull":
+                if isinstance(current, list):
+                    set_path(document, path, [
+                        item for item in current
+                        if not (match_filter(item, argument) if isinstance(argument, dict) and isinstance(item, dict)
+                                else match_condition(item, argument))
+                    ])
+            else:
+                raise CommandError(9, f"unknown update operator: {operator}")
+
+
+def upsert_seed(query):
+    """Equality fields of a filter become fields of the upserted document"""
+    document = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            if "$eq" in condition:
+                set_path(document, key, condition["$eq"])
+            continue
+        set_path(document, key, condition)
+    return document
+
+
+def evaluate(expression, document):
+    """Aggregation expression: "$field" paths, literals and nested objects"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(document, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            operator, argument = next(iter(expression.items()))
+            if operator in ("$add", "$subtract", "$multiply", "$divide"):
+                values = [evaluate(item, document) for item in argument]
+                if any(value is None for value in values):
+                    return None
+                result = values[0]
+                for value in values[1:]:
+                    if operator == "$add":
+                        result = result + value
+                    elif operator == "$subtract":
+                        result = result - value
+                    elif operator == "$multiply":
+                        result = result * value
+                    else:
+                        result = result / value
+                return result
+            if operator == "$literal":
+                return argument
+        return {key: evaluate(value, document) for key, value in expression.items()}
+    return expression
+
+
+class CommandError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+# Storage
+
+class Collection:
+    def __init__(self, name):
+        self.name = name
+        self.documents = {}
+        # _id key -> insertion number, to return index hits in natural order
+        self.sequence = {}
+        self.inserted = itertools.count()
+        # field -> {value -> set of _id keys}, for the leading field of each index
+        self.field_indexes = {}
+        self.index_specs = [{"v": 2, "key": {"_id": 1}, "name": "_id_"}]
+
+    def index_values(self, document, field):
+        value = get_path(document, field)
+        if value is MISSING:
+            value = None
+        if isinstance(value, list):
+            return {hashable(item) for item in value} | {hashable(value)}
+        return {hashable(value)}
+
+    def add_to_indexes(self, key, document):
+        for field, index in self.field_indexes.items():
+            for value in self.index_values(document, field):
+                index.setdefault(value, set()).add(key)
+
+    def remove_from_indexes(self, key, document):
+        for field, index in self.field_indexes.items():
+            for value in self.index_values(document, field):
+                bucket = index.get(value)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del index[value]
+
+    def create_index(self, spec):
+        if any(existing["name"] == spec["name"] for existing in self.index_specs):
+            return False
+        self.index_specs.append(spec)
+        field = next(iter(spec["key"]))
+        if field != "_id" and field not in self.field_indexes:
+            self.field_indexes[field] = {}
+            for key, document in self.documents.items():
+                for value in self.index_values(document, field):
+                    self.field_indexes[field].setdefault(value, set()).add(key)
+        return True
+
+    def insert(self, document):
+        if "_id" not in document:
+            document = {"_id": ObjectId(), **document}
+        key = hashable(document["_id"])
+        if key in self.documents:
+            raise CommandError(11000, f"E11000 duplicate key error collection: {self.name} "
+                                      f"index: _id_ dup key: {{ _id: {document['_id']!r} }}")
+        self.documents[key] = document
+        self.sequence[key] = next(self.inserted)
+        self.add_to_indexes(key, document)
+        return document
+
+    def candidate_keys(self, query):
+        """Narrow a scan with the _id map or an equality index when possible"""
+        best = None
+        for field, condition in query.items():
+            if field.startswith("$"):
+                continue
+            values = None
+            if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+                if "$eq" in condition:
+                    values = [condition["$eq"]]
+                elif "$in" in condition:
+                    values = condition["$in"]
+            elif not isinstance(condition, (dict, Regex)):
+                values = [condition]
+            if values is None:
+                continue
+            if field == "_id":
+                keys = {hashable(value) for value in values if hashable(value) in self.documents}
+            elif field in self.field_indexes:
+                index = self.field_indexes[field]
+                keys = set()
+                for value in values:
+                    keys |= index.get(hashable(value), set())
+            else:
+                continue
+            if best is None or len(keys) < len(best):
+                best = keys
+        return best
+
+    def find(self, query, sort=None, skip=0, limit=0):
+        keys = self.candidate_keys(query or {})
+        if keys is None:
+            source = self.documents.values()
+        else:
+            if not sort:
+                keys = sorted(keys, key=self.sequence.__getitem__)
+            source = (self.documents[key] for key in keys)
+        matches = [document for document in source if match_filter(document, query or {})]
+        if sort:
+            sort_documents(matches, sort)
+        if skip:
+            matches = matches[skip:]
+        if limit:
+            matches = matches[:abs(limit)]
+        return matches
+
+    def update_document(self, document, update, inserting=False):
+        key = hashable(document["_id"])
+        self.remove_from_indexes(key, document)
+        try:
+            apply_update(document, update, inserting)
+        finally:
+            self.add_to_indexes(key, document)
+
+    def delete(self, document):
+        key = hashable(document["_id"])
+        self.remove_from_indexes(key, document)
+        del self.documents[key]
+        del self.sequence[key]
+
+
+class MongoStandin:
+    """Command layer over in-memory databases, with per-operation statistics"""
+
+    def __init__(self, host="127.0.0.1", port=27018):
+        self.host = host
+        self.port = port
+        self.databases = {}
+        self.cursors = {}
+        self.cursor_ids = itertools.count(1)
+        self.connection_ids = itertools.count(1)
+        self.request_ids = itertools.count(1)
+        self.stats = {}
+        self.connections = 0
+        self.server = None
+        self._lock = threading.Lock()
+
+    def collection(self, db_name, name, create=True):
+        database = self.databases.setdefault(db_name, {})
+        if name not in database and create:
+            database[name] = Collection(name)
+        return database.get(name)
+
+    # Statistics
+    def record(self, command, collection, seconds, documents):
+        key = f"{command} {collection}" if collection else command
+        with self._lock:
+            entry = self.stats.get(key)
+            if entry is None:
+                entry = self.stats[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "documents": 0}
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            entry["documents"] += documents
+
+    def snapshot(self):
+        """Copy of the per-operation counters, safe to diff across calls"""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self.stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    # Commands
+    def run_command(self, command, connection_id):
+        name = next(iter(command))
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        db_name = command.get("$db", "test")
+        start = time.perf_counter()
+        documents = 0
+        try:
+            if handler is None:
+                raise CommandError(59, f"no such command: '{name}'")
+            reply, documents = handler(command, db_name, connection_id)
+            reply.setdefault("ok", 1.0)
+        except CommandError as error:
+            reply = {"ok": 0.0, "errmsg": error.message, "code": error.code}
+        collection = command[name] if isinstance(command[name], str) else command.get("collection")
+        if name not in ("hello", "isMaster", "ismaster", "ping", "endSessions"):
+            self.record(name, collection, time.perf_counter() - start, documents)
+        return reply
+
+    def cmd_hello(self, command, db_name, connection_id):
+        return {
+            "helloOk": True,
+            "ismaster": True,
+            "isWritablePrimary": True,
+            "maxBsonObjectSize": 16 * 1024 * 1024,
+            "maxMessageSizeBytes": 48000000,
+            "maxWriteBatchSize": 100000,
+            "localTime": datetime.now(timezone.utc),
+            "logicalSessionTimeoutMinutes": 30,
+            "connectionId": connection_id,
+            "minWireVersion": 0,
+            "maxWireVersion": 21,
+            "readOnly": False,
+        }, 0
+
+    cmd_ismaster = cmd_hello
+
+    def cmd_ping(self, command, db_name, connection_id):
+        return {}, 0
+
+    def cmd_buildinfo(self, command, db_name, connection_id):
+        return {"version": "7.0.0-standin", "versionArray": [7, 0, 0, 0], "maxBsonObjectSize": 16 * 1024 * 1024}, 0
+
+    def cmd_getparameter(self, command, db_name, connection_id):
+        return {}, 0
+
+    def cmd_endsessions(self, command, db_name, connection_id):
+        return {}, 0
+
+    def cmd_standinstats(self, command, db_name, connection_id):
+        return {"stats": self.snapshot()}, 0
+
+    def cmd_standinreset(self, command, db_name, connection_id):
+        self.reset_stats()
+        return {}, 0
+
+    def cmd_listcollections(self, command, db_name, connection_id):
+        batch = [{"name": name, "type": "collection", "options": {}, "info": {"readOnly": False}}
+                 for name in self.databases.get(db_name, {})]
+        batch = [item for item in batch if match_filter(item, command.get("filter") or {})]
+        return {"cursor": {"id": Int64(0), "ns": f"{db_name}.$cmd.listCollections", "firstBatch": batch}}, len(batch)
+
+    def cmd_create(self, command, db_name, connection_id):
+        self.collection(db_name, command["create"])
+        return {}, 0
+
+    def cmd_drop(self, command, db_name, connection_id):
+        if self.databases.get(db_name, {}).pop(command["drop"], None) is None:
+            raise CommandError(26, "ns not found")
+        return {}, 0
+
+    def cmd_dropdatabase(self, command, db_name, connection_id):
+        self.databases.pop(db_name, None)
+        return {}, 0
+
+    def open_cursor(self, namespace, documents, batch_size, single_batch=False):
+        batch_size = batch_size or DEFAULT_BATCH_SIZE
+        first, rest = documents[:batch_size], documents[batch_size:]
+        cursor_id = 0
+        if rest and not single_batch:
+            cursor_id = next(self.cursor_ids)
+            self.cursors[cursor_id] = (namespace, rest)
+        return {"cursor": {"firstBatch": first, "id": Int64(cursor_id), "ns": namespace}}
+
+    def cmd_find(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["find"], create=False)
+        limit = command.get("limit", 0)
+        documents = collection.find(command.get("filter") or {}, command.get("sort"),
+                                    command.get("skip", 0), limit) if collection else []
+        documents = [project(document, command.get("projection")) for document in documents]
+        reply = self.open_cursor(f"{db_name}.{command['find']}", documents, command.get("batchSize"),
+                                 command.get("singleBatch", False) or limit < 0)
+        return reply, len(documents)
+
+    def cmd_getmore(self, command, db_name, connection_id):
+        cursor_id = int(command["getMore"])
+        if cursor_id not in self.cursors:
+            raise CommandError(43, f"cursor id {cursor_id} not found")
+        namespace, remaining = self.cursors.pop(cursor_id)
+        batch_size = command.get("batchSize") or len(remaining)
+        batch, rest = remaining[:batch_size], remaining[batch_size:]
+        if rest:
+            self.cursors[cursor_id] = (namespace, rest)
+        return {"cursor": {"nextBatch": batch, "id": Int64(cursor_id if rest else 0), "ns": namespace}}, len(batch)
+
+    def cmd_killcursors(self, command, db_name, connection_id):
+        killed = [cursor_id for cursor_id in command.get("cursors", []) if self.cursors.pop(int(cursor_id), None)]
+        return {"cursorsKilled": killed, "cursorsNotFound": [], "cursorsAlive": [], "cursorsUnknown": []}, 0
+
+    def cmd_insert(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["insert"])
+        inserted, errors = 0, []
+        for index, document in enumerate(command.get("documents", [])):
+            try:
+                collection.insert(document)
+                inserted += 1
+            except CommandError as error:
+                errors.append({"index": index, "code": error.code, "errmsg": error.message})
+                if command.get("ordered", True):
+                    break
+        reply = {"n": inserted}
+        if errors:
+            reply["writeErrors"] = errors
+        return reply, inserted
+
+    def cmd_update(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["update"])
+        matched = modified = 0
+        upserted, errors = [], []
+        for index, statement in enumerate(command.get("updates", [])):
+            try:
+                query, update = statement.get("q") or {}, statement["u"]
+                documents = collection.find(query)
+                if not statement.get("multi"):
+                    documents = documents[:1]
+                for document in documents:
+                    before = hashable(document)
+                    collection.update_document(document, update)
+                    matched += 1
+                    modified += hashable(document) != before
+                if not documents and statement.get("upsert"):
+                    document = upsert_seed(query)
+                    if any(key.startswith("$") for key in update):
+                        apply_update(document, update, inserting=True)
+                    else:
+                        document.update(update)
+                    document = collection.insert(document)
+                    upserted.append({"index": index, "_id": document["_id"]})
+            except CommandError as error:
+                errors.append({"index": index, "code": error.code, "errmsg": error.message})
+                if command.get("ordered", True):
+                    break
+        reply = {"n": matched + len(upserted), "nModified": modified}
+        if upserted:
+            reply["upserted"] = upserted
+        if errors:
+            reply["writeErrors"] = errors
+        return reply, matched + len(upserted)
+
+    def cmd_delete(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["delete"], create=False)
+        removed = 0
+        for statement in command.get("deletes", []):
+            if collection is None:
+                break
+            documents = collection.find(statement.get("q") or {})
+            if statement.get("limit", 0) == 1:
+                documents = documents[:1]
+            for document in documents:
+                collection.delete(document)
+                removed += 1
+        return {"n": removed}, removed
+
+    def cmd_findandmodify(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["findAndModify"])
+        query = command.get("query") or {}
+        documents = collection.find(query, command.get("sort"), 0, 1)
+        last_error = {"n": 0, "updatedExisting": False}
+        value = None
+        if documents:
+            document = documents[0]
+            if command.get("remove"):
+                collection.delete(document)
+                value = document
+            else:
+                original = dict(document)
+                collection.update_document(document, command.get("update", {}))
+                value = document if command.get("new") else original
+                last_error["updatedExisting"] = True
+            last_error["n"] = 1
+        elif command.get("upsert") and not command.get("remove"):
+            update = command.get("update", {})
+            document = upsert_seed(query)
+            if any(key.startswith("$") for key in update):
+                apply_update(document, update, inserting=True)
+            else:
+                document.update(update)
+            document = collection.insert(document)
+            last_error.update(n=1, upserted=document["_id"])
+            value = document if command.get("new") else None
+        if value is not None:
+            value = project(value, command.get("fields"))
+        return {"lastErrorObject": last_error, "value": value}, last_error["n"]
+
+    def cmd_count(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["count"], create=False)
+        count = len(collection.find(command.get("query") or {}, None, command.get("skip", 0),
+                                    command.get("limit", 0))) if collection else 0
+        return {"n": count}, 0
+
+    def cmd_distinct(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["distinct"], create=False)
+        seen, values = set(), []
+        for document in collection.find(command.get("query") or {}) if collection else []:
+            value = get_path(document, command["key"])
+            for item in (value if isinstance(value, list) else [value]):
+                if item is not MISSING and hashable(item) not in seen:
+                    seen.add(hashable(item))
+                    values.append(item)
+        return {"values": values}, len(values)
+
+    def cmd_aggregate(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["aggregate"], create=False)
+        pipeline = command.get("pipeline", [])
+        documents = None
+        if collection and pipeline and "$match" in pipeline[0]:
+            documents = collection.find(pipeline[0]["$match"])
+            pipeline = pipeline[1:]
+        elif collection:
+            documents = list(collection.documents.values())
+        documents = [dict(document) for document in documents or []]
+        for stage in pipeline:
+            (operator, argument), = stage.items()
+            if operator == "$match":
+                documents = [document for document in documents if match_filter(document, argument)]
+            elif operator == "$sort":
+                sort_documents(documents, argument)
+            elif operator == "$skip":
+                documents = documents[argument:]
+            elif operator == "$limit":
+                documents = documents[:argument]
+            elif operator == "$count":
+                documents = [{argument: len(documents)}] if documents else []
+            elif operator == "$project":
+                if all(value in (0, 1, True, False) for value in argument.values()):
+                    documents = [project(document, argument) for document in documents]
+                else:
+                    documents = [{"_id": document.get("_id"), **{
+                        key: get_path(document, key) if value in (1, True) else evaluate(value, document)
+                        for key, value in argument.items() if key != "_id"}} for document in documents]
+            elif operator in ("$addFields", "$set"):
+                for document in documents:
+                    for key, value in argument.items():
+                        set_path(document, key, evaluate(value, document))
+            elif operator == "$unwind":
+                path = (argument["path"] if isinstance(argument, dict) else argument)[1:]
+                unwound = []
+                for document in documents:
+                    value = get_path(document, path)
+                    for item in (value if isinstance(value, list) else []):
+                        copy = dict(document)
+                        set_path(copy, path, item)
+                        unwound.append(copy)
+                documents = unwound
+            elif operator == "$group":
+                documents = self.group(documents, argument)
+            else:
+                raise CommandError(40324, f"Unrecognized pipeline stage name: '{operator}'")
+        cursor = command.get("cursor", {})
+        reply = self.open_cursor(f"{db_name}.{command['aggregate']}", documents, cursor.get("batchSize"))
+        return reply, len(documents)
+
+    def group(self, documents, spec):
+        groups = {}
+        for document in documents:
+            key = evaluate(spec["_id"], document)
+            state = groups.setdefault(hashable(key), {"_id": key, "__n": {}})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (operator, expression), = accumulator.items()
+                value = evaluate(expression, document)
+                if operator == "$sum":
+                    state[field] = state.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+                elif operator == "$avg":
+                    if isinstance(value, (int, float)):
+                        count = state["__n"].get(field, 0) + 1
+                        state["__n"][field] = count
+                        state[field] = state.get(field, 0) + (value - state.get(field, 0)) / count
+                    else:
+                        state.setdefault(field, None)
+                elif operator == "$min":
+                    if field not in state or compare(value, state[field]) == -1:
+                        state[field] = value
+                elif operator == "$max":
+                    if field not in state or compare(value, state[field]) == 1:
+                        state[field] = value
+                elif operator == "$first":
+                    state.setdefault(field, value)
+                elif operator == "$last":
+                    state[field] = value
+                elif operator == "$push":
+                    state.setdefault(field, []).append(value)
+                elif operator == "$addToSet":
+                    items = state.setdefault(field, [])
+                    if not any(values_equal(value, item) for item in items):
+                        items.append(value)
+                else:
+                    raise CommandError(15952, f"unknown group operator '{operator}'")
+        results = []
+        for state in groups.values():
+            state.pop("__n")
+            results.append(state)
+        return results
+
+    def cmd_createindexes(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["createIndexes"])
+        before = len(collection.index_specs)
+        for spec in command.get("indexes", []):
+            spec = dict(spec)
+            spec.setdefault("name", "_".join(f"{key}_{direction}" for key, direction in spec["key"].items()))
+            collection.create_index({"v": 2, **spec})
+        return {"numIndexesBefore": before, "numIndexesAfter": len(collection.index_specs),
+                "createdCollectionAutomatically": before == 1}, 0
+
+    def cmd_listindexes(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["listIndexes"], create=False)
+        if collection is None:
+            raise CommandError(26, "ns does not exist")
+        return self.open_cursor(f"{db_name}.{command['listIndexes']}", list(collection.index_specs), None), 0
+
+    def cmd_dropindexes(self, command, db_name, connection_id):
+        collection = self.collection(db_name, command["dropIndexes"], create=False)
+        if collection is not None and command.get("index") == "*":
+            collection.index_specs = collection.index_specs[:1]
+            collection.field_indexes = {}
+        return {}, 0
+
+    # Wire protocol
+    async def handle_connection(self, reader, writer):
+        connection_id = next(self.connection_ids)
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readexactly(16)
+                length, request_id, _, opcode = struct.unpack("<iiii", header)
+                payload = await reader.readexactly(length - 16)
+                if opcode == OP_MSG:
+                    reply = self.handle_op_msg(payload, request_id, connection_id)
+                elif opcode == OP_QUERY:
+                    reply = self.handle_op_query(payload, request_id, connection_id)
+                else:
+                    continue
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def handle_op_msg(self, payload, request_id, connection_id):
+        flags = struct.unpack_from("<I", payload, 0)[0]
+        end = len(payload) - (4 if flags & 1 else 0)
+        pos = 4
+        command = {}
+        while pos < end:
+            kind = payload[pos]
+            pos += 1
+            if kind == 0:
+                body, pos = decode_document(payload, pos)
+                command = {**body, **command}
+            else:
+                size = struct.unpack_from("<i", payload, pos)[0]
+                section_end = pos + size
+                name_end = payload.index(b"\x00", pos + 4)
+                identifier = payload[pos + 4:name_end].decode()
+                pos = name_end + 1
+                documents = []
+                while pos < section_end:
+                    document, pos = decode_document(payload, pos)
+                    documents.append(document)
+                command[identifier] = documents
+        reply = encode_document(self.run_command(command, connection_id))
+        body = struct.pack("<I", 0) + b"\x00" + reply
+        return struct.pack("<iiii", 16 + len(body), next(self.request_ids), request_id, OP_MSG) + body
+
+    def handle_op_query(self, payload, request_id, connection_id):
+        # Only used for the legacy isMaster handshake against admin.$cmd
+        name_end = payload.index(b"\x00", 4)
+        namespace = payload[4:name_end].decode()
+        query, _ = decode_document(payload, name_end + 9)
+        if "$query" in query:
+            query = query["$query"]
+        query.setdefault("$db", namespace.split(".", 1)[0])
+        reply = encode_document(self.run_command(query, connection_id))
+        body = struct.pack("<iqii", 0, 0, 0, 1) + reply
+        return struct.pack("<iiii", 16 + len(body), next(self.request_ids), request_id, OP_REPLY) + body
+
+    # Lifecycle
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"🍃 Mongo stand-in listening on mongodb://{self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self):
+        """Run the server on a daemon thread; returns once it is accepting connections"""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="mongo-standin", daemon=True).start()
+        ready.wait()
+        return self
+
+    @property
+    def url(self):
+        return f"mongodb://{self.host}:{self.port}"
+
+
+def print_stats(stats):
+    print(f"{'Operation':<40}{'count':>8}{'docs':>9}{'avg ms':>9}{'max ms':>9}")
+    for key, entry in sorted(stats.items()):
+        print(f"{key:<40}{entry['count']:>8}{entry['documents']:>9}"
+              f"{entry['total_ms'] / entry['count']:>9.3f}{entry['max_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory MongoDB wire-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27018)
+    args = parser.parse_args()
+    standin = MongoStandin(args.host, args.port)
+    try:
+        asyncio.run(standin.serve_forever())
+    except KeyboardInterrupt:
+        print_stats(standin.snapshot())
@@ -0,0 +1,807 @@
+#!/usr/bin/env python3
+"""
+Offline pronunciation scoring service
+Decodes a WAV recording, extracts MFCC and pitch features with vectorized NumPy
+and scores it against a reference recording of the same phrase with DTW.
+CPU only, no network access and no model downloads. POST /score takes JSON
+{"phrase", "audioBase64"}; POST /score/stream?phrase=... takes the raw WAV body,
+plain or chunked, and refuses unknown phrases and non-WAV data before reading it.
+
+Concurrent requests are micro-batched: the batcher collects whatever arrived
+within --batch-window-ms (up to --max-batch clips) and hands the batch to a
+process pool, where all clips share one framing/FFT/mel pass. Every core gets
+a batch in flight. Run it next to the app and point the route at it:
+    python pronunciation_service.py --references references/ --port 8090
+    PRONUNCIATION_SERVICE_URL=http://localhost:8090 yarn dev
+
+Reference recordings are WAV files named after the phrase ("she-sells-
+seashells-by-the-seashore.wav"). --write-references DIR writes synthetic
+placeholder references for the app's sample phrases, and --bench measures
+throughput in requests per second per core:
+    python pronunciation_service.py --bench 2000 --concurrency 64 --workers 4
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import re
+import struct
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400          # 25 ms
+HOP_LENGTH = 160            # 10 ms
+N_FFT = 1024                # long enough for the pitch autocorrelation not to wrap
+N_MELS = 26
+N_MFCC = 13
+PITCH_MIN_HZ = 60
+PITCH_MAX_HZ = 400
+VOICING_THRESHOLD = 0.35
+SILENCE_RATIO = 0.05        # frames quieter than 5% of the loudest are silence
+MAX_CLIP_SECONDS = 30
+MIN_SPEECH_SECONDS = 0.2
+
+# Mean DTW frame cost mapped linearly onto a 1.0 .. 0.0 score
+COST_PERFECT = 0.15
+COST_FAILED = 0.75
+
+# Phrases offered on the pronunciation page and in the API tests
+SAMPLE_PHRASES = [
+    "The quick brown fox jumps over the lazy dog",
+    "She sells seashells by the seashore",
+    "How much wood would a woodchuck chuck",
+    "Hello, how are you today?",
+]
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+}
+
+
+class AudioError(ValueError):
+    """The upload is not audio this service can decode"""
+
+
+class UploadTooLarge(Exception):
+    """The request body is larger than the server accepts"""
+
+
+def phrase_key(phrase):
+    """File-name form of a phrase: lowercase words joined by dashes"""
+    return "-".join(re.findall(r"[a-z0-9']+", phrase.lower())).replace("'", "")
+
+
+# Audio decoding
+def decode_wav(data):
+    """Mono float32 samples at SAMPLE_RATE from a PCM (8/16/24/32-bit) or float32 WAV"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise AudioError("unsupported audio format; send a PCM WAV recording")
+
+    fmt, samples, offset = None, None, 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = data[offset + 8:offset + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", body)
+        elif chunk_id == b"data":
+            samples = body
+            break
+        offset += 8 + size + (size & 1)
+    if fmt is None or samples is None:
+        raise AudioError("WAV file has no fmt or data chunk")
+
+    encoding, channels, rate, _, _, bits = fmt
+    if encoding == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE: the sub-format decides
+        encoding = 3 if bits == 32 and len(samples) % 4 == 0 and b"\x03\x00" in data[36:60] else 1
+    width = bits // 8
+    usable = len(samples) - len(samples) % (width * channels)
+    if channels < 1 or usable == 0:
+        raise AudioError("WAV file has no samples")
+    if usable / (width * channels) / rate > MAX_CLIP_SECONDS:
+        raise AudioError(f"recordings are limited to {MAX_CLIP_SECONDS} seconds")
+
+    raw = samples[:usable]
+    if encoding == 3 and bits == 32:
+        signal = np.frombuffer(raw, dtype="<f4").astype(np.float32)
+    elif encoding == 1 and bits == 8:
+        signal = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif encoding == 1 and bits == 16:
+        signal = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif encoding == 1 and bits == 24:
+        triples = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+        signal = (np.where(values >= 1 << 23, values - (1 << 24), values) / float(1 << 23)).astype(np.float32)
+    elif encoding == 1 and bits == 32:
+        signal = (np.frombuffer(raw, dtype="<i4") / float(1 << 31)).astype(np.float32)
+    else:
+        raise AudioError(f"unsupported WAV encoding {encoding} with {bits}-bit samples")
+
+    signal = signal.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(signal) * SAMPLE_RATE / rate) * rate / SAMPLE_RATE
+        signal = np.interp(positions, np.arange(len(signal)), signal).astype(np.float32)
+    return signal
+
+
+def encode_wav(signal, sample_rate=SAMPLE_RATE):
+    """16-bit mono PCM WAV bytes"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+# Feature extraction
+def mel_filterbank(n_mels=N_MELS, n_fft=N_FFT, sample_rate=SAMPLE_RATE, fmin=20.0):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix"""
+    hz_to_mel = lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0)
+    mel_to_hz = lambda mel: 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(sample_rate / 2), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    return np.maximum(0.0, np.minimum((bins - lower) / (center - lower), (upper - bins) / (upper - center)))
+
+
+def dct_matrix(n_mfcc=N_MFCC, n_mels=N_MELS):
+    """Orthonormal DCT-II rows"""
+    basis = np.cos(np.pi / n_mels * (np.arange(n_mels) + 0.5) * np.arange(n_mfcc)[:, None])
+    basis *= np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis
+
+
+MEL_FILTERS = mel_filterbank()
+DCT = dct_matrix()
+WINDOW = np.hamming(FRAME_LENGTH).astype(np.float32)
+MIN_LAG = SAMPLE_RATE // PITCH_MAX_HZ
+MAX_LAG = SAMPLE_RATE // PITCH_MIN_HZ
+
+
+def frames_of(signal):
+    """(n_frames, FRAME_LENGTH) strided view, zero-padded to at least one frame"""
+    if len(signal) < FRAME_LENGTH:
+        signal = np.pad(signal, (0, FRAME_LENGTH - len(signal)))
+    return np.lib.stride_tricks.sliding_window_view(signal, FRAME_LENGTH)[::HOP_LENGTH]
+
+
+def trim_silence(signal):
+    """Drop leading and trailing frames below SILENCE_RATIO of the loudest frame"""
+    rms = np.sqrt(np.mean(np.square(frames_of(signal)), axis=1))
+    loud = np.flatnonzero(rms > max(rms.max() * SILENCE_RATIO, 1e-4))
+    if len(loud) == 0:
+        return signal[:0]
+    return signal[loud[0] * HOP_LENGTH:loud[-1] * HOP_LENGTH + FRAME_LENGTH]
+
+
+def batch_features(signals):
+    """MFCC (CMVN-normalized), pitch and loudness for several clips with one FFT pass"""
+    trimmed = [trim_silence(signal) for signal in signals]
+    emphasized = [np.append(clip[:1], clip[1:] - 0.97 * clip[:-1]) if len(clip) else clip for clip in trimmed]
+    framed = [frames_of(clip) for clip in emphasized]
+    counts = [len(frames) for frames in framed]
+
+    stacked = np.concatenate(framed) * WINDOW
+    power = np.square(np.abs(np.fft.rfft(stacked, N_FFT))) / N_FFT
+    mfcc = np.log(power @ MEL_FILTERS.T + 1e-10) @ DCT.T
+
+    # Pitch from the autocorrelation of the same spectrum (Wiener-Khinchin)
+    autocorrelation = np.fft.irfft(power, N_FFT)[:, :MAX_LAG + 1]
+    energy = autocorrelation[:, 0]
+    normalized = autocorrelation[:, MIN_LAG:] / np.maximum(energy, 1e-12)[:, None]
+    lag = MIN_LAG + normalized.argmax(axis=1)
+    voiced = (normalized.max(axis=1) > VOICING_THRESHOLD) & (energy > energy.max() * 1e-3)
+    f0 = np.where(voiced, SAMPLE_RATE / lag, np.nan)
+
+    features = []
+    for start, count, clip in zip(np.cumsum([0] + counts[:-1]), counts, trimmed):
+        coefficients = mfcc[start:start + count]
+        coefficients = (coefficients - coefficients.mean(axis=0)) / (coefficients.std(axis=0) + 1e-8)
+        features.append({
+            "mfcc": coefficients.astype(np.float32),
+            "f0": f0[start:start + count],
+            "rms": float(np.sqrt(np.mean(np.square(clip)))) if len(clip) else 0.0,
+            "seconds": len(clip) / SAMPLE_RATE,
+        })
+    return features
+
+
+# Alignment and scoring
+def frame_costs(user_mfcc, reference_mfcc):
+    """Cosine distance between every user and reference frame, ignoring c0 (loudness)"""
+    user = user_mfcc[:, 1:] / (np.linalg.norm(user_mfcc[:, 1:], axis=1, keepdims=True) + 1e-8)
+    reference = reference_mfcc[:, 1:] / (np.linalg.norm(reference_mfcc[:, 1:], axis=1, keepdims=True) + 1e-8)
+    return 1.0 - user @ reference.T
+
+
+def dtw_batch(costs):
+    """Total cost and warping path for several cost matrices at once. The matrices are
+    padded to a common shape and each anti-diagonal is filled for the whole batch in one
+    vectorized step, so the Python loop runs once per batch instead of once per clip."""
+    rows = max(cost.shape[0] for cost in costs)
+    cols = max(cost.shape[1] for cost in costs)
+    padded = np.full((len(costs), rows, cols), np.inf)
+    for index, cost in enumerate(costs):
+        padded[index, :cost.shape[0], :cost.shape[1]] = cost
+
+    total = np.full((len(costs), rows + 1, cols + 1), np.inf)
+    total[:, 0, 0] = 0.0
+    steps = np.zeros((len(costs), rows + 1, cols + 1), np.int8)  # 0 diagonal, 1 up, 2 left
+    for diagonal in range(2, rows + cols + 1):
+        i = np.arange(max(1, diagonal - cols), min(rows, diagonal - 1) + 1)
+        j = diagonal - i
+        options = np.stack((total[:, i - 1, j - 1], total[:, i - 1, j], total[:, i, j - 1]))
+        step = options.argmin(axis=0)
+        steps[:, i, j] = step
+        total[:, i, j] = padded[:, i - 1, j - 1] + np.take_along_axis(options, step[None], 0)[0]
+
+    alignments = []
+    for index, cost in enumerate(costs):
+        path, choices = [], steps[index]
+        i, j = cost.shape
+        while i > 0 and j > 0:
+            path.append((i - 1, j - 1))
+            step = choices[i, j]
+            i, j = (i - 1, j - 1) if step == 0 else (i - 1, j) if step == 1 else (i, j - 1)
+        path.reverse()
+        alignments.append((total[index, cost.shape[0], cost.shape[1]], np.array(path)))
+    return alignments
+
+
+def cost_to_score(cost):
+    return float(np.clip((COST_FAILED - cost) / (COST_FAILED - COST_PERFECT), 0.0, 1.0))
+
+
+def semitones(f0):
+    """Pitch contour relative to the speaker's median, so voices of any range compare"""
+    return 12.0 * np.log2(f0 / np.nanmedian(f0)) if np.isfinite(f0).any() else f0
+
+
+def score_clip(features, reference, phrase, cost, alignment):
+    """Compare one clip with the reference given their DTW alignment; returns the API result fields"""
+    if features["seconds"] < MIN_SPEECH_SECONDS:
+        return {"score": 0.0, "tips": ["We could not hear you. Record closer to the microphone."],
+                "details": {"seconds": features["seconds"]}}
+
+    total, path = alignment
+    path_costs = cost[path[:, 0], path[:, 1]]
+    articulation = cost_to_score(total / len(path))
+
+    # Intonation: correlate the two pitch contours along the alignment
+    user_pitch = semitones(features["f0"])[path[:, 0]]
+    reference_pitch = semitones(reference["f0"])[path[:, 1]]
+    both = np.isfinite(user_pitch) & np.isfinite(reference_pitch)
+    intonation = None
+    if both.sum() >= 10 and user_pitch[both].std() > 1e-6 and reference_pitch[both].std() > 1e-6:
+        intonation = float(np.corrcoef(user_pitch[both], reference_pitch[both])[0, 1])
+
+    # Word scores: reference frames are shared out between the words by letter count
+    words = re.findall(r"[A-Za-z']+", phrase) or [phrase]
+    bounds = np.cumsum([len(word) for word in words]) / sum(len(word) for word in words)
+    word_of_frame = np.searchsorted(bounds * len(reference["mfcc"]), path[:, 1], side="right")
+    word_of_frame = np.minimum(word_of_frame, len(words) - 1)
+    word_costs = np.bincount(word_of_frame, weights=path_costs, minlength=len(words))
+    word_costs /= np.maximum(np.bincount(word_of_frame, minlength=len(words)), 1)
+    word_scores = [{"word": word, "score": round(cost_to_score(value), 2)} for word, value in zip(words, word_costs)]
+
+    score = articulation if intonation is None else 0.8 * articulation + 0.2 * max(0.0, intonation)
+    duration_ratio = features["seconds"] / reference["seconds"]
+
+    tips = []
+    weakest = min(word_scores, key=lambda item: item["score"])
+    if weakest["score"] < 0.6:
+        tips.append(f'Practise "{weakest["word"]}" on its own; it was the least clear word.')
+    if duration_ratio > 1.4:
+        tips.append("Try to speak a little faster and link the words together.")
+    elif duration_ratio < 0.7:
+        tips.append("Slow down a little and pronounce every syllable.")
+    if intonation is not None and intonation < 0.3:
+        tips.append("Follow the rise and fall of the reference; your intonation was different.")
+    if features["rms"] < 0.01:
+        tips.append("Your recording was very quiet. Speak up or move closer to the microphone.")
+    if not tips:
+        tips.append("Great job! Your pronunciation is very close to the reference.")
+
+    return {
+        "score": round(score, 2),
+        "tips": tips,
+        "words": word_scores,
+        "details": {
+            "articulation": round(articulation, 3),
+            "intonation": None if intonation is None else round(intonation, 3),
+            "durationRatio": round(duration_ratio, 3),
+            "seconds": round(features["seconds"], 3),
+        },
+    }
+
+
+# Process pool workers
+_references = {}
+
+
+def init_worker(reference_signals):
+    """Compute reference features once per worker process"""
+    keys = list(reference_signals)
+    for key, features in zip(keys, batch_features([reference_signals[key][1] for key in keys])):
+        _references[key] = dict(features, phrase=reference_signals[key][0])
+
+
+def score_batch(items):
+    """Score [(phrase, wav_bytes)] in one pass; per-item errors come back as {"error", "status"}"""
+    results = [None] * len(items)
+    decoded = []
+    for index, (phrase, audio) in enumerate(items):
+        reference = _references.get(phrase_key(phrase))
+        if reference is None:
+            results[index] = {"error": f"No reference recording for phrase {phrase!r}", "status": 404}
+            continue
+        try:
+            decoded.append((index, decode_wav(audio)))
+        except AudioError as e:
+            results[index] = {"error": str(e), "status": 422}
+
+    if decoded:
+        features = batch_features([signal for _, signal in decoded])
+        references = [_references[phrase_key(items[index][0])] for index, _ in decoded]
+        costs = [frame_costs(clip["mfcc"], reference["mfcc"]) for clip, reference in zip(features, references)]
+        audible = [position for position, clip in enumerate(features) if clip["seconds"] >= MIN_SPEECH_SECONDS]
+        alignments = dict(zip(audible, dtw_batch([costs[position] for position in audible]) if audible else []))
+        for position, ((index, _), clip, reference) in enumerate(zip(decoded, features, references)):
+            results[index] = score_clip(clip, reference, items[index][0], costs[position], alignments.get(position))
+    return results
+
+
+# Service
+def load_references(directory):
+    """{phrase key: (phrase, samples)} for every WAV in directory"""
+    references = {}
+    for name in sorted(os.listdir(directory)) if directory and os.path.isdir(directory) else []:
+        if name.lower().endswith(".wav"):
+            with open(os.path.join(directory, name), "rb") as handle:
+                key = phrase_key(os.path.splitext(name)[0].replace("-", " "))
+                references[key] = (key.replace("-", " "), decode_wav(handle.read()))
+    return references
+
+
+class PronunciationService:
+    """Micro-batching front end of the process pool"""
+
+    def __init__(self, references, workers=None, max_batch=16, batch_window_ms=5.0):
+        self.references = references
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000.0
+        self.stats = {
+            "requests": 0,
+            "streamed": 0,
+            "scored": 0,
+            "errors": 0,
+            "batches": 0,
+            "batched_items": 0,
+            "max_batch": 0,
+            "queued": 0,
+            "audio_seconds": 0.0,
+            "busy_seconds": 0.0,
+        }
+        self.pool = None
+        self.queue = None
+        self.slots = None
+        self.batcher = None
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.references,))
+        # Warm every worker so the first requests do not pay for process start-up
+        list(self.pool.map(score_batch, [[]] * self.workers))
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.batcher = asyncio.get_running_loop().create_task(self.run_batcher())
+        return self
+
+    def close(self):
+        if self.batcher:
+            self.batcher.cancel()
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def score(self, phrase, audio):
+        """Result dict for one recording, or {"error", "status"}"""
+        self.stats["requests"] += 1
+        self.stats["queued"] += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((phrase, audio, future))
+        return await future
+
+    async def run_batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker first, so batches fill up while the pool is busy
+            await self.slots.acquire()
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            loop.create_task(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        started = time.perf_counter()
+        self.stats["queued"] -= len(batch)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool, score_batch, [(phrase, audio) for phrase, audio, _ in batch])
+        except Exception as e:  # a crashed worker fails the batch, not the service
+            results = [{"error": f"scoring failed: {e}", "status": 500}] * len(batch)
+        finally:
+            self.slots.release()
+
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(batch)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        self.stats["busy_seconds"] += time.perf_counter() - started
+        for (_, _, future), result in zip(batch, results):
+            if "error" in result:
+                self.stats["errors"] += 1
+            else:
+                self.stats["scored"] += 1
+                self.stats["audio_seconds"] += result["details"]["seconds"]
+            if not future.done():
+                future.set_result(result)
+
+    def snapshot(self):
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "mean_batch": self.stats["batched_items"] / batches if batches else 0.0,
+            "references": len(self.references),
+        }
+
+
+class PronunciationServer:
+    """Minimal asyncio HTTP/1.1 front end, same shape as fake_openai_server"""
+
+    def __init__(self, service, host="127.0.0.1", port=8090, max_body_bytes=8 * 1024 * 1024):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self.server = None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                path, _, query = target.partition("?")
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    if method == "POST" and path == "/score/stream":
+                        keep_alive = await self.score_stream(parse_qs(query), headers, reader, writer) and keep_alive
+                    else:
+                        body = b"".join([chunk async for chunk in self.body_chunks(reader, headers)])
+                        await self.dispatch(method, path, body, writer)
+                except UploadTooLarge:
+                    await self.send_json(writer, 413, {"error": "Recording too large"}, close=True)
+                    break
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def body_chunks(self, reader, headers):
+        """Request body as it arrives (Content-Length or chunked), capped at max_body_bytes"""
+        received = 0
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")
+                    return
+                received += size
+                if received > self.max_body_bytes:
+                    raise UploadTooLarge()
+                yield await reader.readexactly(size)
+                await reader.readexactly(2)
+        else:
+            remaining = int(headers.get("content-length", 0))
+            if remaining > self.max_body_bytes:
+                raise UploadTooLarge()
+            while remaining:
+                chunk = await reader.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(chunk)
+                yield chunk
+
+    async def score_stream(self, query, headers, reader, writer):
+        """POST /score/stream?phrase=...: the raw WAV body, checked and buffered as it arrives.
+        Unknown phrases and non-WAV uploads are answered straight away and the rest of the
+        body is discarded unread into memory; returns False when the connection must close."""
+        phrase = query.get("phrase", [""])[0]
+        if not phrase:
+            await self.send_json(writer, 400, {"error": "phrase is required"})
+            return await self.discard_body(reader, headers)
+        if phrase_key(phrase) not in self.service.references:
+            await self.send_json(writer, 404, {"error": f"No reference recording for phrase {phrase!r}"})
+            return await self.discard_body(reader, headers)
+
+        audio = bytearray()
+        chunks = self.body_chunks(reader, headers)
+        async for chunk in chunks:
+            checked = len(audio) >= 12
+            audio += chunk
+            if not checked and len(audio) >= 12 and (audio[:4] != b"RIFF" or audio[8:12] != b"WAVE"):
+                await self.send_json(writer, 422, {"error": "unsupported audio format; send a PCM WAV recording"})
+                return await self.discard_body(reader, headers, chunks)
+
+        self.service.stats["streamed"] += 1
+        result = await self.service.score(phrase, bytes(audio))
+        await self.send_json(writer, result.pop("status", 200) if "error" in result else 200, result)
+        return True
+
+    async def discard_body(self, reader, headers, chunks=None):
+        """Read and drop the rest of a request body that has already been answered"""
+        try:
+            async for _ in chunks or self.body_chunks(reader, headers):
+                pass
+        except UploadTooLarge:
+            return False
+        return True
+
+    async def send_json(self, writer, status, payload, close=False):
+        data = json.dumps(payload).encode()
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+                      "Content-Type: application/json\r\n"
+                      f"Content-Length: {len(data)}\r\n"
+                      f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n").encode() + data)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body, writer):
+        if method == "GET" and path == "/health":
+            await self.send_json(writer, 200, {"status": "ok"})
+        elif method == "GET" and path == "/stats":
+            await self.send_json(writer, 200, self.service.snapshot())
+        elif method == "GET" and path == "/references":
+            await self.send_json(writer, 200, sorted(phrase for phrase, _ in self.service.references.values()))
+        elif method == "POST" and path == "/score":
+            try:
+                request = json.loads(body or b"{}")
+                phrase = request["phrase"]
+                audio = base64.b64decode(request["audioBase64"], validate=False)
+            except (ValueError, KeyError, TypeError):
+                await self.send_json(writer, 400, {"error": "phrase and audioBase64 are required"})
+                return
+            result = await self.service.score(phrase, audio)
+            await self.send_json(writer, result.pop("status", 200) if "error" in result else 200, result)
+        else:
+            await self.send_json(writer, 404, {"error": f"no route for {method} {path}"})
+
+    async def start(self):
+        self.service.start()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"🎤 Pronunciation service on http://{self.host}:{self.port} "
+              f"({self.service.workers} workers, {len(self.service.references)} references)")
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.service.close()
+
+    def start_in_thread(self):
+        """Run the server on a daemon thread; returns once it is accepting connections"""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="pronunciation-service", daemon=True).start()
+        ready.wait()
+        return self
+
+
+# Synthetic speech for placeholder references and benchmarks
+VOWEL_FORMANTS = {
+    "a": (800, 1200), "e": (500, 1900), "i": (300, 2300),
+    "o": (500, 900), "u": (350, 800), "y": (300, 2100),
+}
+
+
+def synthesize_speech(phrase, rate=1.0, pitch_hz=120.0, noise=0.003, seed=0):
+    """Deterministic vowel/consonant pseudo-speech for a phrase. Not intelligible, but
+    phrase-specific in spectrum, rhythm and intonation, which is what the scorer compares."""
+    rng = np.random.default_rng(seed)
+    words = re.findall(r"[a-z']+", phrase.lower())
+    syllables = [re.findall(r"[^aeiouy]*[aeiouy]+|[^aeiouy]+$", word) for word in words]
+    total = max(1, sum(len(parts) for parts in syllables))
+    pieces, spoken = [np.zeros(int(0.15 * SAMPLE_RATE), np.float32)], 0
+
+    for parts in syllables:
+        for part in parts:
+            vowels = part.lstrip("bcdfghjklmnpqrstvwxz'")
+            consonants = part[:len(part) - len(vowels)]
+            for letter in consonants:
+                t = np.arange(int(0.035 * SAMPLE_RATE / rate)) / SAMPLE_RATE
+                carrier = np.cos(2 * np.pi * (1500 + (ord(letter) % 20) * 180) * t)
+                pieces.append((rng.normal(0, 0.08, len(t)) * carrier * np.hanning(len(t))).astype(np.float32))
+            if vowels:
+                t = np.arange(int(0.16 * SAMPLE_RATE / rate)) / SAMPLE_RATE
+                # Declination over the phrase plus a small rise inside each syllable
+                progress = (spoken + t / t[-1]) / total
+                f0 = pitch_hz * (1.15 - 0.3 * progress + 0.05 * np.sin(np.pi * t / t[-1]))
+                phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+                formants = np.mean([VOWEL_FORMANTS[letter] for letter in vowels], axis=0)
+                harmonics = np.arange(1, 25)[:, None]
+                gains = sum(1.0 / (1.0 + ((harmonics * f0 - formant) / 120.0) ** 2) for formant in formants)
+                voiced = (gains * np.sin(harmonics * phase)).sum(axis=0) * np.hanning(len(t))
+                pieces.append((0.1 * voiced).astype(np.float32))
+                spoken += 1
+        pieces.append(np.zeros(int(0.07 * SAMPLE_RATE / rate), np.float32))
+
+    pieces.append(np.zeros(int(0.15 * SAMPLE_RATE), np.float32))
+    signal = np.concatenate(pieces)
+    signal = 0.5 * signal / (np.abs(signal).max() + 1e-9)
+    return (signal + rng.normal(0, noise, len(signal))).astype(np.float32)
+
+
+def write_references(directory, phrases=SAMPLE_PHRASES):
+    os.makedirs(directory, exist_ok=True)
+    for phrase in phrases:
+        with open(os.path.join(directory, f"{phrase_key(phrase)}.wav"), "wb") as handle:
+            handle.write(encode_wav(synthesize_speech(phrase)))
+        print(f"🎙️  {phrase_key(phrase)}.wav")
+
+
+def learner_attempt(phrase, rng):
+    """A synthetic learner reading the phrase: different voice, pace and background noise"""
+    return encode_wav(synthesize_speech(
+        phrase,
+        rate=rng.uniform(0.75, 1.3),
+        pitch_hz=rng.uniform(95, 230),
+        noise=rng.uniform(0.002, 0.02),
+        seed=int(rng.integers(1 << 31)),
+    ))
+
+
+async def run_benchmark(service, total_requests, concurrency, phrases, seed=7):
+    """Score total_requests synthetic attempts with `concurrency` in flight; returns a summary"""
+    rng = np.random.default_rng(seed)
+    attempts = [(phrase, learner_attempt(phrase, rng)) for phrase in phrases for _ in range(8)]
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        phrase, audio = attempts[index % len(attempts)]
+        async with limit:
+            started = time.perf_counter()
+            result = await service.score(phrase, audio)
+            latencies.append(time.perf_counter() - started)
+            return result
+
+    service.start()
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(index) for index in range(total_requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        service.close()
+
+    latencies = np.array(latencies) * 1000
+    scores = [result["score"] for result in results if "score" in result]
+    snapshot = service.snapshot()
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "workers": service.workers,
+        "max_batch": service.max_batch,
+        "seconds": elapsed,
+        "requests_per_second": total_requests / elapsed,
+        "requests_per_second_per_core": total_requests / elapsed / service.workers,
+        "realtime_factor": snapshot["audio_seconds"] / elapsed,
+        "mean_batch": snapshot["mean_batch"],
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_score": float(np.mean(scores)) if scores else None,
+        "errors": snapshot["errors"],
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline MFCC/DTW pronunciation scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--references", default="references",
+                        help="directory of reference WAVs named after their phrase")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scoring processes")
+    parser.add_argument("--max-batch", type=int, default=16, help="most clips scored in one batch")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0,
+                        help="how long the batcher waits for more clips once it has one")
+    parser.add_argument("--write-references", metavar="DIR",
+                        help="write synthetic placeholder references for the sample phrases and exit")
+    parser.add_argument("--bench", type=int, default=0, metavar="N",
+                        help="score N synthetic attempts in-process and report throughput")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight for --bench")
+    parser.add_argument("--json", help="write the --bench summary to this file")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.write_references:
+        write_references(args.write_references)
+        return 0
+
+    if args.bench:
+        # Synthetic references, so the benchmark needs no files
+        references = {phrase_key(phrase): (phrase, synthesize_speech(phrase)) for phrase in SAMPLE_PHRASES}
+        summaries = []
+        for max_batch in sorted({1, args.max_batch}):
+            service = PronunciationService(references, args.workers, max_batch, args.batch_window_ms)
+            summary = asyncio.run(run_benchmark(service, args.bench, args.concurrency, SAMPLE_PHRASES))
+            summaries.append(summary)
+            print(f"🎯 max batch {max_batch:>3}: {summary['requests_per_second']:7.1f} req/s "
+                  f"({summary['requests_per_second_per_core']:.1f} per core, {summary['workers']} workers), "
+                  f"mean batch {summary['mean_batch']:.1f}, p50 {summary['p50_ms']:.0f}ms "
+                  f"p99 {summary['p99_ms']:.0f}ms, {summary['realtime_factor']:.0f}x real time")
+        if args.json:
+            with open(args.json, "w") as handle:
+                json.dump(summaries, handle, indent=2)
+        return 0
+
+    references = load_references(args.references)
+    if not references:
+        print(f"⚠️  No reference WAVs in {args.references!r}; "
+              f"create placeholders with --write-references {args.references}")
+    service = PronunciationService(references, args.workers, args.max_batch, args.batch_window_ms)
+    try:
+        asyncio.run(PronunciationServer(service, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
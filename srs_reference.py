@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Vectorized reference implementation of the SRS scheduler in lib/srs.js
+Replays large synthetic review logs with NumPy so backend_test.py can
+cross-check server output and size due queues at millions of cards.
+
+Benchmark the reference itself with:
+    python srs_reference.py --cards 1000000 --max-reviews 8
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+RESULTS = ("again", "hard", "good", "easy")
+AGAIN, HARD, GOOD, EASY = range(len(RESULTS))
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MAX_INTERVAL = 3650
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Ease change per rating, in RESULTS order
+EASE_STEP = np.array([-0.2, -0.15, 0.0, 0.15])
+
+# Rating mix of a typical learner, in RESULTS order
+DEFAULT_RATING_WEIGHTS = (0.1, 0.15, 0.6, 0.15)
+
+
+def js_round(values):
+    """Math.round semantics (ties towards +infinity), unlike numpy's banker's rounding"""
+    floor = np.floor(values)
+    return floor + (values - floor >= 0.5)
+
+
+def initial_state(n_cards):
+    """State of cards that have never been reviewed"""
+    return {
+        "interval": np.zeros(n_cards, dtype=np.int64),
+        "ease": np.full(n_cards, DEFAULT_EASE),
+        "repetitions": np.zeros(n_cards, dtype=np.int64),
+        "lapses": np.zeros(n_cards, dtype=np.int64),
+        "due_ms": np.full(n_cards, np.iinfo(np.int64).max, dtype=np.int64),
+    }
+
+
+def encode_results(results):
+    """Map result names to rating codes; unknown results count as 'again' like the server"""
+    lookup = {name: code for code, name in enumerate(RESULTS)}
+    return np.array([lookup.get(result, AGAIN) for result in results], dtype=np.int8)
+
+
+def schedule(interval, ease, repetitions, lapses, ratings, reviewed_ms):
+    """One scheduleReview() step applied element-wise; returns the new state arrays"""
+    interval = np.asarray(interval, dtype=np.int64)
+    ease = np.asarray(ease, dtype=np.float64)
+    repetitions = np.asarray(repetitions, dtype=np.int64)
+    lapses = np.asarray(lapses, dtype=np.int64)
+    ratings = np.asarray(ratings)
+
+    first = repetitions == 0
+    again, hard, easy = ratings == AGAIN, ratings == HARD, ratings == EASY
+
+    # Each branch's arithmetic is kept exactly as scheduleReview() orders it, but the
+    # branches share one multiply and one rounding pass instead of evaluating all three,
+    # and work in place: at millions of cards the temporaries cost more than the math
+    new_ease = ease + EASE_STEP[ratings]
+    np.maximum(new_ease, MIN_EASE, out=new_ease, where=ratings <= HARD)
+
+    grow = interval + 1
+    factor = np.where(easy, new_ease, ease)
+    np.copyto(factor, 1.2, where=hard)
+    scaled = interval * factor
+    np.multiply(scaled, 1.3, out=scaled, where=easy)
+    with np.errstate(invalid="ignore"):
+        new_interval = np.maximum(grow, js_round(scaled)).astype(np.int64)
+    np.copyto(new_interval, np.maximum(grow, 4), where=~(easy | hard) & (repetitions == 1))
+    np.copyto(new_interval, np.where(easy, 4, 1), where=first)
+    np.copyto(new_interval, 1, where=again)
+    np.minimum(new_interval, MAX_INTERVAL, out=new_interval)
+
+    new_repetitions = np.where(again, 0, repetitions + 1)
+    new_lapses = lapses + again
+    new_ease = js_round(new_ease * 100) / 100
+
+    return {
+        "interval": new_interval,
+        "ease": new_ease,
+        "repetitions": new_repetitions,
+        "lapses": new_lapses,
+        "due_ms": np.asarray(reviewed_ms, dtype=np.int64) + new_interval * DAY_MS,
+    }
+
+
+def replay(card_index, ratings, reviewed_ms, n_cards, state=None):
+    """
+    Replay a review log in order. Vectorized across cards: the Python loop
+    only runs once per review *depth* (the most reviews any single card has).
+    Returns (final_state, per_review) where per_review holds the state after
+    each log entry, aligned with the input order.
+    """
+    card_index = np.asarray(card_index, dtype=np.int64)
+    ratings = np.asarray(ratings)
+    reviewed_ms = np.asarray(reviewed_ms, dtype=np.int64)
+    state = {key: value.copy() for key, value in (state or initial_state(n_cards)).items()}
+
+    # Rank of each review within its card, preserving log order
+    order = np.argsort(card_index, kind="stable")
+    sorted_cards = card_index[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cards[1:] != sorted_cards[:-1]])
+    group_sizes = np.diff(np.r_[starts, len(sorted_cards)])
+    depth = np.arange(len(sorted_cards)) - np.repeat(starts, group_sizes)
+
+    per_review = {key: np.empty(len(card_index), dtype=value.dtype) for key, value in state.items()}
+    for step in range(int(depth.max()) + 1 if len(depth) else 0):
+        rows = order[depth == step]
+        cards = card_index[rows]
+        updated = schedule(
+            state["interval"][cards], state["ease"][cards], state["repetitions"][cards],
+            state["lapses"][cards], ratings[rows], reviewed_ms[rows],
+        )
+        for key, values in updated.items():
+            state[key][cards] = values
+            per_review[key][rows] = values
+
+    return state, per_review
+
+
+def due_queue(state, now_ms, limit):
+    """Indices of the `limit` most overdue cards, matching getDueCards() ordering"""
+    due = np.flatnonzero(state["due_ms"] <= now_ms)
+    if len(due) > limit:
+        due = due[np.argpartition(state["due_ms"][due], limit - 1)[:limit]]
+    return due[np.argsort(state["due_ms"][due], kind="stable")]
+
+
+def synthetic_log(n_cards, max_reviews=8, span_days=120, now_ms=None, seed=42,
+                  weights=DEFAULT_RATING_WEIGHTS):
+    """Random review history: 1..max_reviews reviews per card, spread over the last span_days"""
+    rng = np.random.default_rng(seed)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+    counts = rng.integers(1, max_reviews + 1, size=n_cards)
+    card_index = np.repeat(np.arange(n_cards, dtype=np.int64), counts)
+    ratings = rng.choice(len(RESULTS), size=len(card_index), p=weights).astype(np.int8)
+    offsets = rng.integers(0, span_days * DAY_MS, size=len(card_index), dtype=np.int64)
+
+    # Chronological log: older reviews first
+    reviewed_ms = now_ms - offsets
+    order = np.argsort(reviewed_ms, kind="stable")
+    return card_index[order], ratings[order], reviewed_ms[order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized SRS reference scheduler")
+    parser.add_argument("--cards", type=int, default=1_000_000, help="synthetic cards to schedule")
+    parser.add_argument("--max-reviews", type=int, default=8, help="maximum reviews per card")
+    parser.add_argument("--span-days", type=int, default=120, help="history window in days")
+    parser.add_argument("--limit", type=int, default=20, help="due queue page size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    now_ms = int(time.time() * 1000)
+    started = time.perf_counter()
+    log = synthetic_log(args.cards, args.max_reviews, args.span_days, now_ms, args.seed)
+    generated = time.perf_counter()
+    state, _ = replay(*log, n_cards=args.cards)
+    replayed = time.perf_counter()
+    queue = due_queue(state, now_ms, args.limit)
+    queued = time.perf_counter()
+
+    due_count = int(np.count_nonzero(state["due_ms"] <= now_ms))
+    print(f"🧮 {len(log[0]):,} reviews over {args.cards:,} cards")
+    print(f"   generate: {generated - started:.2f}s  replay: {replayed - generated:.2f}s  "
+          f"due queue: {(queued - replayed) * 1000:.1f}ms")
+    print(f"📅 {due_count:,} cards due now ({due_count / args.cards:.1%}), "
+          f"median interval {np.median(state['interval']):.0f} days, "
+          f"mean ease {state['ease'].mean():.2f}")
+    print(f"   first {len(queue)} due: {queue[:10].tolist()}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
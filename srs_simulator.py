@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Offline SRS simulator for capacity planning
+Simulates N learners x M cards over D days with the production scheduler
+(srs_reference.schedule, the NumPy twin of lib/srs.js) and a recall-probability
+model. Reports daily review load, due-queue sizes and retention, and turns the
+peak day into vocabulary/due and vocabulary/review request rates.
+
+Card state lives in flat NumPy arrays indexed by learner * cards + card, so
+each simulated day is a handful of vectorized passes over the due cards and run
+time follows the number of reviews (about 0.4 s per peak day of 100k learners x
+100 cards on one core, some 40 s for the default 180 days):
+    python srs_simulator.py --learners 100000 --cards 100 --days 180 --csv load.csv
+"""
+
+import argparse
+import csv
+import json
+import time
+
+import numpy as np
+
+import srs_reference
+
+NOT_DUE = np.iinfo(np.int32).max
+
+LN_RECALL_AT_STABILITY = float(np.log(0.9))
+
+# Rating mix for recalled cards, in (hard, good, easy) order
+DEFAULT_RECALL_MIX = (0.15, 0.7, 0.15)
+
+
+def recall_exponential(elapsed, stability):
+    """Exponential forgetting curve, 90% recall when elapsed == stability"""
+    return np.exp(elapsed / stability * LN_RECALL_AT_STABILITY)
+
+
+def recall_power(elapsed, stability):
+    """FSRS power forgetting curve, 90% recall when elapsed == stability"""
+    return np.power(1.0 + 19.0 / 81.0 * elapsed / stability, -0.5)
+
+
+RECALL_MODELS = {
+    "exponential": recall_exponential,
+    "power": recall_power,
+}
+
+
+class SRSSimulator:
+    """Array-backed simulation of every learner's deck, one vectorized step per day"""
+
+    def __init__(self, learners, cards, days, new_per_day=10, active_rate=0.7,
+                 max_reviews_per_day=0, model="exponential", ability_sigma=0.3,
+                 first_recall=0.6, recall_mix=DEFAULT_RECALL_MIX, seed=42):
+        self.learners = learners
+        self.cards = cards
+        self.days = days
+        self.new_per_day = new_per_day
+        self.active_rate = active_rate
+        self.max_reviews_per_day = max_reviews_per_day
+        self.recall = RECALL_MODELS[model]
+        self.first_recall = first_recall
+        # Ratings for recalled cards are drawn by inverting this CDF over (hard, good, easy)
+        self.recall_cdf = np.cumsum(recall_mix[:-1]) / np.sum(recall_mix)
+        self.rng = np.random.default_rng(seed)
+
+        total = learners * cards
+        # Compact per-card state; ease is stored in hundredths, exactly as rounded by the scheduler
+        self.interval = np.zeros(total, dtype=np.int16)
+        self.ease_centi = np.full(total, int(srs_reference.DEFAULT_EASE * 100), dtype=np.int16)
+        self.repetitions = np.zeros(total, dtype=np.int16)
+        self.lapses = np.zeros(total, dtype=np.int16)
+        self.last_day = np.full(total, -1, dtype=np.int16)
+        self.due_day = np.full(total, NOT_DUE, dtype=np.int32)
+
+        self.introduced = np.zeros(learners, dtype=np.int32)
+        # Some learners forget faster than others; scales card stability
+        self.ability = self.rng.lognormal(0.0, ability_sigma, size=learners).astype(np.float32)
+
+    def introduce_cards(self, day, active):
+        """Unlock up to new_per_day unseen cards for each active learner, due immediately"""
+        learners = np.flatnonzero(active)
+        counts = np.minimum(self.new_per_day, self.cards - self.introduced[learners])
+        if counts.sum() == 0:
+            return 0
+        owners = np.repeat(learners, counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.arange(counts.sum()) - starts + self.introduced[owners]
+        self.due_day[owners * self.cards + positions] = day
+        self.introduced[learners] += counts
+        return int(counts.sum())
+
+    def select_reviews(self, due, owners, active):
+        """Cards actually reviewed today: active learners only, capped and most overdue first"""
+        mask = active[owners]
+        due, owners = due[mask], owners[mask]
+        if self.max_reviews_per_day and len(due):
+            order = np.lexsort((self.due_day[due], owners))
+            due, owners = due[order], owners[order]
+            starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+            rank = np.arange(len(due)) - np.repeat(starts, np.diff(np.r_[starts, len(due)]))
+            keep = rank < self.max_reviews_per_day
+            due, owners = due[keep], owners[keep]
+        return due, owners
+
+    def review(self, day, cards, owners):
+        """Draw recall outcomes and reschedule; returns the number of cards recalled"""
+        # The recall model runs in float32: it only feeds random draws, and halves the memory traffic
+        interval = self.interval[cards]
+        last_day = self.last_day[cards]
+        stability = np.maximum(interval, 1).astype(np.float32) * self.ability[owners]
+        probability = self.recall((day - last_day).astype(np.float32), stability)
+        probability[last_day < 0] = self.first_recall
+
+        draws = self.rng.random((2, len(cards)), dtype=np.float32)
+        recalled = draws[0] < probability
+        ratings = np.full(len(cards), srs_reference.HARD, dtype=np.int8)
+        for edge in self.recall_cdf:
+            ratings += draws[1] >= edge
+        ratings[~recalled] = srs_reference.AGAIN
+
+        state = srs_reference.schedule(
+            interval, self.ease_centi[cards] / 100, self.repetitions[cards],
+            self.lapses[cards], ratings, 0,
+        )
+        self.interval[cards] = state["interval"]
+        self.ease_centi[cards] = np.rint(state["ease"] * 100)
+        self.repetitions[cards] = np.minimum(state["repetitions"], np.iinfo(np.int16).max)
+        self.lapses[cards] = np.minimum(state["lapses"], np.iinfo(np.int16).max)
+        self.last_day[cards] = day
+        self.due_day[cards] = day + state["interval"]
+        return int(recalled.sum())
+
+    def retrievability(self, day):
+        """Mean probability of recalling each introduced card today (the retention curve)"""
+        seen = np.flatnonzero(self.last_day >= 0)
+        if len(seen) == 0:
+            return 0.0
+        stability = np.maximum(self.interval[seen], 1).astype(np.float32) * self.ability[seen // self.cards]
+        return float(self.recall((day - self.last_day[seen]).astype(np.float32), stability).mean(dtype=np.float64))
+
+    def run(self, curve_every=7, progress=None):
+        """Simulate every day; returns one dict of metrics per day"""
+        daily = []
+        for day in range(self.days):
+            active = self.rng.random(self.learners) < self.active_rate
+            new_cards = self.introduce_cards(day, active)
+
+            due = np.flatnonzero(self.due_day <= day)
+            owners = due // self.cards
+            queue_sizes = np.bincount(owners, minlength=self.learners)
+            reviewed, reviewers = self.select_reviews(due, owners, active)
+            recalled = self.review(day, reviewed, reviewers) if len(reviewed) else 0
+            sessions = int(np.count_nonzero(np.bincount(reviewers, minlength=self.learners)))
+
+            row = {
+                "day": day,
+                "active_learners": int(active.sum()),
+                "sessions": sessions,
+                "new_cards": new_cards,
+                "reviews": len(reviewed),
+                "lapses": len(reviewed) - recalled,
+                "due_cards": len(due),
+                "backlog": len(due) - len(reviewed),
+                "due_queue_p50": float(np.percentile(queue_sizes, 50)),
+                "due_queue_p95": float(np.percentile(queue_sizes, 95)),
+                "due_queue_max": int(queue_sizes.max()) if len(queue_sizes) else 0,
+                "review_retention": recalled / len(reviewed) if len(reviewed) else None,
+                "retrievability": None,
+            }
+            if curve_every and (day % curve_every == 0 or day == self.days - 1):
+                row["retrievability"] = self.retrievability(day)
+            daily.append(row)
+            if progress:
+                progress(row)
+        return daily
+
+
+def capacity_plan(daily, page_size=10, peak_hour_share=0.15, bulk_reviews=True):
+    """Turn the busiest simulated day into request rates for the vocabulary routes"""
+    peak = max(daily, key=lambda row: row["reviews"])
+    sessions = max(peak["sessions"], 1)
+    reviews_per_session = peak["reviews"] / sessions
+    # Each session pages through its due cards, plus one empty read at the end
+    due_requests = peak["sessions"] * (np.ceil(reviews_per_session / page_size) + 1)
+    review_requests = peak["sessions"] if bulk_reviews else peak["reviews"]
+    per_second = peak_hour_share / 3600
+    return {
+        "peak_day": peak["day"],
+        "peak_reviews": peak["reviews"],
+        "peak_sessions": peak["sessions"],
+        "reviews_per_session": reviews_per_session,
+        "peak_hour_share": peak_hour_share,
+        "vocabulary_due_rps": float(due_requests * per_second),
+        "vocabulary_review_rps": float(review_requests * per_second),
+        "srs_writes_per_second": float(peak["reviews"] * per_second),
+        "bulk_reviews": bulk_reviews,
+    }
+
+
+def write_daily_csv(path, daily):
+    with open(path, "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=list(daily[0]))
+        writer.writeheader()
+        writer.writerows(daily)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate SRS review load for capacity planning")
+    parser.add_argument("--learners", type=int, default=100_000)
+    parser.add_argument("--cards", type=int, default=100, help="deck size per learner")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--new-per-day", type=int, default=10, help="new cards per active learner per day")
+    parser.add_argument("--active-rate", type=float, default=0.7,
+                        help="probability a learner studies on a given day")
+    parser.add_argument("--max-reviews-per-day", type=int, default=0,
+                        help="per-learner daily review cap (0 = review everything due)")
+    parser.add_argument("--model", choices=sorted(RECALL_MODELS), default="exponential",
+                        help="recall-probability model")
+    parser.add_argument("--ability-sigma", type=float, default=0.3,
+                        help="spread of learner memory strength (lognormal sigma)")
+    parser.add_argument("--first-recall", type=float, default=0.6,
+                        help="probability a brand-new card is answered correctly")
+    parser.add_argument("--page-size", type=int, default=10, help="vocabulary/due limit used by clients")
+    parser.add_argument("--peak-hour-share", type=float, default=0.15,
+                        help="fraction of a day's traffic that lands in the busiest hour")
+    parser.add_argument("--per-card-reviews", action="store_true",
+                        help="plan for one vocabulary/review call per card instead of bulk sessions")
+    parser.add_argument("--curve-every", type=int, default=7, help="days between retention-curve samples")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", help="write the daily series to this CSV file")
+    parser.add_argument("--json", help="write daily series and capacity plan to this JSON file")
+    parser.add_argument("--quiet", action="store_true", help="only print the capacity plan")
+    args = parser.parse_args()
+
+    simulator = SRSSimulator(
+        learners=args.learners,
+        cards=args.cards,
+        days=args.days,
+        new_per_day=args.new_per_day,
+        active_rate=args.active_rate,
+        max_reviews_per_day=args.max_reviews_per_day,
+        model=args.model,
+        ability_sigma=args.ability_sigma,
+        first_recall=args.first_recall,
+        seed=args.seed,
+    )
+
+    def progress(row):
+        if args.quiet or row["retrievability"] is None:
+            return
+        retention = row["review_retention"]
+        print(f"  day {row['day']:>4}  reviews {row['reviews']:>11,}  new {row['new_cards']:>9,}  "
+              f"due {row['due_cards']:>11,}  backlog {row['backlog']:>10,}  "
+              f"p95 queue {row['due_queue_p95']:>6.0f}  "
+              f"retention {retention if retention is not None else 0:.1%}  "
+              f"retrievability {row['retrievability']:.1%}")
+
+    print(f"🧠 Simulating {args.learners:,} learners x {args.cards} cards over {args.days} days "
+          f"({args.model} recall model)")
+    start = time.perf_counter()
+    daily = simulator.run(curve_every=args.curve_every, progress=progress)
+    elapsed = time.perf_counter() - start
+
+    plan = capacity_plan(daily, page_size=args.page_size, peak_hour_share=args.peak_hour_share,
+                         bulk_reviews=not args.per_card_reviews)
+    print(f"\n⏱️  Simulated {args.learners * args.cards:,} cards x {args.days} days in {elapsed:.1f}s")
+    print(f"📈 Peak day {plan['peak_day']}: {plan['peak_reviews']:,} reviews in "
+          f"{plan['peak_sessions']:,} sessions ({plan['reviews_per_session']:.1f} per session)")
+    print(f"🚦 Peak hour ({plan['peak_hour_share']:.0%} of daily traffic): "
+          f"vocabulary/due {plan['vocabulary_due_rps']:.1f} req/s, "
+          f"vocabulary/review{'/bulk' if plan['bulk_reviews'] else ''} "
+          f"{plan['vocabulary_review_rps']:.1f} req/s, "
+          f"srsReviews writes {plan['srs_writes_per_second']:.1f}/s")
+
+    if args.csv:
+        write_daily_csv(args.csv, daily)
+        print(f"💾 Daily series written to {args.csv}")
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"parameters": vars(args), "capacity": plan, "daily": daily}, handle, indent=2)
+        print(f"💾 Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())